@@ -0,0 +1,109 @@
+"""Chat message counters.
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-18
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision: str = "003"
+down_revision: Union[str, None] = "002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("messages", sa.Column("seq", sa.BigInteger, nullable=True))
+    op.add_column("chats", sa.Column("message_seq", sa.BigInteger, server_default="0", nullable=False))
+    op.add_column("chats", sa.Column("last_message_id", postgresql.UUID(as_uuid=True), nullable=True))
+    op.add_column("chat_members", sa.Column("last_read_seq", sa.BigInteger, server_default="0", nullable=False))
+    op.add_column("chat_members", sa.Column("unread_excluded", sa.Integer, server_default="0", nullable=False))
+
+    # Порядковые номера сообщений внутри чата
+    op.execute(
+        """
+        UPDATE messages AS m
+        SET seq = numbered.rn
+        FROM (
+            SELECT id, row_number() OVER (PARTITION BY chat_id ORDER BY created_at, id) AS rn
+            FROM messages
+        ) AS numbered
+        WHERE m.id = numbered.id
+        """
+    )
+    op.alter_column("messages", "seq", nullable=False)
+    op.create_index("ix_messages_chat_id_seq", "messages", ["chat_id", "seq"], unique=True)
+
+    op.execute(
+        """
+        UPDATE chats AS c
+        SET message_seq = latest.seq,
+            last_message_id = latest.id
+        FROM (
+            SELECT DISTINCT ON (chat_id) chat_id, id, seq
+            FROM messages
+            ORDER BY chat_id, seq DESC
+        ) AS latest
+        WHERE c.id = latest.chat_id
+        """
+    )
+    op.create_foreign_key(
+        "fk_chats_last_message_id", "chats", "messages",
+        ["last_message_id"], ["id"], ondelete="SET NULL",
+    )
+
+    # Прочитанное до last_read_at; без отметки чтения — вся история прочитана,
+    # как и раньше (unread_count был 0)
+    op.execute(
+        """
+        UPDATE chat_members AS cm
+        SET last_read_seq = COALESCE(
+            (
+                SELECT max(m.seq) FROM messages AS m
+                WHERE m.chat_id = cm.chat_id AND m.created_at <= cm.last_read_at
+            ),
+            0
+        )
+        WHERE cm.last_read_at IS NOT NULL
+        """
+    )
+    op.execute(
+        """
+        UPDATE chat_members AS cm
+        SET last_read_seq = c.message_seq
+        FROM chats AS c
+        WHERE c.id = cm.chat_id AND cm.last_read_at IS NULL
+        """
+    )
+    # Собственные сообщения после last_read_seq не считаются непрочитанными
+    op.execute(
+        """
+        UPDATE chat_members AS cm
+        SET unread_excluded = own.cnt
+        FROM (
+            SELECT m.chat_id, m.sender_id, count(*) AS cnt
+            FROM messages AS m
+            JOIN chat_members AS member
+                ON member.chat_id = m.chat_id AND member.user_id = m.sender_id
+            WHERE m.seq > member.last_read_seq
+            GROUP BY m.chat_id, m.sender_id
+        ) AS own
+        WHERE cm.chat_id = own.chat_id AND cm.user_id = own.sender_id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint("fk_chats_last_message_id", "chats", type_="foreignkey")
+    op.drop_column("chat_members", "unread_excluded")
+    op.drop_column("chat_members", "last_read_seq")
+    op.drop_column("chats", "last_message_id")
+    op.drop_column("chats", "message_seq")
+    op.drop_index("ix_messages_chat_id_seq", table_name="messages")
+    op.drop_column("messages", "seq")
@@ -0,0 +1,32 @@
+"""Trigram index on message content.
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-18
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "005"
+down_revision: Union[str, None] = "004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # Индекс обслуживает ILIKE '%q%' и операторы похожести <%, %
+    op.create_index(
+        "ix_messages_content_trgm",
+        "messages",
+        ["content"],
+        postgresql_using="gin",
+        postgresql_ops={"content": "gin_trgm_ops"},
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_messages_content_trgm", table_name="messages")
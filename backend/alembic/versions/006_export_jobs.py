@@ -0,0 +1,63 @@
+"""Export jobs table.
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-18
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision: str = "006"
+down_revision: Union[str, None] = "005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "export_jobs",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column(
+            "user_id",
+            postgresql.UUID(as_uuid=True),
+            sa.ForeignKey("users.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column(
+            "chat_id",
+            postgresql.UUID(as_uuid=True),
+            sa.ForeignKey("chats.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("format", sa.String(10), nullable=False),
+        sa.Column("status", sa.String(20), nullable=False),
+        sa.Column("include_media", sa.Boolean, nullable=False),
+        sa.Column("start_date", sa.DateTime, nullable=True),
+        sa.Column("end_date", sa.DateTime, nullable=True),
+        sa.Column("until_seq", sa.BigInteger, nullable=True),
+        sa.Column("total_messages", sa.Integer, nullable=True),
+        sa.Column("message_count", sa.Integer, server_default="0", nullable=False),
+        sa.Column("last_seq", sa.BigInteger, server_default="0", nullable=False),
+        sa.Column("file_path", sa.String(500), nullable=True),
+        sa.Column("file_size", sa.BigInteger, nullable=True),
+        sa.Column("error_message", sa.String(500), nullable=True),
+        sa.Column("attempts", sa.Integer, server_default="0", nullable=False),
+        sa.Column("created_at", sa.DateTime, server_default=sa.func.now(), nullable=False),
+        sa.Column("started_at", sa.DateTime, nullable=True),
+        sa.Column("heartbeat_at", sa.DateTime, nullable=True),
+        sa.Column("completed_at", sa.DateTime, nullable=True),
+    )
+    op.create_index("ix_export_jobs_user_id", "export_jobs", ["user_id"])
+    # Очередь: ожидающие и брошенные задачи по времени создания
+    op.create_index("ix_export_jobs_status_created_at", "export_jobs", ["status", "created_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_export_jobs_status_created_at", table_name="export_jobs")
+    op.drop_index("ix_export_jobs_user_id", table_name="export_jobs")
+    op.drop_table("export_jobs")
@@ -0,0 +1,42 @@
+"""Content-addressed media blobs.
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-18
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "008"
+down_revision: Union[str, None] = "007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "media_blobs",
+        sa.Column("sha256", sa.String(64), primary_key=True),
+        sa.Column("storage_path", sa.String(500), nullable=False),
+        sa.Column("size", sa.BigInteger, nullable=False),
+        sa.Column("ref_count", sa.Integer, server_default="1", nullable=False),
+        sa.Column("created_at", sa.DateTime, server_default=sa.func.now(), nullable=False),
+    )
+    # Файлы, загруженные раньше, остаются на своих путях с content_hash = NULL
+    op.add_column("media_files", sa.Column("content_hash", sa.String(64), nullable=True))
+    op.create_foreign_key(
+        "fk_media_files_content_hash", "media_files", "media_blobs",
+        ["content_hash"], ["sha256"],
+    )
+    op.create_index("ix_media_files_content_hash", "media_files", ["content_hash"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_media_files_content_hash", table_name="media_files")
+    op.drop_constraint("fk_media_files_content_hash", "media_files", type_="foreignkey")
+    op.drop_column("media_files", "content_hash")
+    op.drop_table("media_blobs")
@@ -0,0 +1,33 @@
+"""Media preview generation status.
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-18
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "009"
+down_revision: Union[str, None] = "008"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("media_files", sa.Column("preview_status", sa.String(20), nullable=True))
+    # Очередь досоздания превью: только ожидающие записи
+    op.create_index(
+        "ix_media_files_preview_pending",
+        "media_files",
+        ["created_at"],
+        postgresql_where=sa.text("preview_status = 'pending'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_media_files_preview_pending", table_name="media_files")
+    op.drop_column("media_files", "preview_status")
@@ -0,0 +1,33 @@
+"""Media metadata extraction status.
+
+Revision ID: 010
+Revises: 009
+Create Date: 2026-10-18
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "010"
+down_revision: Union[str, None] = "009"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("media_files", sa.Column("metadata_status", sa.String(20), nullable=True))
+    # Очередь извлечения метаданных: только ожидающие записи
+    op.create_index(
+        "ix_media_files_metadata_pending",
+        "media_files",
+        ["created_at"],
+        postgresql_where=sa.text("metadata_status = 'pending'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_media_files_metadata_pending", table_name="media_files")
+    op.drop_column("media_files", "metadata_status")
@@ -0,0 +1,30 @@
+"""Voice message waveform peaks.
+
+Revision ID: 011
+Revises: 010
+Create Date: 2026-10-18
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "011"
+down_revision: Union[str, None] = "010"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("media_files", sa.Column("waveform", sa.LargeBinary(), nullable=True))
+    # Голосовые без волны (в т.ч. уже разобранные) проходят обработку заново
+    op.execute(
+        "UPDATE media_files SET metadata_status = 'pending' "
+        "WHERE media_type = 'voice' AND metadata_status IS DISTINCT FROM 'pending'"
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("media_files", "waveform")
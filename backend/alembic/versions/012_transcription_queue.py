@@ -0,0 +1,39 @@
+"""Transcription job queue.
+
+Revision ID: 012
+Revises: 011
+Create Date: 2026-10-18
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "012"
+down_revision: Union[str, None] = "011"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "transcriptions",
+        sa.Column("attempts", sa.Integer, server_default="0", nullable=False),
+    )
+    op.add_column("transcriptions", sa.Column("started_at", sa.DateTime, nullable=True))
+    op.add_column("transcriptions", sa.Column("available_at", sa.DateTime, nullable=True))
+    # Заглушка переводила задачи в processing без исполнителя: вернуть в очередь
+    op.execute("UPDATE transcriptions SET status = 'pending' WHERE status = 'processing'")
+    # Очередь: ожидающие и брошенные задачи по времени создания
+    op.create_index(
+        "ix_transcriptions_status_created_at", "transcriptions", ["status", "created_at"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_transcriptions_status_created_at", table_name="transcriptions")
+    op.drop_column("transcriptions", "available_at")
+    op.drop_column("transcriptions", "started_at")
+    op.drop_column("transcriptions", "attempts")
@@ -0,0 +1,36 @@
+"""Media metadata claim.
+
+Revision ID: 014
+Revises: 013
+Create Date: 2026-10-18
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "014"
+down_revision: Union[str, None] = "013"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("media_files", sa.Column("metadata_claimed_at", sa.DateTime, nullable=True))
+    # Брошенные пакеты: забранные записи по времени захвата
+    op.create_index(
+        "ix_media_files_metadata_processing",
+        "media_files",
+        ["metadata_claimed_at"],
+        postgresql_where=sa.text("metadata_status = 'processing'"),
+    )
+
+
+def downgrade() -> None:
+    op.execute(
+        "UPDATE media_files SET metadata_status = 'pending' WHERE metadata_status = 'processing'"
+    )
+    op.drop_index("ix_media_files_metadata_processing", table_name="media_files")
+    op.drop_column("media_files", "metadata_claimed_at")
@@ -0,0 +1,199 @@
+"""Бенчмарк поиска по сообщениям на сгенерированном корпусе.
+
+Сравнивает прежний путь ``lower(content) LIKE '%q%'`` (``contains()``)
+с триграммным индексом (ILIKE и ``<%``) и полнотекстовым ``tsvector``.
+Корпус создаётся в отдельной таблице ``bench_messages`` и не затрагивает
+данные приложения.
+
+Запуск (нужен PostgreSQL с pg_trgm)::
+
+    python -m scripts.benchmark_search --rows 1000000
+    python -m scripts.benchmark_search --database-url postgresql+asyncpg://... --keep
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import time
+from dataclasses import dataclass
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, create_async_engine
+
+from src.config import get_settings
+
+TABLE = "bench_messages"
+
+VOCABULARY = [
+    "привет",
+    "встреча",
+    "завтра",
+    "сообщение",
+    "проект",
+    "документы",
+    "отчёт",
+    "созвон",
+    "пожалуйста",
+    "спасибо",
+    "отправил",
+    "посмотри",
+    "вечером",
+    "сегодня",
+    "hello",
+    "meeting",
+    "release",
+    "deploy",
+    "review",
+    "please",
+    "thanks",
+    "tomorrow",
+    "https://example.com/docs",
+    "https://git.example.org/merge/42",
+    "v2.3.1",
+    "ok",
+]
+
+# (название, запрос): части слов, URL, опечатки и обычные слова
+QUERIES = [
+    ("слово", "встреча"),
+    ("часть слова", "докум"),
+    ("url", "example.com/docs"),
+    ("опечатка", "сообщенье"),
+    ("англ. слово", "release"),
+]
+
+STRATEGIES = {
+    "contains": "lower(content) LIKE '%' || lower(:q) || '%'",
+    "trgm_ilike": "content ILIKE '%' || :q || '%'",
+    "trgm_fuzzy": ":q <% content",
+    "fts": "search_vector @@ websearch_to_tsquery('russian', :q)",
+}
+
+
+@dataclass
+class Measurement:
+    """Результат замера одной стратегии на одном запросе."""
+
+    strategy: str
+    label: str
+    rows: int
+    median_ms: float
+    p95_ms: float
+
+
+async def create_corpus(conn: AsyncConnection, rows: int) -> None:
+    """Создать таблицу, сгенерировать корпус и построить индексы."""
+    await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    await conn.execute(text(f"DROP TABLE IF EXISTS {TABLE}"))
+    await conn.execute(
+        text(
+            f"""
+            CREATE UNLOGGED TABLE {TABLE} (
+                id bigserial PRIMARY KEY,
+                content text NOT NULL,
+                search_vector tsvector
+                    GENERATED ALWAYS AS (to_tsvector('russian', content)) STORED
+            )
+            """
+        )
+    )
+    # Сообщение из 3–17 случайных слов; ссылка на g не даёт Postgres
+    # вычислить подзапрос один раз на весь корпус
+    await conn.execute(
+        text(
+            f"""
+            INSERT INTO {TABLE} (content)
+            SELECT array_to_string(
+                ARRAY(
+                    SELECT ((:vocabulary)::text[])
+                        [1 + floor(random() * cardinality((:vocabulary)::text[]))::int]
+                    FROM generate_series(1, 3 + (g % 15))
+                    WHERE g > 0
+                ),
+                ' '
+            )
+            FROM generate_series(1, :rows) AS g
+            """  # noqa: S608
+        ),
+        {"vocabulary": VOCABULARY, "rows": rows},
+    )
+    await conn.execute(
+        text(f"CREATE INDEX {TABLE}_trgm ON {TABLE} USING gin (content gin_trgm_ops)")
+    )
+    await conn.execute(text(f"CREATE INDEX {TABLE}_fts ON {TABLE} USING gin (search_vector)"))
+    await conn.execute(text(f"ANALYZE {TABLE}"))
+
+
+async def measure(
+    conn: AsyncConnection,
+    strategy: str,
+    label: str,
+    query: str,
+    repeat: int,
+) -> Measurement:
+    """Выполнить count(*) по стратегии ``repeat`` раз и посчитать время."""
+    statement = text(f"SELECT count(*) FROM {TABLE} WHERE {STRATEGIES[strategy]}")  # noqa: S608
+    timings: list[float] = []
+    rows = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = int(await conn.scalar(statement, {"q": query}) or 0)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return Measurement(
+        strategy=strategy,
+        label=label,
+        rows=rows,
+        median_ms=statistics.median(timings),
+        p95_ms=timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+    )
+
+
+async def run(database_url: str, rows: int, repeat: int, threshold: float, keep: bool) -> None:
+    """Сгенерировать корпус и вывести таблицу замеров."""
+    engine = create_async_engine(database_url)
+    try:
+        async with engine.begin() as conn:
+            started = time.perf_counter()
+            await create_corpus(conn, rows)
+            print(f"Корпус: {rows} сообщений за {time.perf_counter() - started:.1f} с\n")
+
+        async with engine.connect() as conn:
+            await conn.execute(
+                text("SELECT set_config('pg_trgm.word_similarity_threshold', :t, false)"),
+                {"t": str(threshold)},
+            )
+            print(f"{'запрос':<14}{'стратегия':<12}{'строк':>10}{'медиана, мс':>14}{'p95, мс':>10}")
+            for label, query in QUERIES:
+                for strategy in STRATEGIES:
+                    m = await measure(conn, strategy, label, query, repeat)
+                    print(
+                        f"{m.label:<14}{m.strategy:<12}{m.rows:>10}"
+                        f"{m.median_ms:>14.1f}{m.p95_ms:>10.1f}"
+                    )
+                print()
+
+        if not keep:
+            async with engine.begin() as conn:
+                await conn.execute(text(f"DROP TABLE IF EXISTS {TABLE}"))
+    finally:
+        await engine.dispose()
+
+
+def main() -> None:
+    """Точка входа CLI."""
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default=settings.database_url)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--threshold", type=float, default=settings.search_similarity_threshold)
+    parser.add_argument("--keep", action="store_true", help="Не удалять таблицу корпуса")
+    args = parser.parse_args()
+    asyncio.run(run(args.database_url, args.rows, args.repeat, args.threshold, args.keep))
+
+
+if __name__ == "__main__":
+    main()
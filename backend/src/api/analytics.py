@@ -7,9 +7,8 @@ from datetime import UTC, datetime, timedelta
 from fastapi import APIRouter, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.api.deps import get_current_user
+from src.api.deps import get_current_user_id
 from src.db import get_db
-from src.models.user import User
 from src.schemas.analytics import (
     AnalyticsPeriod,
     AnalyticsRequest,
@@ -46,7 +45,7 @@ def calculate_change(current: float, previous: float) -> tuple[float, str]:
 @router.get("/overview", response_model=OverviewResponse)
 async def get_overview(
     period: AnalyticsPeriod = AnalyticsPeriod.WEEK,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db),
 ) -> OverviewResponse:
     """Получить общую сводку аналитики."""
@@ -97,7 +96,7 @@ async def get_overview(
 @router.get("/user", response_model=UserActivityResponse)
 async def get_user_activity(
     period: AnalyticsPeriod = AnalyticsPeriod.WEEK,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
 ) -> UserActivityResponse:
     """Получить аналитику активности пользователя."""
     days = {"day": 1, "week": 7, "month": 30, "year": 365}.get(period.value, 7)
@@ -119,7 +118,7 @@ async def get_user_activity(
 async def get_chat_analytics(
     chat_id: uuid.UUID,
     period: AnalyticsPeriod = AnalyticsPeriod.WEEK,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
 ) -> ChatAnalyticsResponse:
     """Получить аналитику чата."""
     days = {"day": 1, "week": 7, "month": 30, "year": 365}.get(period.value, 7)
@@ -145,7 +144,7 @@ async def get_chat_analytics(
 @router.post("/export")
 async def export_analytics(
     request: AnalyticsRequest,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
 ) -> dict:
     """Экспортировать аналитику."""
     return {
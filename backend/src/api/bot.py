@@ -7,9 +7,8 @@ from datetime import UTC, datetime
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.api.deps import get_current_user
+from src.api.deps import get_current_user_id
 from src.db import get_db
-from src.models.user import User
 from src.schemas.bot import (
     BotCommand,
     BotCommandsRequest,
@@ -37,7 +36,7 @@ def generate_api_token() -> str:
 @router.post("", response_model=BotResponse)
 async def create_bot(
     request: CreateBotRequest,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db),
 ) -> BotResponse:
     """Создать нового бота."""
@@ -58,7 +57,7 @@ async def create_bot(
         "username": request.username,
         "description": request.description,
         "about": request.about,
-        "owner_id": current_user.id,
+        "owner_id": current_user_id,
         "status": BotStatus.ACTIVE,
         "api_token": api_token,
         "created_at": now,
@@ -72,13 +71,13 @@ async def create_bot(
 
 @router.get("", response_model=list[BotResponse])
 async def list_my_bots(
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
 ) -> list[BotResponse]:
     """Получить список своих ботов."""
     user_bots = [
         BotResponse(**bot)
         for bot in BOTS.values()
-        if bot["owner_id"] == current_user.id
+        if bot["owner_id"] == current_user_id
     ]
     return user_bots
 
@@ -86,7 +85,7 @@ async def list_my_bots(
 @router.get("/{bot_id}", response_model=BotResponse)
 async def get_bot(
     bot_id: uuid.UUID,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
 ) -> BotResponse:
     """Получить информацию о боте."""
     bot = BOTS.get(str(bot_id))
@@ -97,7 +96,7 @@ async def get_bot(
         )
 
     response_bot = {**bot}
-    if bot["owner_id"] != current_user.id:
+    if bot["owner_id"] != current_user_id:
         response_bot["api_token"] = None
 
     return BotResponse(**response_bot)
@@ -107,7 +106,7 @@ async def get_bot(
 async def update_bot(
     bot_id: uuid.UUID,
     request: BotUpdateRequest,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
 ) -> BotResponse:
     """Обновить бота."""
     bot = BOTS.get(str(bot_id))
@@ -117,7 +116,7 @@ async def update_bot(
             detail={"message": "Бот не найден", "code": "bot_not_found"},
         )
 
-    if bot["owner_id"] != current_user.id:
+    if bot["owner_id"] != current_user_id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail={"message": "Нет прав", "code": "no_permission"},
@@ -136,7 +135,7 @@ async def update_bot(
 @router.delete("/{bot_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_bot(
     bot_id: uuid.UUID,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
 ) -> None:
     """Удалить бота."""
     bot = BOTS.get(str(bot_id))
@@ -146,7 +145,7 @@ async def delete_bot(
             detail={"message": "Бот не найден", "code": "bot_not_found"},
         )
 
-    if bot["owner_id"] != current_user.id:
+    if bot["owner_id"] != current_user_id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail={"message": "Нет прав", "code": "no_permission"},
@@ -160,11 +159,11 @@ async def delete_bot(
 @router.post("/{bot_id}/token", response_model=dict)
 async def regenerate_token(
     bot_id: uuid.UUID,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
 ) -> dict:
     """Перегенерировать API токен бота."""
     bot = BOTS.get(str(bot_id))
-    if not bot or bot["owner_id"] != current_user.id:
+    if not bot or bot["owner_id"] != current_user_id:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail={"message": "Бот не найден", "code": "bot_not_found"},
@@ -180,11 +179,11 @@ async def regenerate_token(
 async def set_commands(
     bot_id: uuid.UUID,
     request: BotCommandsRequest,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
 ) -> list[BotCommand]:
     """Установить команды бота."""
     bot = BOTS.get(str(bot_id))
-    if not bot or bot["owner_id"] != current_user.id:
+    if not bot or bot["owner_id"] != current_user_id:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail={"message": "Бот не найден", "code": "bot_not_found"},
@@ -197,7 +196,7 @@ async def set_commands(
 @router.get("/{bot_id}/commands", response_model=list[BotCommand])
 async def get_commands(
     bot_id: uuid.UUID,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
 ) -> list[BotCommand]:
     """Получить команды бота."""
     if str(bot_id) not in BOTS:
@@ -213,11 +212,11 @@ async def get_commands(
 async def send_message(
     bot_id: uuid.UUID,
     request: BotMessageRequest,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
 ) -> BotMessageResponse:
     """Отправить сообщение от имени бота."""
     bot = BOTS.get(str(bot_id))
-    if not bot or bot["owner_id"] != current_user.id:
+    if not bot or bot["owner_id"] != current_user_id:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail={"message": "Бот не найден", "code": "bot_not_found"},
@@ -237,11 +236,11 @@ async def send_message(
 async def set_webhook(
     bot_id: uuid.UUID,
     config: WebhookConfig,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
 ) -> dict:
     """Установить вебхук для бота."""
     bot = BOTS.get(str(bot_id))
-    if not bot or bot["owner_id"] != current_user.id:
+    if not bot or bot["owner_id"] != current_user_id:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail={"message": "Бот не найден", "code": "bot_not_found"},
@@ -255,11 +254,11 @@ async def set_webhook(
 @router.delete("/{bot_id}/webhook")
 async def delete_webhook(
     bot_id: uuid.UUID,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
 ) -> dict:
     """Удалить вебхук бота."""
     bot = BOTS.get(str(bot_id))
-    if not bot or bot["owner_id"] != current_user.id:
+    if not bot or bot["owner_id"] != current_user_id:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail={"message": "Бот не найден", "code": "bot_not_found"},
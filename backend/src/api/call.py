@@ -5,7 +5,7 @@ import uuid
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.api.deps import get_current_user
+from src.api.deps import get_current_user_id
 from src.db import get_db
 from src.models.call import Call
 from src.models.user import User
@@ -43,7 +43,7 @@ async def _build_call_response(call: Call, db: AsyncSession) -> CallResponse:
 @router.post("", response_model=CallResponse, status_code=status.HTTP_201_CREATED)
 async def initiate_call(
     data: InitiateCallRequest,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db),
 ) -> CallResponse:
     """Инициировать звонок."""
@@ -51,7 +51,7 @@ async def initiate_call(
 
     try:
         call = await service.initiate_call(
-            caller_id=current_user.id,
+            caller_id=current_user_id,
             callee_id=data.callee_id,
             call_type=data.call_type,
         )
@@ -67,7 +67,7 @@ async def initiate_call(
 @router.get("/{call_id}", response_model=CallResponse)
 async def get_call(
     call_id: uuid.UUID,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db),
 ) -> CallResponse:
     """Получить информацию о звонке."""
@@ -80,7 +80,7 @@ async def get_call(
             detail={"message": "Звонок не найден", "code": "not_found"},
         )
 
-    if call.caller_id != current_user.id and call.callee_id != current_user.id:
+    if call.caller_id != current_user_id and call.callee_id != current_user_id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail={"message": "Нет доступа к звонку", "code": "forbidden"},
@@ -93,7 +93,7 @@ async def get_call(
 async def call_action(
     call_id: uuid.UUID,
     data: CallActionRequest,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db),
 ) -> CallResponse:
     """Выполнить действие со звонком (accept/decline/end)."""
@@ -101,11 +101,11 @@ async def call_action(
 
     try:
         if data.action == "accept":
-            call = await service.accept_call(call_id, current_user.id)
+            call = await service.accept_call(call_id, current_user_id)
         elif data.action == "decline":
-            call = await service.decline_call(call_id, current_user.id)
+            call = await service.decline_call(call_id, current_user_id)
         elif data.action == "end":
-            call = await service.end_call(call_id, current_user.id)
+            call = await service.end_call(call_id, current_user_id)
         else:
             raise ValueError("Неизвестное действие")
     except ValueError as e:
@@ -121,12 +121,12 @@ async def call_action(
 async def get_call_history(
     limit: int = Query(50, ge=1, le=100),
     offset: int = Query(0, ge=0),
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db),
 ) -> CallHistoryResponse:
     """Получить историю звонков."""
     service = CallService(db)
-    calls, total = await service.get_call_history(current_user.id, limit, offset)
+    calls, total = await service.get_call_history(current_user_id, limit, offset)
 
     calls_response = [await _build_call_response(call, db) for call in calls]
 
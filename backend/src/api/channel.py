@@ -6,7 +6,7 @@ from datetime import UTC, datetime
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.api.deps import get_current_user
+from src.api.deps import get_current_user, get_current_user_id
 from src.db import get_db
 from src.models.user import User
 from src.schemas.channel import (
@@ -73,7 +73,7 @@ async def create_channel(
 @router.get("/{channel_id}", response_model=ChannelResponse)
 async def get_channel(
     channel_id: uuid.UUID,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
 ) -> ChannelResponse:
     """Получить информацию о канале."""
     channel = CHANNELS.get(str(channel_id))
@@ -90,7 +90,7 @@ async def get_channel(
 async def update_channel(
     channel_id: uuid.UUID,
     request: ChannelUpdateRequest,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
 ) -> ChannelResponse:
     """Обновить канал."""
     channel = CHANNELS.get(str(channel_id))
@@ -100,7 +100,7 @@ async def update_channel(
             detail={"message": "Канал не найден", "code": "channel_not_found"},
         )
 
-    if channel["owner_id"] != current_user.id:
+    if channel["owner_id"] != current_user_id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail={"message": "Нет прав для редактирования", "code": "no_permission"},
@@ -119,7 +119,7 @@ async def update_channel(
 @router.get("/{channel_id}/stats", response_model=ChannelStatsResponse)
 async def get_channel_stats(
     channel_id: uuid.UUID,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
 ) -> ChannelStatsResponse:
     """Получить статистику канала."""
     channel = CHANNELS.get(str(channel_id))
@@ -147,7 +147,7 @@ async def get_channel_stats(
 async def create_post(
     channel_id: uuid.UUID,
     request: ChannelPostRequest,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
 ) -> ChannelPostResponse:
     """Создать публикацию в канале."""
     channel = CHANNELS.get(str(channel_id))
@@ -158,7 +158,7 @@ async def create_post(
         )
 
     members = CHANNEL_MEMBERS.get(str(channel_id), [])
-    user_member = next((m for m in members if m["user_id"] == current_user.id), None)
+    user_member = next((m for m in members if m["user_id"] == current_user_id), None)
     if not user_member or user_member["role"] not in [ChannelRole.OWNER, ChannelRole.ADMIN]:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -172,7 +172,7 @@ async def create_post(
         "id": post_id,
         "channel_id": channel_id,
         "content": request.content,
-        "author_id": current_user.id,
+        "author_id": current_user_id,
         "views": 0,
         "is_pinned": request.pin,
         "created_at": now,
@@ -186,7 +186,7 @@ async def create_post(
 @router.get("/{channel_id}/members", response_model=list[ChannelMemberResponse])
 async def list_channel_members(
     channel_id: uuid.UUID,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
 ) -> list[ChannelMemberResponse]:
     """Получить список участников канала."""
     channel = CHANNELS.get(str(channel_id))
@@ -230,7 +230,7 @@ async def subscribe_channel(
 @router.delete("/{channel_id}/subscribe", status_code=status.HTTP_204_NO_CONTENT)
 async def unsubscribe_channel(
     channel_id: uuid.UUID,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
 ) -> None:
     """Отписаться от канала."""
     channel = CHANNELS.get(str(channel_id))
@@ -242,7 +242,7 @@ async def unsubscribe_channel(
 
     members = CHANNEL_MEMBERS.get(str(channel_id), [])
     for i, m in enumerate(members):
-        if m["user_id"] == current_user.id and m["role"] != ChannelRole.OWNER:
+        if m["user_id"] == current_user_id and m["role"] != ChannelRole.OWNER:
             members.pop(i)
             channel["subscriber_count"] -= 1
             break
@@ -1,21 +1,21 @@
 """API эндпоинты чатов и сообщений."""
 
+import logging
 import uuid
 from datetime import UTC, datetime
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy import and_, func, or_, select
+from sqlalchemy import and_, or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
-from src.api.deps import get_current_user
+from src.api.deps import get_current_user_id
 from src.db import get_db
 from src.models.chat import Chat, ChatMember, ChatType, MemberRole, Message
 from src.models.user import User
 from src.schemas.chat import (
     AddMembersRequest,
     ChatListResponse,
-    ChatMemberResponse,
     ChatResponse,
     CreateDirectChatRequest,
     CreateGroupChatRequest,
@@ -26,24 +26,23 @@ from src.schemas.chat import (
     UpdateGroupChatRequest,
     UpdateMemberRoleRequest,
 )
+from src.services.chat import ChatError, ChatService, build_message_response
+from src.websocket import manager
 
 router = APIRouter(prefix="/chats", tags=["chats"])
+logger = logging.getLogger(__name__)
+
+_CHAT_ERROR_STATUS = {
+    "access_denied": status.HTTP_403_FORBIDDEN,
+    "reply_not_found": status.HTTP_400_BAD_REQUEST,
+    "message_not_found": status.HTTP_404_NOT_FOUND,
+}
 
 
 async def _build_message_response(message: Message, db: AsyncSession) -> MessageResponse:
     """Построить ответ сообщения с данными отправителя."""
     sender = await db.get(User, message.sender_id)
-    return MessageResponse(
-        id=message.id,
-        chat_id=message.chat_id,
-        sender_id=message.sender_id,
-        sender_name=sender.name if sender else "Удалённый пользователь",
-        content=message.content,
-        status=message.status,
-        reply_to_id=message.reply_to_id,
-        edited_at=message.edited_at,
-        created_at=message.created_at,
-    )
+    return build_message_response(message, sender.name if sender else None)
 
 
 async def _build_chat_response(
@@ -52,96 +51,46 @@ async def _build_chat_response(
     db: AsyncSession,
 ) -> ChatResponse:
     """Построить ответ чата."""
-    members_response = []
-    for member in chat.members:
-        user = await db.get(User, member.user_id)
-        if user:
-            members_response.append(
-                ChatMemberResponse(
-                    user_id=user.id,
-                    name=user.name,
-                    avatar_url=user.avatar_url,
-                    role=member.role,
-                    joined_at=member.joined_at,
-                )
-            )
-
-    last_message_result = await db.execute(
-        select(Message)
-        .where(Message.chat_id == chat.id)
-        .order_by(Message.created_at.desc())
-        .limit(1)
-    )
-    last_message = last_message_result.scalar_one_or_none()
-    last_message_response = None
-    if last_message:
-        last_message_response = await _build_message_response(last_message, db)
-
-    member_record = next(
-        (m for m in chat.members if m.user_id == current_user_id), None
-    )
-    unread_count = 0
-    if member_record and member_record.last_read_at:
-        unread_result = await db.execute(
-            select(func.count(Message.id))
-            .where(Message.chat_id == chat.id)
-            .where(Message.created_at > member_record.last_read_at)
-            .where(Message.sender_id != current_user_id)
-        )
-        unread_count = unread_result.scalar() or 0
-
-    chat_name = chat.name
-    if chat.chat_type == ChatType.DIRECT.value and not chat_name:
-        other_member = next(
-            (m for m in chat.members if m.user_id != current_user_id), None
-        )
-        if other_member:
-            other_user = await db.get(User, other_member.user_id)
-            chat_name = other_user.name if other_user else None
-
-    return ChatResponse(
-        id=chat.id,
-        chat_type=chat.chat_type,
-        name=chat_name,
-        description=chat.description,
-        avatar_url=chat.avatar_url,
-        members=members_response,
-        last_message=last_message_response,
-        unread_count=unread_count,
-        created_at=chat.created_at,
+    responses = await ChatService(db, manager.presence).build_chat_responses(
+        [chat], current_user_id
     )
+    return responses[0]
 
 
 @router.get("", response_model=ChatListResponse)
 async def get_chats(
-    current_user: User = Depends(get_current_user),
+    limit: int = Query(50, ge=1, le=100),
+    cursor: str | None = Query(None, description="Курсор следующей страницы"),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db),
 ) -> ChatListResponse:
     """Получить список чатов пользователя."""
-    result = await db.execute(
-        select(Chat)
-        .join(ChatMember)
-        .where(ChatMember.user_id == current_user.id)
-        .options(selectinload(Chat.members))
-        .order_by(Chat.updated_at.desc())
+    try:
+        page = await ChatService(db, manager.presence).list_chats(
+            current_user_id, limit, cursor
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"message": str(e), "code": "invalid_cursor"},
+        ) from e
+
+    return ChatListResponse(
+        chats=page.chats,
+        total=page.total,
+        next_cursor=page.next_cursor,
+        has_more=page.next_cursor is not None,
     )
-    chats = result.scalars().unique().all()
-
-    chat_responses = []
-    for chat in chats:
-        chat_responses.append(await _build_chat_response(chat, current_user.id, db))
-
-    return ChatListResponse(chats=chat_responses, total=len(chat_responses))
 
 
 @router.post("/direct", response_model=ChatResponse, status_code=status.HTTP_201_CREATED)
 async def create_direct_chat(
     data: CreateDirectChatRequest,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db),
 ) -> ChatResponse:
     """Создать прямой чат с пользователем."""
-    if data.user_id == current_user.id:
+    if data.user_id == current_user_id:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail={"message": "Нельзя создать чат с самим собой", "code": "self_chat"},
@@ -161,7 +110,7 @@ async def create_direct_chat(
         .where(
             or_(
                 and_(
-                    ChatMember.user_id == current_user.id,
+                    ChatMember.user_id == current_user_id,
                     Chat.id.in_(
                         select(ChatMember.chat_id).where(ChatMember.user_id == data.user_id)
                     ),
@@ -169,7 +118,7 @@ async def create_direct_chat(
                 and_(
                     ChatMember.user_id == data.user_id,
                     Chat.id.in_(
-                        select(ChatMember.chat_id).where(ChatMember.user_id == current_user.id)
+                        select(ChatMember.chat_id).where(ChatMember.user_id == current_user_id)
                     ),
                 ),
             )
@@ -178,13 +127,13 @@ async def create_direct_chat(
     )
     existing = existing_chat.scalars().first()
     if existing:
-        return await _build_chat_response(existing, current_user.id, db)
+        return await _build_chat_response(existing, current_user_id, db)
 
     chat = Chat(chat_type=ChatType.DIRECT.value)
     db.add(chat)
     await db.flush()
 
-    member1 = ChatMember(chat_id=chat.id, user_id=current_user.id)
+    member1 = ChatMember(chat_id=chat.id, user_id=current_user_id)
     member2 = ChatMember(chat_id=chat.id, user_id=data.user_id)
     db.add(member1)
     db.add(member2)
@@ -196,13 +145,13 @@ async def create_direct_chat(
     )
     chat = result.scalar_one()
 
-    return await _build_chat_response(chat, current_user.id, db)
+    return await _build_chat_response(chat, current_user_id, db)
 
 
 @router.get("/{chat_id}", response_model=ChatResponse)
 async def get_chat(
     chat_id: uuid.UUID,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db),
 ) -> ChatResponse:
     """Получить информацию о чате."""
@@ -219,29 +168,40 @@ async def get_chat(
             detail={"message": "Чат не найден", "code": "chat_not_found"},
         )
 
-    is_member = any(m.user_id == current_user.id for m in chat.members)
+    is_member = any(m.user_id == current_user_id for m in chat.members)
     if not is_member:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail={"message": "Нет доступа к чату", "code": "access_denied"},
         )
 
-    return await _build_chat_response(chat, current_user.id, db)
+    return await _build_chat_response(chat, current_user_id, db)
 
 
 @router.get("/{chat_id}/messages", response_model=MessageListResponse)
 async def get_messages(
     chat_id: uuid.UUID,
     limit: int = Query(50, ge=1, le=100),
-    before: uuid.UUID | None = None,
-    current_user: User = Depends(get_current_user),
+    before: str | None = Query(None, description="Курсор или ID сообщения: более старые"),
+    after: str | None = Query(None, description="Курсор или ID сообщения: более новые"),
+    around: str | None = Query(None, description="Курсор или ID сообщения: окно вокруг"),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db),
 ) -> MessageListResponse:
     """Получить сообщения чата."""
+    if sum(anchor is not None for anchor in (before, after, around)) > 1:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={
+                "message": "Укажите только один из параметров before, after, around",
+                "code": "invalid_cursor",
+            },
+        )
+
     member_check = await db.execute(
         select(ChatMember)
         .where(ChatMember.chat_id == chat_id)
-        .where(ChatMember.user_id == current_user.id)
+        .where(ChatMember.user_id == current_user_id)
     )
     if not member_check.scalar_one_or_none():
         raise HTTPException(
@@ -249,29 +209,28 @@ async def get_messages(
             detail={"message": "Нет доступа к чату", "code": "access_denied"},
         )
 
-    query = select(Message).where(Message.chat_id == chat_id)
-
-    if before:
-        before_msg = await db.get(Message, before)
-        if before_msg:
-            query = query.where(Message.created_at < before_msg.created_at)
-
-    query = query.order_by(Message.created_at.desc()).limit(limit + 1)
-    result = await db.execute(query)
-    messages = list(result.scalars().all())
-
-    has_more = len(messages) > limit
-    if has_more:
-        messages = messages[:limit]
-
-    message_responses = []
-    for msg in reversed(messages):
-        message_responses.append(await _build_message_response(msg, db))
+    try:
+        page = await ChatService(db).get_message_page(
+            chat_id, limit, before=before, after=after, around=around
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"message": str(e), "code": "invalid_cursor"},
+        ) from e
+    except ChatError as e:
+        raise HTTPException(
+            status_code=_CHAT_ERROR_STATUS.get(e.code, status.HTTP_400_BAD_REQUEST),
+            detail={"message": e.message, "code": e.code},
+        ) from e
 
     return MessageListResponse(
-        messages=message_responses,
-        total=len(message_responses),
-        has_more=has_more,
+        messages=page.messages,
+        total=len(page.messages),
+        has_more=page.has_older,
+        has_newer=page.has_newer,
+        prev_cursor=page.prev_cursor,
+        next_cursor=page.next_cursor,
     )
 
 
@@ -283,45 +242,31 @@ async def get_messages(
 async def send_message(
     chat_id: uuid.UUID,
     data: SendMessageRequest,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db),
 ) -> MessageResponse:
-    """Отправить сообщение в чат."""
-    member_check = await db.execute(
-        select(ChatMember)
-        .where(ChatMember.chat_id == chat_id)
-        .where(ChatMember.user_id == current_user.id)
-    )
-    if not member_check.scalar_one_or_none():
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail={"message": "Нет доступа к чату", "code": "access_denied"},
+    """Отправить сообщение в чат.
+
+    Сообщение сохраняется одним запросом и после commit рассылается
+    в комнату чата через WebSocket.
+    """
+    try:
+        response = await ChatService(db).send_message(
+            chat_id, current_user_id, data.content, data.reply_to_id
         )
+    except ChatError as e:
+        raise HTTPException(
+            status_code=_CHAT_ERROR_STATUS.get(e.code, status.HTTP_400_BAD_REQUEST),
+            detail={"message": e.message, "code": e.code},
+        ) from e
 
-    if data.reply_to_id:
-        reply_msg = await db.get(Message, data.reply_to_id)
-        if not reply_msg or reply_msg.chat_id != chat_id:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail={"message": "Сообщение для ответа не найдено", "code": "reply_not_found"},
-            )
-
-    message = Message(
-        chat_id=chat_id,
-        sender_id=current_user.id,
-        content=data.content,
-        reply_to_id=data.reply_to_id,
-    )
-    db.add(message)
-
-    chat_result = await db.execute(select(Chat).where(Chat.id == chat_id))
-    chat = chat_result.scalar_one()
-    chat.updated_at = datetime.now(UTC)
+    await db.commit()
+    try:
+        await manager.emit_new_message(chat_id, response.model_dump(mode="json"))
+    except Exception:
+        logger.exception("Не удалось разослать сообщение %s", response.id)
 
-    await db.flush()
-    await db.refresh(message)
-
-    return await _build_message_response(message, db)
+    return response
 
 
 @router.patch("/{chat_id}/messages/{message_id}", response_model=MessageResponse)
@@ -329,7 +274,7 @@ async def edit_message(
     chat_id: uuid.UUID,
     message_id: uuid.UUID,
     data: EditMessageRequest,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db),
 ) -> MessageResponse:
     """Редактировать сообщение."""
@@ -341,7 +286,7 @@ async def edit_message(
             detail={"message": "Сообщение не найдено", "code": "message_not_found"},
         )
 
-    if message.sender_id != current_user.id:
+    if message.sender_id != current_user_id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail={"message": "Можно редактировать только свои сообщения", "code": "not_owner"},
@@ -359,7 +304,7 @@ async def edit_message(
 async def delete_message(
     chat_id: uuid.UUID,
     message_id: uuid.UUID,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db),
 ) -> None:
     """Удалить сообщение."""
@@ -371,43 +316,35 @@ async def delete_message(
             detail={"message": "Сообщение не найдено", "code": "message_not_found"},
         )
 
-    if message.sender_id != current_user.id:
+    if message.sender_id != current_user_id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail={"message": "Можно удалять только свои сообщения", "code": "not_owner"},
         )
 
     await db.delete(message)
+    await db.flush()
+    await ChatService(db).on_message_deleted(message)
 
 
 @router.post("/{chat_id}/read", status_code=status.HTTP_204_NO_CONTENT)
 async def mark_as_read(
     chat_id: uuid.UUID,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db),
 ) -> None:
     """Отметить чат как прочитанный."""
-    result = await db.execute(
-        select(ChatMember)
-        .where(ChatMember.chat_id == chat_id)
-        .where(ChatMember.user_id == current_user.id)
-    )
-    member = result.scalar_one_or_none()
-
-    if not member:
+    if not await ChatService(db).mark_read(chat_id, current_user_id):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail={"message": "Нет доступа к чату", "code": "access_denied"},
         )
 
-    member.last_read_at = datetime.now(UTC)
-    await db.flush()
-
 
 @router.post("/group", response_model=ChatResponse, status_code=status.HTTP_201_CREATED)
 async def create_group_chat(
     data: CreateGroupChatRequest,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db),
 ) -> ChatResponse:
     """Создать групповой чат."""
@@ -421,13 +358,13 @@ async def create_group_chat(
 
     owner_member = ChatMember(
         chat_id=chat.id,
-        user_id=current_user.id,
+        user_id=current_user_id,
         role=MemberRole.OWNER.value,
     )
     db.add(owner_member)
 
     for user_id in data.member_ids:
-        if user_id == current_user.id:
+        if user_id == current_user_id:
             continue
         user = await db.get(User, user_id)
         if user:
@@ -445,14 +382,14 @@ async def create_group_chat(
     )
     chat = result.scalar_one()
 
-    return await _build_chat_response(chat, current_user.id, db)
+    return await _build_chat_response(chat, current_user_id, db)
 
 
 @router.patch("/{chat_id}", response_model=ChatResponse)
 async def update_group_chat(
     chat_id: uuid.UUID,
     data: UpdateGroupChatRequest,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db),
 ) -> ChatResponse:
     """Обновить групповой чат (только для owner/admin)."""
@@ -473,7 +410,7 @@ async def update_group_chat(
             detail={"message": "Только групповые чаты можно редактировать", "code": "not_group"},
         )
 
-    member = next((m for m in chat.members if m.user_id == current_user.id), None)
+    member = next((m for m in chat.members if m.user_id == current_user_id), None)
     if not member or member.role not in (MemberRole.OWNER.value, MemberRole.ADMIN.value):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -490,14 +427,14 @@ async def update_group_chat(
     await db.flush()
     await db.refresh(chat)
 
-    return await _build_chat_response(chat, current_user.id, db)
+    return await _build_chat_response(chat, current_user_id, db)
 
 
 @router.post("/{chat_id}/members", status_code=status.HTTP_201_CREATED)
 async def add_members(
     chat_id: uuid.UUID,
     data: AddMembersRequest,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db),
 ) -> dict[str, int]:
     """Добавить участников в групповой чат."""
@@ -512,7 +449,7 @@ async def add_members(
             detail={"message": "Групповой чат не найден", "code": "chat_not_found"},
         )
 
-    member = next((m for m in chat.members if m.user_id == current_user.id), None)
+    member = next((m for m in chat.members if m.user_id == current_user_id), None)
     if not member or member.role not in (MemberRole.OWNER.value, MemberRole.ADMIN.value):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -531,6 +468,7 @@ async def add_members(
                 chat_id=chat.id,
                 user_id=user_id,
                 role=MemberRole.MEMBER.value,
+                last_read_seq=chat.message_seq,
             )
             db.add(new_member)
             added += 1
@@ -543,7 +481,7 @@ async def add_members(
 async def remove_member(
     chat_id: uuid.UUID,
     user_id: uuid.UUID,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db),
 ) -> None:
     """Удалить участника из группового чата."""
@@ -558,7 +496,7 @@ async def remove_member(
             detail={"message": "Групповой чат не найден", "code": "chat_not_found"},
         )
 
-    current_member = next((m for m in chat.members if m.user_id == current_user.id), None)
+    current_member = next((m for m in chat.members if m.user_id == current_user_id), None)
     target_member = next((m for m in chat.members if m.user_id == user_id), None)
 
     if not target_member:
@@ -567,7 +505,7 @@ async def remove_member(
             detail={"message": "Участник не найден", "code": "member_not_found"},
         )
 
-    is_self_leave = user_id == current_user.id
+    is_self_leave = user_id == current_user_id
     is_admin = current_member and current_member.role in (
         MemberRole.OWNER.value, MemberRole.ADMIN.value
     )
@@ -592,7 +530,7 @@ async def update_member_role(
     chat_id: uuid.UUID,
     user_id: uuid.UUID,
     data: UpdateMemberRoleRequest,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db),
 ) -> dict[str, str]:
     """Изменить роль участника."""
@@ -607,7 +545,7 @@ async def update_member_role(
             detail={"message": "Групповой чат не найден", "code": "chat_not_found"},
         )
 
-    current_member = next((m for m in chat.members if m.user_id == current_user.id), None)
+    current_member = next((m for m in chat.members if m.user_id == current_user_id), None)
     if not current_member or current_member.role != MemberRole.OWNER.value:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
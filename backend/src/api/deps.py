@@ -9,18 +9,13 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from src.db import get_db
 from src.models.user import User
 from src.services.auth import AuthService
+from src.services.auth_cache import UserPrincipal
 
 security = HTTPBearer()
 
 
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: AsyncSession = Depends(get_db),
-) -> User:
-    """Получить текущего авторизованного пользователя."""
-    token = credentials.credentials
-    service = AuthService(db)
-
+def _verify_token(service: AuthService, token: str) -> uuid.UUID:
+    """Проверить access token или вернуть 401."""
     user_id = service.verify_access_token(token)
     if not user_id:
         raise HTTPException(
@@ -28,8 +23,11 @@ async def get_current_user(
             detail={"message": "Невалидный или истёкший токен", "code": "invalid_token"},
             headers={"WWW-Authenticate": "Bearer"},
         )
+    return user_id
 
-    user = await service.get_user_by_id(user_id)
+
+def _ensure_active(user: User | UserPrincipal | None) -> None:
+    """Проверить, что пользователь существует и активен."""
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -43,23 +41,40 @@ async def get_current_user(
             detail={"message": "Аккаунт деактивирован", "code": "account_inactive"},
         )
 
+
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_db),
+) -> User:
+    """Получить текущего авторизованного пользователя (загружает User из БД)."""
+    service = AuthService(db)
+    user_id = _verify_token(service, credentials.credentials)
+
+    user = await service.get_user_by_id(user_id)
+    _ensure_active(user)
+    assert user is not None
     return user
 
 
-async def get_current_user_id(
+async def get_current_principal(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: AsyncSession = Depends(get_db),
-) -> uuid.UUID:
-    """Получить ID текущего пользователя (легковесная версия без загрузки User)."""
-    token = credentials.credentials
+) -> UserPrincipal:
+    """Получить минимальные данные текущего пользователя.
+
+    При попадании в кеш процесса запрос к БД не выполняется.
+    """
     service = AuthService(db)
+    user_id = _verify_token(service, credentials.credentials)
 
-    user_id = service.verify_access_token(token)
-    if not user_id:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail={"message": "Невалидный или истёкший токен", "code": "invalid_token"},
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+    principal = await service.get_principal(user_id)
+    _ensure_active(principal)
+    assert principal is not None
+    return principal
 
-    return user_id
+
+async def get_current_user_id(
+    principal: UserPrincipal = Depends(get_current_principal),
+) -> uuid.UUID:
+    """Получить ID текущего пользователя (легковесная версия без загрузки User)."""
+    return principal.id
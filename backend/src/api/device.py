@@ -6,9 +6,8 @@ from datetime import UTC, datetime
 from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.api.deps import get_current_user
+from src.api.deps import get_current_user_id
 from src.db import get_db
-from src.models.user import User
 from src.schemas.device import (
     DeviceListResponse,
     DevicePlatform,
@@ -58,11 +57,11 @@ def detect_platform(user_agent: str) -> DevicePlatform:
 async def register_device(
     request_data: DeviceRegisterRequest,
     request: Request,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db),
 ) -> DeviceResponse:
     """Зарегистрировать новое устройство."""
-    user_id = str(current_user.id)
+    user_id = str(current_user_id)
     device_id = uuid.uuid4()
     now = datetime.now(UTC)
 
@@ -71,7 +70,7 @@ async def register_device(
 
     device = {
         "id": device_id,
-        "user_id": current_user.id,
+        "user_id": current_user_id,
         "device_name": request_data.device_name,
         "device_type": request_data.device_type or detect_device_type(user_agent),
         "platform": request_data.platform or detect_platform(user_agent),
@@ -97,10 +96,10 @@ async def register_device(
 
 @router.get("", response_model=DeviceListResponse)
 async def list_devices(
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
 ) -> DeviceListResponse:
     """Получить список устройств пользователя."""
-    user_id = str(current_user.id)
+    user_id = str(current_user_id)
     devices = USER_DEVICES.get(user_id, [])
     current_id = CURRENT_DEVICE.get(user_id)
 
@@ -113,10 +112,10 @@ async def list_devices(
 @router.get("/{device_id}", response_model=DeviceResponse)
 async def get_device(
     device_id: uuid.UUID,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
 ) -> DeviceResponse:
     """Получить информацию об устройстве."""
-    user_id = str(current_user.id)
+    user_id = str(current_user_id)
     devices = USER_DEVICES.get(user_id, [])
 
     device = next((d for d in devices if d["id"] == device_id), None)
@@ -133,10 +132,10 @@ async def get_device(
 async def update_device(
     device_id: uuid.UUID,
     request_data: DeviceUpdateRequest,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
 ) -> DeviceResponse:
     """Обновить информацию об устройстве."""
-    user_id = str(current_user.id)
+    user_id = str(current_user_id)
     devices = USER_DEVICES.get(user_id, [])
 
     device = next((d for d in devices if d["id"] == device_id), None)
@@ -157,10 +156,10 @@ async def update_device(
 @router.delete("/{device_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def remove_device(
     device_id: uuid.UUID,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
 ) -> None:
     """Удалить устройство (завершить сессию)."""
-    user_id = str(current_user.id)
+    user_id = str(current_user_id)
     devices = USER_DEVICES.get(user_id, [])
 
     device_idx = next((i for i, d in enumerate(devices) if d["id"] == device_id), None)
@@ -175,10 +174,10 @@ async def remove_device(
 
 @router.get("/sessions/active", response_model=list[SessionResponse])
 async def list_active_sessions(
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
 ) -> list[SessionResponse]:
     """Получить список активных сессий."""
-    user_id = str(current_user.id)
+    user_id = str(current_user_id)
     devices = USER_DEVICES.get(user_id, [])
 
     return [
@@ -199,10 +198,10 @@ async def list_active_sessions(
 @router.post("/sessions/terminate", status_code=status.HTTP_204_NO_CONTENT)
 async def terminate_sessions(
     request_data: TerminateSessionsRequest,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
 ) -> None:
     """Завершить сессии на устройствах."""
-    user_id = str(current_user.id)
+    user_id = str(current_user_id)
     current_id = CURRENT_DEVICE.get(user_id)
 
     if request_data.terminate_all_except_current:
@@ -5,9 +5,8 @@ import uuid
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.api.deps import get_current_user
+from src.api.deps import get_current_user_id
 from src.db import get_db
-from src.models.user import User
 from src.schemas.encryption import (
     KeyBundleResponse,
     PrekeysCountResponse,
@@ -23,14 +22,14 @@ router = APIRouter(prefix="/encryption", tags=["encryption"])
 @router.post("/keys", response_model=PublicKeyResponse, status_code=status.HTTP_201_CREATED)
 async def register_keys(
     data: RegisterKeysRequest,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db),
 ) -> PublicKeyResponse:
     """Зарегистрировать ключи устройства."""
     service = EncryptionService(db)
 
     public_key = await service.register_keys(
-        user_id=current_user.id,
+        user_id=current_user_id,
         device_id=data.device_id,
         identity_key=data.identity_key,
         signed_prekey=data.signed_prekey,
@@ -52,7 +51,7 @@ async def register_keys(
 @router.get("/keys/{user_id}", response_model=KeyBundleResponse)
 async def get_key_bundle(
     user_id: uuid.UUID,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db),
 ) -> KeyBundleResponse:
     """Получить пакет ключей пользователя для установки сессии."""
@@ -77,21 +76,21 @@ async def get_key_bundle(
 async def upload_prekeys(
     data: UploadPrekeysRequest,
     device_id: str,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db),
 ) -> PrekeysCountResponse:
     """Загрузить дополнительные one-time prekeys."""
     service = EncryptionService(db)
 
     try:
-        await service.upload_prekeys(current_user.id, device_id, data.prekeys)
+        await service.upload_prekeys(current_user_id, device_id, data.prekeys)
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail={"message": str(e), "code": "upload_error"},
         ) from e
 
-    count = await service.get_prekeys_count(current_user.id, device_id)
+    count = await service.get_prekeys_count(current_user_id, device_id)
 
     return PrekeysCountResponse(count=count, device_id=device_id)
 
@@ -99,12 +98,12 @@ async def upload_prekeys(
 @router.get("/prekeys/count", response_model=PrekeysCountResponse)
 async def get_prekeys_count(
     device_id: str,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db),
 ) -> PrekeysCountResponse:
     """Получить количество доступных prekeys."""
     service = EncryptionService(db)
 
-    count = await service.get_prekeys_count(current_user.id, device_id)
+    count = await service.get_prekeys_count(current_user_id, device_id)
 
     return PrekeysCountResponse(count=count, device_id=device_id)
@@ -1,33 +1,29 @@
 """API эндпоинты для экспорта переписок."""
 
-import json
 import uuid
-from datetime import UTC, datetime
+from pathlib import Path
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.responses import StreamingResponse
+from fastapi.responses import FileResponse
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.api.deps import get_current_user
+from src.api.deps import get_current_user_id
 from src.db import get_db
-from src.models.chat import Chat, ChatMember, Message
-from src.models.user import User
+from src.models.chat import Chat, ChatMember
+from src.models.export import ExportFormat, ExportJob
 from src.schemas.export import (
     ExportChatRequest,
-    ExportFormat,
     ExportJobResponse,
     ExportListResponse,
     ExportProgressResponse,
     ExportStatus,
-    ExportedChat,
-    ExportedMessage,
 )
+from src.services.export import create_encoder
+from src.services.export_jobs import export_download_url, export_progress, export_runner
 
 router = APIRouter(prefix="/export", tags=["export"])
 
-EXPORT_JOBS: dict[str, dict] = {}
-
 
 async def check_chat_access(
     db: AsyncSession, user_id: uuid.UUID, chat_id: uuid.UUID
@@ -54,211 +50,162 @@ async def check_chat_access(
     return chat
 
 
+def _job_response(job: ExportJob) -> ExportJobResponse:
+    """Ответ по задаче экспорта."""
+    completed = job.status == ExportStatus.COMPLETED.value
+    return ExportJobResponse(
+        id=job.id,
+        chat_id=job.chat_id,
+        user_id=job.user_id,
+        format=ExportFormat(job.format),
+        status=ExportStatus(job.status),
+        include_media=job.include_media,
+        file_url=export_download_url(job.id) if completed else None,
+        file_size=job.file_size if completed else None,
+        message_count=job.message_count if completed else None,
+        error_message=job.error_message,
+        created_at=job.created_at,
+        completed_at=job.completed_at,
+    )
+
+
+async def get_own_job(db: AsyncSession, user_id: uuid.UUID, job_id: uuid.UUID) -> ExportJob:
+    """Задача экспорта, принадлежащая пользователю."""
+    job = await db.get(ExportJob, job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail={"message": "Экспорт не найден", "code": "export_not_found"},
+        )
+
+    if job.user_id != user_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail={"message": "Нет доступа к экспорту", "code": "no_access"},
+        )
+
+    return job
+
+
 @router.post("/chat", response_model=ExportJobResponse, status_code=status.HTTP_202_ACCEPTED)
 async def start_export(
     request: ExportChatRequest,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db),
 ) -> ExportJobResponse:
     """Начать экспорт чата."""
-    await check_chat_access(db, current_user.id, request.chat_id)
-
-    job_id = uuid.uuid4()
-    now = datetime.now(UTC)
-
-    job = {
-        "id": job_id,
-        "chat_id": request.chat_id,
-        "user_id": current_user.id,
-        "format": request.format,
-        "status": ExportStatus.PENDING,
-        "include_media": request.include_media,
-        "file_url": None,
-        "file_size": None,
-        "message_count": None,
-        "error_message": None,
-        "created_at": now,
-        "completed_at": None,
-    }
-    EXPORT_JOBS[str(job_id)] = job
-
-    return ExportJobResponse(**job)
+    await check_chat_access(db, current_user_id, request.chat_id)
+
+    job = ExportJob(
+        user_id=current_user_id,
+        chat_id=request.chat_id,
+        format=request.format.value,
+        status=ExportStatus.PENDING.value,
+        include_media=request.include_media,
+        start_date=request.start_date,
+        end_date=request.end_date,
+    )
+    db.add(job)
+    await db.commit()
+    await db.refresh(job)
+    export_runner.notify()
+
+    return _job_response(job)
 
 
 @router.get("/jobs", response_model=ExportListResponse)
 async def list_exports(
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db),
 ) -> ExportListResponse:
     """Получить список экспортов пользователя."""
-    user_jobs = [
-        ExportJobResponse(**job)
-        for job in EXPORT_JOBS.values()
-        if job["user_id"] == current_user.id
-    ]
+    result = await db.execute(
+        select(ExportJob)
+        .where(ExportJob.user_id == current_user_id)
+        .order_by(ExportJob.created_at.desc())
+    )
+    user_jobs = [_job_response(job) for job in result.scalars().all()]
     return ExportListResponse(exports=user_jobs, total=len(user_jobs))
 
 
 @router.get("/jobs/{job_id}", response_model=ExportJobResponse)
 async def get_export_status(
     job_id: uuid.UUID,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db),
 ) -> ExportJobResponse:
     """Получить статус экспорта."""
-    job = EXPORT_JOBS.get(str(job_id))
-    if not job:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail={"message": "Экспорт не найден", "code": "export_not_found"},
-        )
-
-    if job["user_id"] != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail={"message": "Нет доступа к экспорту", "code": "no_access"},
-        )
-
-    return ExportJobResponse(**job)
+    job = await get_own_job(db, current_user_id, job_id)
+    return _job_response(job)
 
 
 @router.get("/jobs/{job_id}/progress", response_model=ExportProgressResponse)
 async def get_export_progress(
     job_id: uuid.UUID,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db),
 ) -> ExportProgressResponse:
-    """Получить прогресс экспорта."""
-    job = EXPORT_JOBS.get(str(job_id))
-    if not job:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail={"message": "Экспорт не найден", "code": "export_not_found"},
-        )
-
-    if job["user_id"] != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail={"message": "Нет доступа к экспорту", "code": "no_access"},
-        )
+    """Получить прогресс экспорта по числу записанных сообщений.
 
-    progress = 100 if job["status"] == ExportStatus.COMPLETED else 50
+    Тот же прогресс приходит по сокету событием ``job_event``; опрос — для
+    клиентов без соединения.
+    """
+    job = await get_own_job(db, current_user_id, job_id)
 
     return ExportProgressResponse(
-        job_id=job_id,
-        status=job["status"],
-        progress=progress,
-        message_count=job.get("message_count"),
-        current_message=None,
+        job_id=job.id,
+        status=ExportStatus(job.status),
+        progress=export_progress(job.status, job.message_count, job.total_messages),
+        message_count=job.total_messages,
+        current_message=job.message_count,
     )
 
 
 @router.get("/jobs/{job_id}/download")
 async def download_export(
     job_id: uuid.UUID,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db),
-) -> StreamingResponse:
-    """Скачать экспортированный чат."""
-    job = EXPORT_JOBS.get(str(job_id))
-    if not job:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail={"message": "Экспорт не найден", "code": "export_not_found"},
-        )
+) -> FileResponse:
+    """Скачать готовый файл экспорта."""
+    job = await get_own_job(db, current_user_id, job_id)
 
-    if job["user_id"] != current_user.id:
+    if job.status != ExportStatus.COMPLETED.value:
         raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail={"message": "Нет доступа к экспорту", "code": "no_access"},
+            status_code=status.HTTP_409_CONFLICT,
+            detail={"message": "Экспорт ещё не готов", "code": "export_not_ready"},
         )
 
-    chat = await db.get(Chat, job["chat_id"])
-    if not chat:
+    if not job.file_path or not Path(job.file_path).is_file():
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail={"message": "Чат не найден", "code": "chat_not_found"},
+            detail={"message": "Файл экспорта не найден", "code": "export_file_missing"},
         )
 
-    messages_result = await db.execute(
-        select(Message)
-        .where(Message.chat_id == job["chat_id"])
-        .order_by(Message.created_at.asc())
-        .limit(1000)
-    )
-    messages = messages_result.scalars().all()
-
-    exported_messages = [
-        {
-            "id": str(m.id),
-            "sender_id": str(m.sender_id),
-            "content": m.content,
-            "message_type": m.message_type,
-            "created_at": m.created_at.isoformat(),
-        }
-        for m in messages
-    ]
-
-    export_data = {
-        "chat_id": str(job["chat_id"]),
-        "chat_name": chat.name or "Чат",
-        "exported_at": datetime.now(UTC).isoformat(),
-        "message_count": len(exported_messages),
-        "messages": exported_messages,
-    }
-
-    job["status"] = ExportStatus.COMPLETED
-    job["completed_at"] = datetime.now(UTC)
-    job["message_count"] = len(exported_messages)
-
-    if job["format"] == ExportFormat.JSON:
-        content = json.dumps(export_data, ensure_ascii=False, indent=2)
-        media_type = "application/json"
-        filename = f"chat_export_{job['chat_id']}.json"
-    elif job["format"] == ExportFormat.TXT:
-        lines = [f"Экспорт чата: {export_data['chat_name']}", f"Дата: {export_data['exported_at']}", ""]
-        for msg in exported_messages:
-            lines.append(f"[{msg['created_at']}] {msg['content']}")
-        content = "\n".join(lines)
-        media_type = "text/plain; charset=utf-8"
-        filename = f"chat_export_{job['chat_id']}.txt"
+    if job.include_media:
+        media_type, extension = "application/zip", "zip"
     else:
-        lines = [
-            "<!DOCTYPE html>",
-            "<html><head><meta charset='utf-8'><title>Экспорт чата</title></head>",
-            "<body><h1>Экспорт чата</h1>",
-        ]
-        for msg in exported_messages:
-            lines.append(f"<p><small>{msg['created_at']}</small><br>{msg['content']}</p>")
-        lines.append("</body></html>")
-        content = "\n".join(lines)
-        media_type = "text/html; charset=utf-8"
-        filename = f"chat_export_{job['chat_id']}.html"
-
-    async def generate():
-        yield content.encode("utf-8")
-
-    return StreamingResponse(
-        generate(),
+        encoder = create_encoder(ExportFormat(job.format))
+        media_type, extension = encoder.media_type, encoder.extension
+    return FileResponse(
+        job.file_path,
         media_type=media_type,
-        headers={"Content-Disposition": f"attachment; filename={filename}"},
+        filename=f"chat_export_{job.chat_id}.{extension}",
     )
 
 
 @router.delete("/jobs/{job_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_export(
     job_id: uuid.UUID,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db),
 ) -> None:
-    """Удалить экспорт."""
-    job = EXPORT_JOBS.get(str(job_id))
-    if not job:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail={"message": "Экспорт не найден", "code": "export_not_found"},
-        )
+    """Удалить экспорт и его файл."""
+    job = await get_own_job(db, current_user_id, job_id)
+    file_path = job.file_path
 
-    if job["user_id"] != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail={"message": "Нет доступа к экспорту", "code": "no_access"},
-        )
+    await db.delete(job)
+    await db.commit()
 
-    del EXPORT_JOBS[str(job_id)]
+    if file_path:
+        Path(file_path).unlink(missing_ok=True)
@@ -3,6 +3,8 @@
 from fastapi import APIRouter
 from pydantic import BaseModel
 
+from src.db.session import get_pool_stats
+
 router = APIRouter()
 
 
@@ -13,7 +15,29 @@ class HealthResponse(BaseModel):
     version: str
 
 
+class DatabasePoolResponse(BaseModel):
+    """Состояние пула соединений БД текущего воркера."""
+
+    initialized: bool
+    size: int
+    checked_in: int
+    checked_out: int
+    overflow: int
+    checkouts: int
+    checkins: int
+    connects: int
+    invalidations: int
+    wait_time_total: float
+    wait_time_max: float
+
+
 @router.get("/health", response_model=HealthResponse)
 async def health_check() -> HealthResponse:
     """Проверка работоспособности API."""
     return HealthResponse(status="ok", version="0.1.0")
+
+
+@router.get("/health/db-pool", response_model=DatabasePoolResponse)
+async def db_pool_stats() -> DatabasePoolResponse:
+    """Метрики пула соединений для подбора max_connections."""
+    return DatabasePoolResponse(**get_pool_stats())
@@ -8,10 +8,9 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.api.deps import get_current_user
+from src.api.deps import get_current_user_id
 from src.db import get_db
 from src.models.chat import Chat, ChatMember
-from src.models.user import User
 from src.schemas.invite import (
     CreateInviteRequest,
     InviteJoinRequest,
@@ -36,7 +35,7 @@ def generate_invite_code() -> str:
 @router.post("", response_model=InviteResponse)
 async def create_invite(
     request: CreateInviteRequest,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db),
 ) -> InviteResponse:
     """Создать приглашение в чат."""
@@ -50,7 +49,7 @@ async def create_invite(
     member_result = await db.execute(
         select(ChatMember)
         .where(ChatMember.chat_id == request.chat_id)
-        .where(ChatMember.user_id == current_user.id)
+        .where(ChatMember.user_id == current_user_id)
     )
     member = member_result.scalar_one_or_none()
     if not member or member.role not in ["owner", "admin"]:
@@ -72,7 +71,7 @@ async def create_invite(
         "code": code,
         "chat_id": request.chat_id,
         "invite_type": InviteType.GROUP if chat.is_group else InviteType.CHAT,
-        "created_by": current_user.id,
+        "created_by": current_user_id,
         "expires_at": expires_at,
         "max_uses": request.max_uses,
         "use_count": 0,
@@ -142,7 +141,7 @@ async def get_invite_preview(
 @router.post("/join", response_model=InviteJoinResponse)
 async def join_by_invite(
     request: InviteJoinRequest,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db),
 ) -> InviteJoinResponse:
     """Присоединиться к чату по приглашению."""
@@ -168,7 +167,7 @@ async def join_by_invite(
     existing_member = await db.execute(
         select(ChatMember)
         .where(ChatMember.chat_id == invite["chat_id"])
-        .where(ChatMember.user_id == current_user.id)
+        .where(ChatMember.user_id == current_user_id)
     )
     if existing_member.scalar_one_or_none():
         return InviteJoinResponse(
@@ -179,8 +178,11 @@ async def join_by_invite(
 
     new_member = ChatMember(
         chat_id=invite["chat_id"],
-        user_id=current_user.id,
+        user_id=current_user_id,
         role="member",
+        last_read_seq=select(Chat.message_seq)
+        .where(Chat.id == invite["chat_id"])
+        .scalar_subquery(),
     )
     db.add(new_member)
     await db.commit()
@@ -197,14 +199,14 @@ async def join_by_invite(
 @router.get("/chat/{chat_id}", response_model=InviteListResponse)
 async def list_chat_invites(
     chat_id: uuid.UUID,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db),
 ) -> InviteListResponse:
     """Получить список приглашений чата."""
     member_result = await db.execute(
         select(ChatMember)
         .where(ChatMember.chat_id == chat_id)
-        .where(ChatMember.user_id == current_user.id)
+        .where(ChatMember.user_id == current_user_id)
     )
     member = member_result.scalar_one_or_none()
     if not member or member.role not in ["owner", "admin"]:
@@ -225,7 +227,7 @@ async def list_chat_invites(
 @router.delete("/{code}", status_code=status.HTTP_204_NO_CONTENT)
 async def revoke_invite(
     code: str,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db),
 ) -> None:
     """Отозвать приглашение."""
@@ -239,7 +241,7 @@ async def revoke_invite(
     member_result = await db.execute(
         select(ChatMember)
         .where(ChatMember.chat_id == invite["chat_id"])
-        .where(ChatMember.user_id == current_user.id)
+        .where(ChatMember.user_id == current_user_id)
     )
     member = member_result.scalar_one_or_none()
     if not member or member.role not in ["owner", "admin"]:
@@ -1,27 +1,84 @@
 """API эндпоинты для медиафайлов."""
 
+import asyncio
 import uuid
-
-from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile, status
-from fastapi.responses import FileResponse
+from pathlib import Path
+from typing import NoReturn
+
+from fastapi import (
+    APIRouter,
+    Depends,
+    File,
+    Form,
+    Header,
+    HTTPException,
+    Request,
+    Response,
+    UploadFile,
+    status,
+)
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.api.deps import get_current_user
+from src.api.deps import get_current_user_id
+from src.config import get_settings
 from src.db import get_db
-from src.models.media import MediaFile
-from src.models.user import User
-from src.schemas.media import MediaFileResponse, UploadResponse
+from src.models.media import MediaFile, ProcessingStatus, UploadSession
+from src.schemas.media import (
+    CreateUploadRequest,
+    MediaFileResponse,
+    UploadResponse,
+    UploadSessionResponse,
+)
+from src.services.blobs import BlobStore, preview_path
 from src.services.media import (
-    generate_storage_path,
+    FileTooLargeError,
     get_file_url,
     get_media_type,
     guess_mime_type,
     is_allowed_file,
-    validate_file_size,
+)
+from src.services.media_delivery import blob_hash, resolve_media_path, serve_media
+from src.services.previews import PREVIEW_SIZES
+from src.services.uploads import (
+    ResumableUploadService,
+    UploadError,
+    needs_processing,
+    schedule_processing,
+    store_upload,
 )
 
 router = APIRouter(prefix="/media", tags=["media"])
+# Файлы по URL из get_file_url; подключается в корень приложения, без /api
+files_router = APIRouter(prefix="/media", tags=["media"])
+
+# Тело PATCH по протоколу tus
+UPLOAD_CHUNK_CONTENT_TYPE = "application/offset+octet-stream"
+
+_UPLOAD_ERROR_STATUS = {
+    "upload_not_found": status.HTTP_404_NOT_FOUND,
+    "upload_expired": status.HTTP_410_GONE,
+    "offset_mismatch": status.HTTP_409_CONFLICT,
+    "upload_incomplete": status.HTTP_409_CONFLICT,
+    "file_too_large": status.HTTP_413_CONTENT_TOO_LARGE,
+}
+
+
+def _preview_urls(media: MediaFile) -> dict[int, str] | None:
+    if media.preview_status != ProcessingStatus.READY.value or not media.content_hash:
+        return None
+    root = get_settings().media_storage_path
+    return {
+        size: get_file_url(str(preview_path(root, media.content_hash, size)))
+        for size in PREVIEW_SIZES
+    }
+
+
+async def _schedule_processing(db: AsyncSession, media: MediaFile) -> None:
+    """Зафиксировать запись и поставить её в фоновую обработку."""
+    if needs_processing(media):
+        await db.commit()
+        schedule_processing(media)
 
 
 def _build_media_response(media: MediaFile) -> MediaFileResponse:
@@ -35,9 +92,11 @@ def _build_media_response(media: MediaFile) -> MediaFileResponse:
         file_size=media.file_size,
         url=get_file_url(media.storage_path),
         thumbnail_url=get_file_url(media.thumbnail_path) if media.thumbnail_path else None,
+        preview_urls=_preview_urls(media),
         duration_seconds=media.duration_seconds,
         width=media.width,
         height=media.height,
+        waveform=list(media.waveform) if media.waveform else None,
         created_at=media.created_at,
     )
 
@@ -46,7 +105,7 @@ def _build_media_response(media: MediaFile) -> MediaFileResponse:
 async def upload_file(
     file: UploadFile = File(...),
     is_voice: bool = Form(False),
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db),
 ) -> UploadResponse:
     """Загрузить медиафайл."""
@@ -66,34 +125,14 @@ async def upload_file(
 
     media_type = get_media_type(mime_type, is_voice)
 
-    content = await file.read()
-    file_size = len(content)
-
-    if not validate_file_size(file_size, media_type):
+    try:
+        media = await store_upload(db, file, current_user_id, mime_type, media_type)
+    except FileTooLargeError:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail={"message": "Файл слишком большой", "code": "file_too_large"},
-        )
-
-    filename, storage_path = generate_storage_path(
-        current_user.id, media_type, file.filename
-    )
-
-    with open(storage_path, "wb") as f:
-        f.write(content)
-
-    media = MediaFile(
-        uploader_id=current_user.id,
-        media_type=media_type.value,
-        filename=filename,
-        original_filename=file.filename,
-        mime_type=mime_type,
-        file_size=file_size,
-        storage_path=storage_path,
-    )
-    db.add(media)
-    await db.flush()
-    await db.refresh(media)
+        ) from None
+    await _schedule_processing(db, media)
 
     return UploadResponse(
         media=_build_media_response(media),
@@ -104,7 +143,7 @@ async def upload_file(
 @router.get("/{media_id}")
 async def get_media_info(
     media_id: uuid.UUID,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db),
 ) -> MediaFileResponse:
     """Получить информацию о медиафайле."""
@@ -119,32 +158,43 @@ async def get_media_info(
     return _build_media_response(media)
 
 
+def _file_not_found() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail={"message": "Файл не найден", "code": "file_not_found"},
+    )
+
+
 @router.get("/{media_id}/download")
 async def download_media(
     media_id: uuid.UUID,
-    current_user: User = Depends(get_current_user),
+    request: Request,
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db),
-) -> FileResponse:
-    """Скачать медиафайл."""
+) -> Response:
+    """Скачать медиафайл (с поддержкой Range и условных запросов)."""
     media = await db.get(MediaFile, media_id)
 
     if not media:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail={"message": "Файл не найден", "code": "file_not_found"},
+        raise _file_not_found()
+
+    try:
+        return await serve_media(
+            request.headers,
+            media.storage_path,
+            media.mime_type,
+            content_hash=media.content_hash,
+            filename=media.original_filename,
+            disposition="attachment",
         )
-
-    return FileResponse(
-        path=media.storage_path,
-        filename=media.original_filename,
-        media_type=media.mime_type,
-    )
+    except FileNotFoundError:
+        raise _file_not_found() from None
 
 
 @router.delete("/{media_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_media(
     media_id: uuid.UUID,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db),
 ) -> None:
     """Удалить медиафайл."""
@@ -156,33 +206,213 @@ async def delete_media(
             detail={"message": "Файл не найден", "code": "file_not_found"},
         )
 
-    if media.uploader_id != current_user.id:
+    if media.uploader_id != current_user_id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail={"message": "Можно удалять только свои файлы", "code": "not_owner"},
         )
 
-    import os
-    if os.path.exists(media.storage_path):
-        os.remove(media.storage_path)
-    if media.thumbnail_path and os.path.exists(media.thumbnail_path):
-        os.remove(media.thumbnail_path)
-
     await db.delete(media)
+    await db.flush()
+
+    if media.content_hash:
+        # Превью общие для одинакового содержимого и удаляются вместе с blob
+        await BlobStore(db).release(media.content_hash)
+    else:
+        await asyncio.to_thread(Path(media.storage_path).unlink, True)
+        if media.thumbnail_path:
+            await asyncio.to_thread(Path(media.thumbnail_path).unlink, True)
 
 
 @router.get("/user/files")
 async def get_user_files(
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db),
 ) -> list[MediaFileResponse]:
     """Получить список файлов пользователя."""
     result = await db.execute(
         select(MediaFile)
-        .where(MediaFile.uploader_id == current_user.id)
+        .where(MediaFile.uploader_id == current_user_id)
         .order_by(MediaFile.created_at.desc())
         .limit(100)
     )
     files = result.scalars().all()
 
     return [_build_media_response(media) for media in files]
+
+
+def _raise_upload_error(e: UploadError) -> NoReturn:
+    raise HTTPException(
+        status_code=_UPLOAD_ERROR_STATUS.get(e.code, status.HTTP_400_BAD_REQUEST),
+        detail={"message": e.message, "code": e.code},
+    ) from e
+
+
+def _build_upload_response(upload: UploadSession) -> UploadSessionResponse:
+    """Построить ответ сессии загрузки."""
+    return UploadSessionResponse(
+        id=upload.id,
+        filename=upload.original_filename,
+        mime_type=upload.mime_type,
+        size=upload.total_size,
+        offset=upload.offset,
+        expires_at=upload.expires_at,
+        upload_url=f"/api/media/uploads/{upload.id}",
+    )
+
+
+def _upload_headers(upload: UploadSession) -> dict[str, str]:
+    return {
+        "Upload-Offset": str(upload.offset),
+        "Upload-Length": str(upload.total_size),
+        "Upload-Expires": upload.expires_at.isoformat(),
+        "Cache-Control": "no-store",
+    }
+
+
+@router.post(
+    "/uploads", response_model=UploadSessionResponse, status_code=status.HTTP_201_CREATED
+)
+async def create_upload(
+    request: CreateUploadRequest,
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db),
+) -> UploadSessionResponse:
+    """Начать возобновляемую загрузку файла."""
+    mime_type = request.mime_type or guess_mime_type(request.filename)
+    try:
+        upload = await ResumableUploadService(db).create(
+            current_user_id, request.filename, request.size, mime_type, request.is_voice
+        )
+    except UploadError as e:
+        _raise_upload_error(e)
+    return _build_upload_response(upload)
+
+
+@router.get("/uploads/{upload_id}", response_model=UploadSessionResponse)
+async def get_upload(
+    upload_id: uuid.UUID,
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db),
+) -> UploadSessionResponse:
+    """Получить состояние загрузки (принятое смещение)."""
+    try:
+        upload = await ResumableUploadService(db).get(upload_id, current_user_id)
+    except UploadError as e:
+        _raise_upload_error(e)
+    return _build_upload_response(upload)
+
+
+@router.head("/uploads/{upload_id}")
+async def get_upload_offset(
+    upload_id: uuid.UUID,
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db),
+) -> Response:
+    """Принятое смещение в заголовке ``Upload-Offset``."""
+    try:
+        upload = await ResumableUploadService(db).get(upload_id, current_user_id)
+    except UploadError as e:
+        _raise_upload_error(e)
+    return Response(headers=_upload_headers(upload))
+
+
+@router.patch("/uploads/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def append_upload(
+    upload_id: uuid.UUID,
+    request: Request,
+    upload_offset: int = Header(..., alias="Upload-Offset", ge=0),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db),
+) -> Response:
+    """Дописать часть файла с позиции ``Upload-Offset``."""
+    if request.headers.get("content-type") != UPLOAD_CHUNK_CONTENT_TYPE:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail={
+                "message": f"Ожидается {UPLOAD_CHUNK_CONTENT_TYPE}",
+                "code": "invalid_content_type",
+            },
+        )
+
+    try:
+        upload = await ResumableUploadService(db).append(
+            upload_id, current_user_id, upload_offset, request.stream()
+        )
+    except UploadError as e:
+        _raise_upload_error(e)
+    await db.commit()
+
+    return Response(status_code=status.HTTP_204_NO_CONTENT, headers=_upload_headers(upload))
+
+
+@router.post(
+    "/uploads/{upload_id}/complete",
+    response_model=UploadResponse,
+    status_code=status.HTTP_201_CREATED,
+)
+async def complete_upload(
+    upload_id: uuid.UUID,
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db),
+) -> UploadResponse:
+    """Завершить загрузку и создать медиафайл."""
+    try:
+        media = await ResumableUploadService(db).complete(upload_id, current_user_id)
+    except UploadError as e:
+        _raise_upload_error(e)
+    await _schedule_processing(db, media)
+
+    return UploadResponse(
+        media=_build_media_response(media),
+        message="Файл успешно загружен",
+    )
+
+
+@router.delete("/uploads/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def abort_upload(
+    upload_id: uuid.UUID,
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db),
+) -> None:
+    """Отменить загрузку."""
+    try:
+        await ResumableUploadService(db).abort(upload_id, current_user_id)
+    except UploadError as e:
+        _raise_upload_error(e)
+
+
+@files_router.get("/{file_path:path}")
+async def get_stored_file(
+    file_path: str,
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+) -> Response:
+    """Файл хранилища по URL из ``get_file_url`` (Range, ETag, 304).
+
+    Имена файлов — SHA-256 или UUID, ссылка на файл служит доступом к нему.
+    """
+    settings = get_settings()
+    path = resolve_media_path(settings.media_storage_path, file_path)
+    if path is None:
+        raise _file_not_found()
+
+    content_hash = blob_hash(file_path)
+    mime_type = None
+    if content_hash:
+        # У blob нет расширения: тип берём у любой ссылающейся записи
+        mime_type = await db.scalar(
+            select(MediaFile.mime_type).where(MediaFile.content_hash == content_hash).limit(1)
+        )
+        if mime_type is None:
+            raise _file_not_found()
+
+    try:
+        return await serve_media(
+            request.headers,
+            path,
+            mime_type or guess_mime_type(path.name),
+            content_hash=content_hash,
+        )
+    except FileNotFoundError:
+        raise _file_not_found() from None
@@ -6,7 +6,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.api.deps import get_current_user
+from src.api.deps import get_current_user, get_current_user_id
 from src.db import get_db
 from src.models.contact import Contact, ContactStatus
 from src.models.user import User
@@ -18,6 +18,7 @@ from src.schemas.profile import (
     ContactUpdateRequest,
     ProfileUpdateRequest,
 )
+from src.services.auth_cache import invalidate_user
 
 router = APIRouter(prefix="/profile", tags=["profile"])
 
@@ -46,18 +47,22 @@ async def update_my_profile(
 
     await db.flush()
     await db.refresh(current_user)
+    # Кеш сбрасывается после фиксации: иначе параллельный запрос успеет
+    # положить в него старые данные до commit
+    await db.commit()
+    invalidate_user(current_user.id)
     return UserResponse.model_validate(current_user)
 
 
 @router.get("/contacts", response_model=ContactListResponse)
 async def get_contacts(
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db),
 ) -> ContactListResponse:
     """Получить список контактов."""
     result = await db.execute(
         select(Contact)
-        .where(Contact.owner_id == current_user.id)
+        .where(Contact.owner_id == current_user_id)
         .where(Contact.status != ContactStatus.BLOCKED.value)
         .order_by(Contact.created_at.desc())
     )
@@ -87,11 +92,11 @@ async def get_contacts(
 @router.post("/contacts", response_model=ContactResponse, status_code=status.HTTP_201_CREATED)
 async def add_contact(
     data: ContactCreateRequest,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db),
 ) -> ContactResponse:
     """Добавить контакт."""
-    if data.contact_id == current_user.id:
+    if data.contact_id == current_user_id:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail={"message": "Нельзя добавить себя в контакты", "code": "self_contact"},
@@ -106,7 +111,7 @@ async def add_contact(
 
     existing = await db.execute(
         select(Contact)
-        .where(Contact.owner_id == current_user.id)
+        .where(Contact.owner_id == current_user_id)
         .where(Contact.contact_id == data.contact_id)
     )
     if existing.scalar_one_or_none():
@@ -116,7 +121,7 @@ async def add_contact(
         )
 
     contact = Contact(
-        owner_id=current_user.id,
+        owner_id=current_user_id,
         contact_id=data.contact_id,
         nickname=data.nickname,
         status=ContactStatus.ACCEPTED.value,
@@ -142,14 +147,14 @@ async def add_contact(
 async def update_contact(
     contact_id: uuid.UUID,
     data: ContactUpdateRequest,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db),
 ) -> ContactResponse:
     """Обновить контакт (nickname)."""
     result = await db.execute(
         select(Contact)
         .where(Contact.id == contact_id)
-        .where(Contact.owner_id == current_user.id)
+        .where(Contact.owner_id == current_user_id)
     )
     contact = result.scalar_one_or_none()
 
@@ -188,14 +193,14 @@ async def update_contact(
 @router.delete("/contacts/{contact_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_contact(
     contact_id: uuid.UUID,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db),
 ) -> None:
     """Удалить контакт."""
     result = await db.execute(
         select(Contact)
         .where(Contact.id == contact_id)
-        .where(Contact.owner_id == current_user.id)
+        .where(Contact.owner_id == current_user_id)
     )
     contact = result.scalar_one_or_none()
 
@@ -211,14 +216,14 @@ async def delete_contact(
 @router.post("/contacts/{contact_id}/block", status_code=status.HTTP_204_NO_CONTENT)
 async def block_contact(
     contact_id: uuid.UUID,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db),
 ) -> None:
     """Заблокировать контакт."""
     result = await db.execute(
         select(Contact)
         .where(Contact.id == contact_id)
-        .where(Contact.owner_id == current_user.id)
+        .where(Contact.owner_id == current_user_id)
     )
     contact = result.scalar_one_or_none()
 
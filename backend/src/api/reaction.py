@@ -7,7 +7,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.api.deps import get_current_user
+from src.api.deps import get_current_principal, get_current_user_id
 from src.db.session import get_db
 from src.models.chat import ChatMember, Message
 from src.models.reaction import MessageReaction
@@ -18,6 +18,7 @@ from src.schemas.reaction import (
     ReactionResponse,
     ReactionSummary,
 )
+from src.services.auth_cache import UserPrincipal
 
 router = APIRouter(prefix="/reactions", tags=["reactions"])
 
@@ -54,7 +55,7 @@ async def _check_message_access(
 async def add_reaction(
     message_id: uuid.UUID,
     data: ReactionCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: UserPrincipal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db),
 ) -> ReactionResponse:
     """Добавить реакцию на сообщение."""
@@ -96,16 +97,16 @@ async def add_reaction(
 async def remove_reaction(
     message_id: uuid.UUID,
     emoji: str,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db),
 ) -> None:
     """Удалить реакцию с сообщения."""
-    await _check_message_access(message_id, current_user.id, db)
+    await _check_message_access(message_id, current_user_id, db)
 
     reaction = await db.scalar(
         select(MessageReaction).where(
             MessageReaction.message_id == message_id,
-            MessageReaction.user_id == current_user.id,
+            MessageReaction.user_id == current_user_id,
             MessageReaction.emoji == emoji,
         )
     )
@@ -122,11 +123,11 @@ async def remove_reaction(
 @router.get("/messages/{message_id}", response_model=MessageReactionsResponse)
 async def get_reactions(
     message_id: uuid.UUID,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db),
 ) -> MessageReactionsResponse:
     """Получить все реакции на сообщение."""
-    await _check_message_access(message_id, current_user.id, db)
+    await _check_message_access(message_id, current_user_id, db)
 
     result = await db.execute(
         select(MessageReaction, User.name)
@@ -142,7 +143,7 @@ async def get_reactions(
     for reaction, user_name in rows:
         emoji_counts[reaction.emoji] += 1
         emoji_users[reaction.emoji].append(user_name)
-        if reaction.user_id == current_user.id:
+        if reaction.user_id == current_user_id:
             emoji_my[reaction.emoji] = True
 
     summaries = [
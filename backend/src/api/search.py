@@ -1,55 +1,49 @@
 """API эндпоинты для поиска."""
 
 import uuid
-from typing import Any, Sequence
+from typing import Any
 
 from fastapi import APIRouter, Depends, Query
-from sqlalchemy import and_, func, select
+from sqlalchemy import ColumnElement, and_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.api.deps import get_current_user
+from src.api.deps import get_current_user_id
 from src.db.session import get_db
-from src.models.chat import Chat, ChatMember, Message
+from src.models.chat import ChatMember, Message
 from src.models.media import MessageAttachment
-from src.models.user import User
 from src.schemas.search import (
+    SearchCountMode,
+    SearchOrder,
     SearchResponse,
     SearchResultItem,
     SearchType,
 )
+from src.services.message_context import MessageContextLoader
+from src.services.search import (
+    SessionSetup,
+    apply_similarity_threshold,
+    build_ts_query,
+    fuzzy_condition,
+    fuzzy_highlight,
+    headline_expression,
+    match_condition,
+    rank_expression,
+    search_counter,
+    similarity_expression,
+)
 
 router = APIRouter(prefix="/search", tags=["search"])
 
 
-def _highlight_text(content: str, query: str, max_len: int = 100) -> str:
-    """Подсветить найденный текст."""
-    query_lower = query.lower()
-    content_lower = content.lower()
-
-    idx = content_lower.find(query_lower)
-    if idx == -1:
-        return content[:max_len] + ("..." if len(content) > max_len else "")
-
-    start = max(0, idx - 30)
-    end = min(len(content), idx + len(query) + 30)
-
-    prefix = "..." if start > 0 else ""
-    suffix = "..." if end < len(content) else ""
-
-    return prefix + content[start:end] + suffix
-
-
-async def _get_chat_name(chat: Chat, current_user_id: uuid.UUID, db: AsyncSession) -> str:
-    """Получить имя чата."""
-    if chat.name:
-        return chat.name
-
-    for member in chat.members:
-        if member.user_id != current_user_id:
-            user = await db.get(User, member.user_id)
-            if user:
-                return user.name
-    return "Чат"
+def _search_order(
+    order: SearchOrder,
+    created_at: ColumnElement[Any],
+    rank: ColumnElement[Any],
+) -> list[ColumnElement[Any]]:
+    """Порядок результатов: по релевантности или по дате."""
+    if order == SearchOrder.RELEVANCE:
+        return [rank.desc(), created_at.desc()]
+    return [created_at.desc()]
 
 
 @router.get("", response_model=SearchResponse)
@@ -58,19 +52,35 @@ async def search_messages(
     chat_id: uuid.UUID | None = Query(None, description="ID чата"),
     search_type: SearchType = Query(SearchType.ALL, description="Тип поиска"),
     sender_id: uuid.UUID | None = Query(None, description="ID отправителя"),
+    order: SearchOrder = Query(SearchOrder.DATE, description="Сортировка"),
+    count_mode: SearchCountMode = Query(
+        SearchCountMode.ESTIMATE, description="Подсчёт total_count"
+    ),
     limit: int = Query(20, ge=1, le=100),
     offset: int = Query(0, ge=0),
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db),
 ) -> SearchResponse:
-    """Поиск по сообщениям."""
+    """Поиск по сообщениям: полнотекстовый или нечёткий (``fuzzy``)."""
+    ts_query = build_ts_query(q)
+    fuzzy = search_type == SearchType.FUZZY
+    setup: SessionSetup | None = None
+    if fuzzy:
+        setup = apply_similarity_threshold
+        await setup(db)
+        match = fuzzy_condition(q)
+        rank = similarity_expression(q).label("rank")
+    else:
+        match = match_condition(ts_query)
+        rank = rank_expression(ts_query).label("rank")
+
     user_chats_subq = (
         select(ChatMember.chat_id)
-        .where(ChatMember.user_id == current_user.id)
+        .where(ChatMember.user_id == current_user_id)
         .scalar_subquery()
     )
 
-    conditions: list[Any] = [Message.chat_id.in_(user_chats_subq)]
+    conditions: list[Any] = [Message.chat_id.in_(user_chats_subq), match]
 
     if chat_id:
         conditions.append(Message.chat_id == chat_id)
@@ -78,63 +88,72 @@ async def search_messages(
     if sender_id:
         conditions.append(Message.sender_id == sender_id)
 
-    if search_type == SearchType.TEXT:
-        conditions.append(func.lower(Message.content).contains(q.lower()))
-    elif search_type == SearchType.MEDIA:
+    if search_type == SearchType.MEDIA:
         media_messages = select(MessageAttachment.message_id).scalar_subquery()
         conditions.append(Message.id.in_(media_messages))
-        conditions.append(func.lower(Message.content).contains(q.lower()))
-    elif search_type == SearchType.VOICE:
-        conditions.append(func.lower(Message.content).contains(q.lower()))
-    else:
-        conditions.append(func.lower(Message.content).contains(q.lower()))
 
-    count_query = select(func.count()).select_from(Message).where(and_(*conditions))
-    total_count = await db.scalar(count_query) or 0
+    count_key = (current_user_id, q, chat_id, search_type, sender_id)
+    if count_mode == SearchCountMode.EXACT:
+        total_count = await search_counter.exact(db, count_key, conditions)
+        total_exact = True
+    else:
+        total_count, total_exact = await search_counter.estimate(
+            db, count_key, conditions, setup
+        )
 
-    query = (
-        select(Message)
+    page = (
+        select(
+            Message.id,
+            Message.chat_id,
+            Message.sender_id,
+            Message.content,
+            Message.created_at,
+            rank,
+        )
         .where(and_(*conditions))
-        .order_by(Message.created_at.desc())
-        .limit(limit)
+        .order_by(*_search_order(order, Message.created_at, rank))
+        .limit(limit + 1)
         .offset(offset)
+        .subquery()
     )
+    # ts_headline дорогой — считается только для строк страницы; в нечётком
+    # режиме tsquery не совпадает с найденным, подсветка строится по подстроке
+    columns: list[Any] = [page]
+    if not fuzzy:
+        columns.append(headline_expression(page.c.content, ts_query).label("highlight"))
+    query = select(*columns).order_by(*_search_order(order, page.c.created_at, page.c.rank))
 
     result = await db.execute(query)
-    messages: Sequence[Message] = result.scalars().all()
+    messages = result.all()
+    has_more = len(messages) > limit
+    messages = messages[:limit]
+
+    contexts = await MessageContextLoader(db).load(messages, current_user_id)
 
     results: list[SearchResultItem] = []
     for msg in messages:
-        chat = await db.get(Chat, msg.chat_id)
-        sender = await db.get(User, msg.sender_id)
-
-        if not chat or not sender:
+        context = contexts.get(msg.id)
+        if not context or context.sender_name is None:
             continue
 
-        has_media_result = await db.execute(
-            select(MessageAttachment.id).where(MessageAttachment.message_id == msg.id).limit(1)
-        )
-        has_media = has_media_result.scalar() is not None
-
-        chat_name = await _get_chat_name(chat, current_user.id, db)
-
         results.append(
             SearchResultItem(
                 message_id=msg.id,
                 chat_id=msg.chat_id,
-                chat_name=chat_name,
+                chat_name=context.chat_name,
                 sender_id=msg.sender_id,
-                sender_name=sender.name,
+                sender_name=context.sender_name,
                 content=msg.content,
-                highlight=_highlight_text(msg.content, q),
+                highlight=fuzzy_highlight(msg.content, q) if fuzzy else msg.highlight,
                 created_at=msg.created_at,
-                has_media=has_media,
+                has_media=context.has_media,
             )
         )
 
     return SearchResponse(
         query=q,
         total_count=total_count,
+        total_exact=total_exact,
         results=results,
-        has_more=offset + limit < total_count,
+        has_more=has_more,
     )
@@ -6,10 +6,9 @@ import uuid
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.api.deps import get_current_user
+from src.api.deps import get_current_user_id
 from src.db import get_db
 from src.models.chat import Message
-from src.models.user import User
 from src.schemas.smart_reply import (
     QUICK_REPLIES,
     SmartReplyRequest,
@@ -57,7 +56,7 @@ def generate_replies(message_text: str, max_count: int = 3) -> list[str]:
 @router.post("/generate", response_model=SmartReplyResponse)
 async def generate_smart_replies(
     request: SmartReplyRequest,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db),
 ) -> SmartReplyResponse:
     """Сгенерировать умные ответы на сообщение."""
@@ -68,7 +67,7 @@ async def generate_smart_replies(
             detail={"message": "Сообщение не найдено", "code": "message_not_found"},
         )
 
-    settings = USER_SETTINGS.get(str(current_user.id), {"max_suggestions": 3})
+    settings = USER_SETTINGS.get(str(current_user_id), {"max_suggestions": 3})
     max_count = settings.get("max_suggestions", 3)
 
     replies = generate_replies(message.content, max_count)
@@ -82,10 +81,10 @@ async def generate_smart_replies(
 @router.post("/quick", response_model=SmartReplyResponse)
 async def get_quick_replies(
     text: str,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
 ) -> SmartReplyResponse:
     """Быстрые ответы без сохранения в БД."""
-    settings = USER_SETTINGS.get(str(current_user.id), {"max_suggestions": 3})
+    settings = USER_SETTINGS.get(str(current_user_id), {"max_suggestions": 3})
     max_count = settings.get("max_suggestions", 3)
 
     replies = generate_replies(text, max_count)
@@ -95,10 +94,10 @@ async def get_quick_replies(
 
 @router.get("/settings", response_model=SmartReplySettingsResponse)
 async def get_smart_reply_settings(
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
 ) -> SmartReplySettingsResponse:
     """Получить настройки smart replies."""
-    settings = USER_SETTINGS.get(str(current_user.id), {
+    settings = USER_SETTINGS.get(str(current_user_id), {
         "enabled": True,
         "max_suggestions": 3,
         "include_emoji": True,
@@ -111,9 +110,9 @@ async def get_smart_reply_settings(
 @router.put("/settings", response_model=SmartReplySettingsResponse)
 async def update_smart_reply_settings(
     request: SmartReplySettingsRequest,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
 ) -> SmartReplySettingsResponse:
     """Обновить настройки smart replies."""
-    USER_SETTINGS[str(current_user.id)] = request.model_dump()
+    USER_SETTINGS[str(current_user_id)] = request.model_dump()
 
     return SmartReplySettingsResponse(**request.model_dump())
@@ -7,9 +7,8 @@ from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.api.deps import get_current_user
+from src.api.deps import get_current_user_id
 from src.db import get_db
-from src.models.user import User
 from src.schemas.sticker import (
     GifResponse,
     GifSearchResponse,
@@ -64,7 +63,7 @@ DEMO_GIFS = [
 
 @router.get("/packs", response_model=UserStickerPacksResponse)
 async def get_sticker_packs(
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
 ) -> UserStickerPacksResponse:
     """Получить список наборов стикеров пользователя."""
     packs = [
@@ -87,7 +86,7 @@ async def get_sticker_packs(
 @router.get("/packs/{pack_id}", response_model=StickerPackDetailResponse)
 async def get_sticker_pack(
     pack_id: uuid.UUID,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
 ) -> StickerPackDetailResponse:
     """Получить детали набора стикеров."""
     pack = next((p for p in DEMO_STICKER_PACKS if p["id"] == str(pack_id)), None)
@@ -124,7 +123,7 @@ async def get_sticker_pack(
 @router.get("/recent", response_model=RecentStickersResponse)
 async def get_recent_stickers(
     limit: int = Query(20, ge=1, le=50),
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
 ) -> RecentStickersResponse:
     """Получить недавно использованные стикеры."""
     stickers = [
@@ -142,7 +141,7 @@ async def get_recent_stickers(
 @router.post("/packs/{pack_id}/add", status_code=status.HTTP_204_NO_CONTENT)
 async def add_sticker_pack(
     pack_id: uuid.UUID,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
 ) -> None:
     """Добавить набор стикеров в коллекцию пользователя."""
     pack = next((p for p in DEMO_STICKER_PACKS if p["id"] == str(pack_id)), None)
@@ -156,7 +155,7 @@ async def add_sticker_pack(
 @router.delete("/packs/{pack_id}/remove", status_code=status.HTTP_204_NO_CONTENT)
 async def remove_sticker_pack(
     pack_id: uuid.UUID,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
 ) -> None:
     """Удалить набор стикеров из коллекции пользователя."""
     pass
@@ -165,7 +164,7 @@ async def remove_sticker_pack(
 @router.get("/search", response_model=UserStickerPacksResponse)
 async def search_sticker_packs(
     query: str = Query(..., min_length=1, max_length=100),
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
 ) -> UserStickerPacksResponse:
     """Поиск наборов стикеров."""
     query_lower = query.lower()
@@ -196,7 +195,7 @@ async def search_gifs(
     query: str = Query(..., min_length=1, max_length=100),
     limit: int = Query(20, ge=1, le=50),
     offset: int = Query(0, ge=0),
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
 ) -> GifSearchResponse:
     """Поиск GIF (заглушка, в реальности использовать Giphy/Tenor API)."""
     gifs = [
@@ -220,7 +219,7 @@ async def search_gifs(
 @router.get("/gifs/trending", response_model=TrendingGifsResponse)
 async def get_trending_gifs(
     limit: int = Query(20, ge=1, le=50),
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
 ) -> TrendingGifsResponse:
     """Получить популярные GIF (заглушка)."""
     gifs = [
@@ -6,9 +6,8 @@ from datetime import UTC, datetime
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.api.deps import get_current_user
+from src.api.deps import get_current_user_id
 from src.db import get_db
-from src.models.user import User
 from src.schemas.subtitle import (
     GenerateSubtitlesRequest,
     SubtitleCue,
@@ -42,10 +41,13 @@ def generate_dummy_cues(duration: float = 60.0) -> list[SubtitleCue]:
 @router.post("/generate", response_model=SubtitleResponse)
 async def generate_subtitles(
     request: GenerateSubtitlesRequest,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db),
 ) -> SubtitleResponse:
-    """Запустить генерацию субтитров для видео."""
+    """Сгенерировать субтитры для видео.
+
+    Генерация синхронная: готовые субтитры возвращаются в ответе.
+    """
     subtitle_id = uuid.uuid4()
     now = datetime.now(UTC)
 
@@ -72,7 +74,7 @@ async def generate_subtitles(
 @router.get("/video/{video_id}", response_model=SubtitleListResponse)
 async def list_video_subtitles(
     video_id: uuid.UUID,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
 ) -> SubtitleListResponse:
     """Получить список субтитров для видео."""
     subtitles = VIDEO_SUBTITLES.get(str(video_id), [])
@@ -86,7 +88,7 @@ async def list_video_subtitles(
 @router.get("/{subtitle_id}", response_model=SubtitleResponse)
 async def get_subtitle(
     subtitle_id: uuid.UUID,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
 ) -> SubtitleResponse:
     """Получить субтитры по ID."""
     for video_subs in VIDEO_SUBTITLES.values():
@@ -103,7 +105,7 @@ async def get_subtitle(
 @router.post("/upload", response_model=SubtitleResponse)
 async def upload_subtitles(
     request: SubtitleUploadRequest,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
 ) -> SubtitleResponse:
     """Загрузить готовые субтитры."""
     subtitle_id = uuid.uuid4()
@@ -178,7 +180,7 @@ def parse_time(time_str: str) -> float:
 @router.delete("/{subtitle_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_subtitle(
     subtitle_id: uuid.UUID,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
 ) -> None:
     """Удалить субтитры."""
     for video_key, video_subs in VIDEO_SUBTITLES.items():
@@ -195,10 +197,10 @@ async def delete_subtitle(
 
 @router.get("/settings", response_model=SubtitleSettingsResponse)
 async def get_subtitle_settings(
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
 ) -> SubtitleSettingsResponse:
     """Получить настройки субтитров пользователя."""
-    settings = USER_SUBTITLE_SETTINGS.get(str(current_user.id), {
+    settings = USER_SUBTITLE_SETTINGS.get(str(current_user_id), {
         "enabled": True,
         "font_size": 16,
         "background_opacity": 0.7,
@@ -213,9 +215,9 @@ async def get_subtitle_settings(
 @router.put("/settings", response_model=SubtitleSettingsResponse)
 async def update_subtitle_settings(
     request: SubtitleSettingsRequest,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
 ) -> SubtitleSettingsResponse:
     """Обновить настройки субтитров."""
-    USER_SUBTITLE_SETTINGS[str(current_user.id)] = request.model_dump()
+    USER_SUBTITLE_SETTINGS[str(current_user_id)] = request.model_dump()
 
     return SubtitleSettingsResponse(**request.model_dump())
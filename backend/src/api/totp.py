@@ -1,11 +1,12 @@
 """API эндпоинты для 2FA [SECURITY]."""
 
+import uuid
+
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.api.deps import get_current_user
+from src.api.deps import get_current_user_id
 from src.db import get_db
-from src.models.user import User
 from src.schemas.totp import (
     Setup2FAResponse,
     TwoFactorStatusResponse,
@@ -19,25 +20,25 @@ router = APIRouter(prefix="/2fa", tags=["2fa"])
 
 @router.get("/status", response_model=TwoFactorStatusResponse)
 async def get_2fa_status(
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db),
 ) -> TwoFactorStatusResponse:
     """Получить статус 2FA."""
     service = TOTPService(db)
-    enabled = await service.is_2fa_enabled(current_user.id)
+    enabled = await service.is_2fa_enabled(current_user_id)
     return TwoFactorStatusResponse(enabled=enabled)
 
 
 @router.post("/setup", response_model=Setup2FAResponse)
 async def setup_2fa(
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db),
 ) -> Setup2FAResponse:
     """Настроить 2FA (шаг 1: получить секрет и QR-код)."""
     service = TOTPService(db)
 
     try:
-        result = await service.setup_2fa(current_user.id)
+        result = await service.setup_2fa(current_user_id)
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -54,14 +55,14 @@ async def setup_2fa(
 @router.post("/verify", response_model=Verify2FAResponse)
 async def verify_and_enable_2fa(
     data: Verify2FARequest,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db),
 ) -> Verify2FAResponse:
     """Подтвердить и включить 2FA (шаг 2: ввести код из аутентификатора)."""
     service = TOTPService(db)
 
     try:
-        success = await service.verify_and_enable_2fa(current_user.id, data.code)
+        success = await service.verify_and_enable_2fa(current_user_id, data.code)
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -77,14 +78,14 @@ async def verify_and_enable_2fa(
 @router.post("/disable", response_model=Verify2FAResponse)
 async def disable_2fa(
     data: Verify2FARequest,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db),
 ) -> Verify2FAResponse:
     """Отключить 2FA."""
     service = TOTPService(db)
 
     try:
-        success = await service.disable_2fa(current_user.id, data.code)
+        success = await service.disable_2fa(current_user_id, data.code)
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -5,12 +5,12 @@ import uuid
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.api.deps import get_current_user
+from src.api.deps import get_current_user_id
 from src.db import get_db
-from src.models.media import MediaFile, MediaType, Transcription
-from src.models.user import User
+from src.models.media import MediaFile, MediaType, Transcription, TranscriptionStatus
 from src.schemas.media import CreateTranscriptionRequest, TranscriptionResponse
 from src.services.transcription import TranscriptionService
+from src.services.transcription_jobs import transcription_queue
 
 router = APIRouter(prefix="/transcriptions", tags=["transcriptions"])
 
@@ -33,7 +33,7 @@ def _build_transcription_response(transcription: Transcription) -> Transcription
 @router.post("", response_model=TranscriptionResponse, status_code=status.HTTP_201_CREATED)
 async def create_transcription(
     data: CreateTranscriptionRequest,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db),
 ) -> TranscriptionResponse:
     """Создать транскрипцию для голосового сообщения."""
@@ -57,20 +57,22 @@ async def create_transcription(
     service = TranscriptionService(db)
 
     try:
-        transcription = await service.create_transcription(data.media_id)
+        transcription = await service.create_transcription(data.media_id, current_user_id)
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail={"message": str(e), "code": "transcription_error"},
         ) from e
 
+    await db.commit()
+    transcription_queue.notify()
     return _build_transcription_response(transcription)
 
 
 @router.get("/{transcription_id}", response_model=TranscriptionResponse)
 async def get_transcription(
     transcription_id: uuid.UUID,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db),
 ) -> TranscriptionResponse:
     """Получить транскрипцию по ID."""
@@ -89,7 +91,7 @@ async def get_transcription(
 @router.get("/media/{media_id}", response_model=TranscriptionResponse)
 async def get_transcription_by_media(
     media_id: uuid.UUID,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db),
 ) -> TranscriptionResponse:
     """Получить транскрипцию по ID медиафайла."""
@@ -108,12 +110,15 @@ async def get_transcription_by_media(
 @router.post("/{transcription_id}/process", response_model=TranscriptionResponse)
 async def process_transcription(
     transcription_id: uuid.UUID,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db),
 ) -> TranscriptionResponse:
-    """Запустить обработку транскрипции."""
+    """Повторно поставить в очередь неудавшуюся транскрипцию.
+
+    Новые транскрипции обрабатываются без этого вызова.
+    """
     service = TranscriptionService(db)
-    transcription = await service.process_transcription(transcription_id)
+    transcription = await service.retry_transcription(transcription_id)
 
     if not transcription:
         raise HTTPException(
@@ -121,4 +126,7 @@ async def process_transcription(
             detail={"message": "Транскрипция не найдена", "code": "not_found"},
         )
 
+    if transcription.status == TranscriptionStatus.PENDING.value:
+        await db.commit()
+        transcription_queue.notify()
     return _build_transcription_response(transcription)
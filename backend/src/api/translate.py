@@ -5,10 +5,9 @@ import uuid
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.api.deps import get_current_user
+from src.api.deps import get_current_user_id
 from src.db import get_db
 from src.models.chat import Message
-from src.models.user import User
 from src.schemas.translate import (
     DetectLanguageRequest,
     DetectLanguageResponse,
@@ -59,7 +58,7 @@ def translate_text(text: str, source_lang: str, target_lang: str) -> str:
 @router.post("/message", response_model=TranslateResponse)
 async def translate_message(
     request: TranslateRequest,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db),
 ) -> TranslateResponse:
     """Перевести сообщение."""
@@ -85,7 +84,7 @@ async def translate_message(
 @router.post("/text", response_model=TranslateResponse)
 async def translate_text_endpoint(
     request: TranslateTextRequest,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
 ) -> TranslateResponse:
     """Перевести произвольный текст."""
     if request.source_language:
@@ -108,7 +107,7 @@ async def translate_text_endpoint(
 @router.post("/detect", response_model=DetectLanguageResponse)
 async def detect_language_endpoint(
     request: DetectLanguageRequest,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
 ) -> DetectLanguageResponse:
     """Определить язык текста."""
     lang_code, confidence = detect_language(request.text)
@@ -127,7 +126,7 @@ async def detect_language_endpoint(
 
 @router.get("/languages", response_model=SupportedLanguagesResponse)
 async def get_supported_languages(
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
 ) -> SupportedLanguagesResponse:
     """Получить список поддерживаемых языков."""
     return SupportedLanguagesResponse(languages=SUPPORTED_LANGUAGES)
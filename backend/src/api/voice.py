@@ -1,5 +1,6 @@
 """API эндпоинты для голосовых сообщений."""
 
+import logging
 import uuid
 from datetime import UTC, datetime, timedelta
 
@@ -7,9 +8,10 @@ from fastapi import APIRouter, Depends, HTTPException, UploadFile, status
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.api.deps import get_current_user
+from src.api.deps import get_current_user_id
 from src.db import get_db
 from src.models.chat import Chat, ChatMember, Message
+from src.models.media import MediaFile, MediaType, MessageAttachment
 from src.models.user import User
 from src.schemas.voice import (
     VoiceMessageCreate,
@@ -17,9 +19,28 @@ from src.schemas.voice import (
     VoiceMessageResponse,
     VoiceTranscriptionResponse,
 )
+from src.services.chat import ChatService, build_message_response
+from src.services.media import FileTooLargeError, get_file_url, guess_mime_type, is_allowed_file
+from src.services.uploads import schedule_processing, store_upload
+from src.websocket import manager
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/voice", tags=["voice"])
 
+VOICE_MESSAGE_CONTENT = "[Голосовое сообщение]"
+
+
+async def get_voice_media(db: AsyncSession, message_id: uuid.UUID) -> MediaFile | None:
+    """Голосовое вложение сообщения, если оно есть."""
+    return await db.scalar(
+        select(MediaFile)
+        .join(MessageAttachment, MessageAttachment.media_id == MediaFile.id)
+        .where(MessageAttachment.message_id == message_id)
+        .where(MediaFile.media_type == MediaType.VOICE.value)
+        .limit(1)
+    )
+
 
 async def check_chat_access(
     db: AsyncSession, user_id: uuid.UUID, chat_id: uuid.UUID
@@ -50,39 +71,61 @@ async def check_chat_access(
 async def upload_voice_message(
     file: UploadFile,
     chat_id: uuid.UUID,
-    duration: int,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db),
 ) -> dict:
-    """Загрузить голосовое сообщение."""
-    await check_chat_access(db, current_user.id, chat_id)
-
-    if not file.content_type or not file.content_type.startswith("audio/"):
+    """Загрузить голосовое сообщение.
+
+    Файл сохраняется в хранилище и прикрепляется к новому сообщению чата.
+    Длительность не берётся у клиента: её извлекает из заголовков файла
+    фоновый обработчик метаданных, он же отклоняет голосовые длиннее
+    ``MAX_VOICE_DURATION``. В ответе длительности поэтому нет — она приходит
+    позже в данных медиафайла.
+    """
+    await check_chat_access(db, current_user_id, chat_id)
+
+    mime_type = (file.content_type or guess_mime_type(file.filename or "")).split(";")[0]
+    if not mime_type.startswith("audio/") or not is_allowed_file(mime_type):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail={"message": "Файл должен быть аудио", "code": "invalid_file_type"},
         )
 
-    if duration < 1 or duration > 600:
+    try:
+        media = await store_upload(db, file, current_user_id, mime_type, MediaType.VOICE)
+    except FileTooLargeError:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail={"message": "Длительность должна быть от 1 до 600 секунд", "code": "invalid_duration"},
-        )
+            detail={"message": "Файл слишком большой", "code": "file_too_large"},
+        ) from None
 
+    chat_service = ChatService(db)
     message = Message(
         chat_id=chat_id,
-        sender_id=current_user.id,
-        content="[Голосовое сообщение]",
-        message_type="voice",
+        sender_id=current_user_id,
+        seq=await chat_service.next_message_seq(chat_id),
+        content=VOICE_MESSAGE_CONTENT,
     )
     db.add(message)
     await db.flush()
+    db.add(MessageAttachment(message_id=message.id, media_id=media.id))
+    await chat_service.on_message_sent(message)
     await db.refresh(message)
+    sender_name = await db.scalar(select(User.name).where(User.id == current_user_id))
+
+    await db.commit()
+    schedule_processing(media)
+    response = build_message_response(message, sender_name)
+    try:
+        await manager.emit_new_message(chat_id, response.model_dump(mode="json"))
+    except Exception:
+        logger.exception("Не удалось разослать сообщение %s", message.id)
 
     return {
         "message_id": str(message.id),
         "chat_id": str(chat_id),
-        "duration": duration,
+        "media_id": str(media.id),
+        "url": get_file_url(media.storage_path),
         "created_at": message.created_at.isoformat(),
     }
 
@@ -90,7 +133,7 @@ async def upload_voice_message(
 @router.post("/{message_id}/listen", status_code=status.HTTP_204_NO_CONTENT)
 async def mark_as_listened(
     message_id: uuid.UUID,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db),
 ) -> None:
     """Отметить голосовое сообщение как прослушанное."""
@@ -101,9 +144,9 @@ async def mark_as_listened(
             detail={"message": "Сообщение не найдено", "code": "message_not_found"},
         )
 
-    await check_chat_access(db, current_user.id, message.chat_id)
+    await check_chat_access(db, current_user_id, message.chat_id)
 
-    if message.sender_id == current_user.id:
+    if message.sender_id == current_user_id:
         return
 
     message.is_read = True
@@ -113,7 +156,7 @@ async def mark_as_listened(
 @router.get("/{message_id}/transcribe")
 async def transcribe_voice_message(
     message_id: uuid.UUID,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db),
 ) -> VoiceTranscriptionResponse:
     """Получить транскрипцию голосового сообщения (заглушка)."""
@@ -124,9 +167,9 @@ async def transcribe_voice_message(
             detail={"message": "Сообщение не найдено", "code": "message_not_found"},
         )
 
-    await check_chat_access(db, current_user.id, message.chat_id)
+    await check_chat_access(db, current_user_id, message.chat_id)
 
-    if message.message_type != "voice":
+    if await get_voice_media(db, message_id) is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail={"message": "Сообщение не является голосовым", "code": "not_voice_message"},
@@ -145,21 +188,22 @@ async def get_voice_messages(
     chat_id: uuid.UUID,
     limit: int = 20,
     offset: int = 0,
-    current_user: User = Depends(get_current_user),
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db),
 ) -> list[dict]:
     """Получить голосовые сообщения чата."""
-    await check_chat_access(db, current_user.id, chat_id)
+    await check_chat_access(db, current_user_id, chat_id)
 
     result = await db.execute(
-        select(Message)
+        select(Message, MediaFile)
+        .join(MessageAttachment, MessageAttachment.message_id == Message.id)
+        .join(MediaFile, MediaFile.id == MessageAttachment.media_id)
         .where(Message.chat_id == chat_id)
-        .where(Message.message_type == "voice")
-        .order_by(Message.created_at.desc())
+        .where(MediaFile.media_type == MediaType.VOICE.value)
+        .order_by(Message.seq.desc())
         .offset(offset)
         .limit(limit)
     )
-    messages = result.scalars().all()
 
     return [
         {
@@ -167,8 +211,11 @@ async def get_voice_messages(
             "chat_id": str(m.chat_id),
             "sender_id": str(m.sender_id),
             "content": m.content,
-            "is_read": m.is_read,
+            "media_id": str(media.id),
+            "url": get_file_url(media.storage_path),
+            "duration": media.duration_seconds,
+            "waveform": list(media.waveform) if media.waveform else None,
             "created_at": m.created_at.isoformat(),
         }
-        for m in messages
+        for m, media in result.all()
     ]
@@ -1,35 +1,156 @@
-"""Управление сессиями базы данных."""
+"""Управление сессиями базы данных.
 
+Engine и пул соединений создаются один раз на процесс (воркер uvicorn)
+в ``main.lifespan`` и освобождаются при остановке приложения.
+"""
+
+import time
 from collections.abc import AsyncGenerator
+from dataclasses import dataclass
+from typing import Any
 
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import (
     AsyncEngine,
     AsyncSession,
     async_sessionmaker,
     create_async_engine,
 )
+from sqlalchemy.pool import AsyncAdaptedQueuePool, ConnectionPoolEntry
 
 from src.config import get_settings
 
 
-def get_engine() -> AsyncEngine:
-    """Создать async engine."""
+@dataclass
+class PoolMetrics:
+    """Накопительные метрики пула соединений."""
+
+    checkouts: int = 0
+    checkins: int = 0
+    connects: int = 0
+    invalidations: int = 0
+    wait_time_total: float = 0.0
+    wait_time_max: float = 0.0
+
+    def record_wait(self, seconds: float) -> None:
+        """Учесть время ожидания соединения из пула."""
+        self.wait_time_total += seconds
+        if seconds > self.wait_time_max:
+            self.wait_time_max = seconds
+
+
+_engine: AsyncEngine | None = None
+_session_factory: async_sessionmaker[AsyncSession] | None = None
+_metrics = PoolMetrics()
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Пул соединений с замером времени ожидания checkout."""
+
+    def _do_get(self) -> ConnectionPoolEntry:
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            _metrics.record_wait(time.perf_counter() - started)
+
+
+def _register_pool_events(engine: AsyncEngine) -> None:
+    """Подписаться на события пула для сбора метрик."""
+    pool = engine.sync_engine.pool
+
+    @event.listens_for(pool, "connect")
+    def _on_connect(*_: Any) -> None:
+        _metrics.connects += 1
+
+    @event.listens_for(pool, "checkout")
+    def _on_checkout(*_: Any) -> None:
+        _metrics.checkouts += 1
+
+    @event.listens_for(pool, "checkin")
+    def _on_checkin(*_: Any) -> None:
+        _metrics.checkins += 1
+
+    @event.listens_for(pool, "invalidate")
+    def _on_invalidate(*_: Any) -> None:
+        _metrics.invalidations += 1
+
+
+def _build_engine() -> AsyncEngine:
+    """Создать async engine с настройками пула из Settings."""
     settings = get_settings()
-    return create_async_engine(
+    engine = create_async_engine(
         settings.database_url,
         echo=settings.debug,
+        poolclass=InstrumentedQueuePool,
         pool_pre_ping=True,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        connect_args={"statement_cache_size": settings.db_statement_cache_size},
     )
+    _register_pool_events(engine)
+    return engine
+
+
+def init_engine() -> AsyncEngine:
+    """Инициализировать engine процесса (идемпотентно)."""
+    global _engine, _session_factory
+    if _engine is None:
+        _engine = _build_engine()
+        _session_factory = async_sessionmaker(
+            _engine,
+            class_=AsyncSession,
+            expire_on_commit=False,
+        )
+    return _engine
+
+
+async def dispose_engine() -> None:
+    """Закрыть пул соединений и сбросить engine процесса."""
+    global _engine, _session_factory
+    if _engine is not None:
+        await _engine.dispose()
+    _engine = None
+    _session_factory = None
+
+
+def get_engine() -> AsyncEngine:
+    """Получить async engine процесса (создаётся лениво вне lifespan)."""
+    return init_engine()
 
 
 def get_session_factory() -> async_sessionmaker[AsyncSession]:
     """Получить фабрику сессий."""
-    engine = get_engine()
-    return async_sessionmaker(
-        engine,
-        class_=AsyncSession,
-        expire_on_commit=False,
-    )
+    init_engine()
+    assert _session_factory is not None
+    return _session_factory
+
+
+def get_pool_stats() -> dict[str, Any]:
+    """Текущее состояние пула и накопленные метрики."""
+    stats: dict[str, Any] = {
+        "initialized": _engine is not None,
+        "size": 0,
+        "checked_in": 0,
+        "checked_out": 0,
+        "overflow": 0,
+        "checkouts": _metrics.checkouts,
+        "checkins": _metrics.checkins,
+        "connects": _metrics.connects,
+        "invalidations": _metrics.invalidations,
+        "wait_time_total": round(_metrics.wait_time_total, 6),
+        "wait_time_max": round(_metrics.wait_time_max, 6),
+    }
+    if _engine is not None:
+        pool = _engine.sync_engine.pool
+        if isinstance(pool, AsyncAdaptedQueuePool):
+            stats["size"] = pool.size()
+            stats["checked_in"] = pool.checkedin()
+            stats["checked_out"] = pool.checkedout()
+            stats["overflow"] = max(pool.overflow(), 0)
+    return stats
 
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
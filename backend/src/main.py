@@ -6,15 +6,38 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from src.api.media import files_router as media_files_router
 from src.api.routes import router as api_router
 from src.config import get_settings
+from src.db.session import dispose_engine, init_engine
+from src.services.export_jobs import export_runner
+from src.services.media_metadata import metadata_worker
+from src.services.previews import preview_pipeline
+from src.services.transcription_jobs import transcription_queue
+from src.services.uploads import upload_cleaner
 from src.websocket import manager
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     """Lifecycle управление приложением."""
-    yield
+    init_engine()
+    await manager.start()
+    export_runner.start()
+    upload_cleaner.start()
+    preview_pipeline.start()
+    metadata_worker.start()
+    transcription_queue.start()
+    try:
+        yield
+    finally:
+        await transcription_queue.stop()
+        await metadata_worker.stop()
+        await preview_pipeline.stop()
+        await upload_cleaner.stop()
+        await export_runner.stop()
+        await manager.stop()
+        await dispose_engine()
 
 
 def create_app() -> FastAPI:
@@ -37,6 +60,7 @@ def create_app() -> FastAPI:
     )
 
     app.include_router(api_router, prefix="/api")
+    app.include_router(media_files_router)
 
     app.mount("/ws", manager.app)
 
@@ -4,12 +4,16 @@ from src.models.call import Call, CallStatus, CallType
 from src.models.chat import Chat, ChatMember, ChatType, MemberRole, Message, MessageStatus
 from src.models.contact import Contact, ContactStatus
 from src.models.encryption import OneTimePrekey, UserPublicKey
+from src.models.export import ExportFormat, ExportJob, ExportStatus
 from src.models.media import (
+    MediaBlob,
     MediaFile,
     MediaType,
     MessageAttachment,
+    ProcessingStatus,
     Transcription,
     TranscriptionStatus,
+    UploadSession,
 )
 from src.models.reaction import MessageReaction
 from src.models.user import User, UserSession
@@ -23,6 +27,10 @@ __all__ = [
     "ChatType",
     "Contact",
     "ContactStatus",
+    "ExportFormat",
+    "ExportJob",
+    "ExportStatus",
+    "MediaBlob",
     "MediaFile",
     "MediaType",
     "MemberRole",
@@ -31,8 +39,10 @@ __all__ = [
     "MessageReaction",
     "MessageStatus",
     "OneTimePrekey",
+    "ProcessingStatus",
     "Transcription",
     "TranscriptionStatus",
+    "UploadSession",
     "User",
     "UserPublicKey",
     "UserSession",
@@ -7,8 +7,17 @@ from datetime import datetime
 from enum import Enum
 from typing import TYPE_CHECKING
 
-from sqlalchemy import DateTime, ForeignKey, String, Text, func
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import (
+    BigInteger,
+    Computed,
+    DateTime,
+    ForeignKey,
+    Index,
+    String,
+    Text,
+    func,
+)
+from sqlalchemy.dialects.postgresql import TSVECTOR, UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from src.db.base import Base
@@ -18,6 +27,10 @@ if TYPE_CHECKING:
     from src.models.reaction import MessageReaction
     from src.models.user import User
 
+# Конфигурация полнотекстового поиска: russian_stem для кириллицы,
+# english_stem для латиницы
+MESSAGE_SEARCH_CONFIG = "russian"
+
 
 class ChatType(str, Enum):
     """Тип чата."""
@@ -60,6 +73,22 @@ class Chat(Base):
     name: Mapped[str | None] = mapped_column(String(100), nullable=True)
     description: Mapped[str | None] = mapped_column(String(500), nullable=True)
     avatar_url: Mapped[str | None] = mapped_column(String(500), nullable=True)
+    message_seq: Mapped[int] = mapped_column(
+        BigInteger,
+        default=0,
+        server_default="0",
+        nullable=False,
+    )
+    last_message_id: Mapped[uuid.UUID | None] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey(
+            "messages.id",
+            ondelete="SET NULL",
+            use_alter=True,
+            name="fk_chats_last_message_id",
+        ),
+        nullable=True,
+    )
     created_at: Mapped[datetime] = mapped_column(
         DateTime,
         server_default=func.now(),
@@ -81,6 +110,7 @@ class Chat(Base):
         "Message",
         back_populates="chat",
         cascade="all, delete-orphan",
+        foreign_keys="Message.chat_id",
     )
 
 
@@ -117,6 +147,17 @@ class ChatMember(Base):
         nullable=False,
     )
     last_read_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    last_read_seq: Mapped[int] = mapped_column(
+        BigInteger,
+        default=0,
+        server_default="0",
+        nullable=False,
+    )
+    unread_excluded: Mapped[int] = mapped_column(
+        default=0,
+        server_default="0",
+        nullable=False,
+    )
 
     chat: Mapped[Chat] = relationship("Chat", back_populates="members")
     user: Mapped[User] = relationship("User")
@@ -126,6 +167,16 @@ class Message(Base):
     """Модель сообщения."""
 
     __tablename__ = "messages"
+    __table_args__ = (
+        Index("ix_messages_chat_id_seq", "chat_id", "seq", unique=True),
+        Index("ix_messages_search_vector", "search_vector", postgresql_using="gin"),
+        Index(
+            "ix_messages_content_trgm",
+            "content",
+            postgresql_using="gin",
+            postgresql_ops={"content": "gin_trgm_ops"},
+        ),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True),
@@ -144,6 +195,7 @@ class Message(Base):
         nullable=False,
         index=True,
     )
+    seq: Mapped[int] = mapped_column(BigInteger, nullable=False)
     content: Mapped[str] = mapped_column(Text, nullable=False)
     status: Mapped[str] = mapped_column(
         String(20),
@@ -161,8 +213,18 @@ class Message(Base):
         server_default=func.now(),
         nullable=False,
     )
+    search_vector: Mapped[str | None] = mapped_column(
+        TSVECTOR,
+        Computed(f"to_tsvector('{MESSAGE_SEARCH_CONFIG}', content)", persisted=True),
+        nullable=True,
+        deferred=True,
+    )
 
-    chat: Mapped[Chat] = relationship("Chat", back_populates="messages")
+    chat: Mapped[Chat] = relationship(
+        "Chat",
+        back_populates="messages",
+        foreign_keys=[chat_id],
+    )
     sender: Mapped[User] = relationship("User")
     reply_to: Mapped[Message | None] = relationship(
         "Message",
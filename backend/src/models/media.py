@@ -7,7 +7,18 @@ from datetime import datetime
 from enum import Enum
 from typing import TYPE_CHECKING
 
-from sqlalchemy import BigInteger, DateTime, ForeignKey, String, Text, func
+from sqlalchemy import (
+    BigInteger,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    LargeBinary,
+    String,
+    Text,
+    func,
+    text,
+)
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -28,10 +39,55 @@ class MediaType(str, Enum):
     FILE = "file"
 
 
+class ProcessingStatus(str, Enum):
+    """Состояние фоновой обработки медиафайла (превью, метаданные)."""
+
+    PENDING = "pending"
+    PROCESSING = "processing"
+    READY = "ready"
+    FAILED = "failed"
+
+
+class MediaBlob(Base):
+    """Содержимое файла в хранилище, общее для одинаковых загрузок.
+
+    Ключ — SHA-256 содержимого; ``ref_count`` — число ссылающихся MediaFile.
+    """
+
+    __tablename__ = "media_blobs"
+
+    sha256: Mapped[str] = mapped_column(String(64), primary_key=True)
+    storage_path: Mapped[str] = mapped_column(String(500), nullable=False)
+    size: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    ref_count: Mapped[int] = mapped_column(Integer, default=1, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        server_default=func.now(),
+        nullable=False,
+    )
+
+
 class MediaFile(Base):
     """Модель медиафайла."""
 
     __tablename__ = "media_files"
+    __table_args__ = (
+        Index(
+            "ix_media_files_preview_pending",
+            "created_at",
+            postgresql_where=text("preview_status = 'pending'"),
+        ),
+        Index(
+            "ix_media_files_metadata_pending",
+            "created_at",
+            postgresql_where=text("metadata_status = 'pending'"),
+        ),
+        Index(
+            "ix_media_files_metadata_processing",
+            "metadata_claimed_at",
+            postgresql_where=text("metadata_status = 'processing'"),
+        ),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True),
@@ -53,10 +109,25 @@ class MediaFile(Base):
     mime_type: Mapped[str] = mapped_column(String(100), nullable=False)
     file_size: Mapped[int] = mapped_column(BigInteger, nullable=False)
     storage_path: Mapped[str] = mapped_column(String(500), nullable=False)
+    # Общий blob содержимого; NULL у файлов, загруженных до дедупликации
+    content_hash: Mapped[str | None] = mapped_column(
+        String(64),
+        ForeignKey("media_blobs.sha256"),
+        nullable=True,
+        index=True,
+    )
     thumbnail_path: Mapped[str | None] = mapped_column(String(500), nullable=True)
+    # NULL — превью не нужны (не изображение или файл загружен раньше)
+    preview_status: Mapped[str | None] = mapped_column(String(20), nullable=True)
+    # NULL — длительность и размеры не извлекаются (не аудио/видео)
+    metadata_status: Mapped[str | None] = mapped_column(String(20), nullable=True)
+    # Когда исполнитель забрал запись; по нему подбираются брошенные упавшим воркером
+    metadata_claimed_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
     duration_seconds: Mapped[int | None] = mapped_column(nullable=True)
     width: Mapped[int | None] = mapped_column(nullable=True)
     height: Mapped[int | None] = mapped_column(nullable=True)
+    # Пики громкости голосового: по байту (0–255) на отрезок записи
+    waveform: Mapped[bytes | None] = mapped_column(LargeBinary, nullable=True)
     created_at: Mapped[datetime] = mapped_column(
         DateTime,
         server_default=func.now(),
@@ -84,6 +155,7 @@ class Transcription(Base):
     """Модель транскрипции голосового сообщения."""
 
     __tablename__ = "transcriptions"
+    __table_args__ = (Index("ix_transcriptions_status_created_at", "status", "created_at"),)
 
     id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True),
@@ -97,6 +169,12 @@ class Transcription(Base):
         unique=True,
         index=True,
     )
+    # Кому отправлять частичный текст и события по задаче
+    requested_by: Mapped[uuid.UUID | None] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("users.id", ondelete="SET NULL"),
+        nullable=True,
+    )
     status: Mapped[str] = mapped_column(
         String(20),
         default=TranscriptionStatus.PENDING.value,
@@ -106,11 +184,15 @@ class Transcription(Base):
     language: Mapped[str | None] = mapped_column(String(10), nullable=True)
     duration_seconds: Mapped[float | None] = mapped_column(nullable=True)
     error_message: Mapped[str | None] = mapped_column(String(500), nullable=True)
+    attempts: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
     created_at: Mapped[datetime] = mapped_column(
         DateTime,
         server_default=func.now(),
         nullable=False,
     )
+    started_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    # Не раньше этого времени задача снова берётся в работу (повтор после ошибки)
+    available_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
     completed_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
 
     media: Mapped[MediaFile] = relationship("MediaFile")
@@ -142,3 +224,36 @@ class MessageAttachment(Base):
 
     message: Mapped[Message] = relationship("Message", back_populates="attachments")
     media: Mapped[MediaFile] = relationship("MediaFile", back_populates="attachments")
+
+
+class UploadSession(Base):
+    """Сессия возобновляемой загрузки: данные копятся в staging-файле."""
+
+    __tablename__ = "upload_sessions"
+
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        primary_key=True,
+        default=uuid.uuid4,
+    )
+    uploader_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+    media_type: Mapped[str] = mapped_column(String(20), nullable=False)
+    original_filename: Mapped[str] = mapped_column(String(255), nullable=False)
+    mime_type: Mapped[str] = mapped_column(String(100), nullable=False)
+    total_size: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    # Число байт, подтверждённо записанных в staging-файл
+    offset: Mapped[int] = mapped_column(BigInteger, default=0, nullable=False)
+    # PATCH, который сейчас пишет данные; только он может подтвердить смещение
+    writer_id: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True), nullable=True)
+    staging_path: Mapped[str] = mapped_column(String(500), nullable=False)
+    expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, index=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        server_default=func.now(),
+        nullable=False,
+    )
@@ -77,6 +77,7 @@ class ChatMemberResponse(BaseModel):
     avatar_url: str | None
     role: str
     joined_at: datetime
+    is_online: bool = False
 
 
 class ChatResponse(BaseModel):
@@ -100,6 +101,8 @@ class ChatListResponse(BaseModel):
 
     chats: list[ChatResponse]
     total: int
+    next_cursor: str | None = None
+    has_more: bool = False
 
 
 class MessageListResponse(BaseModel):
@@ -108,3 +111,6 @@ class MessageListResponse(BaseModel):
     messages: list[MessageResponse]
     total: int
     has_more: bool
+    has_newer: bool = False
+    prev_cursor: str | None = None
+    next_cursor: str | None = None
@@ -2,26 +2,10 @@
 
 import uuid
 from datetime import datetime
-from enum import Enum
 
 from pydantic import BaseModel, Field
 
-
-class ExportFormat(str, Enum):
-    """Формат экспорта."""
-
-    JSON = "json"
-    HTML = "html"
-    TXT = "txt"
-
-
-class ExportStatus(str, Enum):
-    """Статус экспорта."""
-
-    PENDING = "pending"
-    PROCESSING = "processing"
-    COMPLETED = "completed"
-    FAILED = "failed"
+from src.models.export import ExportFormat, ExportStatus
 
 
 class ExportChatRequest(BaseModel):
@@ -3,7 +3,7 @@
 import uuid
 from datetime import datetime
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class MediaFileResponse(BaseModel):
@@ -17,9 +17,13 @@ class MediaFileResponse(BaseModel):
     file_size: int
     url: str
     thumbnail_url: str | None
+    # Сторона превью (px) -> URL, когда превью готовы
+    preview_urls: dict[int, str] | None = None
     duration_seconds: int | None
     width: int | None
     height: int | None
+    # Пики громкости голосового (0-255), когда аудио обработано
+    waveform: list[int] | None = None
     created_at: datetime
 
     model_config = {"from_attributes": True}
@@ -40,6 +44,27 @@ class UploadResponse(BaseModel):
     message: str
 
 
+class CreateUploadRequest(BaseModel):
+    """Запрос на создание возобновляемой загрузки."""
+
+    filename: str = Field(..., min_length=1, max_length=255)
+    size: int = Field(..., gt=0, description="Итоговый размер файла в байтах")
+    mime_type: str | None = None
+    is_voice: bool = False
+
+
+class UploadSessionResponse(BaseModel):
+    """Состояние возобновляемой загрузки."""
+
+    id: uuid.UUID
+    filename: str
+    mime_type: str
+    size: int
+    offset: int
+    expires_at: datetime
+    upload_url: str
+
+
 class TranscriptionResponse(BaseModel):
     """Ответ с данными транскрипции."""
 
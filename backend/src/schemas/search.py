@@ -14,6 +14,21 @@ class SearchType(str, Enum):
     TEXT = "text"
     MEDIA = "media"
     VOICE = "voice"
+    FUZZY = "fuzzy"
+
+
+class SearchOrder(str, Enum):
+    """Сортировка результатов поиска."""
+
+    RELEVANCE = "relevance"
+    DATE = "date"
+
+
+class SearchCountMode(str, Enum):
+    """Режим подсчёта total_count."""
+
+    ESTIMATE = "estimate"
+    EXACT = "exact"
 
 
 class SearchRequest(BaseModel):
@@ -23,6 +38,7 @@ class SearchRequest(BaseModel):
     chat_id: uuid.UUID | None = Field(None, description="ID чата для поиска")
     search_type: SearchType = Field(SearchType.ALL, description="Тип поиска")
     sender_id: uuid.UUID | None = Field(None, description="ID отправителя")
+    order: SearchOrder = Field(SearchOrder.DATE, description="Сортировка")
     date_from: datetime | None = Field(None, description="Дата начала")
     date_to: datetime | None = Field(None, description="Дата окончания")
     limit: int = Field(20, ge=1, le=100, description="Лимит результатов")
@@ -38,7 +54,9 @@ class SearchResultItem(BaseModel):
     sender_id: uuid.UUID
     sender_name: str
     content: str
-    highlight: str
+    highlight: str | None = Field(
+        None, description="Фрагменты с совпадениями в <mark>...</mark>, если они найдены"
+    )
     created_at: datetime
     has_media: bool = False
 
@@ -48,5 +66,8 @@ class SearchResponse(BaseModel):
 
     query: str
     total_count: int
+    total_exact: bool = Field(
+        True, description="False — совпадений не меньше total_count (например, 1000+)"
+    )
     results: list[SearchResultItem]
     has_more: bool
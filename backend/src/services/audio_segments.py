@@ -0,0 +1,131 @@
+"""Нарезка длинного аудио на перекрывающиеся сегменты для распознавания.
+
+Голосовое до 10 минут распознаётся не одним вызовом STT, а сегментами по
+``length`` секунд, которые идут параллельно: время ответа определяется
+длиной сегмента, а не файла. Соседние сегменты перекрываются на ``overlap``
+секунд, чтобы слово на границе целиком попало хотя бы в один из них;
+повтор в перекрытии убирается при склейке текста (``merge_transcripts``).
+
+Если длительность ещё не извлечена обработчиком метаданных, она определяется
+``ffprobe`` (``probe_duration``) перед нарезкой.
+"""
+
+import asyncio
+import math
+import re
+import shutil
+from pathlib import Path
+
+# Частота и формат сегментов: моно 16 кГц — родной вход Whisper
+SEGMENT_SAMPLE_RATE = 16000
+SEGMENT_MIME_TYPE = "audio/wav"
+# Сколько слов стыка сравнивается при склейке сегментов
+MERGE_WINDOW_WORDS = 16
+PROBE_TIMEOUT = 30.0
+
+_WORD_TRIM = re.compile(r"^\W+|\W+$")
+
+
+class SegmentError(Exception):
+    """Сегмент аудио не удалось вырезать."""
+
+
+def segment_bounds(
+    duration: float | None, length: float, overlap: float
+) -> list[tuple[float, float]]:
+    """Начало и длительность сегментов; один сегмент — резать не нужно."""
+    if not duration or duration <= length:
+        return [(0.0, float(duration or 0))]
+    step = length - overlap
+    count = math.ceil((duration - overlap) / step)
+    return [(i * step, min(length, duration - i * step)) for i in range(count)]
+
+
+def can_split() -> bool:
+    """Доступен ли ``ffmpeg`` для нарезки."""
+    return shutil.which("ffmpeg") is not None
+
+
+async def probe_duration(source: str) -> float | None:
+    """Длительность файла (сек) по ``ffprobe``; None — определить не удалось."""
+    if shutil.which("ffprobe") is None:
+        return None
+    process = await asyncio.create_subprocess_exec(
+        "ffprobe",
+        "-v",
+        "error",
+        "-show_entries",
+        "format=duration",
+        "-of",
+        "csv=p=0",
+        source,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.DEVNULL,
+    )
+    try:
+        stdout, _ = await asyncio.wait_for(process.communicate(), PROBE_TIMEOUT)
+    except (asyncio.CancelledError, TimeoutError):
+        process.kill()
+        await process.wait()
+        raise
+    try:
+        return float(stdout.decode().strip())
+    except ValueError:
+        return None
+
+
+async def cut_segment(source: str, start: float, duration: float, target: Path) -> None:
+    """Вырезать сегмент ``source`` в WAV (моно, 16 кГц)."""
+    process = await asyncio.create_subprocess_exec(
+        "ffmpeg",
+        "-nostdin",
+        "-v",
+        "error",
+        "-y",
+        "-ss",
+        f"{start:.3f}",
+        "-t",
+        f"{duration:.3f}",
+        "-i",
+        source,
+        "-ac",
+        "1",
+        "-ar",
+        str(SEGMENT_SAMPLE_RATE),
+        str(target),
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    try:
+        _, stderr = await process.communicate()
+    except asyncio.CancelledError:
+        process.kill()
+        await process.wait()
+        raise
+    if process.returncode != 0:
+        message = stderr.decode(errors="replace").strip()[:200]
+        raise SegmentError(f"ffmpeg: {message}")
+
+
+def _normalize(word: str) -> str:
+    return _WORD_TRIM.sub("", word.lower())
+
+
+def _overlap_words(left: list[str], right: list[str]) -> int:
+    """Длина самого длинного конца ``left``, с которого начинается ``right``."""
+    limit = min(len(left), len(right), MERGE_WINDOW_WORDS)
+    tail = [_normalize(word) for word in left[-limit:]]
+    head = [_normalize(word) for word in right[:limit]]
+    for size in range(limit, 0, -1):
+        if tail[-size:] == head[:size]:
+            return size
+    return 0
+
+
+def merge_transcripts(texts: list[str]) -> str:
+    """Склеить тексты сегментов по порядку, убрав слова, повторённые в перекрытии."""
+    merged: list[str] = []
+    for text in texts:
+        words = text.split()
+        merged.extend(words[_overlap_words(merged, words) :])
+    return " ".join(merged)
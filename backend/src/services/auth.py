@@ -2,6 +2,7 @@
 
 import hashlib
 import secrets
+import time
 import uuid
 from datetime import UTC, datetime, timedelta
 
@@ -13,6 +14,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.config import get_settings
 from src.models.user import User, UserSession
+from src.services.auth_cache import UserPrincipal, principal_cache, token_cache
 
 ph = PasswordHasher()
 
@@ -67,7 +69,14 @@ class AuthService:
         return secrets.token_urlsafe(32)
 
     def verify_access_token(self, token: str) -> uuid.UUID | None:
-        """Проверка access token и возврат user_id."""
+        """Проверка access token и возврат user_id.
+
+        Результат декодирования кешируется до истечения ``exp`` токена.
+        """
+        cached: uuid.UUID | None = token_cache.get(token)
+        if cached is not None:
+            return cached
+
         try:
             payload = jwt.decode(
                 token,
@@ -79,10 +88,15 @@ class AuthService:
             user_id = payload.get("sub")
             if user_id is None:
                 return None
-            return uuid.UUID(user_id)
+            result = uuid.UUID(user_id)
         except (JWTError, ValueError):
             return None
 
+        exp = payload.get("exp")
+        if isinstance(exp, int | float):
+            token_cache.set(token, result, ttl=exp - time.time())
+        return result
+
     async def register(
         self,
         email: str,
@@ -198,6 +212,22 @@ class AuthService:
         result = await self.db.execute(select(User).where(User.id == user_id))
         return result.scalar_one_or_none()
 
+    async def get_principal(self, user_id: uuid.UUID) -> UserPrincipal | None:
+        """Получить минимальные данные пользователя (с кешем процесса)."""
+        principal: UserPrincipal | None = principal_cache.get(user_id)
+        if principal is not None:
+            return principal
+
+        result = await self.db.execute(
+            select(User.id, User.name, User.is_active).where(User.id == user_id)
+        )
+        row = result.one_or_none()
+        if row is None:
+            return None
+        principal = UserPrincipal(id=row.id, name=row.name, is_active=row.is_active)
+        principal_cache.set(user_id, principal)
+        return principal
+
     async def get_user_sessions(self, user_id: uuid.UUID) -> list[UserSession]:
         """Получить все активные сессии пользователя."""
         result = await self.db.execute(
@@ -0,0 +1,44 @@
+"""In-process кеш аутентификации [SECURITY].
+
+Два кеша процесса (воркера):
+
+- декодированные access token → user_id, до истечения ``exp`` токена;
+- ``UserPrincipal`` (id, name, is_active) → на ``auth_principal_ttl`` секунд.
+
+Кеш принципала сбрасывается при изменении профиля и деактивации на этом
+воркере; на остальных воркерах изменения видны не позже чем через TTL.
+"""
+
+from __future__ import annotations
+
+import uuid
+from dataclasses import dataclass
+
+from src.config import get_settings
+from src.services.cache import TTLCache
+
+
+@dataclass(frozen=True)
+class UserPrincipal:
+    """Минимальные данные пользователя для авторизации запроса."""
+
+    id: uuid.UUID
+    name: str
+    is_active: bool
+
+
+_settings = get_settings()
+
+token_cache = TTLCache(
+    maxsize=_settings.auth_cache_size,
+    ttl=_settings.access_token_expire_minutes * 60,
+)
+principal_cache = TTLCache(
+    maxsize=_settings.auth_cache_size,
+    ttl=_settings.auth_principal_ttl,
+)
+
+
+def invalidate_user(user_id: uuid.UUID) -> None:
+    """Сбросить закешированного принципала пользователя."""
+    principal_cache.pop(user_id)
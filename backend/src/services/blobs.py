@@ -0,0 +1,119 @@
+"""Контентно-адресуемое хранилище медиафайлов.
+
+Содержимое хранится один раз по SHA-256 в ``<media_storage_path>/blobs/ab/cd/<sha256>``,
+строки ``MediaFile`` ссылаются на общий ``MediaBlob`` со счётчиком ссылок.
+Одна и та же картинка, пересланная в сотню чатов, занимает место один раз;
+файл удаляется вместе с последней ссылкой.
+
+Изменения счётчика идут через строку ``media_blobs`` и её блокировку:
+параллельные загрузки и удаления одного содержимого выполняются по очереди,
+а файл перемещается и удаляется до commit, пока строка заблокирована.
+"""
+
+import asyncio
+import hashlib
+import shutil
+import uuid
+from pathlib import Path
+
+from sqlalchemy import delete, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import get_settings
+from src.models.media import MediaBlob
+from src.services.media import UPLOAD_CHUNK_SIZE
+
+BLOBS_DIR = "blobs"
+PREVIEWS_DIR = "previews"
+INCOMING_DIR = "incoming"
+
+
+def blob_path(root: str | Path, sha256: str) -> Path:
+    """Путь blob: два уровня каталогов по префиксу хеша."""
+    return Path(root) / BLOBS_DIR / sha256[:2] / sha256[2:4] / sha256
+
+
+def preview_path(root: str | Path, sha256: str, size: int) -> Path:
+    """Путь уменьшенной копии blob (WebP) со стороной ``size``."""
+    return Path(root) / PREVIEWS_DIR / sha256[:2] / sha256[2:4] / f"{sha256}_{size}.webp"
+
+
+def _unlink_previews(root: Path, sha256: str) -> None:
+    for path in preview_path(root, sha256, 0).parent.glob(f"{sha256}_*.webp"):
+        path.unlink(missing_ok=True)
+
+
+def incoming_path(root: str | Path) -> Path:
+    """Уникальный временный путь для принимаемого файла."""
+    path = Path(root) / INCOMING_DIR
+    path.mkdir(parents=True, exist_ok=True)
+    return path / f"{uuid.uuid4()}.upload"
+
+
+def _hash_file(path: Path) -> str:
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(UPLOAD_CHUNK_SIZE):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+async def hash_file(path: str | Path) -> str:
+    """SHA-256 файла на диске, блоками в пуле потоков."""
+    return await asyncio.to_thread(_hash_file, Path(path))
+
+
+def _place(source: Path, target: Path) -> None:
+    target.parent.mkdir(parents=True, exist_ok=True)
+    # rename в пределах одной ФС, копирование — если staging на другом диске
+    shutil.move(source, target)
+
+
+class BlobStore:
+    """Добавление и освобождение blob в транзакции сессии."""
+
+    def __init__(self, db: AsyncSession, root: str | Path | None = None) -> None:
+        self.db = db
+        self.root = Path(root or get_settings().media_storage_path)
+
+    async def add(self, source: str | Path, sha256: str, size: int) -> str:
+        """Сохранить файл как blob (или сослаться на существующий); вернуть путь.
+
+        ``source`` забирается: перемещается в хранилище или удаляется как дубль.
+        """
+        source = Path(source)
+        target = blob_path(self.root, sha256)
+        ref_count = await self.db.scalar(
+            insert(MediaBlob)
+            .values(sha256=sha256, storage_path=str(target), size=size, ref_count=1)
+            .on_conflict_do_update(
+                index_elements=[MediaBlob.sha256],
+                set_={"ref_count": MediaBlob.ref_count + 1},
+            )
+            .returning(MediaBlob.ref_count)
+        )
+        if ref_count == 1 or not await asyncio.to_thread(target.exists):
+            await asyncio.to_thread(_place, source, target)
+        else:
+            await asyncio.to_thread(source.unlink, True)
+        return str(target)
+
+    async def release(self, sha256: str) -> bool:
+        """Убрать одну ссылку; True — это была последняя и файл удалён вместе с превью."""
+        remaining = await self.db.scalar(
+            update(MediaBlob)
+            .where(MediaBlob.sha256 == sha256)
+            .values(ref_count=MediaBlob.ref_count - 1)
+            .returning(MediaBlob.ref_count)
+        )
+        if remaining is None or remaining > 0:
+            return False
+
+        storage_path = await self.db.scalar(
+            delete(MediaBlob).where(MediaBlob.sha256 == sha256).returning(MediaBlob.storage_path)
+        )
+        if storage_path:
+            await asyncio.to_thread(Path(storage_path).unlink, True)
+        await asyncio.to_thread(_unlink_previews, self.root, sha256)
+        return True
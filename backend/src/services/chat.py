@@ -0,0 +1,519 @@
+"""Сервис чатов: пакетная сборка списка чатов и счётчики сообщений."""
+
+import base64
+import binascii
+import json
+import uuid
+from collections.abc import Sequence
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from typing import Any
+
+from sqlalchemy import (
+    exists,
+    func,
+    insert,
+    literal,
+    select,
+    tuple_,
+    union_all,
+    update,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from src.models.chat import Chat, ChatMember, ChatType, Message, MessageStatus
+from src.models.user import User
+from src.schemas.chat import ChatMemberResponse, ChatResponse, MessageResponse
+from src.websocket.presence import PresenceTracker
+
+DELETED_USER_NAME = "Удалённый пользователь"
+
+
+class ChatError(Exception):
+    """Ошибка операции с чатом."""
+
+    def __init__(self, message: str, code: str):
+        self.message = message
+        self.code = code
+        super().__init__(message)
+
+
+@dataclass
+class ChatPage:
+    """Страница списка чатов."""
+
+    chats: list[ChatResponse]
+    total: int
+    next_cursor: str | None
+
+
+@dataclass
+class MessagePage:
+    """Окно сообщений чата в хронологическом порядке."""
+
+    messages: list[MessageResponse]
+    has_older: bool
+    has_newer: bool
+    prev_cursor: str | None
+    next_cursor: str | None
+
+
+def _encode_cursor(values: list[str | int]) -> str:
+    """Упаковать значения ключа в непрозрачный курсор."""
+    raw = json.dumps(values)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> list[Any]:
+    """Распаковать курсор в список значений ключа."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded))
+    except (binascii.Error, ValueError) as e:
+        raise ValueError("Невалидный курсор") from e
+    if not isinstance(values, list):
+        raise ValueError("Невалидный курсор")
+    return values
+
+
+def encode_chat_cursor(updated_at: datetime, chat_id: uuid.UUID) -> str:
+    """Закодировать позицию в списке чатов в непрозрачный курсор."""
+    return _encode_cursor([updated_at.isoformat(), str(chat_id)])
+
+
+def decode_chat_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    """Раскодировать курсор списка чатов."""
+    try:
+        updated_at, chat_id = _decode_cursor(cursor)
+        return datetime.fromisoformat(updated_at), uuid.UUID(chat_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError("Невалидный курсор") from e
+
+
+def encode_message_cursor(seq: int) -> str:
+    """Закодировать позицию сообщения в чате в непрозрачный курсор."""
+    return _encode_cursor([seq])
+
+
+def decode_message_cursor(cursor: str) -> int:
+    """Раскодировать курсор сообщений."""
+    values = _decode_cursor(cursor)
+    if len(values) != 1 or not isinstance(values[0], int) or isinstance(values[0], bool):
+        raise ValueError("Невалидный курсор")
+    return values[0]
+
+
+def get_unread_count(chat: Chat, member: ChatMember) -> int:
+    """Количество непрочитанных сообщений по денормализованным счётчикам."""
+    return max(chat.message_seq - member.last_read_seq - member.unread_excluded, 0)
+
+
+def build_message_response(message: Message, sender_name: str | None) -> MessageResponse:
+    """Построить ответ сообщения по уже загруженному имени отправителя."""
+    return MessageResponse(
+        id=message.id,
+        chat_id=message.chat_id,
+        sender_id=message.sender_id,
+        sender_name=sender_name or DELETED_USER_NAME,
+        content=message.content,
+        status=message.status,
+        reply_to_id=message.reply_to_id,
+        edited_at=message.edited_at,
+        created_at=message.created_at,
+    )
+
+
+class ChatService:
+    """Сервис для работы со списком чатов и счётчиками сообщений.
+
+    Все данные для страницы чатов загружаются фиксированным числом запросов
+    независимо от количества чатов и участников. Непрочитанные считаются
+    вычитанием: ``chat.message_seq - member.last_read_seq - member.unread_excluded``,
+    где ``unread_excluded`` — удалённые сообщения после ``last_read_seq``.
+    """
+
+    def __init__(self, db: AsyncSession, presence: PresenceTracker | None = None) -> None:
+        self.db = db
+        self.presence = presence
+
+    async def list_chats(
+        self,
+        user_id: uuid.UUID,
+        limit: int,
+        cursor: str | None = None,
+    ) -> ChatPage:
+        """Получить страницу чатов пользователя, упорядоченную по активности."""
+        query = (
+            select(Chat)
+            .join(ChatMember, ChatMember.chat_id == Chat.id)
+            .where(ChatMember.user_id == user_id)
+            .options(selectinload(Chat.members))
+            .order_by(Chat.updated_at.desc(), Chat.id.desc())
+            .limit(limit + 1)
+        )
+        if cursor:
+            updated_at, chat_id = decode_chat_cursor(cursor)
+            query = query.where(tuple_(Chat.updated_at, Chat.id) < tuple_(updated_at, chat_id))
+
+        result = await self.db.execute(query)
+        chats = list(result.scalars().unique().all())
+
+        next_cursor = None
+        if len(chats) > limit:
+            chats = chats[:limit]
+            last = chats[-1]
+            next_cursor = encode_chat_cursor(last.updated_at, last.id)
+
+        total = await self.db.scalar(
+            select(func.count(ChatMember.id)).where(ChatMember.user_id == user_id)
+        )
+
+        return ChatPage(
+            chats=await self.build_chat_responses(chats, user_id),
+            total=total or 0,
+            next_cursor=next_cursor,
+        )
+
+    async def build_chat_responses(
+        self,
+        chats: Sequence[Chat],
+        current_user_id: uuid.UUID,
+    ) -> list[ChatResponse]:
+        """Построить ответы для набора чатов с загруженными участниками."""
+        if not chats:
+            return []
+
+        users = await self._load_users({m.user_id for chat in chats for m in chat.members})
+        last_messages = await self._load_last_messages(
+            [chat.last_message_id for chat in chats if chat.last_message_id]
+        )
+        online: set[uuid.UUID] = set()
+        if self.presence is not None:
+            online = await self.presence.are_online(users.keys())
+
+        responses = []
+        for chat in chats:
+            members_response = [
+                ChatMemberResponse(
+                    user_id=member.user_id,
+                    name=users[member.user_id].name,
+                    avatar_url=users[member.user_id].avatar_url,
+                    role=member.role,
+                    joined_at=member.joined_at,
+                    is_online=member.user_id in online,
+                )
+                for member in chat.members
+                if member.user_id in users
+            ]
+
+            member_record = next(
+                (m for m in chat.members if m.user_id == current_user_id), None
+            )
+            unread_count = get_unread_count(chat, member_record) if member_record else 0
+
+            chat_name = chat.name
+            if chat.chat_type == ChatType.DIRECT.value and not chat_name:
+                other_member = next(
+                    (m for m in chat.members if m.user_id != current_user_id), None
+                )
+                if other_member and other_member.user_id in users:
+                    chat_name = users[other_member.user_id].name
+
+            responses.append(
+                ChatResponse(
+                    id=chat.id,
+                    chat_type=chat.chat_type,
+                    name=chat_name,
+                    description=chat.description,
+                    avatar_url=chat.avatar_url,
+                    members=members_response,
+                    last_message=last_messages.get(chat.id),
+                    unread_count=unread_count,
+                    created_at=chat.created_at,
+                )
+            )
+        return responses
+
+    async def _load_users(self, user_ids: set[uuid.UUID]) -> dict[uuid.UUID, User]:
+        """Загрузить пользователей одним запросом."""
+        if not user_ids:
+            return {}
+        result = await self.db.execute(select(User).where(User.id.in_(user_ids)))
+        return {user.id: user for user in result.scalars().all()}
+
+    async def _load_last_messages(
+        self, message_ids: list[uuid.UUID]
+    ) -> dict[uuid.UUID, MessageResponse]:
+        """Последние сообщения чатов по chats.last_message_id."""
+        if not message_ids:
+            return {}
+        result = await self.db.execute(
+            select(Message, User.name)
+            .outerjoin(User, User.id == Message.sender_id)
+            .where(Message.id.in_(message_ids))
+        )
+        return {
+            message.chat_id: build_message_response(message, sender_name)
+            for message, sender_name in result.all()
+        }
+
+    async def _anchor_seq(self, chat_id: uuid.UUID, anchor: str) -> int:
+        """seq якоря: курсор или ID сообщения этого чата (например, для ответа)."""
+        try:
+            message_id = uuid.UUID(anchor)
+        except ValueError:
+            return decode_message_cursor(anchor)
+        seq = await self.db.scalar(
+            select(Message.seq).where(Message.id == message_id).where(Message.chat_id == chat_id)
+        )
+        if seq is None:
+            raise ChatError("Сообщение не найдено", "message_not_found")
+        return seq
+
+    async def get_message_page(
+        self,
+        chat_id: uuid.UUID,
+        limit: int,
+        before: str | None = None,
+        after: str | None = None,
+        around: str | None = None,
+    ) -> MessagePage:
+        """Получить окно сообщений по ключу (chat_id, seq).
+
+        ``before``/``after`` — страница строго старше/новее якоря, ``around`` —
+        окно с якорем посередине. Без якоря возвращаются последние сообщения.
+        Окно выбирается одним запросом с диапазонным сканированием индекса
+        ``ix_messages_chat_id_seq``: по ``limit + 1`` строк в каждую сторону
+        от границы, лишняя строка показывает, есть ли сообщения дальше.
+        Якорь-ID сообщения предварительно разрешается в seq.
+        """
+        # older — строки с seq <= bound, newer — после границы
+        if around:
+            bound: int | None = await self._anchor_seq(chat_id, around)
+            older_limit = limit // 2 + 1
+        elif after:
+            bound = await self._anchor_seq(chat_id, after)
+            older_limit = 0
+        elif before:
+            bound = await self._anchor_seq(chat_id, before) - 1
+            older_limit = limit
+        else:
+            bound = None
+            older_limit = limit
+        newer_limit = limit - older_limit
+
+        base = select(Message.id).where(Message.chat_id == chat_id)
+        older = base.order_by(Message.seq.desc()).limit(older_limit + 1)
+        if bound is None:
+            ids = older
+        else:
+            older = older.where(Message.seq <= bound).subquery()
+            newer = (
+                base.where(Message.seq > bound)
+                .order_by(Message.seq.asc())
+                .limit(newer_limit + 1)
+                .subquery()
+            )
+            ids = union_all(select(older.c.id), select(newer.c.id))
+
+        result = await self.db.execute(
+            select(Message, User.name)
+            .outerjoin(User, User.id == Message.sender_id)
+            .where(Message.id.in_(ids.scalar_subquery()))
+            .order_by(Message.seq.asc())
+        )
+        rows = list(result.all())
+
+        older_rows = [row for row in rows if bound is None or row[0].seq <= bound]
+        newer_rows = rows[len(older_rows) :]
+        has_older = len(older_rows) > older_limit
+        has_newer = len(newer_rows) > newer_limit
+        rows = older_rows[max(len(older_rows) - older_limit, 0) :] + newer_rows[:newer_limit]
+
+        prev_cursor = next_cursor = None
+        if rows and has_older:
+            prev_cursor = encode_message_cursor(rows[0][0].seq)
+        if rows and has_newer:
+            next_cursor = encode_message_cursor(rows[-1][0].seq)
+
+        return MessagePage(
+            messages=[build_message_response(message, name) for message, name in rows],
+            has_older=has_older,
+            has_newer=has_newer,
+            prev_cursor=prev_cursor,
+            next_cursor=next_cursor,
+        )
+
+    async def send_message(
+        self,
+        chat_id: uuid.UUID,
+        sender_id: uuid.UUID,
+        content: str,
+        reply_to_id: uuid.UUID | None = None,
+    ) -> MessageResponse:
+        """Отправить сообщение одним запросом к БД.
+
+        Один WITH-запрос проверяет участие и ответ, выделяет ``seq`` и обновляет
+        ``chats`` (UPDATE ... RETURNING блокирует строку чата), вставляет
+        сообщение, сдвигает метку прочтения отправителя и возвращает строку
+        вместе с именем отправителя. Пустой результат — отказ; причину
+        выясняет отдельный запрос только на этом пути.
+        """
+        message_id = uuid.uuid4()
+
+        conditions = [
+            Chat.id == chat_id,
+            exists().where(ChatMember.chat_id == chat_id, ChatMember.user_id == sender_id),
+        ]
+        if reply_to_id is not None:
+            conditions.append(
+                exists().where(Message.id == reply_to_id, Message.chat_id == chat_id)
+            )
+
+        bumped = (
+            update(Chat)
+            .where(*conditions)
+            .values(
+                message_seq=Chat.message_seq + 1,
+                updated_at=func.now(),
+                last_message_id=message_id,
+            )
+            .returning(Chat.message_seq)
+            .cte("bumped")
+        )
+        inserted = (
+            insert(Message)
+            .from_select(
+                ["id", "chat_id", "sender_id", "seq", "content", "status", "reply_to_id"],
+                select(
+                    literal(message_id, Message.id.type),
+                    literal(chat_id, Message.chat_id.type),
+                    literal(sender_id, Message.sender_id.type),
+                    bumped.c.message_seq,
+                    literal(content, Message.content.type),
+                    literal(MessageStatus.SENT.value, Message.status.type),
+                    literal(reply_to_id, Message.reply_to_id.type),
+                ),
+            )
+            .returning(
+                Message.id,
+                Message.chat_id,
+                Message.sender_id,
+                Message.seq,
+                Message.content,
+                Message.status,
+                Message.reply_to_id,
+                Message.edited_at,
+                Message.created_at,
+            )
+            .cte("inserted")
+        )
+        read_marker = (
+            update(ChatMember)
+            .where(
+                ChatMember.chat_id == inserted.c.chat_id,
+                ChatMember.user_id == inserted.c.sender_id,
+            )
+            .values(
+                last_read_seq=inserted.c.seq,
+                unread_excluded=0,
+                last_read_at=func.now(),
+            )
+            .cte("read_marker")
+        )
+        query = (
+            select(inserted, User.name.label("sender_name"))
+            .outerjoin(User, User.id == inserted.c.sender_id)
+            .add_cte(read_marker)
+        )
+
+        row = (await self.db.execute(query)).one_or_none()
+        if row is None:
+            raise await self._send_rejection(chat_id, sender_id)
+        return build_message_response(row, row.sender_name)  # type: ignore[arg-type]
+
+    async def _send_rejection(self, chat_id: uuid.UUID, sender_id: uuid.UUID) -> ChatError:
+        """Причина отказа в отправке сообщения."""
+        is_member = await self.db.scalar(
+            select(
+                exists().where(ChatMember.chat_id == chat_id, ChatMember.user_id == sender_id)
+            )
+        )
+        if not is_member:
+            return ChatError("Нет доступа к чату", "access_denied")
+        return ChatError("Сообщение для ответа не найдено", "reply_not_found")
+
+    async def next_message_seq(self, chat_id: uuid.UUID) -> int:
+        """Выделить следующий номер сообщения в чате.
+
+        UPDATE ... RETURNING блокирует строку чата до конца транзакции, поэтому
+        номера монотонны и не повторяются при конкурентной отправке.
+        """
+        seq = await self.db.scalar(
+            update(Chat)
+            .where(Chat.id == chat_id)
+            .values(message_seq=Chat.message_seq + 1, updated_at=func.now())
+            .returning(Chat.message_seq)
+        )
+        if seq is None:
+            raise ValueError("Чат не найден")
+        return int(seq)
+
+    async def on_message_sent(self, message: Message) -> None:
+        """Обновить счётчики после вставки сообщения."""
+        await self.db.execute(
+            update(Chat)
+            .where(Chat.id == message.chat_id)
+            .values(last_message_id=message.id)
+        )
+        await self.db.execute(
+            update(ChatMember)
+            .where(ChatMember.chat_id == message.chat_id)
+            .where(ChatMember.user_id == message.sender_id)
+            .values(
+                last_read_seq=message.seq,
+                unread_excluded=0,
+                last_read_at=datetime.now(UTC),
+            )
+        )
+
+    async def on_message_deleted(self, message: Message) -> None:
+        """Обновить счётчики после удаления сообщения."""
+        await self.db.execute(
+            update(ChatMember)
+            .where(ChatMember.chat_id == message.chat_id)
+            .where(ChatMember.user_id != message.sender_id)
+            .where(ChatMember.last_read_seq < message.seq)
+            .values(unread_excluded=ChatMember.unread_excluded + 1)
+        )
+        latest_message_id = (
+            select(Message.id)
+            .where(Message.chat_id == message.chat_id)
+            .where(Message.id != message.id)
+            .order_by(Message.seq.desc())
+            .limit(1)
+            .scalar_subquery()
+        )
+        await self.db.execute(
+            update(Chat)
+            .where(Chat.id == message.chat_id)
+            .where((Chat.last_message_id == message.id) | Chat.last_message_id.is_(None))
+            .values(last_message_id=latest_message_id)
+        )
+
+    async def mark_read(self, chat_id: uuid.UUID, user_id: uuid.UUID) -> bool:
+        """Отметить все сообщения чата прочитанными. False — не участник."""
+        current_seq = select(Chat.message_seq).where(Chat.id == chat_id).scalar_subquery()
+        member_id = await self.db.scalar(
+            update(ChatMember)
+            .where(ChatMember.chat_id == chat_id)
+            .where(ChatMember.user_id == user_id)
+            .values(
+                last_read_seq=current_seq,
+                unread_excluded=0,
+                last_read_at=datetime.now(UTC),
+            )
+            .returning(ChatMember.id)
+        )
+        return member_id is not None
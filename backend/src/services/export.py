@@ -0,0 +1,415 @@
+"""Потоковый экспорт переписки.
+
+Сообщения читаются keyset-пакетами по ``Message.seq`` через серверный курсор
+(``AsyncSession.stream`` с ``yield_per``), и каждый пакет сразу кодируется в
+выбранный формат. В памяти одновременно находится не больше одного пакета,
+независимо от размера чата; JSON пишется как поток элементов массива.
+"""
+
+import html
+import json
+import uuid
+from abc import ABC, abstractmethod
+from collections.abc import AsyncIterator, Sequence
+from dataclasses import dataclass, replace
+from datetime import datetime
+from pathlib import PurePath
+
+from sqlalchemy import ColumnElement, Select, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.chat import Chat, Message
+from src.models.media import MediaFile, MessageAttachment
+from src.models.user import User
+from src.schemas.export import ExportFormat
+from src.services.message_context import DEFAULT_CHAT_NAME
+
+EXPORT_BATCH_SIZE = 500
+MEDIA_ARCHIVE_DIR = "media"
+
+
+@dataclass(frozen=True)
+class ExportHeader:
+    """Данные чата для заголовка экспорта."""
+
+    chat_id: uuid.UUID
+    chat_name: str
+    chat_type: str
+    exported_at: datetime
+
+
+@dataclass(frozen=True)
+class ExportFilter:
+    """Диапазон экспортируемых сообщений."""
+
+    start_date: datetime | None = None
+    end_date: datetime | None = None
+    # Последнее сообщение экспорта; None — до конца чата
+    until_seq: int | None = None
+
+    def conditions(self, chat_id: uuid.UUID) -> list[ColumnElement[bool]]:
+        """Условия выборки сообщений чата."""
+        conditions = [Message.chat_id == chat_id]
+        if self.start_date is not None:
+            conditions.append(Message.created_at >= self.start_date)
+        if self.end_date is not None:
+            conditions.append(Message.created_at <= self.end_date)
+        if self.until_seq is not None:
+            conditions.append(Message.seq <= self.until_seq)
+        return conditions
+
+
+@dataclass(frozen=True)
+class ExportAttachment:
+    """Вложение сообщения и его путь внутри архива экспорта."""
+
+    media_id: uuid.UUID
+    filename: str
+    mime_type: str
+    file_size: int
+
+    @property
+    def archive_path(self) -> str:
+        return media_archive_path(self.media_id, self.filename)
+
+
+@dataclass(frozen=True)
+class ExportMedia:
+    """Файл медиа для упаковки в архив."""
+
+    media_id: uuid.UUID
+    storage_path: str
+    archive_path: str
+    mime_type: str
+
+
+@dataclass(frozen=True)
+class ExportRow:
+    """Сообщение в экспорте."""
+
+    seq: int
+    id: uuid.UUID
+    sender_id: uuid.UUID
+    sender_name: str
+    content: str
+    created_at: datetime
+    edited_at: datetime | None
+    attachments: tuple[ExportAttachment, ...] = ()
+
+
+def media_archive_path(media_id: uuid.UUID, filename: str) -> str:
+    """Имя файла медиа внутри архива: id сохраняет уникальность, суффикс — тип."""
+    return f"{MEDIA_ARCHIVE_DIR}/{media_id}{PurePath(filename).suffix.lower()}"
+
+
+class ExportEncoder(ABC):
+    """Инкрементальный кодировщик: начало, пакеты сообщений, конец."""
+
+    media_type: str
+    extension: str
+
+    @abstractmethod
+    def begin(self, header: ExportHeader) -> str: ...
+
+    @abstractmethod
+    def messages(self, rows: Sequence[ExportRow]) -> str: ...
+
+    @abstractmethod
+    def end(self, message_count: int) -> str: ...
+
+    def resume(self, message_count: int) -> None:
+        """Продолжить запись после ``message_count`` уже записанных сообщений."""
+        # По умолчанию кодировщику не нужно состояние для продолжения
+        return None
+
+
+class JsonExportEncoder(ExportEncoder):
+    """JSON-объект чата с потоковым массивом ``messages``."""
+
+    media_type = "application/json"
+    extension = "json"
+
+    def __init__(self) -> None:
+        self._first = True
+
+    def begin(self, header: ExportHeader) -> str:
+        fields = {
+            "chat_id": str(header.chat_id),
+            "chat_name": header.chat_name,
+            "chat_type": header.chat_type,
+            "exported_at": header.exported_at.isoformat(),
+        }
+        lines = [
+            f"  {json.dumps(k)}: {json.dumps(v, ensure_ascii=False)}," for k, v in fields.items()
+        ]
+        return "{\n" + "\n".join(lines) + '\n  "messages": ['
+
+    def messages(self, rows: Sequence[ExportRow]) -> str:
+        parts = []
+        for row in rows:
+            item = {
+                "id": str(row.id),
+                "seq": row.seq,
+                "sender_id": str(row.sender_id),
+                "sender_name": row.sender_name,
+                "content": row.content,
+                "created_at": row.created_at.isoformat(),
+                "edited_at": row.edited_at.isoformat() if row.edited_at else None,
+                "attachments": [
+                    {
+                        "file": a.archive_path,
+                        "name": a.filename,
+                        "mime_type": a.mime_type,
+                        "size": a.file_size,
+                    }
+                    for a in row.attachments
+                ],
+            }
+            separator = "\n    " if self._first else ",\n    "
+            self._first = False
+            parts.append(separator + json.dumps(item, ensure_ascii=False))
+        return "".join(parts)
+
+    def resume(self, message_count: int) -> None:
+        self._first = message_count == 0
+
+    def end(self, message_count: int) -> str:
+        closing = "]" if self._first else "\n  ]"
+        return f'{closing},\n  "message_count": {message_count}\n}}\n'
+
+
+class TxtExportEncoder(ExportEncoder):
+    """Текстовый лог: строка на сообщение."""
+
+    media_type = "text/plain; charset=utf-8"
+    extension = "txt"
+
+    def begin(self, header: ExportHeader) -> str:
+        return f"Экспорт чата: {header.chat_name}\nДата: {header.exported_at.isoformat()}\n\n"
+
+    def messages(self, rows: Sequence[ExportRow]) -> str:
+        lines = []
+        for row in rows:
+            lines.append(f"[{row.created_at.isoformat()}] {row.sender_name}: {row.content}\n")
+            lines.extend(
+                f"    [вложение: {a.filename} → {a.archive_path}]\n" for a in row.attachments
+            )
+        return "".join(lines)
+
+    def end(self, message_count: int) -> str:
+        return f"\nВсего сообщений: {message_count}\n"
+
+
+class HtmlExportEncoder(ExportEncoder):
+    """HTML-страница; текст сообщений экранируется."""
+
+    media_type = "text/html; charset=utf-8"
+    extension = "html"
+
+    def begin(self, header: ExportHeader) -> str:
+        name = html.escape(header.chat_name)
+        return (
+            "<!DOCTYPE html>\n"
+            f"<html><head><meta charset='utf-8'><title>Экспорт чата: {name}</title></head>\n"
+            f"<body><h1>{name}</h1>\n"
+            f"<p><small>{header.exported_at.isoformat()}</small></p>\n"
+        )
+
+    def messages(self, rows: Sequence[ExportRow]) -> str:
+        return "".join(
+            f"<p><small>{row.created_at.isoformat()}</small> "
+            f"<b>{html.escape(row.sender_name)}</b><br>{html.escape(row.content)}"
+            f"{''.join(self._attachment(a) for a in row.attachments)}</p>\n"
+            for row in rows
+        )
+
+    @staticmethod
+    def _attachment(attachment: ExportAttachment) -> str:
+        src = html.escape(attachment.archive_path)
+        name = html.escape(attachment.filename)
+        if attachment.mime_type.startswith("image/"):
+            return f"<br><img src='{src}' alt='{name}' style='max-width:320px'>"
+        return f"<br><a href='{src}'>{name}</a>"
+
+    def end(self, message_count: int) -> str:
+        return f"<p>Всего сообщений: {message_count}</p>\n</body></html>\n"
+
+
+ENCODERS: dict[ExportFormat, type[ExportEncoder]] = {
+    ExportFormat.JSON: JsonExportEncoder,
+    ExportFormat.TXT: TxtExportEncoder,
+    ExportFormat.HTML: HtmlExportEncoder,
+}
+
+
+def create_encoder(export_format: ExportFormat) -> ExportEncoder:
+    """Кодировщик для формата экспорта."""
+    return ENCODERS[export_format]()
+
+
+def export_page_query(
+    chat_id: uuid.UUID,
+    after_seq: int,
+    limit: int,
+    export_filter: ExportFilter | None = None,
+) -> Select:
+    """Следующая keyset-страница сообщений чата после ``after_seq``."""
+    conditions = (export_filter or ExportFilter()).conditions(chat_id)
+    return (
+        select(
+            Message.seq,
+            Message.id,
+            Message.sender_id,
+            User.name,
+            Message.content,
+            Message.created_at,
+            Message.edited_at,
+        )
+        .join(User, User.id == Message.sender_id)
+        .where(*conditions)
+        .where(Message.seq > after_seq)
+        .order_by(Message.seq)
+        .limit(limit)
+    )
+
+
+def export_media_query(
+    chat_id: uuid.UUID,
+    export_filter: ExportFilter,
+    after_id: uuid.UUID | None,
+    limit: int,
+) -> Select:
+    """Следующая keyset-страница медиафайлов, вложенных в экспортируемые сообщения."""
+    attached = (
+        select(MessageAttachment.media_id)
+        .join(Message, Message.id == MessageAttachment.message_id)
+        .where(*export_filter.conditions(chat_id))
+    )
+    query = select(
+        MediaFile.id, MediaFile.storage_path, MediaFile.original_filename, MediaFile.mime_type
+    ).where(MediaFile.id.in_(attached))
+    if after_id is not None:
+        query = query.where(MediaFile.id > after_id)
+    return query.order_by(MediaFile.id).limit(limit)
+
+
+class ChatExporter:
+    """Экспорт чата потоком байтов.
+
+    ``message_count`` и ``last_seq`` обновляются по мере записи пакетов;
+    с ненулевыми начальными значениями экспорт продолжается с места остановки.
+    """
+
+    def __init__(
+        self,
+        db: AsyncSession,
+        batch_size: int = EXPORT_BATCH_SIZE,
+        last_seq: int = 0,
+        message_count: int = 0,
+        include_media: bool = False,
+    ) -> None:
+        self.db = db
+        self.batch_size = batch_size
+        self.include_media = include_media
+        self.last_seq = last_seq
+        self.message_count = message_count
+
+    async def load_header(self, chat_id: uuid.UUID, exported_at: datetime) -> ExportHeader | None:
+        """Заголовок экспорта или None, если чат удалён."""
+        chat = await self.db.get(Chat, chat_id)
+        if chat is None:
+            return None
+        return ExportHeader(
+            chat_id=chat.id,
+            chat_name=chat.name or DEFAULT_CHAT_NAME,
+            chat_type=chat.chat_type,
+            exported_at=exported_at,
+        )
+
+    async def latest_seq(self, chat_id: uuid.UUID) -> int:
+        """Номер последнего сообщения чата."""
+        return await self.db.scalar(select(Chat.message_seq).where(Chat.id == chat_id)) or 0
+
+    async def count(self, chat_id: uuid.UUID, export_filter: ExportFilter) -> int:
+        """Число сообщений в экспорте."""
+        query = select(func.count()).select_from(Message).where(*export_filter.conditions(chat_id))
+        return await self.db.scalar(query) or 0
+
+    async def iter_batches(
+        self,
+        chat_id: uuid.UUID,
+        after_seq: int = 0,
+        export_filter: ExportFilter | None = None,
+    ) -> AsyncIterator[list[ExportRow]]:
+        """Пакеты сообщений по возрастанию ``seq`` через серверный курсор."""
+        while True:
+            query = export_page_query(chat_id, after_seq, self.batch_size, export_filter)
+            result = await self.db.stream(query.execution_options(yield_per=self.batch_size))
+            batch = [ExportRow(*row) async for row in result]
+            if batch:
+                after_seq = batch[-1].seq
+                yield await self._with_attachments(batch) if self.include_media else batch
+            if len(batch) < self.batch_size:
+                return
+
+    async def _with_attachments(self, batch: list[ExportRow]) -> list[ExportRow]:
+        """Вложения пакета одним запросом."""
+        result = await self.db.execute(
+            select(
+                MessageAttachment.message_id,
+                MediaFile.id,
+                MediaFile.original_filename,
+                MediaFile.mime_type,
+                MediaFile.file_size,
+            )
+            .join(MediaFile, MediaFile.id == MessageAttachment.media_id)
+            .where(MessageAttachment.message_id.in_([row.id for row in batch]))
+            .order_by(MessageAttachment.message_id, MessageAttachment.order)
+        )
+        attachments: dict[uuid.UUID, list[ExportAttachment]] = {}
+        for message_id, *fields in result.tuples():
+            attachments.setdefault(message_id, []).append(ExportAttachment(*fields))
+        return [
+            replace(row, attachments=tuple(attachments[row.id])) if row.id in attachments else row
+            for row in batch
+        ]
+
+    async def iter_media(
+        self,
+        chat_id: uuid.UUID,
+        export_filter: ExportFilter,
+    ) -> AsyncIterator[list[ExportMedia]]:
+        """Пакеты медиафайлов экспорта по возрастанию id."""
+        after_id: uuid.UUID | None = None
+        while True:
+            query = export_media_query(chat_id, export_filter, after_id, self.batch_size)
+            result = await self.db.stream(query.execution_options(yield_per=self.batch_size))
+            batch = [
+                ExportMedia(media_id, storage_path, media_archive_path(media_id, name), mime_type)
+                async for media_id, storage_path, name, mime_type in result
+            ]
+            if batch:
+                after_id = batch[-1].media_id
+                yield batch
+            if len(batch) < self.batch_size:
+                return
+
+    async def stream_body(
+        self,
+        header: ExportHeader,
+        encoder: ExportEncoder,
+        export_filter: ExportFilter | None = None,
+        resume: bool = False,
+    ) -> AsyncIterator[bytes]:
+        """Начало документа и пакеты сообщений, без завершения.
+
+        При ``resume`` начало файла уже записано и не повторяется.
+        """
+        if resume:
+            encoder.resume(self.message_count)
+        else:
+            yield encoder.begin(header).encode("utf-8")
+        async for batch in self.iter_batches(header.chat_id, self.last_seq, export_filter):
+            self.message_count += len(batch)
+            self.last_seq = batch[-1].seq
+            yield encoder.messages(batch).encode("utf-8")
@@ -0,0 +1,53 @@
+"""ZIP-архив экспорта: документ переписки и вложенные медиафайлы.
+
+Файлы копируются в архив блоками по ``COPY_CHUNK_SIZE`` через
+``ZipFile.open(..., "w")``, поэтому ни один файл не читается в память
+целиком. Уже сжатые форматы (изображения, видео, аудио) хранятся без
+повторного сжатия, остальные — deflate.
+"""
+
+import logging
+import shutil
+import zipfile
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+COPY_CHUNK_SIZE = 1024 * 1024
+
+_PRECOMPRESSED_PREFIXES = ("image/", "video/", "audio/")
+
+
+def compress_type(mime_type: str) -> int:
+    """Метод сжатия члена архива по MIME-типу."""
+    if mime_type.startswith(_PRECOMPRESSED_PREFIXES) and mime_type != "image/svg+xml":
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+
+class ExportArchive:
+    """Запись ZIP-архива экспорта (блокирующие вызовы — из потока)."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._zip = zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED, allowZip64=True)
+
+    def add_file(self, source: str | Path, name: str, mime_type: str = "") -> bool:
+        """Скопировать файл в архив блоками; False — исходного файла нет."""
+        source = Path(source)
+        try:
+            src = open(source, "rb")
+        except FileNotFoundError:
+            logger.warning("Файл %s для экспорта не найден", source)
+            return False
+
+        info = zipfile.ZipInfo.from_file(source, name)
+        info.compress_type = compress_type(mime_type)
+        with src, self._zip.open(info, "w", force_zip64=True) as dst:
+            shutil.copyfileobj(src, dst, COPY_CHUNK_SIZE)
+        return True
+
+    def close(self) -> int:
+        """Дописать центральный каталог; вернуть размер архива."""
+        self._zip.close()
+        return self.path.stat().st_size
@@ -0,0 +1,406 @@
+"""Фоновое выполнение задач экспорта.
+
+Задачи хранятся в таблице ``export_jobs``. Каждый воркер приложения
+запускает ``concurrency`` корутин, которые забирают задачи через
+``FOR UPDATE SKIP LOCKED`` и пишут файл экспорта на диск пакетами.
+
+После каждого пакета файл синхронизируется, а ``last_seq``, число сообщений
+и размер файла фиксируются в БД. Задача в статусе ``processing`` без
+heartbeat дольше ``stale_after`` секунд считается брошенной (воркер упал):
+её забирает другой воркер, обрезает файл до зафиксированного размера и
+продолжает с последнего записанного сообщения.
+
+С ``include_media`` готовый документ вместе с вложенными медиафайлами
+упаковывается в ZIP (``export_archive``); после сбоя на этом этапе архив
+собирается заново из уже записанного документа.
+
+Владелец задачи получает по сокету ``job_event`` при каждом изменении
+процента и по завершении.
+"""
+
+import asyncio
+import contextlib
+import logging
+import os
+import time
+import uuid
+from collections.abc import Awaitable, Callable
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from typing import Any, BinaryIO
+
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.config import get_settings
+from src.db.session import get_session_factory
+from src.models.export import ExportFormat, ExportJob, ExportStatus
+from src.services.export import ChatExporter, ExportEncoder, ExportFilter, create_encoder
+from src.services.export_archive import ExportArchive
+from src.websocket import manager
+
+logger = logging.getLogger(__name__)
+
+
+class ExportJobError(Exception):
+    """Задачу экспорта нельзя выполнить."""
+
+
+def export_progress(status: str, message_count: int, total_messages: int | None) -> int:
+    """Прогресс задачи в процентах по числу записанных сообщений."""
+    if status == ExportStatus.COMPLETED.value:
+        return 100
+    if total_messages:
+        return min(message_count * 100 // total_messages, 99)
+    return 0
+
+
+def export_download_url(job_id: uuid.UUID) -> str:
+    """URL скачивания готового экспорта."""
+    return f"/api/export/jobs/{job_id}/download"
+
+
+def artifact_path(storage_path: str | Path, job_id: uuid.UUID, encoder: ExportEncoder) -> Path:
+    """Путь файла экспорта задачи."""
+    return Path(storage_path) / f"{job_id}.{encoder.extension}"
+
+
+def _open_artifact(path: Path, size: int) -> BinaryIO:
+    """Открыть файл для дозаписи, отбросив незафиксированный хвост."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    handle = open(path, "r+b" if size and path.exists() else "wb")
+    handle.truncate(size)
+    handle.seek(size)
+    return handle
+
+
+def _append(handle: BinaryIO, chunk: bytes) -> int:
+    """Дописать фрагмент и сбросить его на диск; вернуть размер файла."""
+    handle.write(chunk)
+    handle.flush()
+    os.fsync(handle.fileno())
+    return handle.tell()
+
+
+class ExportJobRunner:
+    """Пул корутин, выполняющих задачи экспорта этого процесса."""
+
+    def __init__(
+        self,
+        storage_path: str | Path,
+        concurrency: int,
+        poll_interval: float,
+        stale_after: float,
+        max_attempts: int,
+        emit_job_event: Callable[..., Awaitable[None]] = manager.emit_job_event,
+        session_factory: Callable[[], async_sessionmaker[AsyncSession]] = get_session_factory,
+    ) -> None:
+        self.storage_path = Path(storage_path)
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        # Упаковка медиа продлевает heartbeat с запасом до ``stale_after``
+        self.heartbeat_interval = stale_after / 4
+        self.max_attempts = max_attempts
+        self._emit_job_event = emit_job_event
+        self._session_factory = session_factory
+        self._wakeup = asyncio.Event()
+        self._workers: list[asyncio.Task[None]] = []
+        # Последний отправленный владельцу процент по задачам
+        self._progress: dict[uuid.UUID, int] = {}
+
+    def start(self) -> None:
+        """Запустить корутины-исполнители."""
+        if not self._workers:
+            self._workers = [
+                asyncio.create_task(self._worker_loop()) for _ in range(self.concurrency)
+            ]
+
+    async def stop(self) -> None:
+        """Остановить исполнителей; незавершённые задачи продолжатся позже."""
+        workers, self._workers = self._workers, []
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+    def notify(self) -> None:
+        """Разбудить исполнителей: появилась новая задача."""
+        self._wakeup.set()
+
+    async def _worker_loop(self) -> None:
+        while True:
+            job_id = None
+            try:
+                job_id = await self.claim_next()
+                if job_id is not None:
+                    await self.run(job_id)
+            except Exception:
+                logger.exception("Ошибка исполнителя экспорта")
+            if job_id is None:
+                with contextlib.suppress(TimeoutError):
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                self._wakeup.clear()
+
+    async def claim_next(self) -> uuid.UUID | None:
+        """Забрать следующую ожидающую или брошенную задачу."""
+        stale_before = func.now() - timedelta(seconds=self.stale_after)
+        candidate = (
+            select(ExportJob.id)
+            .where(
+                or_(
+                    ExportJob.status == ExportStatus.PENDING.value,
+                    and_(
+                        ExportJob.status == ExportStatus.PROCESSING.value,
+                        ExportJob.heartbeat_at < stale_before,
+                    ),
+                )
+            )
+            .order_by(ExportJob.created_at)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        async with self._session_factory()() as session:
+            job_id = await session.scalar(
+                update(ExportJob)
+                .where(ExportJob.id == candidate)
+                .values(
+                    status=ExportStatus.PROCESSING.value,
+                    attempts=ExportJob.attempts + 1,
+                    heartbeat_at=func.now(),
+                    started_at=func.coalesce(ExportJob.started_at, func.now()),
+                )
+                .returning(ExportJob.id)
+            )
+            await session.commit()
+        return job_id
+
+    async def run(self, job_id: uuid.UUID) -> None:
+        """Выполнить (или продолжить) задачу; ошибки переводят её в failed."""
+        async with self._session_factory()() as session:
+            job = await session.get(ExportJob, job_id)
+            if job is None:
+                return
+            user_id = job.user_id
+            try:
+                if job.attempts > self.max_attempts:
+                    raise ExportJobError("Превышено число попыток экспорта")
+                await self._export(session, job)
+            except Exception as exc:
+                if not isinstance(exc, ExportJobError):
+                    logger.exception("Экспорт %s завершился ошибкой", job_id)
+                await session.rollback()
+                await self._finish(
+                    session, job_id, user_id, ExportStatus.FAILED, error=str(exc)[:500]
+                )
+
+    async def _export(self, session: AsyncSession, job: ExportJob) -> None:
+        exporter = ChatExporter(
+            session,
+            last_seq=job.last_seq,
+            message_count=job.message_count,
+            include_media=job.include_media,
+        )
+        header = await exporter.load_header(job.chat_id, job.started_at or datetime.now(UTC))
+        if header is None:
+            raise ExportJobError("Чат не найден")
+
+        if job.until_seq is None:
+            # Первый запуск: фиксируем границу и объём экспорта
+            job.until_seq = await exporter.latest_seq(job.chat_id)
+            job.total_messages = await exporter.count(job.chat_id, self._filter(job))
+            await session.commit()
+
+        encoder = create_encoder(ExportFormat(job.format))
+        path = artifact_path(self.storage_path, job.id, encoder)
+        resume = bool(job.file_size) and path.exists()
+        if not resume:
+            exporter.last_seq = 0
+            exporter.message_count = 0
+
+        handle = await asyncio.to_thread(
+            _open_artifact, path, (job.file_size or 0) if resume else 0
+        )
+        try:
+            body = exporter.stream_body(header, encoder, self._filter(job), resume=resume)
+            async for chunk in body:
+                size = await asyncio.to_thread(_append, handle, chunk)
+                if not await self._checkpoint(session, job, exporter, str(path), size):
+                    await self._discard(path)
+                    return
+            # Завершение документа не фиксируется: после сбоя оно дописывается
+            # заново поверх зафиксированного размера
+            end = encoder.end(exporter.message_count).encode("utf-8")
+            size = await asyncio.to_thread(_append, handle, end)
+        finally:
+            handle.close()
+
+        if job.include_media:
+            archive = await self._build_archive(session, job, exporter, path, encoder)
+            if archive is None:
+                return
+            path, size = archive
+
+        await self._finish(
+            session,
+            job.id,
+            job.user_id,
+            ExportStatus.COMPLETED,
+            file_path=str(path),
+            file_size=size,
+            message_count=exporter.message_count,
+        )
+
+    async def _build_archive(
+        self,
+        session: AsyncSession,
+        job: ExportJob,
+        exporter: ChatExporter,
+        document: Path,
+        encoder: ExportEncoder,
+    ) -> tuple[Path, int] | None:
+        """Упаковать документ и медиафайлы в ZIP; None — задача удалена."""
+        path = self.storage_path / f"{job.id}.zip"
+        archive = await asyncio.to_thread(ExportArchive, path)
+        try:
+            await asyncio.to_thread(archive.add_file, document, f"messages.{encoder.extension}")
+            touched_at = time.monotonic()
+            async for batch in exporter.iter_media(job.chat_id, self._filter(job)):
+                for media in batch:
+                    await asyncio.to_thread(
+                        archive.add_file, media.storage_path, media.archive_path, media.mime_type
+                    )
+                    # Пакет крупных файлов копируется дольше stale_after: heartbeat
+                    # продлевается по времени, а не по пакетам
+                    if time.monotonic() - touched_at < self.heartbeat_interval:
+                        continue
+                    if not await self._touch(session, job.id):
+                        await asyncio.to_thread(archive.close)
+                        await self._discard(path, document)
+                        return None
+                    touched_at = time.monotonic()
+            size = await asyncio.to_thread(archive.close)
+        except BaseException:
+            await asyncio.to_thread(archive.close)
+            raise
+
+        await asyncio.to_thread(document.unlink, True)
+        return path, size
+
+    @staticmethod
+    async def _discard(*paths: Path) -> None:
+        """Удалить файлы задачи, удалённой во время экспорта."""
+        for path in paths:
+            await asyncio.to_thread(path.unlink, True)
+
+    @staticmethod
+    def _filter(job: ExportJob) -> ExportFilter:
+        return ExportFilter(
+            start_date=job.start_date,
+            end_date=job.end_date,
+            until_seq=job.until_seq,
+        )
+
+    async def _checkpoint(
+        self,
+        session: AsyncSession,
+        job: ExportJob,
+        exporter: ChatExporter,
+        file_path: str,
+        file_size: int,
+    ) -> bool:
+        """Зафиксировать записанный пакет и сообщить прогресс; False — задача удалена."""
+        updated = await session.scalar(
+            update(ExportJob)
+            .where(ExportJob.id == job.id)
+            .values(
+                last_seq=exporter.last_seq,
+                message_count=exporter.message_count,
+                file_path=file_path,
+                file_size=file_size,
+                heartbeat_at=func.now(),
+            )
+            .returning(ExportJob.id)
+        )
+        await session.commit()
+        if updated is None:
+            self._progress.pop(job.id, None)
+            return False
+
+        progress = export_progress(
+            ExportStatus.PROCESSING.value, exporter.message_count, job.total_messages
+        )
+        if self._progress.get(job.id) != progress:
+            self._progress[job.id] = progress
+            await self._emit(
+                job.user_id,
+                job.id,
+                ExportStatus.PROCESSING,
+                progress,
+                message_count=job.total_messages,
+                current_message=exporter.message_count,
+            )
+        return True
+
+    async def _touch(self, session: AsyncSession, job_id: uuid.UUID) -> bool:
+        """Продлить heartbeat; False — задача удалена."""
+        updated = await session.scalar(
+            update(ExportJob)
+            .where(ExportJob.id == job_id)
+            .values(heartbeat_at=func.now())
+            .returning(ExportJob.id)
+        )
+        await session.commit()
+        return updated is not None
+
+    async def _finish(
+        self,
+        session: AsyncSession,
+        job_id: uuid.UUID,
+        user_id: uuid.UUID,
+        status: ExportStatus,
+        error: str | None = None,
+        **values: Any,
+    ) -> None:
+        await session.execute(
+            update(ExportJob)
+            .where(ExportJob.id == job_id)
+            .values(status=status.value, error_message=error, completed_at=func.now(), **values)
+        )
+        await session.commit()
+
+        self._progress.pop(job_id, None)
+        if status == ExportStatus.COMPLETED:
+            await self._emit(
+                user_id,
+                job_id,
+                status,
+                100,
+                file_url=export_download_url(job_id),
+                file_size=values.get("file_size"),
+                message_count=values.get("message_count"),
+            )
+        else:
+            await self._emit(user_id, job_id, status, None, error_message=error)
+
+    async def _emit(
+        self,
+        user_id: uuid.UUID,
+        job_id: uuid.UUID,
+        status: ExportStatus,
+        progress: int | None,
+        **data: Any,
+    ) -> None:
+        try:
+            await self._emit_job_event(user_id, "export", job_id, status.value, progress, **data)
+        except Exception:
+            logger.exception("Не удалось отправить событие экспорта %s", job_id)
+
+
+export_runner = ExportJobRunner(
+    storage_path=get_settings().export_storage_path,
+    concurrency=get_settings().export_concurrency,
+    poll_interval=get_settings().export_poll_interval,
+    stale_after=get_settings().export_stale_after,
+    max_attempts=get_settings().export_max_attempts,
+)
@@ -1,8 +1,15 @@
 """Сервис для работы с медиафайлами."""
 
+import asyncio
+import hashlib
 import mimetypes
+import os
 import uuid
+from dataclasses import dataclass
 from pathlib import Path
+from typing import BinaryIO
+
+from fastapi import UploadFile
 
 from src.config import get_settings
 from src.models.media import MediaType
@@ -22,6 +29,27 @@ ALLOWED_FILE_TYPES = {
 MAX_FILE_SIZE = 100 * 1024 * 1024  # 100MB
 MAX_IMAGE_SIZE = 10 * 1024 * 1024  # 10MB
 MAX_VOICE_SIZE = 20 * 1024 * 1024  # 20MB
+# Допустимая длительность голосового (сек); проверяется по метаданным файла
+MIN_VOICE_DURATION = 1
+MAX_VOICE_DURATION = 600
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1MB
+
+
+class FileTooLargeError(Exception):
+    """Загружаемый файл превышает допустимый размер."""
+
+    def __init__(self, max_size: int) -> None:
+        super().__init__(f"Файл больше {max_size} байт")
+        self.max_size = max_size
+
+
+@dataclass(frozen=True)
+class StoredFile:
+    """Результат сохранения загрузки на диск."""
+
+    size: int
+    sha256: str
 
 
 def get_media_type(mime_type: str, is_voice: bool = False) -> MediaType:
@@ -57,23 +85,9 @@ def get_max_size(media_type: MediaType) -> int:
     return MAX_FILE_SIZE
 
 
-def generate_storage_path(
-    user_id: uuid.UUID,
-    media_type: MediaType,
-    original_filename: str,
-) -> tuple[str, str]:
-    """Сгенерировать путь для хранения файла."""
-    settings = get_settings()
-    ext = Path(original_filename).suffix.lower()
-    file_id = uuid.uuid4()
-    filename = f"{file_id}{ext}"
-
-    type_folder = media_type.value
-    path = Path(settings.media_storage_path) / str(user_id) / type_folder
-    path.mkdir(parents=True, exist_ok=True)
-
-    storage_path = str(path / filename)
-    return filename, storage_path
+def generate_filename(original_filename: str) -> str:
+    """Уникальное имя файла с расширением исходного."""
+    return f"{uuid.uuid4()}{Path(original_filename).suffix.lower()}"
 
 
 def get_file_url(storage_path: str) -> str:
@@ -93,3 +107,51 @@ def validate_file_size(size: int, media_type: MediaType) -> bool:
     """Проверить размер файла."""
     max_size = get_max_size(media_type)
     return size <= max_size
+
+
+def _write_chunk(handle: BinaryIO, hasher: "hashlib._Hash", chunk: bytes) -> None:
+    hasher.update(chunk)
+    handle.write(chunk)
+
+
+def _discard_partial(handle: BinaryIO, path: Path) -> None:
+    handle.close()
+    path.unlink(missing_ok=True)
+
+
+async def save_upload(
+    upload: UploadFile,
+    destination: str | Path,
+    max_size: int,
+    chunk_size: int = UPLOAD_CHUNK_SIZE,
+) -> StoredFile:
+    """Скопировать загрузку на диск блоками, считая SHA-256 на лету.
+
+    В памяти находится не больше одного блока; запись и хеширование идут в
+    пуле потоков. При превышении ``max_size`` копирование прерывается с
+    ``FileTooLargeError``. Файл пишется во временный ``.part`` и появляется
+    под итоговым именем только целиком.
+    """
+    # Размер уже известен, если multipart-парсер сохранил часть целиком
+    if upload.size is not None and upload.size > max_size:
+        raise FileTooLargeError(max_size)
+
+    path = Path(destination)
+    partial = path.with_name(f"{path.name}.part")
+    hasher = hashlib.sha256()
+    size = 0
+
+    handle = await asyncio.to_thread(open, partial, "wb")
+    try:
+        while chunk := await upload.read(chunk_size):
+            size += len(chunk)
+            if size > max_size:
+                raise FileTooLargeError(max_size)
+            await asyncio.to_thread(_write_chunk, handle, hasher, chunk)
+        await asyncio.to_thread(handle.close)
+        await asyncio.to_thread(os.replace, partial, path)
+    except BaseException:
+        await asyncio.to_thread(_discard_partial, handle, partial)
+        raise
+
+    return StoredFile(size=size, sha256=hasher.hexdigest())
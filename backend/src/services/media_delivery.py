@@ -0,0 +1,240 @@
+"""Отдача медиафайлов по HTTP.
+
+Поддерживаются запросы ``Range`` (перемотка видео и голосовых), ``ETag`` и
+``Last-Modified`` с условными запросами (``If-None-Match``,
+``If-Modified-Since`` → 304). ETag blob — его SHA-256: содержимое по такому
+пути не меняется, поэтому ответ кешируется как immutable.
+
+Байты отправляются, в порядке предпочтения:
+
+- прокси по ``X-Accel-Redirect``, если задан ``media_accel_redirect_prefix``:
+  приложение проверяет запрос, а файл отдаёт nginx (``sendfile``);
+- через ASGI-расширение ``http.response.zerocopy`` — сервер вызывает ``sendfile``
+  (файл целиком или один диапазон);
+- через ``http.response.pathsend`` для файла целиком;
+- иначе блоками из пула потоков (``FileResponse``; он же отвечает на
+  несколько диапазонов, ``If-Range`` и ошибочные ``Range``).
+"""
+
+import asyncio
+import os
+import re
+import stat
+from collections.abc import Mapping
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import BinaryIO
+from urllib.parse import quote
+
+from fastapi.responses import FileResponse
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+from src.config import get_settings
+from src.services.blobs import BLOBS_DIR, INCOMING_DIR
+
+ZEROCOPY_EXTENSION = "http.response.zerocopy"
+
+IMMUTABLE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "private, no-cache"
+
+# Типы, безопасные для показа в браузере; остальное отдаётся вложением
+_INLINE_PREFIXES = ("image/", "video/", "audio/")
+_INLINE_DENIED = {"image/svg+xml"}
+
+_SINGLE_RANGE = re.compile(r"bytes=(\d*)-(\d*)", re.IGNORECASE)
+
+
+def media_etag(content_hash: str | None, stat_result: os.stat_result) -> str:
+    """Сильный ETag: SHA-256 содержимого или (для старых файлов) mtime и размер."""
+    if content_hash:
+        return f'"{content_hash}"'
+    return f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+
+
+def is_not_modified(headers: Mapping[str, str], etag: str, mtime: float) -> bool:
+    """Можно ли ответить 304 на условный запрос."""
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-None-Match важнее If-Modified-Since; сравнение слабое
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or etag in tags
+
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    return int(mtime) <= since.timestamp()
+
+
+def inline_allowed(mime_type: str) -> bool:
+    """Показывать ли файл в браузере, а не скачивать."""
+    return mime_type.startswith(_INLINE_PREFIXES) and mime_type not in _INLINE_DENIED
+
+
+def blob_hash(relative_path: str | Path) -> str | None:
+    """SHA-256 из пути blob (``blobs/ab/cd/<sha256>``) или None."""
+    parts = Path(relative_path).parts
+    if len(parts) == 4 and parts[0] == BLOBS_DIR and len(parts[3]) == 64:
+        return parts[3]
+    return None
+
+
+def resolve_media_path(root: str | Path, relative_path: str) -> Path | None:
+    """Путь файла внутри хранилища; None — выход за его пределы или служебный каталог."""
+    root = Path(root).resolve()
+    path = (root / relative_path).resolve()
+    if not path.is_relative_to(root) or path == root:
+        return None
+    if path.relative_to(root).parts[0] == INCOMING_DIR:
+        return None
+    return path
+
+
+def _content_disposition(disposition: str, filename: str) -> str:
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"{disposition}; filename*=utf-8''{quoted}"
+    return f'{disposition}; filename="{filename}"'
+
+
+def _accel_relative_path(path: str | Path, root: str | Path) -> str | None:
+    try:
+        return Path(path).resolve().relative_to(Path(root).resolve()).as_posix()
+    except ValueError:
+        return None
+
+
+def single_range(value: str, file_size: int) -> tuple[int, int] | None:
+    """Один удовлетворимый диапазон ``bytes=`` как (начало, конец); иначе None."""
+    match = _SINGLE_RANGE.fullmatch(value.strip())
+    if match is None or not any(match.groups()):
+        return None
+    first, last = match.groups()
+    if not first:
+        start = max(file_size - int(last), 0)
+        end = file_size
+    else:
+        start = int(first)
+        end = min(int(last) + 1, file_size) if last else file_size
+    if start >= end:
+        return None
+    return start, end
+
+
+def _open_at(path: str | Path, offset: int) -> BinaryIO:
+    handle = open(path, "rb")
+    handle.seek(offset)
+    return handle
+
+
+class MediaFileResponse(FileResponse):
+    """``FileResponse`` с отправкой через ``sendfile`` сервера, если он это умеет.
+
+    Zero-copy выполняется в собственном ``__call__`` и опирается только на
+    публичный интерфейс ``FileResponse``; всё, что он не покрывает, отдаёт
+    базовый класс.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        span = self._zerocopy_span(scope)
+        if span is None:
+            return await super().__call__(scope, receive, send)
+
+        start, end, file_size = span
+        headers = MutableHeaders(raw=list(self.raw_headers))
+        status_code = self.status_code
+        if "range" in Headers(scope=scope):
+            status_code = 206
+            headers["content-range"] = f"bytes {start}-{end - 1}/{file_size}"
+        headers["content-length"] = str(end - start)
+        await send({"type": "http.response.start", "status": status_code, "headers": headers.raw})
+        await self._send_zerocopy(send, start, end - start)
+        if self.background is not None:
+            await self.background()
+
+    def _zerocopy_span(self, scope: Scope) -> tuple[int, int, int] | None:
+        """Начало, конец и размер файла для zerocopy; None — ответ строит ``FileResponse``."""
+        extensions = scope.get("extensions", {})
+        if (
+            scope["type"] != "http"
+            or scope["method"].upper() != "GET"
+            or ZEROCOPY_EXTENSION not in extensions
+            or self.stat_result is None
+            or self.status_code != 200
+        ):
+            return None
+        headers = Headers(scope=scope)
+        http_range = headers.get("range")
+        if http_range is None:
+            if "http.response.pathsend" in extensions:
+                return None
+            return 0, self.stat_result.st_size, self.stat_result.st_size
+        if "if-range" in headers:
+            return None
+        span = single_range(http_range, self.stat_result.st_size)
+        if span is None:
+            return None
+        return *span, self.stat_result.st_size
+
+    async def _send_zerocopy(self, send: Send, offset: int, count: int) -> None:
+        handle = await asyncio.to_thread(_open_at, self.path, offset)
+        try:
+            await send(
+                {
+                    "type": ZEROCOPY_EXTENSION,
+                    "file": handle,
+                    "offset": offset,
+                    "count": count,
+                    "more_body": False,
+                }
+            )
+        finally:
+            await asyncio.to_thread(handle.close)
+
+
+async def serve_media(
+    request_headers: Mapping[str, str],
+    path: str | Path,
+    mime_type: str,
+    content_hash: str | None = None,
+    filename: str | None = None,
+    disposition: str | None = None,
+) -> Response:
+    """Ответ с файлом хранилища: 304, X-Accel-Redirect или сами байты.
+
+    ``disposition`` по умолчанию — ``inline`` для изображений, видео и аудио,
+    иначе ``attachment``. Нет файла (или это не файл) — ``FileNotFoundError``.
+    """
+    settings = get_settings()
+    stat_result = await asyncio.to_thread(os.stat, path)
+    if not stat.S_ISREG(stat_result.st_mode):
+        raise FileNotFoundError(path)
+    etag = media_etag(content_hash, stat_result)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(stat_result.st_mtime, usegmt=True),
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL if content_hash else REVALIDATE_CACHE_CONTROL,
+        "X-Content-Type-Options": "nosniff",
+    }
+    if is_not_modified(request_headers, etag, stat_result.st_mtime):
+        return Response(status_code=304, headers=headers)
+
+    if disposition is None:
+        disposition = "inline" if inline_allowed(mime_type) else "attachment"
+    if filename is not None or disposition != "inline":
+        headers["Content-Disposition"] = _content_disposition(
+            disposition, filename or Path(path).name
+        )
+
+    relative = _accel_relative_path(path, settings.media_storage_path)
+    if settings.media_accel_redirect_prefix and relative is not None:
+        location = settings.media_accel_redirect_prefix.rstrip("/") + "/" + quote(relative)
+        headers["X-Accel-Redirect"] = location
+        return Response(media_type=mime_type, headers=headers)
+
+    return MediaFileResponse(path, stat_result=stat_result, media_type=mime_type, headers=headers)
@@ -0,0 +1,265 @@
+"""Фоновое извлечение длительности и размеров аудио и видео.
+
+Новые аудио, голосовые и видео получают ``metadata_status = pending``.
+Исполнитель забирает их пакетами через ``FOR UPDATE SKIP LOCKED`` (несколько
+воркеров приложения не берут одни и те же строки) и сразу фиксирует захват
+статусом ``processing``. Заголовки контейнеров (``media_probe``) разбираются в
+ограниченном пуле потоков без открытой транзакции, а результаты всего пакета
+записываются в новой сессии одним bulk UPDATE по первичному ключу. Пакет,
+забранный дольше ``stale_after`` секунд назад, считается брошенным (воркер
+упал) и забирается снова.
+
+Голосовые в том же проходе декодируются в пуле процессов (``waveforms``):
+запись получает пики громкости для отрисовки волны, а если заголовки не
+разобраны — и длительность по числу сэмплов. Поэтому в очередь попадают
+голосовые любого формата, а не только разбираемые по заголовкам.
+"""
+
+import asyncio
+import contextlib
+import logging
+import multiprocessing
+import uuid
+from collections.abc import Callable, Sequence
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+from typing import Any
+
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.config import get_settings
+from src.db.session import get_session_factory
+from src.models.media import MediaFile, MediaType, ProcessingStatus
+from src.services.media import MAX_VOICE_DURATION, MIN_VOICE_DURATION
+from src.services.media_probe import MediaProbe, probe_media
+from src.services.waveforms import render_waveform
+
+logger = logging.getLogger(__name__)
+
+PROBEABLE_MIME_TYPES = frozenset(
+    {
+        "audio/wav",
+        "audio/wave",
+        "audio/x-wav",
+        "audio/ogg",
+        "audio/opus",
+        "video/ogg",
+        "audio/mp4",
+        "audio/m4a",
+        "audio/x-m4a",
+        "video/mp4",
+        "video/quicktime",
+        "audio/webm",
+        "video/webm",
+        "video/x-matroska",
+    }
+)
+
+_TIMED_MEDIA_TYPES = {MediaType.AUDIO.value, MediaType.VOICE.value, MediaType.VIDEO.value}
+
+
+def initial_metadata_status(mime_type: str, media_type: str) -> str | None:
+    """Статус метаданных новой записи: ``pending`` для голосовых и разбираемых аудио и видео."""
+    base_type = mime_type.split(";", 1)[0].strip().lower()
+    if media_type == MediaType.VOICE.value:
+        return ProcessingStatus.PENDING.value
+    if media_type in _TIMED_MEDIA_TYPES and base_type in PROBEABLE_MIME_TYPES:
+        return ProcessingStatus.PENDING.value
+    return None
+
+
+def metadata_values(
+    media_id: uuid.UUID,
+    probe: MediaProbe | None,
+    waveform: tuple[bytes, float] | None = None,
+    voice: bool = False,
+) -> dict[str, Any]:
+    """Строка bulk UPDATE для записи; None — заголовки (или аудио) не разобраны.
+
+    Голосовое с длительностью вне ``MIN_VOICE_DURATION``–``MAX_VOICE_DURATION``
+    отмечается ``failed``: клиент не присылает длительность, и ограничение
+    проверяется только здесь.
+    """
+    if probe is None and waveform is None:
+        return {"id": media_id, "metadata_status": ProcessingStatus.FAILED.value}
+    values: dict[str, Any] = {"id": media_id, "metadata_status": ProcessingStatus.READY.value}
+    if probe is not None:
+        values["duration_seconds"] = probe.duration_seconds
+        if probe.width and probe.height:
+            values["width"] = probe.width
+            values["height"] = probe.height
+    if waveform is not None:
+        peaks, duration = waveform
+        values["waveform"] = peaks
+        values.setdefault("duration_seconds", max(1, round(duration)))
+    duration_seconds = values.get("duration_seconds")
+    if voice and duration_seconds is not None:
+        if not MIN_VOICE_DURATION <= duration_seconds <= MAX_VOICE_DURATION:
+            values["metadata_status"] = ProcessingStatus.FAILED.value
+    return values
+
+
+class MetadataWorker:
+    """Пакетная обработка ожидающих метаданных этого процесса."""
+
+    def __init__(
+        self,
+        workers: int,
+        batch_size: int,
+        poll_interval: float,
+        waveform_workers: int = 1,
+        stale_after: float = 1800.0,
+        session_factory: Callable[[], async_sessionmaker[AsyncSession]] = get_session_factory,
+    ) -> None:
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.waveform_workers = waveform_workers
+        self.stale_after = stale_after
+        self._session_factory = session_factory
+        self._wakeup = asyncio.Event()
+        self._pool: ThreadPoolExecutor | None = None
+        self._decode_pool: ProcessPoolExecutor | None = None
+        self._task: asyncio.Task[None] | None = None
+
+    def start(self) -> None:
+        """Запустить пулы потоков и процессов и цикл обработки."""
+        if self._task is None:
+            self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix="media-probe")
+            self._decode_pool = self._new_decode_pool()
+            self._task = asyncio.create_task(self._loop())
+
+    def _new_decode_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.waveform_workers, mp_context=multiprocessing.get_context("spawn")
+        )
+
+    async def stop(self) -> None:
+        """Остановить обработку; незаконченный пакет вернётся в очередь."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+        if self._decode_pool is not None:
+            self._decode_pool.shutdown(wait=False, cancel_futures=True)
+            self._decode_pool = None
+
+    def notify(self) -> None:
+        """Разбудить обработку: появились новые записи."""
+        self._wakeup.set()
+
+    async def _loop(self) -> None:
+        while True:
+            processed = 0
+            try:
+                processed = await self.run_once()
+            except Exception:
+                logger.exception("Ошибка обработки метаданных медиа")
+            if processed < self.batch_size:
+                with contextlib.suppress(TimeoutError):
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                self._wakeup.clear()
+
+    async def _probe(self, storage_path: str) -> MediaProbe | None:
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._pool, probe_media, storage_path)
+        except Exception as exc:
+            logger.warning("Не удалось разобрать %s: %s", storage_path, exc)
+            return None
+
+    async def _waveform(self, storage_path: str, mime_type: str) -> tuple[bytes, float] | None:
+        loop = asyncio.get_running_loop()
+        pool = self._decode_pool
+        try:
+            return await loop.run_in_executor(pool, render_waveform, storage_path, mime_type)
+        except BrokenProcessPool:
+            logger.error("Пул декодирования аудио перезапущен после сбоя на %s", storage_path)
+            if pool is not None and self._decode_pool is pool:
+                pool.shutdown(wait=False)
+                self._decode_pool = self._new_decode_pool()
+            return None
+        except Exception as exc:
+            logger.warning("Волна %s не построена: %s", storage_path, exc)
+            return None
+
+    async def _process(self, row: Any) -> dict[str, Any]:
+        if row.media_type != MediaType.VOICE.value:
+            return metadata_values(row.id, await self._probe(row.storage_path))
+        waveform = self._waveform(row.storage_path, row.mime_type)
+        if row.mime_type.split(";", 1)[0].strip().lower() not in PROBEABLE_MIME_TYPES:
+            return metadata_values(row.id, None, await waveform, voice=True)
+        probe, peaks = await asyncio.gather(self._probe(row.storage_path), waveform)
+        return metadata_values(row.id, probe, peaks, voice=True)
+
+    async def claim(self) -> Sequence[Any]:
+        """Забрать пакет ожидающих или брошенных записей одним запросом."""
+        stale_before = func.now() - timedelta(seconds=self.stale_after)
+        candidates = (
+            select(MediaFile.id)
+            .where(
+                or_(
+                    MediaFile.metadata_status == ProcessingStatus.PENDING.value,
+                    and_(
+                        MediaFile.metadata_status == ProcessingStatus.PROCESSING.value,
+                        MediaFile.metadata_claimed_at < stale_before,
+                    ),
+                )
+            )
+            .order_by(MediaFile.created_at)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        async with self._session_factory()() as session:
+            rows = (
+                await session.execute(
+                    update(MediaFile)
+                    .where(MediaFile.id.in_(candidates))
+                    .values(
+                        metadata_status=ProcessingStatus.PROCESSING.value,
+                        metadata_claimed_at=func.now(),
+                    )
+                    .returning(
+                        MediaFile.id,
+                        MediaFile.storage_path,
+                        MediaFile.mime_type,
+                        MediaFile.media_type,
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+            ).all()
+            await session.commit()
+        return rows
+
+    async def run_once(self) -> int:
+        """Обработать один пакет; вернуть число записей в нём."""
+        rows = await self.claim()
+        if not rows:
+            return 0
+
+        # Соединение с БД не удерживается, пока файлы разбираются и декодируются
+        values = await asyncio.gather(*(self._process(row) for row in rows))
+        async with self._session_factory()() as session:
+            # Записи, удалённые за это время, пропускаются
+            await session.execute(
+                update(MediaFile)
+                .where(MediaFile.metadata_status == ProcessingStatus.PROCESSING.value)
+                .execution_options(synchronize_session=None),
+                list(values),
+            )
+            await session.commit()
+        return len(rows)
+
+
+metadata_worker = MetadataWorker(
+    workers=get_settings().metadata_workers,
+    batch_size=get_settings().metadata_batch_size,
+    poll_interval=get_settings().metadata_poll_interval,
+    waveform_workers=get_settings().waveform_workers,
+    stale_after=get_settings().metadata_stale_after,
+)
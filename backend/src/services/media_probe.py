@@ -0,0 +1,399 @@
+"""Разбор заголовков аудио и видео без декодирования потока.
+
+Длительность и размер кадра берутся из служебных структур контейнера:
+
+- WAV — чанки ``fmt`` и ``data``;
+- OGG (Opus, Vorbis) — заголовок кодека и granule position последней
+  страницы потока, которая ищется в хвосте файла;
+- MP4/MOV — ``moov/mvhd`` и ``tkhd`` видеодорожки; ``mdat`` пропускается;
+- WebM/Matroska — ``Info`` и ``Tracks`` в начале сегмента. У записей
+  MediaRecorder длительности в ``Info`` нет — она берётся по меткам времени
+  последнего кластера в хвосте файла.
+
+Читаются заголовки структур и хвост файла — объём не зависит от размера медиа.
+"""
+
+import os
+import struct
+from collections.abc import Iterator
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO
+
+# Хвост файла, в котором ищется последняя страница OGG / последний кластер WebM
+PROBE_TAIL_SIZE = 256 * 1024
+# Предел размера элемента Matroska, читаемого в память (Info, Tracks)
+MAX_ELEMENT_SIZE = 1024 * 1024
+
+_MP4_TOP_LEVEL = {b"ftyp", b"moov", b"mdat", b"free", b"skip", b"wide", b"pnot"}
+_EBML_MAGIC = b"\x1a\x45\xdf\xa3"
+
+_SEGMENT = 0x18538067
+_INFO = 0x1549A966
+_TRACKS = 0x1654AE6B
+_CLUSTER = 0x1F43B675
+_TIMECODE_SCALE = 0x2AD7B1
+_DURATION = 0x4489
+_TRACK_ENTRY = 0xAE
+_TRACK_TYPE = 0x83
+_VIDEO = 0xE0
+_PIXEL_WIDTH = 0xB0
+_PIXEL_HEIGHT = 0xBA
+_CLUSTER_TIMECODE = 0xE7
+_SIMPLE_BLOCK = 0xA3
+_BLOCK_GROUP = 0xA0
+_BLOCK = 0xA1
+
+
+class ProbeError(Exception):
+    """Заголовки файла не удалось разобрать."""
+
+
+@dataclass(frozen=True)
+class MediaProbe:
+    """Метаданные из заголовков контейнера."""
+
+    duration: float | None = None
+    width: int | None = None
+    height: int | None = None
+
+    @property
+    def duration_seconds(self) -> int | None:
+        """Длительность в целых секундах (не меньше 1 для непустой записи)."""
+        if self.duration is None:
+            return None
+        return max(1, round(self.duration)) if self.duration > 0 else 0
+
+
+def probe_media(path: str | Path) -> MediaProbe:
+    """Определить формат по сигнатуре и разобрать заголовки (блокирующий вызов)."""
+    with open(path, "rb") as f:
+        head = f.read(12)
+        f.seek(0)
+        if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+            return _probe_wav(f)
+        if head[:4] == b"OggS":
+            return _probe_ogg(f)
+        if head[4:8] in _MP4_TOP_LEVEL:
+            return _probe_mp4(f)
+        if head[:4] == _EBML_MAGIC:
+            return _probe_matroska(f)
+    raise ProbeError("Неизвестный формат контейнера")
+
+
+def _file_size(f: BinaryIO) -> int:
+    return os.fstat(f.fileno()).st_size
+
+
+def _read_exact(f: BinaryIO, size: int) -> bytes:
+    data = f.read(size)
+    if len(data) != size:
+        raise ProbeError("Файл обрывается внутри заголовка")
+    return data
+
+
+# WAV
+
+
+def _probe_wav(f: BinaryIO) -> MediaProbe:
+    size = _file_size(f)
+    pos = 12
+    byte_rate = 0
+    while pos + 8 <= size:
+        f.seek(pos)
+        chunk_id, chunk_size = struct.unpack("<4sI", _read_exact(f, 8))
+        if chunk_id == b"fmt ":
+            byte_rate = struct.unpack("<HHII", _read_exact(f, 12))[3]
+        elif chunk_id == b"data":
+            if not byte_rate:
+                raise ProbeError("Чанк data до fmt")
+            available = size - pos - 8
+            # Потоковые записи оставляют размер 0 или 0xFFFFFFFF
+            if chunk_size in (0, 0xFFFFFFFF) or chunk_size > available:
+                chunk_size = available
+            return MediaProbe(duration=chunk_size / byte_rate)
+        pos += 8 + chunk_size + (chunk_size & 1)
+    raise ProbeError("В WAV нет чанка data")
+
+
+# OGG
+
+
+def _probe_ogg(f: BinaryIO) -> MediaProbe:
+    head = f.read(27 + 255 + 64)
+    if len(head) < 28:
+        raise ProbeError("Слишком короткий OGG")
+    serial = head[14:18]
+    packet = head[27 + head[26] :]
+
+    if packet.startswith(b"OpusHead") and len(packet) >= 12:
+        pre_skip = struct.unpack_from("<H", packet, 10)[0]
+        rate, offset = 48000, pre_skip
+    elif packet.startswith(b"\x01vorbis") and len(packet) >= 16:
+        rate, offset = struct.unpack_from("<I", packet, 12)[0], 0
+    else:
+        raise ProbeError("Неподдерживаемый кодек OGG")
+    if not rate:
+        raise ProbeError("Нулевая частота дискретизации")
+
+    granule = _last_ogg_granule(f, serial)
+    return MediaProbe(duration=max(0, granule - offset) / rate)
+
+
+def _last_ogg_granule(f: BinaryIO, serial: bytes) -> int:
+    size = _file_size(f)
+    f.seek(max(0, size - PROBE_TAIL_SIZE))
+    tail = f.read()
+    pos = tail.rfind(b"OggS")
+    while pos >= 0:
+        if pos + 27 <= len(tail) and tail[pos + 14 : pos + 18] == serial:
+            granule = struct.unpack_from("<q", tail, pos + 6)[0]
+            if granule >= 0:
+                return granule
+        pos = tail.rfind(b"OggS", 0, pos)
+    raise ProbeError("Не найдена последняя страница OGG")
+
+
+# MP4 / MOV
+
+
+def _mp4_boxes(f: BinaryIO, start: int, end: int) -> Iterator[tuple[bytes, int, int]]:
+    """Боксы в диапазоне: (тип, начало данных, конец)."""
+    pos = start
+    while pos + 8 <= end:
+        f.seek(pos)
+        size, box_type = struct.unpack(">I4s", _read_exact(f, 8))
+        header = 8
+        if size == 1:
+            size = struct.unpack(">Q", _read_exact(f, 8))[0]
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header:
+            raise ProbeError("Некорректный размер бокса MP4")
+        yield box_type, pos + header, min(pos + size, end)
+        pos += size
+
+
+def _probe_mp4(f: BinaryIO) -> MediaProbe:
+    for box_type, start, end in _mp4_boxes(f, 0, _file_size(f)):
+        if box_type == b"moov":
+            return _parse_moov(f, start, end)
+    raise ProbeError("В MP4 нет бокса moov")
+
+
+def _parse_moov(f: BinaryIO, start: int, end: int) -> MediaProbe:
+    duration = None
+    width = height = None
+    for box_type, box_start, box_end in _mp4_boxes(f, start, end):
+        if box_type == b"mvhd":
+            f.seek(box_start)
+            duration = _parse_mvhd(f.read(min(box_end - box_start, 32)))
+        elif box_type == b"trak" and width is None:
+            width, height = _parse_video_trak(f, box_start, box_end)
+    return MediaProbe(duration=duration, width=width, height=height)
+
+
+def _parse_mvhd(data: bytes) -> float | None:
+    if not data:
+        raise ProbeError("Пустой mvhd")
+    if data[0] == 1:
+        timescale, duration = struct.unpack_from(">IQ", data, 20)
+        unknown = duration == 0xFFFFFFFFFFFFFFFF
+    else:
+        timescale, duration = struct.unpack_from(">II", data, 12)
+        unknown = duration == 0xFFFFFFFF
+    if not timescale or unknown:
+        return None
+    return duration / timescale
+
+
+def _parse_video_trak(f: BinaryIO, start: int, end: int) -> tuple[int | None, int | None]:
+    tkhd = b""
+    is_video = False
+    for box_type, box_start, box_end in _mp4_boxes(f, start, end):
+        if box_type == b"tkhd":
+            f.seek(box_start)
+            tkhd = f.read(min(box_end - box_start, 96))
+        elif box_type == b"mdia":
+            for sub_type, sub_start, _ in _mp4_boxes(f, box_start, box_end):
+                if sub_type == b"hdlr":
+                    f.seek(sub_start + 8)
+                    is_video = f.read(4) == b"vide"
+    if not is_video or not tkhd:
+        return None, None
+
+    # Матрица и размер кадра (16.16) идут после полей, зависящих от версии
+    matrix_at = 40 if tkhd[0] == 0 else 52
+    if len(tkhd) < matrix_at + 44:
+        raise ProbeError("Обрезанный tkhd")
+    a, b, _, c, d = struct.unpack_from(">5i", tkhd, matrix_at)
+    width, height = struct.unpack_from(">II", tkhd, matrix_at + 36)
+    width, height = width >> 16, height >> 16
+    if a == 0 and d == 0 and b and c:
+        # Поворот на 90°/270° — кадр показывается с переставленными сторонами
+        width, height = height, width
+    return width, height
+
+
+# WebM / Matroska
+
+
+def _vint(data: bytes, pos: int, keep_marker: bool) -> tuple[int, int, bool]:
+    """EBML-число переменной длины: (значение, длина, все биты единицы)."""
+    if pos >= len(data):
+        raise ProbeError("Обрыв EBML")
+    first = data[pos]
+    length = 9 - first.bit_length() if first else 0
+    if not 1 <= length <= 8 or pos + length > len(data):
+        raise ProbeError("Некорректное EBML-число")
+    value = first if keep_marker else first & ((1 << (8 - length)) - 1)
+    for byte in data[pos + 1 : pos + length]:
+        value = (value << 8) | byte
+    all_ones = value == (1 << (7 * length)) - 1 and not keep_marker
+    return value, length, all_ones
+
+
+def _ebml_header(data: bytes, pos: int) -> tuple[int, int | None, int]:
+    """Заголовок элемента: (id, размер или None, начало данных)."""
+    element_id, id_len, _ = _vint(data, pos, keep_marker=True)
+    size, size_len, unknown = _vint(data, pos + id_len, keep_marker=False)
+    return element_id, None if unknown else size, pos + id_len + size_len
+
+
+def _ebml_children(data: bytes, start: int, end: int) -> Iterator[tuple[int, int, int]]:
+    pos = start
+    while pos < end:
+        element_id, size, data_start = _ebml_header(data, pos)
+        data_end = end if size is None else min(data_start + size, end)
+        yield element_id, data_start, data_end
+        pos = data_end
+
+
+def _ebml_uint(data: bytes) -> int:
+    return int.from_bytes(data, "big")
+
+
+def _read_element_header(f: BinaryIO) -> tuple[int, int | None, int]:
+    start = f.tell()
+    raw = f.read(12)
+    element_id, size, data_start = _ebml_header(raw, 0)
+    return element_id, size, start + data_start
+
+
+def _probe_matroska(f: BinaryIO) -> MediaProbe:
+    file_size = _file_size(f)
+    element_id, size, pos = _read_element_header(f)
+    if element_id != int.from_bytes(_EBML_MAGIC, "big") or size is None:
+        raise ProbeError("Нет заголовка EBML")
+    f.seek(pos + size)
+    element_id, size, pos = _read_element_header(f)
+    if element_id != _SEGMENT:
+        raise ProbeError("Нет сегмента Matroska")
+    segment_end = file_size if size is None else min(pos + size, file_size)
+
+    scale = 1_000_000
+    duration = None
+    width = height = None
+    while pos < segment_end:
+        f.seek(pos)
+        element_id, size, data_start = _read_element_header(f)
+        if element_id == _CLUSTER or size is None:
+            break
+        if element_id in (_INFO, _TRACKS) and size <= MAX_ELEMENT_SIZE:
+            f.seek(data_start)
+            payload = _read_exact(f, size)
+            if element_id == _INFO:
+                scale, duration = _parse_info(payload, scale)
+            else:
+                width, height = _parse_tracks(payload)
+        pos = data_start + size
+
+    if duration is None:
+        duration = _last_cluster_time(f, file_size)
+    return MediaProbe(
+        duration=duration * scale / 1e9 if duration is not None else None,
+        width=width,
+        height=height,
+    )
+
+
+def _parse_info(payload: bytes, scale: int) -> tuple[int, float | None]:
+    duration = None
+    for element_id, start, end in _ebml_children(payload, 0, len(payload)):
+        if element_id == _TIMECODE_SCALE:
+            scale = _ebml_uint(payload[start:end]) or scale
+        elif element_id == _DURATION and end - start in (4, 8):
+            duration = struct.unpack(">f" if end - start == 4 else ">d", payload[start:end])[0]
+    return scale, duration
+
+
+def _parse_tracks(payload: bytes) -> tuple[int | None, int | None]:
+    for element_id, start, end in _ebml_children(payload, 0, len(payload)):
+        if element_id != _TRACK_ENTRY:
+            continue
+        track_type = None
+        width = height = None
+        for child_id, child_start, child_end in _ebml_children(payload, start, end):
+            if child_id == _TRACK_TYPE:
+                track_type = _ebml_uint(payload[child_start:child_end])
+            elif child_id == _VIDEO:
+                for video_id, video_start, video_end in _ebml_children(
+                    payload, child_start, child_end
+                ):
+                    value = _ebml_uint(payload[video_start:video_end])
+                    if video_id == _PIXEL_WIDTH:
+                        width = value
+                    elif video_id == _PIXEL_HEIGHT:
+                        height = value
+        if track_type == 1 and width:
+            return width, height
+    return None, None
+
+
+def _last_cluster_time(f: BinaryIO, file_size: int) -> float | None:
+    """Метка времени последнего блока последнего кластера (в единицах TimecodeScale)."""
+    f.seek(max(0, file_size - PROBE_TAIL_SIZE))
+    tail = f.read()
+    marker = _CLUSTER.to_bytes(4, "big")
+    pos = tail.rfind(marker)
+    while pos >= 0:
+        found = _cluster_time(tail, pos)
+        if found is not None:
+            return found
+        pos = tail.rfind(marker, 0, pos)
+    return None
+
+
+def _cluster_time(tail: bytes, pos: int) -> float | None:
+    try:
+        _, size, start = _ebml_header(tail, pos)
+        end = len(tail) if size is None else min(start + size, len(tail))
+        children = _ebml_children(tail, start, end)
+        element_id, value_start, value_end = next(children)
+        # Кластер начинается с Timecode — иначе это совпадение внутри данных
+        if element_id != _CLUSTER_TIMECODE:
+            return None
+        cluster_time = _ebml_uint(tail[value_start:value_end])
+        latest = 0
+        for element_id, block_start, block_end in children:
+            if element_id == _BLOCK_GROUP:
+                block = next(
+                    (
+                        (s, e)
+                        for i, s, e in _ebml_children(tail, block_start, block_end)
+                        if i == _BLOCK
+                    ),
+                    None,
+                )
+                if block is None:
+                    continue
+                block_start, block_end = block
+            elif element_id != _SIMPLE_BLOCK:
+                continue
+            _, track_len, _ = _vint(tail, block_start, keep_marker=False)
+            if block_start + track_len + 2 <= block_end:
+                latest = max(latest, struct.unpack_from(">h", tail, block_start + track_len)[0])
+    except (ProbeError, StopIteration, struct.error):
+        return None
+    return float(cluster_time + latest)
@@ -0,0 +1,116 @@
+"""Пакетная загрузка контекста для списков сообщений.
+
+Для страницы сообщений из разных чатов (поиск, экспорт, подборки) нужны
+название чата, имя отправителя и признак вложений. ``MessageContextLoader``
+загружает их для всей страницы фиксированным числом запросов вместо
+нескольких запросов на каждое сообщение.
+"""
+
+import uuid
+from collections.abc import Iterable
+from dataclasses import dataclass
+from typing import Protocol
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.chat import Chat, ChatMember
+from src.models.media import MessageAttachment
+from src.models.user import User
+
+DEFAULT_CHAT_NAME = "Чат"
+
+
+class MessageRef(Protocol):
+    """Минимальные поля сообщения для загрузки контекста."""
+
+    @property
+    def id(self) -> uuid.UUID: ...
+
+    @property
+    def chat_id(self) -> uuid.UUID: ...
+
+    @property
+    def sender_id(self) -> uuid.UUID: ...
+
+
+@dataclass
+class MessageContext:
+    """Контекст сообщения для отображения в списке."""
+
+    chat_name: str
+    sender_name: str | None
+    has_media: bool
+
+
+class MessageContextLoader:
+    """Загрузчик контекста сообщений: не больше четырёх запросов на страницу.
+
+    Название чата без имени — имя первого другого участника (как у личного
+    чата в списке чатов текущего пользователя).
+    """
+
+    def __init__(self, db: AsyncSession) -> None:
+        self.db = db
+
+    async def load(
+        self,
+        messages: Iterable[MessageRef],
+        current_user_id: uuid.UUID,
+    ) -> dict[uuid.UUID, MessageContext]:
+        """Контекст по id сообщения. Сообщения удалённых чатов пропускаются."""
+        messages = list(messages)
+        if not messages:
+            return {}
+
+        chat_names = await self._load_chat_names({m.chat_id for m in messages}, current_user_id)
+        sender_names = await self._load_user_names({m.sender_id for m in messages})
+        with_media = await self._load_media_flags([m.id for m in messages])
+
+        return {
+            m.id: MessageContext(
+                chat_name=chat_names[m.chat_id],
+                sender_name=sender_names.get(m.sender_id),
+                has_media=m.id in with_media,
+            )
+            for m in messages
+            if m.chat_id in chat_names
+        }
+
+    async def _load_chat_names(
+        self,
+        chat_ids: set[uuid.UUID],
+        current_user_id: uuid.UUID,
+    ) -> dict[uuid.UUID, str]:
+        """Названия чатов; безымянные — по первому другому участнику."""
+        result = await self.db.execute(select(Chat.id, Chat.name).where(Chat.id.in_(chat_ids)))
+        names: dict[uuid.UUID, str | None] = dict(result.tuples().all())
+
+        unnamed = [chat_id for chat_id, name in names.items() if not name]
+        if unnamed:
+            peers = await self.db.execute(
+                select(ChatMember.chat_id, User.name)
+                .join(User, User.id == ChatMember.user_id)
+                .where(ChatMember.chat_id.in_(unnamed))
+                .where(ChatMember.user_id != current_user_id)
+                .order_by(ChatMember.chat_id, ChatMember.joined_at)
+            )
+            for chat_id, peer_name in peers.tuples():
+                if not names[chat_id]:
+                    names[chat_id] = peer_name
+
+        return {chat_id: name or DEFAULT_CHAT_NAME for chat_id, name in names.items()}
+
+    async def _load_user_names(self, user_ids: set[uuid.UUID]) -> dict[uuid.UUID, str]:
+        """Имена пользователей одним запросом."""
+        result = await self.db.execute(select(User.id, User.name).where(User.id.in_(user_ids)))
+        return dict(result.tuples().all())
+
+    async def _load_media_flags(self, message_ids: list[uuid.UUID]) -> set[uuid.UUID]:
+        """Сообщения, у которых есть вложения."""
+        result = await self.db.execute(
+            select(MessageAttachment.message_id)
+            .where(MessageAttachment.message_id.in_(message_ids))
+            .distinct()
+        )
+        return set(result.scalars().all())
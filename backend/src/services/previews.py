@@ -0,0 +1,285 @@
+"""Превью изображений в пуле процессов.
+
+После загрузки изображения запись получает ``preview_status = pending``, а её
+id ставится в ограниченную очередь процесса. Исполнители передают
+декодирование и масштабирование (Pillow) в ``ProcessPoolExecutor``: ни цикл
+событий, ни ответ на загрузку обработки не ждут. В пул одновременно попадает
+не больше ``workers`` изображений, остальные ждут в очереди.
+
+Загрузка никогда не блокируется на очереди: если она заполнена, запись
+остаётся ``pending`` и её подбирает периодический проход по БД — он же
+возвращает записи, потерянные при перезапуске процесса.
+
+Превью лежат рядом с blob и адресуются хешем содержимого, поэтому одинаковые
+изображения обрабатываются один раз: пока хеш обрабатывается, другие записи
+с тем же содержимым его не строят — их отметит общий UPDATE. Файлы пишутся
+через уникальный ``.part``, так что и параллельная сборка в разных процессах
+не портит результат.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import uuid
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+from pathlib import Path
+
+from PIL import ExifTags, Image, ImageOps
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.config import get_settings
+from src.db.session import get_session_factory
+from src.models.media import MediaFile, ProcessingStatus
+from src.services.blobs import preview_path
+
+logger = logging.getLogger(__name__)
+
+PREVIEW_SIZES = (128, 320, 800)
+# Размер, который отдаётся как thumbnail_url (пузырь сообщения)
+THUMBNAIL_SIZE = 320
+PREVIEW_QUALITY = 80
+
+PREVIEWABLE_MIME_TYPES = frozenset(
+    {"image/jpeg", "image/png", "image/gif", "image/webp", "image/bmp"}
+)
+
+# Ориентации EXIF, при которых ширина и высота меняются местами
+_TRANSPOSED_ORIENTATIONS = {5, 6, 7, 8}
+
+
+def initial_preview_status(mime_type: str) -> str | None:
+    """Статус превью новой записи: ``pending`` для изображений, иначе None."""
+    if mime_type in PREVIEWABLE_MIME_TYPES:
+        return ProcessingStatus.PENDING.value
+    return None
+
+
+def render_previews(source: str, targets: dict[int, str]) -> tuple[int, int]:
+    """Сохранить WebP-превью по сторонам из ``targets``; вернуть размер оригинала.
+
+    Выполняется в дочернем процессе. Каждое меньшее превью строится из
+    предыдущего, а не из оригинала; JPEG сразу декодируется в уменьшенном
+    масштабе (``draft``).
+    """
+    with Image.open(source) as image:
+        width, height = image.size
+        if image.getexif().get(ExifTags.Base.Orientation) in _TRANSPOSED_ORIENTATIONS:
+            width, height = height, width
+
+        largest = max(targets)
+        image.draft("RGB", (largest, largest))
+        current = ImageOps.exif_transpose(image)
+        has_alpha = "A" in current.getbands() or "transparency" in current.info
+        current = current.convert("RGBA" if has_alpha else "RGB")
+
+        for size in sorted(targets, reverse=True):
+            current.thumbnail((size, size), Image.Resampling.LANCZOS)
+            target = Path(targets[size])
+            target.parent.mkdir(parents=True, exist_ok=True)
+            partial = target.with_name(f"{target.name}.{uuid.uuid4().hex}.part")
+            try:
+                current.save(partial, "WEBP", quality=PREVIEW_QUALITY)
+                os.replace(partial, target)
+            finally:
+                partial.unlink(missing_ok=True)
+
+    return width, height
+
+
+class PreviewPipeline:
+    """Очередь и исполнители генерации превью этого процесса."""
+
+    def __init__(
+        self,
+        storage_path: str | Path,
+        workers: int,
+        queue_size: int,
+        backfill_interval: float,
+        session_factory: Callable[[], async_sessionmaker[AsyncSession]] = get_session_factory,
+    ) -> None:
+        self.storage_path = Path(storage_path)
+        self.workers = workers
+        self.backfill_interval = backfill_interval
+        self._session_factory = session_factory
+        self._queue: asyncio.Queue[uuid.UUID] = asyncio.Queue(queue_size)
+        # Записи в очереди и хеши, превью которых строятся сейчас
+        self._queued: set[uuid.UUID] = set()
+        self._rendering: set[str] = set()
+        self._pool: ProcessPoolExecutor | None = None
+        self._tasks: list[asyncio.Task[None]] = []
+
+    def start(self) -> None:
+        """Запустить пул процессов, исполнителей и проход по БД."""
+        if self._tasks:
+            return
+        self._pool = self._new_pool()
+        self._tasks = [asyncio.create_task(self._consume()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._backfill_loop()))
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+        )
+
+    async def stop(self) -> None:
+        """Остановить обработку; ожидающие записи подберутся после перезапуска."""
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def submit(self, media_id: uuid.UUID) -> bool:
+        """Поставить запись в очередь без ожидания; False — очередь заполнена."""
+        if media_id in self._queued:
+            return True
+        try:
+            self._queue.put_nowait(media_id)
+        except asyncio.QueueFull:
+            return False
+        self._queued.add(media_id)
+        return True
+
+    async def _consume(self) -> None:
+        while True:
+            media_id = await self._queue.get()
+            try:
+                await self.process(media_id)
+            except Exception:
+                logger.exception("Не удалось построить превью %s", media_id)
+            finally:
+                self._queued.discard(media_id)
+                self._queue.task_done()
+
+    async def process(self, media_id: uuid.UUID) -> bool:
+        """Построить превью записи; False — она уже обработана, удалена или
+        превью того же содержимого строятся другой задачей."""
+        async with self._session_factory()() as session:
+            media = (
+                await session.execute(
+                    select(MediaFile.storage_path, MediaFile.content_hash).where(
+                        MediaFile.id == media_id,
+                        MediaFile.preview_status == ProcessingStatus.PENDING.value,
+                    )
+                )
+            ).one_or_none()
+            if media is None or media.content_hash is None:
+                return False
+            values = await self._ready_copy(session, media.content_hash)
+
+        # Запись уже ожидает, поэтому её отметит UPDATE задачи, строящей этот хеш
+        if media.content_hash in self._rendering:
+            return False
+        self._rendering.add(media.content_hash)
+        try:
+            # Соединение с БД не удерживается, пока изображение обрабатывается
+            if values is None:
+                values = await self._render(media.storage_path, media.content_hash)
+
+            async with self._session_factory()() as session:
+                # Одним UPDATE — все ожидающие записи с тем же содержимым
+                await session.execute(
+                    update(MediaFile)
+                    .where(
+                        MediaFile.content_hash == media.content_hash,
+                        MediaFile.preview_status == ProcessingStatus.PENDING.value,
+                    )
+                    .values(**values)
+                )
+                await session.commit()
+        finally:
+            self._rendering.discard(media.content_hash)
+        return True
+
+    @staticmethod
+    async def _ready_copy(session: AsyncSession, content_hash: str) -> dict[str, object] | None:
+        """Данные превью, уже построенных для того же содержимого."""
+        ready = (
+            await session.execute(
+                select(MediaFile.width, MediaFile.height, MediaFile.thumbnail_path)
+                .where(
+                    MediaFile.content_hash == content_hash,
+                    MediaFile.preview_status == ProcessingStatus.READY.value,
+                )
+                .limit(1)
+            )
+        ).one_or_none()
+        if ready is None:
+            return None
+        return {
+            "preview_status": ProcessingStatus.READY.value,
+            "width": ready.width,
+            "height": ready.height,
+            "thumbnail_path": ready.thumbnail_path,
+        }
+
+    async def _render(self, source: str, content_hash: str) -> dict[str, object]:
+        targets = {
+            size: str(preview_path(self.storage_path, content_hash, size)) for size in PREVIEW_SIZES
+        }
+        loop = asyncio.get_running_loop()
+        pool = self._pool
+        try:
+            width, height = await loop.run_in_executor(pool, render_previews, source, targets)
+        except BrokenProcessPool:
+            # Дочерний процесс упал (например, нехватка памяти на этом файле)
+            logger.error("Пул превью перезапущен после сбоя на %s", content_hash)
+            if pool is not None and self._pool is pool:
+                pool.shutdown(wait=False)
+                self._pool = self._new_pool()
+            return {"preview_status": ProcessingStatus.FAILED.value}
+        except Exception as exc:
+            logger.warning("Превью %s не построены: %s", content_hash, exc)
+            return {"preview_status": ProcessingStatus.FAILED.value}
+        return {
+            "preview_status": ProcessingStatus.READY.value,
+            "width": width,
+            "height": height,
+            "thumbnail_path": targets[THUMBNAIL_SIZE],
+        }
+
+    async def backfill(self) -> int:
+        """Поставить в очередь давно ожидающие записи; вернуть их число."""
+        free = self._queue.maxsize - self._queue.qsize()
+        if free <= 0:
+            return 0
+        # Свежие записи уже в очереди у загрузившего их процесса
+        created_before = func.now() - timedelta(seconds=self.backfill_interval)
+        async with self._session_factory()() as session:
+            media_ids = (
+                await session.scalars(
+                    select(MediaFile.id)
+                    .where(
+                        MediaFile.preview_status == ProcessingStatus.PENDING.value,
+                        MediaFile.created_at < created_before,
+                    )
+                    .order_by(MediaFile.created_at)
+                    .limit(free)
+                )
+            ).all()
+        return sum(self.submit(media_id) for media_id in media_ids if media_id not in self._queued)
+
+    async def _backfill_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.backfill_interval)
+            try:
+                queued = await self.backfill()
+                if queued:
+                    logger.info("В очередь превью возвращено записей: %s", queued)
+            except Exception:
+                logger.exception("Не удалось подобрать ожидающие превью")
+
+
+preview_pipeline = PreviewPipeline(
+    storage_path=get_settings().media_storage_path,
+    workers=get_settings().preview_workers,
+    queue_size=get_settings().preview_queue_size,
+    backfill_interval=get_settings().preview_backfill_interval,
+)
@@ -0,0 +1,204 @@
+"""Поиск по сообщениям в PostgreSQL.
+
+Полнотекстовый режим проверяет ``messages.search_vector`` (GIN-индекс),
+запрос разбирается ``websearch_to_tsquery``: поддерживаются кавычки, ``or``
+и ``-``. Нечёткий режим (части слов, URL, опечатки) использует триграммный
+GIN-индекс ``pg_trgm`` на ``messages.content``.
+
+Общее число результатов считает ``SearchCounter``: ограниченный подсчёт
+до ``cap`` совпадений, точный — в фоне с кешем на последующие страницы.
+"""
+
+import asyncio
+import logging
+import re
+from collections.abc import Awaitable, Callable, Hashable, Sequence
+from typing import Any
+
+from sqlalchemy import ColumnElement, Float, Text, func, literal, or_, select
+from sqlalchemy.dialects.postgresql import REGCONFIG
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.config import get_settings
+from src.db.session import get_session_factory
+from src.models.chat import MESSAGE_SEARCH_CONFIG, Message
+from src.services.cache import TTLCache
+
+SessionSetup = Callable[[AsyncSession], Awaitable[None]]
+
+logger = logging.getLogger(__name__)
+
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_STOP = "</mark>"
+
+_HEADLINE_OPTIONS = (
+    f"StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_STOP}, "
+    'MaxWords=20, MinWords=8, MaxFragments=2, FragmentDelimiter=" ... "'
+)
+
+
+def _config() -> ColumnElement[str]:
+    return literal(MESSAGE_SEARCH_CONFIG, REGCONFIG)
+
+
+def build_ts_query(query: str) -> ColumnElement[str]:
+    """tsquery из пользовательского запроса."""
+    return func.websearch_to_tsquery(_config(), query)
+
+
+def match_condition(ts_query: ColumnElement[str]) -> ColumnElement[bool]:
+    """Условие совпадения сообщения с запросом (использует GIN-индекс)."""
+    return Message.search_vector.op("@@")(ts_query)
+
+
+def rank_expression(ts_query: ColumnElement[str]) -> ColumnElement[float]:
+    """Релевантность сообщения: плотность покрытия запроса."""
+    return func.ts_rank_cd(Message.search_vector, ts_query, type_=Float)
+
+
+def headline_expression(
+    content: ColumnElement[str], ts_query: ColumnElement[str]
+) -> ColumnElement[str]:
+    """Фрагменты текста с найденными словами в ``<mark>...</mark>``."""
+    return func.ts_headline(_config(), content, ts_query, _HEADLINE_OPTIONS, type_=Text)
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def fuzzy_condition(query: str) -> ColumnElement[bool]:
+    """Подстрока без учёта регистра или похожее слово (оба через триграммы)."""
+    return or_(
+        Message.content.ilike(f"%{_escape_like(query)}%", escape="\\"),
+        literal(query, Text).op("<%")(Message.content),
+    )
+
+
+def fuzzy_highlight(content: str, query: str) -> str | None:
+    """Вхождения запроса без учёта регистра в ``<mark>...</mark>``.
+
+    None, если сообщение найдено только по похожести слов (``<%``).
+    """
+    highlight, found = re.subn(
+        re.escape(query),
+        lambda match: f"{HIGHLIGHT_START}{match.group(0)}{HIGHLIGHT_STOP}",
+        content,
+        flags=re.IGNORECASE,
+    )
+    return highlight if found else None
+
+
+def similarity_expression(query: str) -> ColumnElement[float]:
+    """Похожесть запроса на наиболее близкий фрагмент сообщения."""
+    return func.word_similarity(literal(query, Text), Message.content, type_=Float)
+
+
+async def set_similarity_threshold(db: AsyncSession, threshold: float) -> None:
+    """Порог оператора ``<%`` до конца текущей транзакции."""
+    await db.execute(
+        select(func.set_config("pg_trgm.word_similarity_threshold", str(threshold), True))
+    )
+
+
+async def apply_similarity_threshold(db: AsyncSession) -> None:
+    """Порог нечёткого поиска из настроек для сессии."""
+    await set_similarity_threshold(db, get_settings().search_similarity_threshold)
+
+
+class SearchCounter:
+    """Подсчёт результатов поиска без полного count() на каждой странице.
+
+    Первая страница получает число совпадений, ограниченное ``cap``. Если
+    совпадений больше, точный count() запускается в фоне в отдельной сессии,
+    и последующие страницы того же запроса берут его из кеша. Фоновых подсчётов
+    одновременно не больше ``concurrency``: сверх этого число остаётся
+    приблизительным, а пул соединений не занимается.
+    """
+
+    def __init__(
+        self,
+        cap: int,
+        ttl: float,
+        concurrency: int = 4,
+        maxsize: int = 10000,
+        session_factory: Callable[[], async_sessionmaker[AsyncSession]] = get_session_factory,
+    ) -> None:
+        self.cap = cap
+        self.concurrency = concurrency
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._pending: dict[Hashable, asyncio.Task[None]] = {}
+        self._session_factory = session_factory
+
+    def cached(self, key: Hashable) -> int | None:
+        """Точное число из кеша."""
+        total: int | None = self._cache.get(key)
+        return total
+
+    async def estimate(
+        self,
+        db: AsyncSession,
+        key: Hashable,
+        conditions: Sequence[ColumnElement[Any]],
+        setup: SessionSetup | None = None,
+    ) -> tuple[int, bool]:
+        """Вернуть (число, точное ли оно), не считая больше ``cap`` строк."""
+        cached = self.cached(key)
+        if cached is not None:
+            return cached, True
+
+        matches = select(literal(1)).select_from(Message).where(*conditions).limit(self.cap + 1)
+        capped = await db.scalar(select(func.count()).select_from(matches.subquery())) or 0
+        if capped <= self.cap:
+            self._cache.set(key, capped)
+            return capped, True
+
+        self._schedule_exact(key, conditions, setup)
+        return self.cap, False
+
+    async def exact(
+        self,
+        db: AsyncSession,
+        key: Hashable,
+        conditions: Sequence[ColumnElement[Any]],
+    ) -> int:
+        """Точное число совпадений (из кеша или полным count())."""
+        cached = self.cached(key)
+        if cached is not None:
+            return cached
+        total = await db.scalar(select(func.count()).select_from(Message).where(*conditions)) or 0
+        self._cache.set(key, total)
+        return total
+
+    def _schedule_exact(
+        self,
+        key: Hashable,
+        conditions: Sequence[ColumnElement[Any]],
+        setup: SessionSetup | None,
+    ) -> None:
+        if key in self._pending or len(self._pending) >= self.concurrency:
+            return
+        task = asyncio.create_task(self._count_in_background(key, conditions, setup))
+        self._pending[key] = task
+        task.add_done_callback(lambda _: self._pending.pop(key, None))
+
+    async def _count_in_background(
+        self,
+        key: Hashable,
+        conditions: Sequence[ColumnElement[Any]],
+        setup: SessionSetup | None,
+    ) -> None:
+        try:
+            async with self._session_factory()() as session:
+                if setup is not None:
+                    await setup(session)
+                await self.exact(session, key, conditions)
+        except Exception:
+            logger.exception("Не удалось посчитать результаты поиска")
+
+
+search_counter = SearchCounter(
+    cap=get_settings().search_count_cap,
+    ttl=get_settings().search_count_cache_ttl,
+    concurrency=get_settings().search_count_concurrency,
+)
@@ -0,0 +1,101 @@
+"""Распознавание речи (STT) для транскрипции голосовых.
+
+Очередь транскрипции вызывает ``SpeechToText.transcribe`` и не знает, кто
+распознаёт речь. Реализация выбирается настройкой ``stt_backend``:
+
+- ``fake`` — локальная заглушка без внешних сервисов (разработка, тесты);
+- ``whisper_api`` — OpenAI-совместимый ``POST /audio/transcriptions``
+  (OpenAI Whisper API, faster-whisper-server, whisper.cpp server).
+"""
+
+import asyncio
+import mimetypes
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from pathlib import Path
+
+import httpx
+
+from src.config import Settings, get_settings
+
+
+class SpeechError(Exception):
+    """Сервис распознавания вернул ошибку."""
+
+
+@dataclass(frozen=True)
+class SpeechResult:
+    """Распознанный текст и язык (если сервис его определил)."""
+
+    text: str
+    language: str | None = None
+
+
+class SpeechToText(ABC):
+    """Сервис распознавания речи."""
+
+    @abstractmethod
+    async def transcribe(self, path: str, mime_type: str) -> SpeechResult: ...
+
+
+class FakeSpeechToText(SpeechToText):
+    """Заглушка: фиксированный текст после необязательной задержки."""
+
+    def __init__(
+        self, text: str = "[Транскрипция недоступна]", language: str = "ru", delay: float = 0.0
+    ) -> None:
+        self.text = text
+        self.language = language
+        self.delay = delay
+
+    async def transcribe(self, path: str, mime_type: str) -> SpeechResult:
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return SpeechResult(text=self.text, language=self.language)
+
+
+class WhisperApiSpeechToText(SpeechToText):
+    """OpenAI-совместимый HTTP API распознавания."""
+
+    def __init__(self, url: str, api_key: str, model: str, language: str | None = None) -> None:
+        self.url = url.rstrip("/") + "/audio/transcriptions"
+        self.api_key = api_key
+        self.model = model
+        self.language = language
+
+    async def transcribe(self, path: str, mime_type: str) -> SpeechResult:
+        content = await asyncio.to_thread(Path(path).read_bytes)
+        filename = "audio" + (mimetypes.guess_extension(mime_type) or "")
+        data = {"model": self.model, "response_format": "verbose_json"}
+        if self.language:
+            data["language"] = self.language
+        headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+
+        # Время ответа ограничивает очередь транскрипции, здесь — только подключение
+        async with httpx.AsyncClient(timeout=httpx.Timeout(None, connect=10.0)) as client:
+            try:
+                response = await client.post(
+                    self.url,
+                    data=data,
+                    files={"file": (filename, content, mime_type)},
+                    headers=headers,
+                )
+            except httpx.HTTPError as exc:
+                raise SpeechError(f"Сервис распознавания недоступен: {exc}") from exc
+        if response.is_error:
+            raise SpeechError(f"Сервис распознавания ответил {response.status_code}")
+        payload = response.json()
+        return SpeechResult(text=payload["text"].strip(), language=payload.get("language"))
+
+
+def create_speech_backend(settings: Settings | None = None) -> SpeechToText:
+    """Сервис распознавания из настроек."""
+    settings = settings or get_settings()
+    if settings.stt_backend == "fake":
+        return FakeSpeechToText()
+    return WhisperApiSpeechToText(
+        settings.stt_api_url,
+        settings.stt_api_key,
+        settings.stt_model,
+        settings.stt_language or None,
+    )
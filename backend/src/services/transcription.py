@@ -1,9 +1,8 @@
 """Сервис транскрипции голосовых сообщений."""
 
 import uuid
-from datetime import UTC, datetime
 
-from sqlalchemy import select
+from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.models.media import MediaFile, MediaType, Transcription, TranscriptionStatus
@@ -15,7 +14,9 @@ class TranscriptionService:
     def __init__(self, db: AsyncSession) -> None:
         self.db = db
 
-    async def create_transcription(self, media_id: uuid.UUID) -> Transcription:
+    async def create_transcription(
+        self, media_id: uuid.UUID, requested_by: uuid.UUID | None = None
+    ) -> Transcription:
         """Создать задачу транскрипции для голосового сообщения."""
         media = await self.db.get(MediaFile, media_id)
         if not media:
@@ -32,6 +33,7 @@ class TranscriptionService:
 
         transcription = Transcription(
             media_id=media_id,
+            requested_by=requested_by,
             status=TranscriptionStatus.PENDING.value,
             duration_seconds=media.duration_seconds,
         )
@@ -54,56 +56,27 @@ class TranscriptionService:
         """Получить транскрипцию по её ID."""
         return await self.db.get(Transcription, transcription_id)
 
-    async def update_status(
-        self,
-        transcription_id: uuid.UUID,
-        status: TranscriptionStatus,
-        text: str | None = None,
-        language: str | None = None,
-        error_message: str | None = None,
-    ) -> Transcription | None:
-        """Обновить статус транскрипции."""
-        transcription = await self.db.get(Transcription, transcription_id)
-        if not transcription:
-            return None
-
-        transcription.status = status.value
-
-        if status == TranscriptionStatus.COMPLETED:
-            transcription.text = text
-            transcription.language = language
-            transcription.completed_at = datetime.now(UTC)
-        elif status == TranscriptionStatus.FAILED:
-            transcription.error_message = error_message
-            transcription.completed_at = datetime.now(UTC)
-
-        await self.db.flush()
-        await self.db.refresh(transcription)
-
-        return transcription
+    async def retry_transcription(self, transcription_id: uuid.UUID) -> Transcription | None:
+        """Вернуть неудавшуюся транскрипцию в очередь; остальные вернуть как есть.
 
-    async def process_transcription(
-        self,
-        transcription_id: uuid.UUID,
-    ) -> Transcription | None:
-        """Обработать транскрипцию (заглушка для интеграции с STT).
-
-        В реальной реализации здесь будет вызов внешнего STT сервиса
-        (например, Whisper, Google Speech-to-Text, etc.)
+        Само распознавание выполняет фоновая очередь (``transcription_jobs``).
         """
-        transcription = await self.db.get(Transcription, transcription_id)
-        if not transcription:
-            return None
-
-        await self.update_status(
-            transcription_id,
-            TranscriptionStatus.PROCESSING,
+        transcription = await self.db.scalar(
+            update(Transcription)
+            .where(
+                Transcription.id == transcription_id,
+                Transcription.status == TranscriptionStatus.FAILED.value,
+            )
+            .values(
+                status=TranscriptionStatus.PENDING.value,
+                attempts=0,
+                error_message=None,
+                available_at=None,
+                completed_at=None,
+            )
+            .returning(Transcription)
+            .execution_options(populate_existing=True)
         )
-
-        # TODO: Здесь будет интеграция с STT сервисом
-        # Пример заглушки для демонстрации:
-        # - Получить аудиофайл по media_id
-        # - Отправить на STT сервис
-        # - Получить результат и обновить статус
-
-        return transcription
+        if transcription is not None:
+            return transcription
+        return await self.db.get(Transcription, transcription_id)
@@ -0,0 +1,391 @@
+"""Фоновая транскрипция голосовых сообщений.
+
+Задачи — строки ``transcriptions`` в статусе ``pending``. Каждый воркер
+приложения ведёт до ``workers`` распознаваний одновременно: свободные места
+заполняются одним UPDATE, который забирает пакет строк через
+``FOR UPDATE SKIP LOCKED`` и сразу возвращает путь к аудио. Пропускная
+способность задаётся числом исполнителей, а не запросами к API: эндпоинт
+только создаёт строку и будит очередь.
+
+Итоги завершившихся распознаваний копятся и записываются одним bulk UPDATE.
+Вызов STT ограничен ``timeout``; ошибка или таймаут возвращают задачу в
+очередь с задержкой, растущей с номером попытки, пока не исчерпан
+``max_attempts``. Задача в ``processing`` дольше ``stale_after`` (воркер упал
+или был остановлен) забирается заново.
+
+Голосовое длиннее ``segment_length`` режется на перекрывающиеся сегменты
+(``audio_segments``), которые распознаются параллельно; ``timeout`` действует
+на каждый сегмент.
+
+Запросивший транскрипцию получает по сокету ``job_event``: по мере
+готовности сегментов — прогресс с уже склеенным началом текста, после
+записи итога — результат, ошибку или возврат задачи в очередь.
+"""
+
+import asyncio
+import contextlib
+import itertools
+import logging
+import shutil
+import tempfile
+import uuid
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from typing import Any
+
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.config import get_settings
+from src.db.session import get_session_factory
+from src.models.media import MediaFile, Transcription, TranscriptionStatus
+from src.services.audio_segments import (
+    SEGMENT_MIME_TYPE,
+    can_split,
+    cut_segment,
+    merge_transcripts,
+    probe_duration,
+    segment_bounds,
+)
+from src.services.speech import SpeechResult, SpeechToText, create_speech_backend
+from src.websocket import manager
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class TranscriptionJob:
+    """Задача, забранная этим процессом."""
+
+    id: uuid.UUID
+    media_id: uuid.UUID
+    requested_by: uuid.UUID | None
+    attempts: int
+    storage_path: str
+    mime_type: str
+    duration_seconds: int | None
+
+
+def _utcnow() -> datetime:
+    return datetime.now(UTC).replace(tzinfo=None)
+
+
+def _outcome(
+    job_id: uuid.UUID,
+    status: TranscriptionStatus,
+    text: str | None = None,
+    language: str | None = None,
+    error: str | None = None,
+    available_at: datetime | None = None,
+) -> dict[str, Any]:
+    """Строка bulk UPDATE; набор ключей одинаков, чтобы пакет ушёл одним запросом."""
+    finished = status in (TranscriptionStatus.COMPLETED, TranscriptionStatus.FAILED)
+    return {
+        "id": job_id,
+        "status": status.value,
+        "text": text,
+        "language": language[:10] if language else None,
+        "error_message": error[:500] if error else None,
+        "available_at": available_at,
+        "completed_at": _utcnow() if finished else None,
+    }
+
+
+class TranscriptionQueue:
+    """Исполнители транскрипции этого процесса."""
+
+    def __init__(
+        self,
+        backend: SpeechToText,
+        workers: int,
+        poll_interval: float,
+        timeout: float,
+        stale_after: float,
+        max_attempts: int,
+        retry_delay: float,
+        segment_length: float = 30.0,
+        segment_overlap: float = 2.0,
+        segment_concurrency: int = 24,
+        emit_job_event: Callable[..., Awaitable[None]] = manager.emit_job_event,
+        session_factory: Callable[[], async_sessionmaker[AsyncSession]] = get_session_factory,
+    ) -> None:
+        self.backend = backend
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.stale_after = stale_after
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.segment_length = segment_length
+        self.segment_overlap = segment_overlap
+        self.segment_concurrency = segment_concurrency
+        self._emit_job_event = emit_job_event
+        self._session_factory = session_factory
+        self._wakeup = asyncio.Event()
+        self._running: set[asyncio.Task[None]] = set()
+        self._results: list[tuple[TranscriptionJob, dict[str, Any]]] = []
+        self._task: asyncio.Task[None] | None = None
+
+    def start(self) -> None:
+        """Запустить цикл выдачи задач."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        """Остановить обработку; прерванные задачи заберутся после ``stale_after``."""
+        tasks = list(self._running)
+        if self._task is not None:
+            tasks.append(self._task)
+            self._task = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._running.clear()
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception("Не удалось записать итоги транскрипции при остановке")
+
+    def notify(self) -> None:
+        """Разбудить очередь: появилась новая задача."""
+        self._wakeup.set()
+
+    async def _loop(self) -> None:
+        while True:
+            claimed = 0
+            try:
+                await self.flush()
+                free = self.workers - len(self._running)
+                if free > 0:
+                    jobs = await self.claim(free)
+                    for job in jobs:
+                        self._spawn(job)
+                    claimed = len(jobs)
+            except Exception:
+                logger.exception("Ошибка очереди транскрипции")
+            if not claimed:
+                # Будит новая задача или завершившееся распознавание
+                with contextlib.suppress(TimeoutError):
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                self._wakeup.clear()
+
+    def _spawn(self, job: TranscriptionJob) -> None:
+        task = asyncio.create_task(self._execute(job))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _execute(self, job: TranscriptionJob) -> None:
+        self._results.append((job, await self.run(job)))
+        self._wakeup.set()
+
+    async def claim(self, limit: int) -> list[TranscriptionJob]:
+        """Забрать до ``limit`` ожидающих или брошенных задач одним запросом."""
+        now = _utcnow()
+        stale_before = func.now() - timedelta(seconds=self.stale_after)
+        candidates = (
+            select(Transcription.id)
+            .where(
+                or_(
+                    and_(
+                        Transcription.status == TranscriptionStatus.PENDING.value,
+                        or_(
+                            Transcription.available_at.is_(None), Transcription.available_at <= now
+                        ),
+                    ),
+                    and_(
+                        Transcription.status == TranscriptionStatus.PROCESSING.value,
+                        Transcription.started_at < stale_before,
+                    ),
+                )
+            )
+            .order_by(Transcription.created_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        async with self._session_factory()() as session:
+            rows = (
+                await session.execute(
+                    update(Transcription)
+                    .where(Transcription.id.in_(candidates), MediaFile.id == Transcription.media_id)
+                    .values(
+                        status=TranscriptionStatus.PROCESSING.value,
+                        attempts=Transcription.attempts + 1,
+                        started_at=func.now(),
+                    )
+                    .returning(
+                        Transcription.id,
+                        Transcription.media_id,
+                        Transcription.requested_by,
+                        Transcription.attempts,
+                        MediaFile.storage_path,
+                        MediaFile.mime_type,
+                        MediaFile.duration_seconds,
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+            ).all()
+            await session.commit()
+        return [TranscriptionJob(*row) for row in rows]
+
+    async def run(self, job: TranscriptionJob) -> dict[str, Any]:
+        """Распознать аудио задачи; вернуть строку bulk UPDATE с итогом."""
+        if job.attempts > self.max_attempts:
+            return _outcome(job.id, TranscriptionStatus.FAILED, error="Превышено число попыток")
+        try:
+            result = await self.transcribe(job)
+        except Exception as exc:
+            if isinstance(exc, ExceptionGroup):
+                # Первая ошибка сегмента; остальные сегменты уже отменены
+                exc = exc.exceptions[0]
+            if isinstance(exc, TimeoutError):
+                error = "Превышено время распознавания"
+            else:
+                error = str(exc) or type(exc).__name__
+            logger.warning("Транскрипция %s (попытка %s): %s", job.id, job.attempts, error)
+            if job.attempts >= self.max_attempts:
+                return _outcome(job.id, TranscriptionStatus.FAILED, error=error)
+            retry_at = _utcnow() + timedelta(seconds=self.retry_delay * job.attempts)
+            return _outcome(job.id, TranscriptionStatus.PENDING, error=error, available_at=retry_at)
+        return _outcome(
+            job.id, TranscriptionStatus.COMPLETED, text=result.text, language=result.language
+        )
+
+    async def transcribe(self, job: TranscriptionJob) -> SpeechResult:
+        """Распознать аудио задачи целиком или параллельными сегментами."""
+        splittable = can_split()
+        duration: float | None = job.duration_seconds
+        if duration is None and splittable:
+            # Метаданные ещё не извлечены: без длительности длинная запись ушла бы
+            # в STT одним вызовом
+            duration = await probe_duration(job.storage_path)
+        bounds = segment_bounds(duration, self.segment_length, self.segment_overlap)
+        if len(bounds) == 1 or not splittable:
+            return await asyncio.wait_for(
+                self.backend.transcribe(job.storage_path, job.mime_type), self.timeout
+            )
+
+        results: list[SpeechResult | None] = [None] * len(bounds)
+        semaphore = asyncio.Semaphore(self.segment_concurrency)
+        workdir = Path(await asyncio.to_thread(tempfile.mkdtemp, prefix="transcription-"))
+
+        async def recognize(index: int, start: float, duration: float) -> SpeechResult:
+            target = workdir / f"{index}.wav"
+            await cut_segment(job.storage_path, start, duration, target)
+            return await self.backend.transcribe(str(target), SEGMENT_MIME_TYPE)
+
+        async def segment(index: int, start: float, duration: float) -> None:
+            async with semaphore:
+                results[index] = await asyncio.wait_for(
+                    recognize(index, start, duration), self.timeout
+                )
+            await self._emit_partial(job, results)
+
+        try:
+            async with asyncio.TaskGroup() as group:
+                for index, (start, duration) in enumerate(bounds):
+                    group.create_task(segment(index, start, duration))
+        finally:
+            await asyncio.to_thread(shutil.rmtree, workdir, True)
+
+        language = next((r.language for r in results if r and r.language), None)
+        return SpeechResult(merge_transcripts([r.text for r in results if r]), language)
+
+    async def _emit_partial(
+        self, job: TranscriptionJob, results: list[SpeechResult | None]
+    ) -> None:
+        """Отправить запросившему начало текста из готовых по порядку сегментов."""
+        ready = list(itertools.takewhile(lambda result: result is not None, results))
+        completed = sum(result is not None for result in results)
+        await self._emit(
+            job,
+            TranscriptionStatus.PROCESSING.value,
+            completed * 100 // len(results),
+            segments=len(results),
+            completed_segments=completed,
+            text=merge_transcripts([result.text for result in ready if result]),
+        )
+
+    async def _emit(
+        self, job: TranscriptionJob, status: str, progress: int | None, **data: Any
+    ) -> None:
+        if job.requested_by is None:
+            return
+        try:
+            await self._emit_job_event(
+                job.requested_by,
+                "transcription",
+                job.id,
+                status,
+                progress,
+                media_id=str(job.media_id),
+                **data,
+            )
+        except Exception:
+            logger.exception("Не удалось отправить событие транскрипции %s", job.id)
+
+    async def flush(self) -> int:
+        """Записать накопленные итоги одним запросом и сообщить о них; вернуть число записанных."""
+        results, self._results = self._results, []
+        if not results:
+            return 0
+        try:
+            async with self._session_factory()() as session:
+                # Строки, которые за это время удалили, вернули в очередь или забрали
+                # повторно как брошенные, не трогаются, и владельцу о них не сообщается
+                claimed = dict(
+                    (
+                        await session.execute(
+                            select(Transcription.id, Transcription.attempts)
+                            .where(
+                                Transcription.id.in_([job.id for job, _ in results]),
+                                Transcription.status == TranscriptionStatus.PROCESSING.value,
+                            )
+                            .with_for_update()
+                        )
+                    )
+                    .tuples()
+                    .all()
+                )
+                results = [
+                    (job, outcome)
+                    for job, outcome in results
+                    if claimed.get(job.id) == job.attempts
+                ]
+                if results:
+                    await session.execute(
+                        update(Transcription), [outcome for _, outcome in results]
+                    )
+                await session.commit()
+        except Exception:
+            self._results[:0] = results
+            raise
+        await asyncio.gather(
+            *(
+                self._emit(
+                    job,
+                    outcome["status"],
+                    100 if outcome["status"] == TranscriptionStatus.COMPLETED.value else None,
+                    text=outcome["text"],
+                    language=outcome["language"],
+                    error_message=outcome["error_message"],
+                )
+                for job, outcome in results
+            )
+        )
+        return len(results)
+
+
+transcription_queue = TranscriptionQueue(
+    backend=create_speech_backend(),
+    workers=get_settings().transcription_workers,
+    poll_interval=get_settings().transcription_poll_interval,
+    timeout=get_settings().transcription_timeout,
+    stale_after=get_settings().transcription_stale_after,
+    max_attempts=get_settings().transcription_max_attempts,
+    retry_delay=get_settings().transcription_retry_delay,
+    segment_length=get_settings().transcription_segment_length,
+    segment_overlap=get_settings().transcription_segment_overlap,
+    segment_concurrency=get_settings().transcription_segment_concurrency,
+)
@@ -0,0 +1,356 @@
+"""Возобновляемые загрузки медиа (по образцу протокола tus).
+
+Клиент создаёт сессию с итоговым размером файла и отправляет данные
+частями ``PATCH`` с заголовком ``Upload-Offset``. Принятые байты копятся в
+staging-файле; смещение в БД обновляется только после ``fsync``, поэтому
+после обрыва связи или падения воркера клиент запрашивает смещение и
+продолжает с него. Строка сессии блокируется лишь на проверку смещения, не
+на приём тела: каждый ``PATCH`` становится её писателем (``writer_id``), и
+смещение подтверждает только последний из них — предыдущий запрос, обрыв
+которого сервер ещё не заметил, не мешает возобновлению. Незавершённые
+сессии удаляются по истечении срока.
+
+Здесь же — сохранение однократной загрузки и постановка нового файла в
+фоновую обработку (превью, метаданные).
+"""
+
+import asyncio
+import contextlib
+import logging
+import os
+import uuid
+from collections.abc import AsyncIterable, Callable
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from typing import BinaryIO
+
+from fastapi import UploadFile
+from sqlalchemy import delete, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from starlette.requests import ClientDisconnect
+
+from src.config import get_settings
+from src.db.session import get_session_factory
+from src.models.media import MediaFile, MediaType, ProcessingStatus, UploadSession
+from src.services.blobs import BlobStore, hash_file, incoming_path
+from src.services.media import (
+    UPLOAD_CHUNK_SIZE,
+    generate_filename,
+    get_max_size,
+    get_media_type,
+    is_allowed_file,
+    save_upload,
+)
+from src.services.media_metadata import initial_metadata_status, metadata_worker
+from src.services.previews import initial_preview_status, preview_pipeline
+
+logger = logging.getLogger(__name__)
+
+
+class UploadError(Exception):
+    """Ошибка операции с возобновляемой загрузкой."""
+
+    def __init__(self, message: str, code: str):
+        self.message = message
+        self.code = code
+        super().__init__(message)
+
+
+def new_media_file(
+    uploader_id: uuid.UUID,
+    media_type: str,
+    original_filename: str,
+    mime_type: str,
+    file_size: int,
+    storage_path: str,
+    content_hash: str,
+) -> MediaFile:
+    """Запись MediaFile для сохранённого blob с очередями фоновой обработки."""
+    return MediaFile(
+        uploader_id=uploader_id,
+        media_type=media_type,
+        filename=generate_filename(original_filename),
+        original_filename=original_filename,
+        mime_type=mime_type,
+        file_size=file_size,
+        storage_path=storage_path,
+        content_hash=content_hash,
+        preview_status=initial_preview_status(mime_type),
+        metadata_status=initial_metadata_status(mime_type, media_type),
+    )
+
+
+async def store_upload(
+    db: AsyncSession,
+    file: UploadFile,
+    uploader_id: uuid.UUID,
+    mime_type: str,
+    media_type: MediaType,
+) -> MediaFile:
+    """Сохранить загрузку как blob и создать MediaFile.
+
+    Превышение лимита размера — ``FileTooLargeError``.
+    """
+    incoming = incoming_path(get_settings().media_storage_path)
+    stored = await save_upload(file, incoming, get_max_size(media_type))
+    storage_path = await BlobStore(db).add(incoming, stored.sha256, stored.size)
+
+    media = new_media_file(
+        uploader_id,
+        media_type.value,
+        file.filename or incoming.name,
+        mime_type,
+        stored.size,
+        storage_path,
+        stored.sha256,
+    )
+    db.add(media)
+    await db.flush()
+    await db.refresh(media)
+    return media
+
+
+def needs_processing(media: MediaFile) -> bool:
+    """Ждёт ли файл фоновой обработки."""
+    pending = ProcessingStatus.PENDING.value
+    return pending in (media.preview_status, media.metadata_status)
+
+
+def schedule_processing(media: MediaFile) -> None:
+    """Поставить зафиксированную запись в очереди фоновой обработки."""
+    if media.preview_status == ProcessingStatus.PENDING.value:
+        preview_pipeline.submit(media.id)
+    if media.metadata_status == ProcessingStatus.PENDING.value:
+        metadata_worker.notify()
+
+
+def _utcnow() -> datetime:
+    return datetime.now(UTC).replace(tzinfo=None)
+
+
+def _open_staging(path: Path, offset: int) -> BinaryIO:
+    """Открыть staging-файл, отбросив байты после подтверждённого смещения."""
+    handle = open(path, "r+b" if path.exists() else "wb")
+    handle.truncate(offset)
+    handle.seek(offset)
+    return handle
+
+
+def _sync_and_close(handle: BinaryIO) -> None:
+    handle.flush()
+    os.fsync(handle.fileno())
+    handle.close()
+
+
+class ResumableUploadService:
+    """Сессии возобновляемых загрузок пользователя."""
+
+    def __init__(
+        self,
+        db: AsyncSession,
+        staging_path: str | Path | None = None,
+        ttl: int | None = None,
+    ) -> None:
+        settings = get_settings()
+        self.db = db
+        self.staging_path = Path(staging_path or settings.upload_staging_path)
+        self.ttl = ttl if ttl is not None else settings.upload_session_ttl
+
+    def _expires_at(self) -> datetime:
+        return _utcnow() + timedelta(seconds=self.ttl)
+
+    async def create(
+        self,
+        uploader_id: uuid.UUID,
+        filename: str,
+        size: int,
+        mime_type: str,
+        is_voice: bool = False,
+    ) -> UploadSession:
+        """Создать сессию загрузки файла известного размера."""
+        if not is_allowed_file(mime_type):
+            raise UploadError("Тип файла не разрешён", "file_type_not_allowed")
+
+        media_type = get_media_type(mime_type, is_voice)
+        if size > get_max_size(media_type):
+            raise UploadError("Файл слишком большой", "file_too_large")
+
+        upload_id = uuid.uuid4()
+        staging = self.staging_path / f"{upload_id}.part"
+        await asyncio.to_thread(self.staging_path.mkdir, parents=True, exist_ok=True)
+        await asyncio.to_thread(staging.touch)
+
+        upload = UploadSession(
+            id=upload_id,
+            uploader_id=uploader_id,
+            media_type=media_type.value,
+            original_filename=filename,
+            mime_type=mime_type,
+            total_size=size,
+            offset=0,
+            staging_path=str(staging),
+            expires_at=self._expires_at(),
+        )
+        self.db.add(upload)
+        await self.db.flush()
+        return upload
+
+    async def get(
+        self,
+        upload_id: uuid.UUID,
+        uploader_id: uuid.UUID,
+        for_update: bool = False,
+    ) -> UploadSession:
+        """Сессия загрузки пользователя; ``for_update`` блокирует строку."""
+        upload = await self.db.get(UploadSession, upload_id, with_for_update=for_update)
+        if upload is None or upload.uploader_id != uploader_id:
+            raise UploadError("Загрузка не найдена", "upload_not_found")
+        if upload.expires_at <= _utcnow():
+            raise UploadError("Срок загрузки истёк", "upload_expired")
+        return upload
+
+    async def append(
+        self,
+        upload_id: uuid.UUID,
+        uploader_id: uuid.UUID,
+        offset: int,
+        chunks: AsyncIterable[bytes],
+    ) -> UploadSession:
+        """Дописать часть с позиции ``offset``.
+
+        Строка сессии блокируется только на проверку смещения и захват
+        записи, тело принимается без транзакции. Смещение подтверждается
+        условным UPDATE, если за это время его не сдвинул и запись не
+        перехватил другой ``PATCH``. Если клиент отключился, сохраняется всё,
+        что успело прийти.
+        """
+        upload = await self.get(upload_id, uploader_id, for_update=True)
+        if offset != upload.offset:
+            raise UploadError("Смещение не совпадает с принятым", "offset_mismatch")
+        writer_id = uuid.uuid4()
+        upload.writer_id = writer_id
+        total_size = upload.total_size
+        path = Path(upload.staging_path)
+        await self.db.commit()
+
+        handle = await asyncio.to_thread(_open_staging, path, offset)
+        written = offset
+        buffer = bytearray()
+        try:
+            with contextlib.suppress(ClientDisconnect):
+                async for chunk in chunks:
+                    if written + len(buffer) + len(chunk) > total_size:
+                        raise UploadError("Данных больше заявленного размера", "file_too_large")
+                    buffer += chunk
+                    if len(buffer) >= UPLOAD_CHUNK_SIZE:
+                        await asyncio.to_thread(handle.write, bytes(buffer))
+                        written += len(buffer)
+                        buffer.clear()
+            if buffer:
+                await asyncio.to_thread(handle.write, bytes(buffer))
+                written += len(buffer)
+        finally:
+            await asyncio.to_thread(_sync_and_close, handle)
+
+        confirmed = await self.db.scalar(
+            update(UploadSession)
+            .where(
+                UploadSession.id == upload_id,
+                UploadSession.offset == offset,
+                UploadSession.writer_id == writer_id,
+            )
+            .values(offset=written, expires_at=self._expires_at(), writer_id=None)
+            .returning(UploadSession)
+            .execution_options(populate_existing=True)
+        )
+        if confirmed is None:
+            raise UploadError("Загрузку продолжил другой запрос", "offset_mismatch")
+        return confirmed
+
+    async def complete(self, upload_id: uuid.UUID, uploader_id: uuid.UUID) -> MediaFile:
+        """Перенести полностью принятый файл в хранилище blob и создать MediaFile."""
+        upload = await self.get(upload_id, uploader_id, for_update=True)
+        if upload.offset != upload.total_size:
+            raise UploadError("Загрузка не завершена", "upload_incomplete")
+
+        sha256 = await hash_file(upload.staging_path)
+        storage_path = await BlobStore(self.db).add(upload.staging_path, sha256, upload.total_size)
+
+        media = new_media_file(
+            uploader_id,
+            upload.media_type,
+            upload.original_filename,
+            upload.mime_type,
+            upload.total_size,
+            storage_path,
+            sha256,
+        )
+        self.db.add(media)
+        await self.db.delete(upload)
+        await self.db.flush()
+        await self.db.refresh(media)
+        return media
+
+    async def abort(self, upload_id: uuid.UUID, uploader_id: uuid.UUID) -> None:
+        """Отменить загрузку и удалить принятые данные."""
+        upload = await self.get(upload_id, uploader_id, for_update=True)
+        await self.db.delete(upload)
+        await self.db.flush()
+        await asyncio.to_thread(Path(upload.staging_path).unlink, True)
+
+
+async def cleanup_expired_uploads(db: AsyncSession) -> int:
+    """Удалить просроченные сессии и их staging-файлы; вернуть их число."""
+    result = await db.execute(
+        delete(UploadSession)
+        .where(UploadSession.expires_at <= _utcnow())
+        .returning(UploadSession.staging_path)
+    )
+    paths = list(result.scalars().all())
+    await db.commit()
+    for path in paths:
+        await asyncio.to_thread(Path(path).unlink, True)
+    return len(paths)
+
+
+class UploadCleaner:
+    """Периодическая очистка просроченных загрузок процесса."""
+
+    def __init__(
+        self,
+        interval: float,
+        session_factory: Callable[[], async_sessionmaker[AsyncSession]] = get_session_factory,
+    ) -> None:
+        self.interval = interval
+        self._session_factory = session_factory
+        self._task: asyncio.Task[None] | None = None
+
+    async def run_once(self) -> int:
+        """Одна очистка в отдельной сессии."""
+        async with self._session_factory()() as session:
+            return await cleanup_expired_uploads(session)
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                removed = await self.run_once()
+                if removed:
+                    logger.info("Удалено просроченных загрузок: %s", removed)
+            except Exception:
+                logger.exception("Не удалось очистить просроченные загрузки")
+
+    def start(self) -> None:
+        """Запустить периодическую очистку."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        """Остановить очистку."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+upload_cleaner = UploadCleaner(interval=get_settings().upload_cleanup_interval)
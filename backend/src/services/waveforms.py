@@ -0,0 +1,113 @@
+"""Пики громкости голосовых сообщений для отрисовки волны.
+
+Голосовое декодируется один раз в дочернем процессе: WAV — стандартным
+модулем ``wave``, остальные форматы — через ``ffmpeg`` в моно 16 бит. Сигнал
+сводится к ``WAVEFORM_BUCKETS`` пикам (максимум модуля амплитуды в отрезке),
+нормированным к 0–255, и хранится в записи медиафайла ``WAVEFORM_BUCKETS``
+байтами — клиенту не нужно скачивать аудио, чтобы нарисовать пузырь.
+"""
+
+import shutil
+import subprocess
+import wave
+
+import numpy as np
+
+WAVEFORM_BUCKETS = 100
+# Частота декодирования через ffmpeg: для пиков на 100 отрезков её с запасом
+WAVEFORM_SAMPLE_RATE = 8000
+DECODE_TIMEOUT = 60.0
+
+_WAV_MIME_TYPES = frozenset({"audio/wav", "audio/wave", "audio/x-wav"})
+
+
+class WaveformError(Exception):
+    """Аудио не удалось декодировать."""
+
+
+def _wav_amplitudes(path: str) -> tuple[np.ndarray, int]:
+    try:
+        with wave.open(path, "rb") as wav:
+            channels = wav.getnchannels()
+            width = wav.getsampwidth()
+            rate = wav.getframerate()
+            frames = wav.readframes(wav.getnframes())
+    except (wave.Error, EOFError) as exc:
+        raise WaveformError(f"Некорректный WAV: {exc}") from exc
+
+    if width == 1:
+        samples = np.frombuffer(frames, np.uint8).astype(np.int32) - 128
+    elif width == 2:
+        samples = np.frombuffer(frames, "<i2").astype(np.int32)
+    elif width == 3:
+        raw = np.frombuffer(frames, np.uint8).reshape(-1, 3).astype(np.int32)
+        # 24 бита little-endian со знаком: сдвигом влево и обратно
+        samples = ((raw[:, 0] | raw[:, 1] << 8 | raw[:, 2] << 16) << 8) >> 8
+    elif width == 4:
+        samples = np.frombuffer(frames, "<i4").astype(np.int64)
+    else:
+        raise WaveformError(f"Неподдерживаемая разрядность WAV: {width}")
+
+    samples = samples[: samples.size - samples.size % channels]
+    # Пик кадра — максимум по каналам
+    return np.abs(samples.reshape(-1, channels)).max(axis=1), rate
+
+
+def _ffmpeg_amplitudes(path: str) -> tuple[np.ndarray, int]:
+    executable = shutil.which("ffmpeg")
+    if executable is None:
+        raise WaveformError("ffmpeg недоступен")
+    command = [
+        executable,
+        "-nostdin",
+        "-v",
+        "error",
+        "-i",
+        path,
+        "-f",
+        "s16le",
+        "-ac",
+        "1",
+        "-ar",
+        str(WAVEFORM_SAMPLE_RATE),
+        "-",
+    ]
+    try:
+        # Путь файла передаётся отдельным аргументом, без оболочки
+        result = subprocess.run(  # noqa: S603
+            command, capture_output=True, timeout=DECODE_TIMEOUT, check=False
+        )
+    except subprocess.TimeoutExpired as exc:
+        raise WaveformError("Декодирование прервано по таймауту") from exc
+    if result.returncode != 0:
+        message = result.stderr.decode(errors="replace").strip()[:200]
+        raise WaveformError(f"ffmpeg: {message}")
+    samples = np.frombuffer(result.stdout[: len(result.stdout) // 2 * 2], "<i2")
+    return np.abs(samples.astype(np.int32)), WAVEFORM_SAMPLE_RATE
+
+
+def compute_peaks(amplitudes: np.ndarray, buckets: int = WAVEFORM_BUCKETS) -> bytes:
+    """Свести модули амплитуд к ``buckets`` пикам 0–255 (по байту на пик)."""
+    if amplitudes.size == 0:
+        return bytes(buckets)
+    starts = np.linspace(0, amplitudes.size, buckets, endpoint=False).astype(np.intp)
+    peaks = np.maximum.reduceat(amplitudes, starts).astype(np.float64)
+    loudest = peaks.max()
+    if loudest <= 0:
+        return bytes(buckets)
+    return np.rint(peaks * 255 / loudest).astype(np.uint8).tobytes()
+
+
+def render_waveform(source: str, mime_type: str) -> tuple[bytes, float]:
+    """Пики громкости и длительность (сек) аудиофайла.
+
+    Выполняется в дочернем процессе.
+    """
+    base_type = mime_type.split(";", 1)[0].strip().lower()
+    if base_type in _WAV_MIME_TYPES:
+        amplitudes, rate = _wav_amplitudes(source)
+    else:
+        amplitudes, rate = _ffmpeg_amplitudes(source)
+    if amplitudes.size == 0:
+        raise WaveformError("Аудио не содержит сэмплов")
+    return compute_peaks(amplitudes), amplitudes.size / rate
@@ -1,5 +1,6 @@
 """WebSocket модуль для real-time коммуникации."""
 
 from src.websocket.manager import ConnectionManager, manager
+from src.websocket.pubsub import LocalPubSubBroker, LocalPubSubManager
 
-__all__ = ["ConnectionManager", "manager"]
+__all__ = ["ConnectionManager", "LocalPubSubBroker", "LocalPubSubManager", "manager"]
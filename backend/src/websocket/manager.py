@@ -7,9 +7,21 @@ from dataclasses import dataclass
 from typing import Any
 
 import socketio
+from sqlalchemy import select
 
 from src.config import get_settings
+from src.db.session import get_session_factory
+from src.models.contact import Contact, ContactStatus
 from src.services.auth import AuthService
+from src.websocket.presence import (
+    PresenceStore,
+    PresenceTracker,
+    create_presence_store,
+)
+from src.websocket.pubsub import create_client_manager
+
+# Канал событий фоновых задач (транскрипция, экспорт)
+JOB_EVENT = "job_event"
 
 
 @dataclass
@@ -20,13 +32,34 @@ class UserConnection:
     user_id: uuid.UUID
 
 
+def user_room(user_id: uuid.UUID) -> str:
+    """Комната всех соединений пользователя (на любом узле)."""
+    return f"user:{user_id}"
+
+
 class ConnectionManager:
-    """Менеджер WebSocket соединений."""
+    """Менеджер WebSocket соединений.
 
-    def __init__(self) -> None:
+    Рассылка идёт через комнаты Socket.IO, поэтому при client manager с
+    pub/sub бэкендом (Redis) события доходят до сокетов на всех воркерах.
+    Онлайн-статус хранится в общем ``PresenceStore`` с TTL heartbeat.
+    """
+
+    def __init__(
+        self,
+        client_manager: socketio.AsyncManager | None = None,
+        presence_store: PresenceStore | None = None,
+    ) -> None:
         settings = get_settings()
+        if client_manager is None:
+            client_manager = create_client_manager(settings)
+        if presence_store is None:
+            presence_store = create_presence_store(
+                settings.ws_message_queue, settings.redis_url
+            )
         self.sio = socketio.AsyncServer(
             async_mode="asgi",
+            client_manager=client_manager,
             cors_allowed_origins=settings.cors_origins,
             logger=settings.debug,
             engineio_logger=settings.debug,
@@ -36,6 +69,13 @@ class ConnectionManager:
         self._connections: dict[str, UserConnection] = {}
         self._user_sids: dict[uuid.UUID, set[str]] = {}
 
+        self.presence = PresenceTracker(
+            store=presence_store,
+            ttl=settings.presence_ttl,
+            offline_grace=settings.presence_offline_grace,
+            on_change=self._broadcast_presence,
+        )
+
         self._register_handlers()
 
     def _register_handlers(self) -> None:  # noqa: C901
@@ -56,22 +96,13 @@ class ConnectionManager:
             if not user_id:
                 return False
 
-            self._connections[sid] = UserConnection(sid=sid, user_id=user_id)
-
-            if user_id not in self._user_sids:
-                self._user_sids[user_id] = set()
-            self._user_sids[user_id].add(sid)
-
+            await self.register_connection(sid, user_id)
             return True
 
         @self.sio.event  # type: ignore[untyped-decorator]
         async def disconnect(sid: str) -> None:
             """Обработка отключения."""
-            conn = self._connections.pop(sid, None)
-            if conn and conn.user_id in self._user_sids:
-                self._user_sids[conn.user_id].discard(sid)
-                if not self._user_sids[conn.user_id]:
-                    del self._user_sids[conn.user_id]
+            await self.unregister_connection(sid)
 
         @self.sio.event  # type: ignore[untyped-decorator]
         async def join_chat(sid: str, data: dict[str, Any]) -> dict[str, Any]:
@@ -118,6 +149,66 @@ class ConnectionManager:
                 skip_sid=sid,
             )
 
+    async def start(self) -> None:
+        """Запустить client manager до первого подключения.
+
+        Pub/sub менеджер начинает слушать канал сразу, а не при первом
+        сокете на этом воркере.
+        """
+        if not self.sio.manager_initialized:
+            self.sio.manager_initialized = True
+            self.sio.manager.initialize()
+        self.presence.start()
+
+    async def stop(self) -> None:
+        """Остановить heartbeat присутствия и снять записи этого воркера."""
+        await self.presence.stop()
+
+    async def register_connection(self, sid: str, user_id: uuid.UUID) -> None:
+        """Зарегистрировать соединение пользователя."""
+        self._connections[sid] = UserConnection(sid=sid, user_id=user_id)
+
+        if user_id not in self._user_sids:
+            self._user_sids[user_id] = set()
+        self._user_sids[user_id].add(sid)
+
+        await self.sio.enter_room(sid, user_room(user_id))
+        await self.presence.connected(user_id)
+
+    async def unregister_connection(self, sid: str) -> UserConnection | None:
+        """Удалить соединение. Комнаты сокета очищает сам Socket.IO."""
+        conn = self._connections.pop(sid, None)
+        if conn is None:
+            return None
+        if conn.user_id in self._user_sids:
+            self._user_sids[conn.user_id].discard(sid)
+            if not self._user_sids[conn.user_id]:
+                del self._user_sids[conn.user_id]
+        await self.presence.disconnected(conn.user_id)
+        return conn
+
+    async def load_presence_watchers(self, user_id: uuid.UUID) -> list[uuid.UUID]:
+        """Пользователи, у которых user_id в принятых контактах."""
+        async with get_session_factory()() as session:
+            result = await session.execute(
+                select(Contact.owner_id).where(
+                    Contact.contact_id == user_id,
+                    Contact.status == ContactStatus.ACCEPTED.value,
+                )
+            )
+            return list(result.scalars().all())
+
+    async def _broadcast_presence(self, user_id: uuid.UUID, online: bool) -> None:
+        """Разослать смену онлайн-статуса контактам одним событием."""
+        watchers = await self.load_presence_watchers(user_id)
+        if not watchers:
+            return
+        await self.sio.emit(
+            "user_online" if online else "user_offline",
+            {"user_id": str(user_id)},
+            room=[user_room(watcher) for watcher in watchers],
+        )
+
     async def emit_new_message(
         self,
         chat_id: uuid.UUID,
@@ -155,14 +246,41 @@ class ConnectionManager:
         event: str,
         data: dict[str, Any],
     ) -> None:
-        """Отправить событие конкретному пользователю."""
-        sids = self._user_sids.get(user_id, set())
-        for sid in sids:
-            await self.sio.emit(event, data, to=sid)
+        """Отправить событие всем соединениям пользователя на всех узлах."""
+        await self.sio.emit(event, data, room=user_room(user_id))
+
+    async def emit_job_event(
+        self,
+        user_id: uuid.UUID,
+        job_type: str,
+        job_id: uuid.UUID,
+        status: str,
+        progress: int | None = None,
+        **data: Any,
+    ) -> None:
+        """Отправить владельцу прогресс или итог фоновой задачи.
+
+        Событие ``job_event``: ``type`` (``transcription``, ``export``), ``id``,
+        ``status``, ``progress`` (0-100 или None) и поля, зависящие от типа
+        задачи. GET-эндпоинты задач остаются
+        запасным вариантом для клиентов без сокета.
+        """
+        payload = {
+            "type": job_type,
+            "id": str(job_id),
+            "status": status,
+            "progress": progress,
+            **data,
+        }
+        await self.emit_to_user(user_id, JOB_EVENT, payload)
 
     def is_user_online(self, user_id: uuid.UUID) -> bool:
-        """Проверить, онлайн ли пользователь."""
+        """Проверить, онлайн ли пользователь на этом воркере."""
         return user_id in self._user_sids and len(self._user_sids[user_id]) > 0
 
+    async def are_online(self, user_ids: list[uuid.UUID]) -> set[uuid.UUID]:
+        """Пакетно проверить онлайн-статус пользователей по всему кластеру."""
+        return await self.presence.are_online(user_ids)
+
 
 manager = ConnectionManager()
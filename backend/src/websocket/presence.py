@@ -0,0 +1,259 @@
+"""Присутствие пользователей (онлайн/офлайн) в масштабе кластера.
+
+Каждый воркер хранит число локальных соединений пользователя и периодически
+публикует его в общее хранилище с TTL. Если воркер упал и перестал слать
+heartbeat, его записи истекают сами. Онлайн-статус — наличие хотя бы одной
+неистёкшей записи с ненулевым числом соединений на любом узле.
+
+Хранилища:
+
+- ``RedisPresenceStore`` — HASH ``presence:<user_id>`` {node_id: "count:expires_at"};
+- ``LocalPresenceStore`` — in-process заменитель для одного процесса и тестов.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections.abc import Awaitable, Callable, Iterable
+
+from redis.asyncio import Redis
+
+PresenceCallback = Callable[[uuid.UUID, bool], Awaitable[None]]
+
+
+class PresenceStore(ABC):
+    """Хранилище числа соединений пользователей по узлам."""
+
+    @abstractmethod
+    async def set_connections(
+        self,
+        node_id: str,
+        counts: dict[uuid.UUID, int],
+        ttl: float,
+    ) -> None:
+        """Записать (продлить) число соединений пользователей на узле."""
+
+    @abstractmethod
+    async def remove(self, node_id: str, user_id: uuid.UUID) -> None:
+        """Удалить запись пользователя для узла."""
+
+    @abstractmethod
+    async def connection_counts(self, user_ids: Iterable[uuid.UUID]) -> dict[uuid.UUID, int]:
+        """Суммарное число живых соединений по всем узлам."""
+
+    async def are_online(self, user_ids: Iterable[uuid.UUID]) -> set[uuid.UUID]:
+        """Пакетная проверка: кто из пользователей онлайн."""
+        counts = await self.connection_counts(user_ids)
+        return {user_id for user_id, count in counts.items() if count > 0}
+
+    async def close(self) -> None:
+        """Освободить ресурсы хранилища."""
+        # Хранилищу без соединений освобождать нечего
+        return None
+
+
+class LocalPresenceStore(PresenceStore):
+    """In-process хранилище с той же семантикой TTL, что и Redis."""
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic) -> None:
+        self._clock = clock
+        self._entries: dict[uuid.UUID, dict[str, tuple[int, float]]] = {}
+
+    async def set_connections(
+        self,
+        node_id: str,
+        counts: dict[uuid.UUID, int],
+        ttl: float,
+    ) -> None:
+        expires_at = self._clock() + ttl
+        for user_id, count in counts.items():
+            self._entries.setdefault(user_id, {})[node_id] = (count, expires_at)
+
+    async def remove(self, node_id: str, user_id: uuid.UUID) -> None:
+        nodes = self._entries.get(user_id)
+        if nodes is not None:
+            nodes.pop(node_id, None)
+            if not nodes:
+                del self._entries[user_id]
+
+    async def connection_counts(self, user_ids: Iterable[uuid.UUID]) -> dict[uuid.UUID, int]:
+        now = self._clock()
+        return {
+            user_id: sum(
+                count
+                for count, expires_at in self._entries.get(user_id, {}).values()
+                if expires_at > now
+            )
+            for user_id in user_ids
+        }
+
+
+class RedisPresenceStore(PresenceStore):
+    """Хранилище присутствия в Redis: один HASH на пользователя."""
+
+    def __init__(self, redis: Redis, prefix: str = "presence") -> None:
+        self.redis = redis
+        self.prefix = prefix
+
+    def _key(self, user_id: uuid.UUID) -> str:
+        return f"{self.prefix}:{user_id}"
+
+    async def set_connections(
+        self,
+        node_id: str,
+        counts: dict[uuid.UUID, int],
+        ttl: float,
+    ) -> None:
+        if not counts:
+            return
+        expires_at = time.time() + ttl
+        key_ttl = max(int(ttl), 1)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for user_id, count in counts.items():
+                key = self._key(user_id)
+                pipe.hset(key, node_id, f"{count}:{expires_at}")
+                pipe.expire(key, key_ttl)
+            await pipe.execute()
+
+    async def remove(self, node_id: str, user_id: uuid.UUID) -> None:
+        await self.redis.hdel(self._key(user_id), node_id)
+
+    async def connection_counts(self, user_ids: Iterable[uuid.UUID]) -> dict[uuid.UUID, int]:
+        ids = list(user_ids)
+        if not ids:
+            return {}
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for user_id in ids:
+                pipe.hvals(self._key(user_id))
+            rows = await pipe.execute()
+
+        now = time.time()
+        counts: dict[uuid.UUID, int] = {}
+        for user_id, values in zip(ids, rows, strict=True):
+            total = 0
+            for value in values:
+                count, _, expires_at = str(value).partition(":")
+                if float(expires_at) > now:
+                    total += int(count)
+            counts[user_id] = total
+        return counts
+
+    async def close(self) -> None:
+        await self.redis.aclose()
+
+
+class PresenceTracker:
+    """Присутствие пользователей одного воркера.
+
+    Переходы онлайн/офлайн сглаживаются: после отключения последнего сокета
+    событие ``offline`` отправляется только если за ``offline_grace`` секунд
+    пользователь не подключился снова ни на одном узле.
+    """
+
+    def __init__(
+        self,
+        store: PresenceStore,
+        ttl: float,
+        offline_grace: float,
+        on_change: PresenceCallback | None = None,
+        node_id: str | None = None,
+    ) -> None:
+        self.store = store
+        self.ttl = ttl
+        self.offline_grace = offline_grace
+        self.on_change = on_change
+        self.node_id = node_id or uuid.uuid4().hex
+        self._counts: dict[uuid.UUID, int] = {}
+        self._pending_offline: dict[uuid.UUID, asyncio.Task[None]] = {}
+        self._heartbeat_task: asyncio.Task[None] | None = None
+
+    async def connected(self, user_id: uuid.UUID) -> None:
+        """Учесть новое соединение пользователя на этом узле."""
+        pending = self._pending_offline.pop(user_id, None)
+        was_online = pending is not None or bool(await self.store.are_online([user_id]))
+        if pending is not None:
+            pending.cancel()
+
+        self._counts[user_id] = self._counts.get(user_id, 0) + 1
+        await self.store.set_connections(self.node_id, {user_id: self._counts[user_id]}, self.ttl)
+
+        if not was_online:
+            await self._notify(user_id, True)
+
+    async def disconnected(self, user_id: uuid.UUID) -> None:
+        """Учесть закрытие соединения пользователя на этом узле."""
+        count = self._counts.get(user_id, 0) - 1
+        if count > 0:
+            self._counts[user_id] = count
+            await self.store.set_connections(self.node_id, {user_id: count}, self.ttl)
+            return
+
+        self._counts.pop(user_id, None)
+        await self.store.remove(self.node_id, user_id)
+        if user_id not in self._pending_offline:
+            self._pending_offline[user_id] = asyncio.create_task(self._debounced_offline(user_id))
+
+    async def _debounced_offline(self, user_id: uuid.UUID) -> None:
+        try:
+            await asyncio.sleep(self.offline_grace)
+            if not await self.store.are_online([user_id]):
+                await self._notify(user_id, False)
+        finally:
+            if self._pending_offline.get(user_id) is asyncio.current_task():
+                del self._pending_offline[user_id]
+
+    async def _notify(self, user_id: uuid.UUID, online: bool) -> None:
+        if self.on_change is not None:
+            await self.on_change(user_id, online)
+
+    def local_count(self, user_id: uuid.UUID) -> int:
+        """Число соединений пользователя на этом узле."""
+        return self._counts.get(user_id, 0)
+
+    async def are_online(self, user_ids: Iterable[uuid.UUID]) -> set[uuid.UUID]:
+        """Пакетная проверка онлайн-статуса по всему кластеру."""
+        return await self.store.are_online(user_ids)
+
+    async def heartbeat(self) -> None:
+        """Продлить TTL всех локальных пользователей одним пакетом."""
+        await self.store.set_connections(self.node_id, dict(self._counts), self.ttl)
+
+    async def _heartbeat_loop(self) -> None:
+        interval = self.ttl / 3
+        while True:
+            await asyncio.sleep(interval)
+            with contextlib.suppress(Exception):
+                await self.heartbeat()
+
+    def start(self) -> None:
+        """Запустить фоновые heartbeat."""
+        if self._heartbeat_task is None:
+            self._heartbeat_task = asyncio.create_task(self._heartbeat_loop())
+
+    async def stop(self) -> None:
+        """Остановить heartbeat и снять записи этого узла."""
+        tasks = list(self._pending_offline.values())
+        if self._heartbeat_task is not None:
+            tasks.append(self._heartbeat_task)
+            self._heartbeat_task = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._pending_offline.clear()
+
+        for user_id in list(self._counts):
+            with contextlib.suppress(Exception):
+                await self.store.remove(self.node_id, user_id)
+        self._counts.clear()
+        await self.store.close()
+
+
+def create_presence_store(message_queue: str, redis_url: str) -> PresenceStore:
+    """Создать хранилище присутствия под выбранный режим кластера."""
+    if message_queue == "redis":
+        return RedisPresenceStore(Redis.from_url(redis_url, decode_responses=True))
+    return LocalPresenceStore()
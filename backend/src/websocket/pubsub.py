@@ -0,0 +1,88 @@
+"""Межпроцессная рассылка событий Socket.IO.
+
+При нескольких воркерах uvicorn (или подах) события, отправленные в комнату
+или пользователю, должны дойти до сокетов на всех узлах. Для этого
+``socketio.AsyncServer`` получает client manager с pub/sub бэкендом:
+
+- ``redis`` — ``socketio.AsyncRedisManager`` поверх ``Settings.redis_url``;
+- ``memory`` — стандартный in-process менеджер (один процесс, без Redis).
+
+``LocalPubSubBroker`` и ``LocalPubSubManager`` — in-process заменитель Redis:
+несколько серверов в одном процессе обмениваются событиями так же, как
+воркеры через Redis. Используется в тестах многоузловой рассылки.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncIterator
+from typing import Any
+
+import socketio
+from socketio.async_pubsub_manager import AsyncPubSubManager
+
+from src.config import Settings
+
+
+class LocalPubSubBroker:
+    """In-process шина сообщений с семантикой Redis PUBLISH/SUBSCRIBE."""
+
+    def __init__(self) -> None:
+        self._subscribers: dict[str, set[asyncio.Queue[Any]]] = {}
+
+    def subscribe(self, channel: str) -> asyncio.Queue[Any]:
+        """Подписаться на канал."""
+        queue: asyncio.Queue[Any] = asyncio.Queue()
+        self._subscribers.setdefault(channel, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, channel: str, queue: asyncio.Queue[Any]) -> None:
+        """Отписаться от канала."""
+        subscribers = self._subscribers.get(channel)
+        if subscribers:
+            subscribers.discard(queue)
+            if not subscribers:
+                del self._subscribers[channel]
+
+    async def publish(self, channel: str, message: Any) -> int:
+        """Опубликовать сообщение. Возвращает число получателей."""
+        subscribers = self._subscribers.get(channel, set())
+        for queue in subscribers:
+            queue.put_nowait(message)
+        return len(subscribers)
+
+
+class LocalPubSubManager(AsyncPubSubManager):  # type: ignore[misc]
+    """Client manager Socket.IO поверх ``LocalPubSubBroker``."""
+
+    name = "localpubsub"
+
+    def __init__(
+        self,
+        broker: LocalPubSubBroker,
+        channel: str = "socketio",
+        write_only: bool = False,
+    ) -> None:
+        super().__init__(channel=channel, write_only=write_only)
+        self.broker = broker
+
+    async def _publish(self, data: dict[str, Any]) -> int:
+        return await self.broker.publish(self.channel, self.json.dumps(data))
+
+    async def _listen(self) -> AsyncIterator[Any]:
+        queue = self.broker.subscribe(self.channel)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self.broker.unsubscribe(self.channel, queue)
+
+
+def create_client_manager(settings: Settings) -> socketio.AsyncManager | None:
+    """Создать client manager по настройкам (None — локальный по умолчанию)."""
+    if settings.ws_message_queue == "redis":
+        return socketio.AsyncRedisManager(
+            settings.redis_url,
+            channel=settings.ws_channel,
+        )
+    return None
@@ -7,6 +7,13 @@ from unittest.mock import AsyncMock, MagicMock
 import pytest
 
 from src.services.auth import AuthError, AuthService
+from src.services.auth_cache import (
+    UserPrincipal,
+    invalidate_user,
+    principal_cache,
+    token_cache,
+)
+from src.services.cache import TTLCache
 
 
 class TestAuthService:
@@ -157,3 +164,119 @@ class TestAuthServicePasswordSecurity:
         # Но оба хеша валидны
         assert auth_service._verify_password(password, hash1)
         assert auth_service._verify_password(password, hash2)
+
+
+class FakeClock:
+    """Управляемые часы для проверки TTL."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestTTLCache:
+    """Тесты TTLCache."""
+
+    def test_entry_expires(self):
+        """Запись недоступна после истечения TTL."""
+        clock = FakeClock()
+        cache = TTLCache(maxsize=10, ttl=30, clock=clock)
+        cache.set("a", 1)
+
+        clock.now = 29
+        assert cache.get("a") == 1
+        clock.now = 30
+        assert cache.get("a") is None
+
+    def test_per_entry_ttl_capped(self):
+        """Собственный TTL записи не превышает TTL кеша."""
+        clock = FakeClock()
+        cache = TTLCache(maxsize=10, ttl=30, clock=clock)
+        cache.set("short", 1, ttl=5)
+        cache.set("long", 2, ttl=100)
+        cache.set("expired", 3, ttl=-1)
+
+        clock.now = 10
+        assert cache.get("short") is None
+        assert cache.get("long") == 2
+        assert cache.get("expired") is None
+
+    def test_lru_eviction(self):
+        """При переполнении вытесняется давно не использованная запись."""
+        cache = TTLCache(maxsize=2, ttl=30)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert len(cache) == 2
+
+
+class TestAuthCache:
+    """Тесты кеширования токенов и принципала."""
+
+    @pytest.fixture(autouse=True)
+    def clear_caches(self):
+        """Изолировать тесты от общего кеша процесса."""
+        token_cache.clear()
+        principal_cache.clear()
+        yield
+        token_cache.clear()
+        principal_cache.clear()
+
+    @pytest.fixture
+    def mock_db(self):
+        """Мок сессии БД."""
+        return AsyncMock()
+
+    def test_verified_token_cached(self, mock_db, monkeypatch):
+        """Повторная проверка токена не декодирует JWT."""
+        service = AuthService(mock_db)
+        user_id = uuid.uuid4()
+        token = service._create_access_token(user_id)
+        assert service.verify_access_token(token) == user_id
+
+        def fail(*args, **kwargs):
+            raise AssertionError("jwt.decode не должен вызываться")
+
+        monkeypatch.setattr("src.services.auth.jwt.decode", fail)
+        assert service.verify_access_token(token) == user_id
+
+    def test_invalid_token_not_cached(self, mock_db):
+        """Невалидные токены не занимают место в кеше."""
+        AuthService(mock_db).verify_access_token("invalid_token")
+
+        assert len(token_cache) == 0
+
+    async def test_principal_loaded_once(self, mock_db):
+        """Принципал загружается из БД один раз, затем берётся из кеша."""
+        user_id = uuid.uuid4()
+        row = MagicMock(id=user_id, is_active=True)
+        row.name = "Иван"
+        result = MagicMock()
+        result.one_or_none.return_value = row
+        mock_db.execute.return_value = result
+        service = AuthService(mock_db)
+
+        first = await service.get_principal(user_id)
+        second = await service.get_principal(user_id)
+
+        assert first == second == UserPrincipal(id=user_id, name="Иван", is_active=True)
+        assert mock_db.execute.await_count == 1
+
+    async def test_invalidate_user_forces_reload(self, mock_db):
+        """После сброса принципал перечитывается из БД."""
+        user_id = uuid.uuid4()
+        principal_cache.set(user_id, UserPrincipal(id=user_id, name="Старое", is_active=True))
+        result = MagicMock()
+        result.one_or_none.return_value = None
+        mock_db.execute.return_value = result
+
+        invalidate_user(user_id)
+
+        assert await AuthService(mock_db).get_principal(user_id) is None
+        assert mock_db.execute.await_count == 1
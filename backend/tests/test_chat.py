@@ -163,3 +163,256 @@ class TestChatSchemas:
         data = MessageListResponse(messages=[], total=0, has_more=False)
         assert data.messages == []
         assert data.has_more is False
+
+
+class TestChatListService:
+    """Тесты пакетной сборки списка чатов."""
+
+    def test_chat_cursor_roundtrip(self):
+        """Курсор списка чатов кодируется и раскодируется без потерь."""
+        from src.services.chat import decode_chat_cursor, encode_chat_cursor
+
+        updated_at = datetime(2026, 1, 21, 12, 30, 15, 123456)
+        chat_id = uuid.uuid4()
+
+        cursor = encode_chat_cursor(updated_at, chat_id)
+        assert decode_chat_cursor(cursor) == (updated_at, chat_id)
+
+    def test_chat_cursor_invalid(self):
+        """Невалидный курсор вызывает ValueError."""
+        import pytest
+
+        from src.services.chat import decode_chat_cursor
+
+        with pytest.raises(ValueError):
+            decode_chat_cursor("не-курсор")
+        with pytest.raises(ValueError):
+            decode_chat_cursor("")
+
+    def test_build_message_response_deleted_sender(self):
+        """Сообщение удалённого пользователя."""
+        from src.models.chat import Message
+        from src.services.chat import DELETED_USER_NAME, build_message_response
+
+        message = Message(
+            id=uuid.uuid4(),
+            chat_id=uuid.uuid4(),
+            sender_id=uuid.uuid4(),
+            content="Привет!",
+            status="sent",
+            created_at=datetime.now(UTC),
+        )
+        response = build_message_response(message, None)
+        assert response.sender_name == DELETED_USER_NAME
+
+    def test_chat_list_response_defaults(self):
+        """ChatListResponse без курсора."""
+        from src.schemas.chat import ChatListResponse
+
+        data = ChatListResponse(chats=[], total=0)
+        assert data.next_cursor is None
+        assert data.has_more is False
+
+    def test_unread_count_by_seq(self):
+        """Непрочитанные считаются вычитанием счётчиков."""
+        from src.models.chat import Chat, ChatMember
+        from src.services.chat import get_unread_count
+
+        chat = Chat(message_seq=42)
+        member = ChatMember(last_read_seq=30, unread_excluded=2)
+        assert get_unread_count(chat, member) == 10
+
+    def test_unread_count_never_negative(self):
+        """Счётчик непрочитанных не уходит в минус."""
+        from src.models.chat import Chat, ChatMember
+        from src.services.chat import get_unread_count
+
+        chat = Chat(message_seq=5)
+        member = ChatMember(last_read_seq=5, unread_excluded=1)
+        assert get_unread_count(chat, member) == 0
+
+    def test_message_cursor_roundtrip(self):
+        """Курсор сообщений кодирует seq."""
+        from src.services.chat import decode_message_cursor, encode_message_cursor
+
+        assert decode_message_cursor(encode_message_cursor(12345)) == 12345
+
+    def test_message_cursor_rejects_chat_cursor(self):
+        """Курсор списка чатов не подходит для сообщений."""
+        import pytest
+
+        from src.services.chat import decode_message_cursor, encode_chat_cursor
+
+        with pytest.raises(ValueError):
+            decode_message_cursor(encode_chat_cursor(datetime.now(UTC), uuid.uuid4()))
+
+    def test_message_list_response_cursors(self):
+        """MessageListResponse с курсорами в обе стороны."""
+        from src.schemas.chat import MessageListResponse
+
+        data = MessageListResponse(
+            messages=[],
+            total=0,
+            has_more=True,
+            has_newer=True,
+            prev_cursor="abc",
+            next_cursor="def",
+        )
+        assert data.prev_cursor == "abc"
+        assert data.next_cursor == "def"
+
+
+class TestSendMessage:
+    """Тесты отправки сообщения одним запросом."""
+
+    @staticmethod
+    def _db(row=None, is_member=True):
+        from unittest.mock import AsyncMock, MagicMock
+
+        db = AsyncMock()
+        result = MagicMock()
+        result.one_or_none.return_value = row
+        db.execute.return_value = result
+        db.scalar.return_value = is_member
+        return db
+
+    async def test_single_round_trip(self):
+        """Успешная отправка — один запрос с INSERT ... RETURNING."""
+        from types import SimpleNamespace
+
+        from sqlalchemy.dialects import postgresql
+
+        from src.services.chat import ChatService
+
+        chat_id, sender_id = uuid.uuid4(), uuid.uuid4()
+        row = SimpleNamespace(
+            id=uuid.uuid4(),
+            chat_id=chat_id,
+            sender_id=sender_id,
+            seq=7,
+            content="Привет",
+            status=MessageStatus.SENT.value,
+            reply_to_id=None,
+            edited_at=None,
+            created_at=datetime.now(UTC),
+            sender_name="Иван",
+        )
+        db = self._db(row)
+
+        response = await ChatService(db).send_message(chat_id, sender_id, "Привет")
+
+        assert response.id == row.id
+        assert response.sender_name == "Иван"
+        assert db.execute.await_count == 1
+        assert db.scalar.await_count == 0
+
+        sql = str(db.execute.await_args.args[0].compile(dialect=postgresql.dialect()))
+        assert "UPDATE chats" in sql
+        assert "INSERT INTO messages" in sql
+        assert "UPDATE chat_members" in sql
+        assert "RETURNING" in sql
+
+    async def test_not_member_rejected(self):
+        """Не участник чата получает access_denied."""
+        import pytest
+
+        from src.services.chat import ChatError, ChatService
+
+        db = self._db(row=None, is_member=False)
+
+        with pytest.raises(ChatError) as exc:
+            await ChatService(db).send_message(uuid.uuid4(), uuid.uuid4(), "Привет")
+        assert exc.value.code == "access_denied"
+
+    async def test_foreign_reply_rejected(self):
+        """Ответ на сообщение из другого чата отклоняется."""
+        import pytest
+
+        from src.services.chat import ChatError, ChatService
+
+        db = self._db(row=None, is_member=True)
+
+        with pytest.raises(ChatError) as exc:
+            await ChatService(db).send_message(
+                uuid.uuid4(), uuid.uuid4(), "Привет", reply_to_id=uuid.uuid4()
+            )
+        assert exc.value.code == "reply_not_found"
+
+
+class TestMessagePage:
+    """Тесты окна сообщений по seq."""
+
+    @staticmethod
+    def _db(seqs, anchor_seq=None):
+        from unittest.mock import AsyncMock, MagicMock
+
+        from src.models.chat import Message
+
+        chat_id = uuid.uuid4()
+        rows = [
+            (
+                Message(
+                    id=uuid.uuid4(),
+                    chat_id=chat_id,
+                    sender_id=uuid.uuid4(),
+                    seq=seq,
+                    content=f"#{seq}",
+                    status=MessageStatus.SENT.value,
+                    created_at=datetime.now(UTC),
+                ),
+                "Иван",
+            )
+            for seq in seqs
+        ]
+        db = AsyncMock()
+        result = MagicMock()
+        result.all.return_value = rows
+        db.execute.return_value = result
+        db.scalar.return_value = anchor_seq
+        return db, chat_id
+
+    async def test_after_without_older_messages(self):
+        """after у начала чата: has_older вычисляется по данным."""
+        from src.services.chat import ChatService, encode_message_cursor
+
+        db, chat_id = self._db([1, 2])
+        page = await ChatService(db).get_message_page(chat_id, 10, after=encode_message_cursor(0))
+        assert [m.content for m in page.messages] == ["#1", "#2"]
+        assert page.has_older is False
+        assert page.has_newer is False
+        assert page.prev_cursor is None
+
+    async def test_after_with_older_messages(self):
+        """Строка не новее якоря означает, что есть более старые сообщения."""
+        from src.services.chat import ChatService, decode_message_cursor, encode_message_cursor
+
+        db, chat_id = self._db([5, 6, 7, 8])
+        page = await ChatService(db).get_message_page(chat_id, 2, after=encode_message_cursor(5))
+        assert [m.content for m in page.messages] == ["#6", "#7"]
+        assert page.has_older is True
+        assert page.has_newer is True
+        assert decode_message_cursor(page.prev_cursor) == 6
+        assert decode_message_cursor(page.next_cursor) == 7
+
+    async def test_before_message_id(self):
+        """before по ID сообщения разрешается в seq и видит более новые."""
+        from src.services.chat import ChatService
+
+        db, chat_id = self._db([3, 4, 5], anchor_seq=5)
+        page = await ChatService(db).get_message_page(chat_id, 2, before=str(uuid.uuid4()))
+        assert [m.content for m in page.messages] == ["#3", "#4"]
+        assert page.has_older is False
+        assert page.has_newer is True
+
+    async def test_unknown_anchor_rejected(self):
+        """ID сообщения не из этого чата — message_not_found, а не пустая страница."""
+        import pytest
+
+        from src.services.chat import ChatError, ChatService
+
+        for anchor in ("before", "after", "around"):
+            db, chat_id = self._db([], anchor_seq=None)
+            with pytest.raises(ChatError) as exc:
+                await ChatService(db).get_message_page(chat_id, 10, **{anchor: str(uuid.uuid4())})
+            assert exc.value.code == "message_not_found"
+            db.execute.assert_not_awaited()
@@ -0,0 +1,66 @@
+"""Тесты engine и пула соединений."""
+
+import asyncio
+
+from src.config import get_settings
+from src.db import session as db_session
+
+
+class TestEngineLifecycle:
+    """Тесты жизненного цикла engine."""
+
+    def test_engine_is_shared(self):
+        """Engine создаётся один раз на процесс."""
+        try:
+            engine = db_session.get_engine()
+            assert db_session.get_engine() is engine
+            assert db_session.get_session_factory() is db_session.get_session_factory()
+        finally:
+            asyncio.run(db_session.dispose_engine())
+
+    def test_pool_uses_settings(self):
+        """Размер пула берётся из настроек."""
+        settings = get_settings()
+        try:
+            engine = db_session.init_engine()
+            pool = engine.sync_engine.pool
+            assert isinstance(pool, db_session.InstrumentedQueuePool)
+            assert pool.size() == settings.db_pool_size
+            assert pool._max_overflow == settings.db_max_overflow
+        finally:
+            asyncio.run(db_session.dispose_engine())
+
+    def test_dispose_resets_engine(self):
+        """После dispose создаётся новый engine."""
+        engine = db_session.init_engine()
+        asyncio.run(db_session.dispose_engine())
+
+        assert db_session.get_pool_stats()["initialized"] is False
+        try:
+            assert db_session.init_engine() is not engine
+        finally:
+            asyncio.run(db_session.dispose_engine())
+
+
+class TestPoolMetrics:
+    """Тесты метрик пула."""
+
+    def test_record_wait(self):
+        """Учёт времени ожидания."""
+        metrics = db_session.PoolMetrics()
+        metrics.record_wait(0.5)
+        metrics.record_wait(0.2)
+
+        assert metrics.wait_time_total == 0.7
+        assert metrics.wait_time_max == 0.5
+
+    def test_pool_stats_with_engine(self):
+        """Статистика пула после инициализации."""
+        try:
+            db_session.init_engine()
+            stats = db_session.get_pool_stats()
+            assert stats["initialized"] is True
+            assert stats["size"] == get_settings().db_pool_size
+            assert stats["checked_out"] == 0
+        finally:
+            asyncio.run(db_session.dispose_engine())
@@ -144,3 +144,412 @@ class TestExportSchemas:
         )
         assert data.name == "Рабочий чат"
         assert data.message_count == 100
+
+
+class _StreamResult:
+    """Результат db.stream: асинхронный итератор по строкам."""
+
+    def __init__(self, rows):
+        self._rows = rows
+
+    def __aiter__(self):
+        async def iterate():
+            for row in self._rows:
+                yield row
+
+        return iterate()
+
+
+class TestStreamingExport:
+    """Тесты потокового экспорта."""
+
+    @staticmethod
+    def _rows(count):
+        now = datetime(2024, 1, 1, 12, 0)
+        sender = uuid.uuid4()
+        return [
+            (seq, uuid.uuid4(), sender, "Иван", f"сообщение {seq}", now, None)
+            for seq in range(1, count + 1)
+        ]
+
+    @staticmethod
+    def _header():
+        from src.services.export import ExportHeader
+
+        return ExportHeader(
+            chat_id=uuid.uuid4(),
+            chat_name="Команда",
+            chat_type="group",
+            exported_at=datetime(2024, 1, 2, tzinfo=UTC),
+        )
+
+    @staticmethod
+    def _db(rows, batch_size):
+        from unittest.mock import AsyncMock
+
+        db = AsyncMock()
+        db.stream.side_effect = [
+            _StreamResult(rows[i : i + batch_size]) for i in range(0, len(rows) + 1, batch_size)
+        ]
+        return db
+
+    async def _export(self, export_format, rows, batch_size=2):
+        from src.services.export import ChatExporter, create_encoder
+
+        db = self._db(rows, batch_size)
+        exporter = ChatExporter(db, batch_size=batch_size)
+        encoder = create_encoder(export_format)
+        chunks = [chunk async for chunk in exporter.stream_body(self._header(), encoder)]
+        chunks.append(encoder.end(exporter.message_count).encode("utf-8"))
+        return exporter, db, chunks
+
+    async def test_json_streamed_by_batches(self) -> None:
+        """JSON собирается из фрагментов по пакетам и остаётся валидным."""
+        import json
+
+        from src.schemas.export import ExportFormat
+
+        exporter, db, chunks = await self._export(ExportFormat.JSON, self._rows(5))
+
+        # начало, три пакета (2 + 2 + 1), конец
+        assert len(chunks) == 5
+        assert db.stream.await_count == 3
+        data = json.loads(b"".join(chunks))
+        assert data["chat_name"] == "Команда"
+        assert data["message_count"] == 5
+        assert [m["seq"] for m in data["messages"]] == [1, 2, 3, 4, 5]
+        assert exporter.message_count == 5
+        assert exporter.last_seq == 5
+
+    async def test_json_empty_chat(self) -> None:
+        """Пустой чат — валидный JSON с пустым массивом."""
+        import json
+
+        from src.schemas.export import ExportFormat
+
+        _, _, chunks = await self._export(ExportFormat.JSON, [])
+
+        data = json.loads(b"".join(chunks))
+        assert data["messages"] == []
+        assert data["message_count"] == 0
+
+    async def test_full_batch_requests_next_page(self) -> None:
+        """Полный последний пакет — ещё один запрос, который вернёт пусто."""
+        from src.schemas.export import ExportFormat
+
+        _, db, chunks = await self._export(ExportFormat.TXT, self._rows(4))
+
+        assert db.stream.await_count == 3
+        text = b"".join(chunks).decode()
+        assert "Иван: сообщение 4" in text
+        assert "Всего сообщений: 4" in text
+
+    async def test_html_escapes_content(self) -> None:
+        """Текст сообщений в HTML экранируется."""
+        from src.schemas.export import ExportFormat
+
+        rows = [
+            (1, uuid.uuid4(), uuid.uuid4(), "<b>", "<script>x</script>", datetime(2024, 1, 1), None)
+        ]
+        _, _, chunks = await self._export(ExportFormat.HTML, rows)
+
+        page = b"".join(chunks).decode()
+        assert "<script>" not in page
+        assert "&lt;script&gt;x&lt;/script&gt;" in page
+
+    def test_incomplete_encoder_not_instantiated(self) -> None:
+        """Кодировщик без end() не создаётся, а не падает посреди задачи."""
+        from src.services.export import ExportEncoder
+
+        class PartialEncoder(ExportEncoder):
+            media_type = "text/csv"
+            extension = "csv"
+
+            def begin(self, header):
+                return ""
+
+            def messages(self, rows):
+                return ""
+
+        with pytest.raises(TypeError):
+            PartialEncoder()
+
+    def test_page_query_uses_keyset(self) -> None:
+        """Страница выбирается по seq без OFFSET."""
+        from sqlalchemy.dialects.postgresql.asyncpg import dialect
+
+        from src.services.export import export_page_query
+
+        sql = str(export_page_query(uuid.uuid4(), 500, 500).compile(dialect=dialect()))
+
+        assert "messages.seq >" in sql
+        assert "ORDER BY messages.seq" in sql
+        assert "LIMIT" in sql
+        assert "OFFSET" not in sql
+
+
+class TestExportJobRunner:
+    """Тесты фонового исполнителя задач экспорта."""
+
+    @staticmethod
+    def _job(**overrides):
+        from types import SimpleNamespace
+
+        fields = {
+            "id": uuid.uuid4(),
+            "user_id": uuid.uuid4(),
+            "chat_id": uuid.uuid4(),
+            "format": "json",
+            "started_at": datetime(2024, 1, 2),
+            "start_date": None,
+            "end_date": None,
+            "until_seq": None,
+            "total_messages": None,
+            "last_seq": 0,
+            "message_count": 0,
+            "file_size": None,
+            "include_media": False,
+        }
+        fields.update(overrides)
+        return SimpleNamespace(**fields)
+
+    @staticmethod
+    def _session(job, rows, scalars):
+        from types import SimpleNamespace
+        from unittest.mock import AsyncMock
+
+        session = AsyncMock()
+        session.get.return_value = SimpleNamespace(
+            id=job.chat_id, name="Команда", chat_type="group"
+        )
+        session.stream.side_effect = [_StreamResult(rows)]
+        session.scalar.side_effect = scalars
+        return session
+
+    @staticmethod
+    def _runner(tmp_path):
+        from unittest.mock import AsyncMock
+
+        from src.services.export_jobs import ExportJobRunner
+
+        return ExportJobRunner(
+            storage_path=tmp_path,
+            concurrency=1,
+            poll_interval=1.0,
+            stale_after=60.0,
+            max_attempts=3,
+            emit_job_event=AsyncMock(),
+        )
+
+    async def test_export_written_to_disk(self, tmp_path) -> None:
+        """Новая задача фиксирует границу, пишет файл и чекпоинты по пакетам."""
+        import json
+
+        job = self._job()
+        rows = TestStreamingExport._rows(3)
+        # latest_seq, count, затем чекпоинты: начало, пакет
+        session = self._session(job, rows, [3, 3, job.id, job.id])
+
+        await self._runner(tmp_path)._export(session, job)
+
+        assert job.until_seq == 3
+        assert job.total_messages == 3
+        data = json.loads((tmp_path / f"{job.id}.json").read_bytes())
+        assert [m["seq"] for m in data["messages"]] == [1, 2, 3]
+        assert session.scalar.await_count == 4
+        session.execute.assert_awaited_once()
+
+    async def test_progress_and_completion_pushed_to_owner(self, tmp_path) -> None:
+        """Владелец получает job_event при изменении процента и по завершении."""
+        job = self._job()
+        rows = TestStreamingExport._rows(3)
+        session = self._session(job, rows, [3, 3, job.id, job.id])
+        runner = self._runner(tmp_path)
+
+        await runner._export(session, job)
+
+        events = [call.args for call in runner._emit_job_event.await_args_list]
+        assert all(args[:3] == (job.user_id, "export", job.id) for args in events)
+        # Чекпоинты начала документа и пакета из трёх сообщений, затем итог
+        assert [args[3:5] for args in events] == [
+            ("processing", 0),
+            ("processing", 99),
+            ("completed", 100),
+        ]
+        completed = runner._emit_job_event.await_args_list[-1].kwargs
+        assert completed["file_url"] == f"/api/export/jobs/{job.id}/download"
+        assert completed["message_count"] == 3
+
+    async def test_export_resumes_after_crash(self, tmp_path) -> None:
+        """Продолжение с last_seq: незафиксированный хвост файла отбрасывается."""
+        import json
+
+        from src.services.export import ExportHeader, ExportRow, JsonExportEncoder
+
+        job = self._job(until_seq=3, total_messages=3, last_seq=1, message_count=1)
+        rows = TestStreamingExport._rows(3)
+        encoder = JsonExportEncoder()
+        header = ExportHeader(job.chat_id, "Команда", "group", job.started_at)
+        committed = (encoder.begin(header) + encoder.messages([ExportRow(*rows[0])])).encode()
+        path = tmp_path / f"{job.id}.json"
+        path.write_bytes(committed + ',\n    {"id": "оборванная запись'.encode())
+        job.file_size = len(committed)
+
+        session = self._session(job, rows[1:], [job.id])
+        await self._runner(tmp_path)._export(session, job)
+
+        data = json.loads(path.read_bytes())
+        assert [m["seq"] for m in data["messages"]] == [1, 2, 3]
+        assert data["message_count"] == 3
+        session.stream.assert_awaited_once()
+
+    async def test_deleted_job_stops_and_removes_file(self, tmp_path) -> None:
+        """Если задачу удалили, экспорт прерывается и файл удаляется."""
+        job = self._job()
+        # latest_seq, count, чекпоинт начала документа, удаление перед пакетом
+        session = self._session(job, TestStreamingExport._rows(1), [1, 1, job.id, None])
+        runner = self._runner(tmp_path)
+
+        await runner._export(session, job)
+
+        assert not (tmp_path / f"{job.id}.json").exists()
+        assert runner._progress == {}
+        session.execute.assert_not_awaited()
+
+    async def test_claim_uses_skip_locked(self) -> None:
+        """Задача забирается атомарно, брошенные задачи тоже подхватываются."""
+        from unittest.mock import AsyncMock, MagicMock
+
+        from sqlalchemy.dialects.postgresql.asyncpg import dialect
+
+        from src.services.export_jobs import ExportJobRunner
+
+        session = AsyncMock()
+        session.scalar.return_value = None
+        factory = MagicMock()
+        factory.return_value.return_value.__aenter__.return_value = session
+
+        runner = ExportJobRunner("/tmp", 1, 1.0, 60.0, 3, session_factory=factory)  # noqa: S108
+        assert await runner.claim_next() is None
+
+        sql = str(session.scalar.await_args.args[0].compile(dialect=dialect()))
+        assert "FOR UPDATE SKIP LOCKED" in sql
+        assert "export_jobs.heartbeat_at <" in sql
+        assert "attempts=(export_jobs.attempts +" in sql
+
+    async def test_media_bundled_into_zip(self, tmp_path) -> None:
+        """С include_media документ и вложения упаковываются в ZIP."""
+        import json
+        import zipfile
+        from unittest.mock import MagicMock
+
+        job = self._job(include_media=True)
+        rows = TestStreamingExport._rows(2)
+        media_id = uuid.uuid4()
+        media_file = tmp_path / "photo.jpg"
+        media_file.write_bytes(b"\xff\xd8jpeg")
+
+        attachments = MagicMock()
+        attachments.tuples.return_value = [(rows[0][1], media_id, "Фото.JPG", "image/jpeg", 6)]
+        # latest_seq, count, чекпоинты начала и пакета, heartbeat упаковки
+        session = self._session(job, rows, [2, 2, job.id, job.id, job.id])
+        session.execute.side_effect = [attachments, None]
+        session.stream.side_effect = [
+            _StreamResult(rows),
+            _StreamResult([(media_id, str(media_file), "Фото.JPG", "image/jpeg")]),
+        ]
+
+        await self._runner(tmp_path)._export(session, job)
+
+        archive_path = tmp_path / f"{job.id}.zip"
+        assert not (tmp_path / f"{job.id}.json").exists()
+        with zipfile.ZipFile(archive_path) as archive:
+            document = json.loads(archive.read("messages.json"))
+            member = f"media/{media_id}.jpg"
+            assert archive.read(member) == b"\xff\xd8jpeg"
+            assert archive.getinfo(member).compress_type == zipfile.ZIP_STORED
+            assert archive.getinfo("messages.json").compress_type == zipfile.ZIP_DEFLATED
+        assert document["messages"][0]["attachments"][0]["file"] == member
+        assert document["messages"][1]["attachments"] == []
+
+    async def test_heartbeat_extended_while_copying_media(self, tmp_path, monkeypatch) -> None:
+        """Пока медиа копируются дольше stale_after, heartbeat продлевается по файлам."""
+        import zipfile
+        from types import SimpleNamespace
+        from unittest.mock import MagicMock
+
+        from src.services import export_jobs
+        from src.services.export_archive import ExportArchive
+
+        job = self._job(include_media=True)
+        rows = TestStreamingExport._rows(1)
+        media = []
+        for index in range(3):
+            media_file = tmp_path / f"video{index}.mp4"
+            media_file.write_bytes(b"video")
+            media.append((uuid.uuid4(), str(media_file), f"{index}.mp4", "video/mp4"))
+
+        now = [0.0]
+        add_file = ExportArchive.add_file
+
+        def slow_add_file(archive, source, name, mime_type=""):
+            # Каждый видеофайл копируется почти stale_after (60 с)
+            if mime_type:
+                now[0] += 50.0
+            return add_file(archive, source, name, mime_type)
+
+        monkeypatch.setattr(export_jobs, "time", SimpleNamespace(monotonic=lambda: now[0]))
+        monkeypatch.setattr(ExportArchive, "add_file", slow_add_file)
+
+        attachments = MagicMock()
+        attachments.tuples.return_value = []
+        # latest_seq, count, чекпоинты начала и пакета, heartbeat после каждого файла
+        session = self._session(job, rows, [1, 1, job.id, job.id, job.id, job.id, job.id])
+        session.execute.side_effect = [attachments, None]
+        session.stream.side_effect = [_StreamResult(rows), _StreamResult(media)]
+
+        await self._runner(tmp_path)._export(session, job)
+
+        assert session.scalar.await_count == 7
+        with zipfile.ZipFile(tmp_path / f"{job.id}.zip") as archive:
+            assert len(archive.namelist()) == 4
+
+
+class TestExportArchive:
+    """Тесты ZIP-архива экспорта."""
+
+    def test_missing_file_skipped(self, tmp_path) -> None:
+        """Отсутствующий на диске файл пропускается, архив остаётся валидным."""
+        import zipfile
+
+        from src.services.export_archive import ExportArchive
+
+        document = tmp_path / "doc.txt"
+        document.write_text("текст")
+        archive = ExportArchive(tmp_path / "out.zip")
+
+        assert archive.add_file(document, "messages.txt") is True
+        assert archive.add_file(tmp_path / "missing.mp4", "media/x.mp4", "video/mp4") is False
+        size = archive.close()
+
+        assert size == (tmp_path / "out.zip").stat().st_size
+        with zipfile.ZipFile(tmp_path / "out.zip") as result:
+            assert result.namelist() == ["messages.txt"]
+
+    def test_copied_in_chunks(self, tmp_path, monkeypatch) -> None:
+        """Файл больше блока копируется по частям без потерь."""
+        import zipfile
+
+        from src.services import export_archive
+
+        monkeypatch.setattr(export_archive, "COPY_CHUNK_SIZE", 1024)
+        payload = bytes(range(256)) * 40
+        source = tmp_path / "voice.ogg"
+        source.write_bytes(payload)
+
+        archive = export_archive.ExportArchive(tmp_path / "out.zip")
+        archive.add_file(source, "media/voice.ogg", "audio/ogg")
+        archive.close()
+
+        with zipfile.ZipFile(tmp_path / "out.zip") as result:
+            assert result.read("media/voice.ogg") == payload
@@ -20,3 +20,13 @@ def test_health_check_returns_version(client: TestClient) -> None:
     assert response.status_code == 200
     data = response.json()
     assert data["version"] == "0.1.0"
+
+
+def test_db_pool_stats(client: TestClient) -> None:
+    """Метрики пула соединений доступны без подключения к БД."""
+    response = client.get("/api/health/db-pool")
+
+    assert response.status_code == 200
+    data = response.json()
+    assert "checked_out" in data
+    assert "wait_time_max" in data
@@ -131,3 +131,1143 @@ class TestMediaSchemas:
         )
         data = UploadResponse(media=media, message="Файл загружен")
         assert data.message == "Файл загружен"
+
+
+class TestSaveUpload:
+    """Тесты потокового сохранения загрузки."""
+
+    @staticmethod
+    def _upload(data: bytes, size: int | None = None):
+        import io
+
+        from fastapi import UploadFile
+
+        return UploadFile(file=io.BytesIO(data), filename="file.bin", size=size)
+
+    async def test_copied_in_chunks_with_hash(self, tmp_path) -> None:
+        """Файл копируется блоками, SHA-256 считается на лету."""
+        import hashlib
+        from unittest.mock import patch
+
+        from src.services.media import save_upload
+
+        data = bytes(range(256)) * 100
+        upload = self._upload(data)
+        destination = tmp_path / "file.bin"
+
+        with patch.object(upload, "read", wraps=upload.read) as read:
+            stored = await save_upload(upload, destination, max_size=len(data), chunk_size=4096)
+
+        assert destination.read_bytes() == data
+        assert stored.size == len(data)
+        assert stored.sha256 == hashlib.sha256(data).hexdigest()
+        assert all(call.args == (4096,) for call in read.call_args_list)
+        assert read.call_count == len(data) // 4096 + 2
+        assert not (tmp_path / "file.bin.part").exists()
+
+    async def test_aborts_when_too_large(self, tmp_path) -> None:
+        """Превышение лимита прерывает копирование и удаляет частичный файл."""
+        import pytest
+
+        from src.services.media import FileTooLargeError, save_upload
+
+        upload = self._upload(b"x" * 10_000)
+
+        with pytest.raises(FileTooLargeError):
+            await save_upload(upload, tmp_path / "file.bin", max_size=5000, chunk_size=1024)
+
+        assert list(tmp_path.iterdir()) == []
+        # Прочитано не больше лимита и одного блока
+        assert upload.file.tell() <= 5000 + 1024
+
+    async def test_rejects_known_size_without_reading(self, tmp_path) -> None:
+        """Известный заранее размер проверяется до копирования."""
+        import pytest
+
+        from src.services.media import FileTooLargeError, save_upload
+
+        upload = self._upload(b"x" * 100, size=10_000)
+
+        with pytest.raises(FileTooLargeError):
+            await save_upload(upload, tmp_path / "file.bin", max_size=5000)
+
+        assert upload.file.tell() == 0
+        assert list(tmp_path.iterdir()) == []
+
+
+async def _chunks(*parts: bytes):
+    for part in parts:
+        yield part
+
+
+class TestResumableUpload:
+    """Тесты возобновляемой загрузки."""
+
+    @staticmethod
+    def _service(tmp_path, upload=None):
+        from unittest.mock import AsyncMock
+
+        from src.services.uploads import ResumableUploadService
+
+        db = AsyncMock()
+        db.add = lambda obj: None
+        db.get.return_value = upload
+
+        async def confirm(statement):
+            # Условный UPDATE смещения: совпасть должны смещение и писатель
+            params = statement.compile().params
+            if (upload.offset, upload.writer_id) != (params["offset_1"], params["writer_id_1"]):
+                return None
+            upload.offset, upload.writer_id = params["offset"], None
+            return upload
+
+        db.scalar.side_effect = confirm
+        return ResumableUploadService(db, staging_path=tmp_path / "staging", ttl=3600), db
+
+    @staticmethod
+    def _upload(tmp_path, uploader_id, total_size=10, offset=0, data=b""):
+        from datetime import timedelta
+
+        from src.models.media import UploadSession
+
+        staging = tmp_path / "upload.part"
+        staging.write_bytes(data)
+        return UploadSession(
+            id=uuid.uuid4(),
+            uploader_id=uploader_id,
+            media_type=MediaType.VIDEO.value,
+            original_filename="clip.mp4",
+            mime_type="video/mp4",
+            total_size=total_size,
+            offset=offset,
+            staging_path=str(staging),
+            expires_at=datetime.now(UTC).replace(tzinfo=None) + timedelta(hours=1),
+        )
+
+    async def test_create_checks_size_and_type(self, tmp_path) -> None:
+        """Размер и тип проверяются при создании, staging-файл создаётся сразу."""
+        import pytest
+
+        from src.services.uploads import UploadError
+
+        service, _ = self._service(tmp_path)
+        user_id = uuid.uuid4()
+
+        with pytest.raises(UploadError) as too_large:
+            await service.create(user_id, "photo.png", MAX_IMAGE_SIZE + 1, "image/png")
+        assert too_large.value.code == "file_too_large"
+
+        with pytest.raises(UploadError) as bad_type:
+            await service.create(user_id, "app.exe", 10, "application/x-msdownload")
+        assert bad_type.value.code == "file_type_not_allowed"
+
+        upload = await service.create(user_id, "clip.mp4", 50 * 1024 * 1024, "video/mp4")
+        assert upload.offset == 0
+        assert upload.media_type == MediaType.VIDEO.value
+        assert (tmp_path / "staging" / f"{upload.id}.part").exists()
+
+    async def test_append_resumes_from_confirmed_offset(self, tmp_path) -> None:
+        """Хвост после подтверждённого смещения отбрасывается, часть дописывается."""
+        user_id = uuid.uuid4()
+        # 4 байта подтверждены, ещё 2 остались от оборванного запроса
+        upload = self._upload(tmp_path, user_id, offset=4, data=b"abcdXX")
+        service, _ = self._service(tmp_path, upload)
+
+        result = await service.append(upload.id, user_id, 4, _chunks(b"efg", b"hij"))
+
+        assert result.offset == 10
+        assert (tmp_path / "upload.part").read_bytes() == b"abcdefghij"
+
+    async def test_lock_released_while_receiving(self, tmp_path) -> None:
+        """Блокировка строки снимается до приёма тела запроса."""
+        user_id = uuid.uuid4()
+        upload = self._upload(tmp_path, user_id)
+        service, db = self._service(tmp_path, upload)
+
+        async def body():
+            db.commit.assert_awaited_once()
+            assert upload.writer_id is not None
+            yield b"abc"
+
+        result = await service.append(upload.id, user_id, 0, body())
+
+        assert result.offset == 3
+        assert upload.writer_id is None
+
+    async def test_superseded_writer_not_confirmed(self, tmp_path) -> None:
+        """PATCH, запись которого перехватил новый запрос, смещение не подтверждает."""
+        import pytest
+
+        from src.services.uploads import UploadError
+
+        user_id = uuid.uuid4()
+        upload = self._upload(tmp_path, user_id)
+        service, _ = self._service(tmp_path, upload)
+
+        async def stale_body():
+            yield b"abc"
+            # Клиент возобновил загрузку новым запросом, пока этот ещё шёл
+            upload.writer_id = uuid.uuid4()
+
+        with pytest.raises(UploadError) as error:
+            await service.append(upload.id, user_id, 0, stale_body())
+
+        assert error.value.code == "offset_mismatch"
+        assert upload.offset == 0
+
+    async def test_append_rejects_wrong_offset(self, tmp_path) -> None:
+        """Несовпадающее смещение — offset_mismatch, данные не трогаются."""
+        import pytest
+
+        from src.services.uploads import UploadError
+
+        user_id = uuid.uuid4()
+        upload = self._upload(tmp_path, user_id, offset=4, data=b"abcd")
+        service, _ = self._service(tmp_path, upload)
+
+        with pytest.raises(UploadError) as error:
+            await service.append(upload.id, user_id, 2, _chunks(b"zz"))
+
+        assert error.value.code == "offset_mismatch"
+        assert (tmp_path / "upload.part").read_bytes() == b"abcd"
+
+    async def test_append_rejects_overflow(self, tmp_path) -> None:
+        """Данные сверх заявленного размера отклоняются, смещение не меняется."""
+        import pytest
+
+        from src.services.uploads import UploadError
+
+        user_id = uuid.uuid4()
+        upload = self._upload(tmp_path, user_id, total_size=5)
+        service, _ = self._service(tmp_path, upload)
+
+        with pytest.raises(UploadError) as error:
+            await service.append(upload.id, user_id, 0, _chunks(b"abc", b"def"))
+
+        assert error.value.code == "file_too_large"
+        assert upload.offset == 0
+
+    async def test_disconnect_keeps_received_data(self, tmp_path) -> None:
+        """При обрыве связи принятое сохраняется и учитывается в смещении."""
+        from starlette.requests import ClientDisconnect
+
+        async def interrupted():
+            yield b"abc"
+            raise ClientDisconnect()
+
+        user_id = uuid.uuid4()
+        upload = self._upload(tmp_path, user_id)
+        service, _ = self._service(tmp_path, upload)
+
+        result = await service.append(upload.id, user_id, 0, interrupted())
+
+        assert result.offset == 3
+        assert (tmp_path / "upload.part").read_bytes() == b"abc"
+
+    async def test_foreign_or_expired_upload_hidden(self, tmp_path) -> None:
+        """Чужая загрузка не найдена, просроченная — upload_expired."""
+        from datetime import timedelta
+
+        import pytest
+
+        from src.services.uploads import UploadError
+
+        owner = uuid.uuid4()
+        upload = self._upload(tmp_path, owner)
+        service, _ = self._service(tmp_path, upload)
+
+        with pytest.raises(UploadError) as foreign:
+            await service.get(upload.id, uuid.uuid4())
+        assert foreign.value.code == "upload_not_found"
+
+        upload.expires_at -= timedelta(hours=2)
+        with pytest.raises(UploadError) as expired:
+            await service.get(upload.id, owner)
+        assert expired.value.code == "upload_expired"
+
+    async def test_complete_moves_file_to_storage(self, tmp_path, monkeypatch) -> None:
+        """Полная загрузка переносится в хранилище blob и становится MediaFile."""
+        import hashlib
+        from pathlib import Path
+
+        import pytest
+
+        from src.config import get_settings
+        from src.services.blobs import blob_path
+        from src.services.uploads import UploadError
+
+        monkeypatch.setattr(get_settings(), "media_storage_path", str(tmp_path / "media"))
+        user_id = uuid.uuid4()
+        upload = self._upload(tmp_path, user_id, total_size=4, offset=2, data=b"ab")
+        service, db = self._service(tmp_path, upload)
+        db.scalar.side_effect = None
+        db.scalar.return_value = 1
+
+        with pytest.raises(UploadError) as incomplete:
+            await service.complete(upload.id, user_id)
+        assert incomplete.value.code == "upload_incomplete"
+
+        upload.offset = 4
+        (tmp_path / "upload.part").write_bytes(b"abcd")
+        media = await service.complete(upload.id, user_id)
+
+        assert media.file_size == 4
+        assert media.original_filename == "clip.mp4"
+        assert media.content_hash == hashlib.sha256(b"abcd").hexdigest()
+        assert Path(media.storage_path) == blob_path(tmp_path / "media", media.content_hash)
+        assert Path(media.storage_path).read_bytes() == b"abcd"
+        assert not (tmp_path / "upload.part").exists()
+        db.delete.assert_awaited_once_with(upload)
+
+    async def test_cleanup_removes_expired_staging(self, tmp_path) -> None:
+        """Очистка удаляет файлы просроченных сессий."""
+        from unittest.mock import AsyncMock, MagicMock
+
+        from src.services.uploads import cleanup_expired_uploads
+
+        staging = tmp_path / "old.part"
+        staging.write_bytes(b"data")
+        result = MagicMock()
+        result.scalars.return_value.all.return_value = [str(staging)]
+        db = AsyncMock()
+        db.execute.return_value = result
+
+        assert await cleanup_expired_uploads(db) == 1
+        assert not staging.exists()
+        db.commit.assert_awaited_once()
+
+
+class TestBlobStore:
+    """Тесты контентно-адресуемого хранилища."""
+
+    SHA = "ab" * 32
+
+    async def test_first_add_moves_file(self, tmp_path) -> None:
+        """Первая ссылка переносит файл в blobs/ab/cd/<sha256>."""
+        from pathlib import Path
+        from unittest.mock import AsyncMock
+
+        from src.services.blobs import BlobStore, blob_path
+
+        source = tmp_path / "incoming.upload"
+        source.write_bytes(b"data")
+        db = AsyncMock()
+        db.scalar.return_value = 1
+
+        stored = await BlobStore(db, tmp_path).add(source, self.SHA, 4)
+
+        assert Path(stored) == tmp_path / "blobs" / "ab" / "ab" / self.SHA
+        assert Path(stored) == blob_path(tmp_path, self.SHA)
+        assert Path(stored).read_bytes() == b"data"
+        assert not source.exists()
+
+    async def test_duplicate_add_keeps_single_copy(self, tmp_path) -> None:
+        """Повторное содержимое не копируется: дубль удаляется."""
+        from unittest.mock import AsyncMock
+
+        from src.services.blobs import BlobStore, blob_path
+
+        target = blob_path(tmp_path, self.SHA)
+        target.parent.mkdir(parents=True)
+        target.write_bytes(b"data")
+        source = tmp_path / "incoming.upload"
+        source.write_bytes(b"data")
+        db = AsyncMock()
+        db.scalar.return_value = 2
+
+        stored = await BlobStore(db, tmp_path).add(source, self.SHA, 4)
+
+        assert stored == str(target)
+        assert target.read_bytes() == b"data"
+        assert not source.exists()
+        assert [p for p in (tmp_path / "blobs").rglob("*") if p.is_file()] == [target]
+
+    async def test_add_is_upsert(self, tmp_path) -> None:
+        """Счётчик увеличивается одним INSERT ... ON CONFLICT."""
+        from unittest.mock import AsyncMock
+
+        from sqlalchemy.dialects.postgresql import asyncpg
+
+        from src.services.blobs import BlobStore
+
+        source = tmp_path / "incoming.upload"
+        source.write_bytes(b"data")
+        db = AsyncMock()
+        db.scalar.return_value = 1
+
+        await BlobStore(db, tmp_path).add(source, self.SHA, 4)
+
+        sql = str(db.scalar.await_args.args[0].compile(dialect=asyncpg.dialect()))
+        assert "ON CONFLICT (sha256) DO UPDATE" in sql
+        assert "RETURNING media_blobs.ref_count" in sql
+
+    async def test_release_deletes_file_on_last_reference(self, tmp_path) -> None:
+        """Файл удаляется только вместе с последней ссылкой."""
+        from unittest.mock import AsyncMock
+
+        from src.services.blobs import BlobStore, blob_path
+
+        target = blob_path(tmp_path, self.SHA)
+        target.parent.mkdir(parents=True)
+        target.write_bytes(b"data")
+        db = AsyncMock()
+        store = BlobStore(db, tmp_path)
+
+        db.scalar.return_value = 1
+        assert await store.release(self.SHA) is False
+        assert target.exists()
+
+        db.scalar.side_effect = [0, str(target)]
+        assert await store.release(self.SHA) is True
+        assert not target.exists()
+
+
+class TestMediaDelivery:
+    """Тесты отдачи медиафайлов."""
+
+    SHA = "cd" * 32
+
+    @staticmethod
+    def _media_root(tmp_path, monkeypatch):
+        from src.config import get_settings
+
+        root = tmp_path / "media"
+        monkeypatch.setattr(get_settings(), "media_storage_path", str(root))
+        monkeypatch.setattr(get_settings(), "media_accel_redirect_prefix", "")
+        return root
+
+    def _blob(self, root, data: bytes):
+        from src.services.blobs import blob_path
+
+        path = blob_path(root, self.SHA)
+        path.parent.mkdir(parents=True)
+        path.write_bytes(data)
+        return path
+
+    @staticmethod
+    def _override_db(mime_type: str | None):
+        from unittest.mock import AsyncMock
+
+        from src.db import get_db
+        from src.main import app
+
+        db = AsyncMock()
+        db.scalar.return_value = mime_type
+
+        async def override():
+            yield db
+
+        app.dependency_overrides[get_db] = override
+        return db
+
+    def test_range_request(self, client, tmp_path, monkeypatch) -> None:
+        """Range отдаёт часть файла с 206 и Content-Range."""
+        root = self._media_root(tmp_path, monkeypatch)
+        root.mkdir()
+        (root / "voice.ogg").write_bytes(b"0123456789")
+
+        response = client.get("/media/voice.ogg", headers={"Range": "bytes=2-5"})
+
+        assert response.status_code == 206
+        assert response.content == b"2345"
+        assert response.headers["content-range"] == "bytes 2-5/10"
+        assert response.headers["accept-ranges"] == "bytes"
+        assert response.headers["content-type"] == "audio/ogg"
+
+    def test_blob_etag_and_not_modified(self, client, tmp_path, monkeypatch) -> None:
+        """ETag blob — его SHA-256; совпавший If-None-Match даёт 304."""
+        from src.db import get_db
+        from src.main import app
+
+        root = self._media_root(tmp_path, monkeypatch)
+        self._blob(root, b"video")
+        self._override_db("video/mp4")
+        url = f"/media/blobs/cd/cd/{self.SHA}"
+        try:
+            response = client.get(url)
+            cached = client.get(url, headers={"If-None-Match": f'W/"x", "{self.SHA}"'})
+        finally:
+            app.dependency_overrides.pop(get_db)
+
+        assert response.status_code == 200
+        assert response.content == b"video"
+        assert response.headers["etag"] == f'"{self.SHA}"'
+        assert response.headers["content-type"] == "video/mp4"
+        assert "immutable" in response.headers["cache-control"]
+        assert cached.status_code == 304
+        assert cached.content == b""
+
+    def test_unknown_blob_not_found(self, client, tmp_path, monkeypatch) -> None:
+        """Blob без ссылающихся записей не отдаётся."""
+        from src.db import get_db
+        from src.main import app
+
+        root = self._media_root(tmp_path, monkeypatch)
+        self._blob(root, b"orphan")
+        self._override_db(None)
+        try:
+            response = client.get(f"/media/blobs/cd/cd/{self.SHA}")
+        finally:
+            app.dependency_overrides.pop(get_db)
+
+        assert response.status_code == 404
+
+    def test_accel_redirect(self, client, tmp_path, monkeypatch) -> None:
+        """С префиксом байты отдаёт прокси по X-Accel-Redirect."""
+        from src.config import get_settings
+
+        root = self._media_root(tmp_path, monkeypatch)
+        root.mkdir()
+        (root / "photo.jpg").write_bytes(b"jpeg")
+        monkeypatch.setattr(get_settings(), "media_accel_redirect_prefix", "/protected-media/")
+
+        response = client.get("/media/photo.jpg")
+
+        assert response.status_code == 200
+        assert response.content == b""
+        assert response.headers["x-accel-redirect"] == "/protected-media/photo.jpg"
+        assert response.headers["content-type"] == "image/jpeg"
+
+    def test_if_modified_since(self) -> None:
+        """If-Modified-Since сравнивается с точностью до секунды."""
+        from email.utils import formatdate
+
+        from src.services.media_delivery import is_not_modified
+
+        mtime = 1_700_000_000.5
+        since = formatdate(1_700_000_000, usegmt=True)
+
+        assert is_not_modified({"if-modified-since": since}, '"a"', mtime)
+        assert not is_not_modified({"if-modified-since": since}, '"a"', mtime + 1)
+        assert not is_not_modified({"if-modified-since": "garbage"}, '"a"', mtime)
+        # If-None-Match важнее даты
+        assert not is_not_modified(
+            {"if-none-match": '"b"', "if-modified-since": since}, '"a"', mtime
+        )
+
+    def test_paths_outside_storage_rejected(self, tmp_path) -> None:
+        """Выход за пределы хранилища и каталог incoming недоступны."""
+        from src.services.media_delivery import resolve_media_path
+
+        root = tmp_path / "media"
+
+        assert resolve_media_path(root, "a/b.png") == (root / "a/b.png").resolve()
+        assert resolve_media_path(root, "../secret.txt") is None
+        assert resolve_media_path(root, "incoming/x.upload") is None
+        assert resolve_media_path(root, "") is None
+
+    def test_svg_served_as_attachment(self, client, tmp_path, monkeypatch) -> None:
+        """Небезопасные для показа типы отдаются вложением."""
+        root = self._media_root(tmp_path, monkeypatch)
+        root.mkdir()
+        (root / "logo.svg").write_bytes(b"<svg/>")
+
+        response = client.get("/media/logo.svg")
+
+        assert response.headers["content-disposition"].startswith("attachment")
+        assert response.headers["x-content-type-options"] == "nosniff"
+
+    async def test_zerocopy_range(self, tmp_path) -> None:
+        """Сервер с http.response.zerocopy получает файл и смещение для sendfile."""
+        import os
+
+        from src.services.media_delivery import MediaFileResponse
+
+        path = tmp_path / "clip.mp4"
+        path.write_bytes(b"0123456789")
+        response = MediaFileResponse(path, stat_result=os.stat(path), media_type="video/mp4")
+        scope = {
+            "type": "http",
+            "method": "GET",
+            "headers": [(b"range", b"bytes=4-")],
+            "extensions": {"http.response.zerocopy": {}},
+            "asgi": {"spec_version": "2.4"},
+        }
+        sent = []
+
+        async def send(message) -> None:
+            if message["type"] == "http.response.zerocopy":
+                message = {**message, "data": message["file"].read(message["count"])}
+            sent.append(message)
+
+        await response(scope, None, send)
+
+        assert sent[0]["status"] == 206
+        assert (b"content-range", b"bytes 4-9/10") in sent[0]["headers"]
+        assert sent[1]["offset"] == 4
+        assert sent[1]["count"] == 6
+        assert sent[1]["data"] == b"456789"
+
+    async def test_zerocopy_whole_file_and_fallback(self, tmp_path) -> None:
+        """Файл целиком уходит через zerocopy, несколько диапазонов — обычным телом."""
+        import os
+
+        from src.services.media_delivery import MediaFileResponse
+
+        path = tmp_path / "clip.mp4"
+        path.write_bytes(b"0123456789")
+
+        async def call(headers):
+            response = MediaFileResponse(path, stat_result=os.stat(path), media_type="video/mp4")
+            scope = {
+                "type": "http",
+                "method": "GET",
+                "headers": headers,
+                "extensions": {"http.response.zerocopy": {}},
+                "asgi": {"spec_version": "2.4"},
+            }
+            sent = []
+
+            async def send(message) -> None:
+                sent.append(message)
+
+            await response(scope, None, send)
+            return sent
+
+        whole = await call([])
+        assert whole[0]["status"] == 200
+        assert (b"content-length", b"10") in whole[0]["headers"]
+        assert whole[1]["type"] == "http.response.zerocopy"
+        assert (whole[1]["offset"], whole[1]["count"]) == (0, 10)
+
+        multiple = await call([(b"range", b"bytes=0-1,4-5")])
+        assert multiple[0]["status"] == 206
+        assert {message["type"] for message in multiple[1:]} == {"http.response.body"}
+
+    def test_single_range(self) -> None:
+        """Разбор одного диапазона bytes=; остальное остаётся FileResponse."""
+        from src.services.media_delivery import single_range
+
+        assert single_range("bytes=2-5", 10) == (2, 6)
+        assert single_range("bytes=4-", 10) == (4, 10)
+        assert single_range("bytes=-3", 10) == (7, 10)
+        assert single_range("bytes=8-100", 10) == (8, 10)
+        assert single_range("bytes=10-", 10) is None
+        assert single_range("bytes=0-1,4-5", 10) is None
+        assert single_range("items=0-1", 10) is None
+        assert single_range("bytes=-", 10) is None
+
+
+class TestPreviews:
+    """Тесты генерации превью."""
+
+    SHA = "ef" * 32
+
+    @staticmethod
+    def _jpeg(path, size, orientation=None) -> None:
+        from PIL import Image
+
+        image = Image.new("RGB", size, "red")
+        exif = Image.Exif()
+        if orientation:
+            exif[0x0112] = orientation
+        image.save(path, "JPEG", exif=exif)
+
+    def test_render_sizes_and_orientation(self, tmp_path) -> None:
+        """Превью строятся всех размеров; размер оригинала учитывает EXIF."""
+        from PIL import Image
+
+        from src.services.previews import render_previews
+
+        source = tmp_path / "photo.jpg"
+        self._jpeg(source, (1600, 1000), orientation=6)
+        targets = {size: str(tmp_path / f"p_{size}.webp") for size in (128, 320, 800)}
+
+        assert render_previews(str(source), targets) == (1000, 1600)
+        for size, target in targets.items():
+            with Image.open(target) as preview:
+                assert preview.format == "WEBP"
+                assert max(preview.size) == size
+                assert preview.size[1] > preview.size[0]
+        assert not list(tmp_path.glob("*.part"))
+
+    def test_render_keeps_alpha(self, tmp_path) -> None:
+        """Прозрачность PNG сохраняется, маленькие изображения не увеличиваются."""
+        from PIL import Image
+
+        from src.services.previews import render_previews
+
+        source = tmp_path / "icon.png"
+        Image.new("RGBA", (100, 50), (0, 0, 0, 0)).save(source)
+        target = tmp_path / "p_320.webp"
+
+        assert render_previews(str(source), {320: str(target)}) == (100, 50)
+        with Image.open(target) as preview:
+            assert preview.mode == "RGBA"
+            assert preview.size == (100, 50)
+
+    def test_submit_does_not_block_when_full(self) -> None:
+        """Переполненная очередь не задерживает загрузку."""
+        from src.services.previews import PreviewPipeline
+
+        pipeline = PreviewPipeline("/tmp", workers=1, queue_size=1, backfill_interval=60.0)  # noqa: S108
+
+        assert pipeline.submit(uuid.uuid4()) is True
+        assert pipeline.submit(uuid.uuid4()) is False
+
+    def test_submit_skips_queued_record(self) -> None:
+        """Запись, уже стоящая в очереди, повторно не ставится."""
+        from src.services.previews import PreviewPipeline
+
+        pipeline = PreviewPipeline("/tmp", workers=1, queue_size=4, backfill_interval=60.0)  # noqa: S108
+        media_id = uuid.uuid4()
+
+        assert pipeline.submit(media_id) is True
+        assert pipeline.submit(media_id) is True
+        assert pipeline._queue.qsize() == 1
+
+    async def test_same_content_rendered_once(self, tmp_path) -> None:
+        """Пока хеш обрабатывается, вторая запись с тем же содержимым его не строит."""
+        import asyncio
+        from unittest.mock import AsyncMock, MagicMock
+
+        from src.services.previews import PreviewPipeline
+
+        row = MagicMock(storage_path=str(tmp_path / "photo.jpg"), content_hash=self.SHA)
+        pending, no_ready = MagicMock(), MagicMock()
+        pending.one_or_none.return_value = row
+        no_ready.one_or_none.return_value = None
+        session = AsyncMock()
+        session.execute.side_effect = [pending, no_ready, pending, no_ready, MagicMock()]
+        factory = MagicMock()
+        factory.return_value.return_value.__aenter__.return_value = session
+        pipeline = PreviewPipeline(tmp_path, 1, 8, 60.0, session_factory=factory)
+
+        async def render(source, content_hash):
+            await asyncio.sleep(0.01)
+            return {"preview_status": "ready"}
+
+        pipeline._render = AsyncMock(side_effect=render)
+
+        results = await asyncio.gather(
+            pipeline.process(uuid.uuid4()), pipeline.process(uuid.uuid4())
+        )
+
+        assert results == [True, False]
+        pipeline._render.assert_awaited_once()
+        session.commit.assert_awaited_once()
+        assert not pipeline._rendering
+
+    async def test_process_updates_all_copies(self, tmp_path) -> None:
+        """Превью строятся по хешу и отмечаются у всех записей с тем же содержимым."""
+        from unittest.mock import AsyncMock, MagicMock
+
+        from sqlalchemy.dialects.postgresql import asyncpg
+
+        from src.services.blobs import preview_path
+        from src.services.previews import PreviewPipeline
+
+        source = tmp_path / "photo.jpg"
+        self._jpeg(source, (900, 300))
+        row = MagicMock(storage_path=str(source), content_hash=self.SHA)
+        pending, no_ready = MagicMock(), MagicMock()
+        pending.one_or_none.return_value = row
+        no_ready.one_or_none.return_value = None
+        session = AsyncMock()
+        session.execute.side_effect = [pending, no_ready, MagicMock()]
+        factory = MagicMock()
+        factory.return_value.return_value.__aenter__.return_value = session
+        pipeline = PreviewPipeline(tmp_path, 1, 8, 60.0, session_factory=factory)
+
+        assert await pipeline.process(uuid.uuid4()) is True
+
+        assert preview_path(tmp_path, self.SHA, 800).exists()
+        statement = session.execute.await_args_list[-1].args[0]
+        sql = str(statement.compile(dialect=asyncpg.dialect()))
+        assert "WHERE media_files.content_hash = $" in sql
+        params = statement.compile().params
+        assert params["preview_status"] == "ready"
+        assert (params["width"], params["height"]) == (900, 300)
+        assert params["thumbnail_path"] == str(preview_path(tmp_path, self.SHA, 320))
+        session.commit.assert_awaited_once()
+
+    async def test_broken_image_marked_failed(self, tmp_path) -> None:
+        """Неразборчивый файл переводит превью в failed."""
+        from unittest.mock import AsyncMock, MagicMock
+
+        from src.services.previews import PreviewPipeline
+
+        source = tmp_path / "broken.jpg"
+        source.write_bytes(b"not an image")
+        row = MagicMock(storage_path=str(source), content_hash=self.SHA)
+        pending, no_ready = MagicMock(), MagicMock()
+        pending.one_or_none.return_value = row
+        no_ready.one_or_none.return_value = None
+        session = AsyncMock()
+        session.execute.side_effect = [pending, no_ready, MagicMock()]
+        factory = MagicMock()
+        factory.return_value.return_value.__aenter__.return_value = session
+        pipeline = PreviewPipeline(tmp_path, 1, 8, 60.0, session_factory=factory)
+
+        await pipeline.process(uuid.uuid4())
+
+        params = session.execute.await_args_list[-1].args[0].compile().params
+        assert params["preview_status"] == "failed"
+
+    async def test_release_removes_previews(self, tmp_path) -> None:
+        """Последняя ссылка на blob удаляет и его превью."""
+        from unittest.mock import AsyncMock
+
+        from src.services.blobs import BlobStore, blob_path, preview_path
+
+        target = blob_path(tmp_path, self.SHA)
+        target.parent.mkdir(parents=True)
+        target.write_bytes(b"data")
+        preview = preview_path(tmp_path, self.SHA, 320)
+        preview.parent.mkdir(parents=True)
+        preview.write_bytes(b"webp")
+        db = AsyncMock()
+        db.scalar.side_effect = [0, str(target)]
+
+        assert await BlobStore(db, tmp_path).release(self.SHA) is True
+        assert not preview.exists()
+
+
+def _ogg_page(granule: int, body: bytes, serial: int = 7, header_type: int = 0) -> bytes:
+    import struct
+
+    header = b"OggS" + struct.pack("<BBqIIIB", 0, header_type, granule, serial, 0, 0, 1)
+    return header + bytes([len(body)]) + body
+
+
+def _mp4_box(box_type: bytes, payload: bytes) -> bytes:
+    import struct
+
+    return struct.pack(">I", len(payload) + 8) + box_type + payload
+
+
+def _ebml(element_id: int, payload: bytes, unknown_size: bool = False) -> bytes:
+    id_bytes = element_id.to_bytes((element_id.bit_length() + 7) // 8, "big")
+    size = b"\x01\xff\xff\xff\xff\xff\xff\xff" if unknown_size else bytes([0x80 | len(payload)])
+    return id_bytes + size + payload
+
+
+class TestMediaProbe:
+    """Тесты разбора заголовков контейнеров."""
+
+    def test_wav(self, tmp_path) -> None:
+        """WAV: длительность по размеру data и byte rate."""
+        import wave
+
+        from src.services.media_probe import probe_media
+
+        path = tmp_path / "voice.wav"
+        with wave.open(str(path), "wb") as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(8000)
+            wav.writeframes(b"\x00\x00" * 12000)
+
+        probe = probe_media(path)
+
+        assert probe.duration == 1.5
+        assert probe.duration_seconds == 2
+        assert probe.width is None
+
+    def test_ogg_opus(self, tmp_path) -> None:
+        """OGG Opus: granule последней страницы минус pre-skip."""
+        import struct
+
+        from src.services.media_probe import probe_media
+
+        head = b"OpusHead" + struct.pack("<BBHIhB", 1, 1, 312, 48000, 0, 0)
+        path = tmp_path / "voice.ogg"
+        path.write_bytes(
+            _ogg_page(0, head, header_type=2)
+            + _ogg_page(-1, b"x" * 200)
+            + _ogg_page(48000 * 3 + 312, b"y" * 100, header_type=4)
+        )
+
+        assert probe_media(path).duration == 3.0
+
+    def test_mp4_rotated_video(self, tmp_path) -> None:
+        """MP4: mvhd даёт длительность, tkhd — кадр с учётом поворота."""
+        import struct
+
+        from src.services.media_probe import probe_media
+
+        mvhd = struct.pack(">4xIIII", 0, 0, 1000, 5000) + bytes(80)
+        rotate_90 = struct.pack(">9i", 0, 0x10000, 0, -0x10000, 0, 0, 0, 0, 0x40000000)
+        tkhd = (
+            struct.pack(">4x5I", 0, 0, 1, 0, 5000)
+            + bytes(16)
+            + rotate_90
+            + struct.pack(">II", 1920 << 16, 1080 << 16)
+        )
+        hdlr = struct.pack(">4x4x4s", b"vide") + bytes(12)
+        trak = _mp4_box(b"tkhd", tkhd) + _mp4_box(b"mdia", _mp4_box(b"hdlr", hdlr))
+        path = tmp_path / "clip.mp4"
+        path.write_bytes(
+            _mp4_box(b"ftyp", b"isom\x00\x00\x02\x00")
+            + _mp4_box(b"mdat", b"\x00" * 4096)
+            + _mp4_box(b"moov", _mp4_box(b"mvhd", mvhd) + _mp4_box(b"trak", trak))
+        )
+
+        probe = probe_media(path)
+
+        assert probe.duration == 5.0
+        assert (probe.width, probe.height) == (1080, 1920)
+
+    def test_webm_without_duration(self, tmp_path) -> None:
+        """WebM от MediaRecorder: длительность по последнему кластеру."""
+        from src.services.media_probe import probe_media
+
+        info = _ebml(0x2AD7B1, (1_000_000).to_bytes(3, "big"))
+        video = _ebml(0xE0, _ebml(0xB0, (640).to_bytes(2, "big")) + _ebml(0xBA, bytes([240])))
+        tracks = _ebml(0xAE, _ebml(0x83, b"\x01") + video)
+        block = b"\x81" + (500).to_bytes(2, "big") + b"\x80" + b"frame"
+        cluster = _ebml(0xE7, (2000).to_bytes(2, "big")) + _ebml(0xA3, block)
+        path = tmp_path / "voice.webm"
+        path.write_bytes(
+            _ebml(0x1A45DFA3, _ebml(0x4282, b"webm"))
+            + _ebml(
+                0x18538067,
+                _ebml(0x1549A966, info)
+                + _ebml(0x1654AE6B, tracks)
+                + _ebml(0x1F43B675, cluster, unknown_size=True),
+                unknown_size=True,
+            )
+        )
+
+        probe = probe_media(path)
+
+        assert probe.duration == 2.5
+        assert (probe.width, probe.height) == (640, 240)
+
+    def test_webm_info_duration(self, tmp_path) -> None:
+        """Длительность из Info берётся в единицах TimecodeScale."""
+        import struct
+
+        from src.services.media_probe import probe_media
+
+        info = _ebml(0x2AD7B1, (1_000_000).to_bytes(3, "big")) + _ebml(
+            0x4489, struct.pack(">d", 61_250.0)
+        )
+        path = tmp_path / "clip.webm"
+        path.write_bytes(
+            _ebml(0x1A45DFA3, _ebml(0x4282, b"webm"))
+            + _ebml(0x18538067, _ebml(0x1549A966, info), unknown_size=True)
+        )
+
+        assert probe_media(path).duration == 61.25
+
+    def test_unknown_format(self, tmp_path) -> None:
+        """Неизвестная сигнатура — ProbeError."""
+        import pytest
+
+        from src.services.media_probe import ProbeError, probe_media
+
+        path = tmp_path / "song.mp3"
+        path.write_bytes(b"ID3\x03\x00" + bytes(100))
+
+        with pytest.raises(ProbeError):
+            probe_media(path)
+
+
+class TestMetadataWorker:
+    """Тесты пакетного извлечения метаданных."""
+
+    def test_initial_status(self) -> None:
+        """В очередь попадают голосовые и разбираемые аудио и видео."""
+        from src.services.media_metadata import initial_metadata_status
+
+        assert initial_metadata_status("audio/webm;codecs=opus", "voice") == "pending"
+        assert initial_metadata_status("audio/mpeg", "voice") == "pending"
+        assert initial_metadata_status("video/mp4", "video") == "pending"
+        assert initial_metadata_status("audio/mpeg", "audio") is None
+        assert initial_metadata_status("image/png", "image") is None
+
+    async def test_batch_updated_in_one_statement(self, tmp_path) -> None:
+        """Пакет забирается через SKIP LOCKED и обновляется одним bulk UPDATE."""
+        import wave
+        from unittest.mock import AsyncMock, MagicMock
+
+        from sqlalchemy.dialects.postgresql import asyncpg
+
+        from src.services.media_metadata import MetadataWorker
+
+        good = tmp_path / "good.wav"
+        with wave.open(str(good), "wb") as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(1)
+            wav.setframerate(8000)
+            wav.writeframes(b"\x80" * 24000)
+        broken = tmp_path / "broken.ogg"
+        broken.write_bytes(b"garbage")
+        rows = [
+            MagicMock(id=uuid.uuid4(), storage_path=str(good)),
+            MagicMock(id=uuid.uuid4(), storage_path=str(broken)),
+        ]
+        result = MagicMock()
+        result.all.return_value = rows
+        session = AsyncMock()
+        session.execute.side_effect = [result, MagicMock()]
+        factory = MagicMock()
+        factory.return_value.return_value.__aenter__.return_value = session
+        worker = MetadataWorker(2, 10, 1.0, session_factory=factory)
+
+        assert await worker.run_once() == 2
+
+        claim = str(session.execute.await_args_list[0].args[0].compile(dialect=asyncpg.dialect()))
+        assert "FOR UPDATE SKIP LOCKED" in claim
+        assert "media_files.metadata_claimed_at <" in claim
+        params = session.execute.await_args_list[1].args[1]
+        assert params[0] == {
+            "id": rows[0].id,
+            "metadata_status": "ready",
+            "duration_seconds": 3,
+        }
+        assert params[1] == {"id": rows[1].id, "metadata_status": "failed"}
+        assert session.commit.await_count == 2
+
+    async def test_claim_committed_before_processing(self) -> None:
+        """Захват пакета фиксируется до разбора: транзакция не висит на декодировании."""
+        from unittest.mock import AsyncMock, MagicMock
+
+        from src.services.media_metadata import MetadataWorker
+
+        row = MagicMock(id=uuid.uuid4(), storage_path="/missing.ogg", media_type="audio")
+        result = MagicMock()
+        result.all.return_value = [row]
+        session = AsyncMock()
+        session.execute.side_effect = [result, MagicMock()]
+        factory = MagicMock()
+        factory.return_value.return_value.__aenter__.return_value = session
+        worker = MetadataWorker(1, 10, 1.0, session_factory=factory)
+
+        async def probe(storage_path):
+            # Захват уже зафиксирован, итог ещё не записан
+            assert session.commit.await_count == 1
+            assert session.execute.await_count == 1
+            return None
+
+        worker._probe = AsyncMock(side_effect=probe)
+
+        assert await worker.run_once() == 1
+
+        assert factory.return_value.call_count == 2
+        params = session.execute.await_args_list[1].args[0].compile().params
+        assert params["metadata_status_1"] == "processing"
+
+    async def test_voice_gets_waveform(self, tmp_path) -> None:
+        """Голосовое получает пики волны в том же bulk UPDATE."""
+        import wave
+        from unittest.mock import AsyncMock, MagicMock
+
+        from src.services.media_metadata import MetadataWorker
+
+        voice = tmp_path / "voice.wav"
+        with wave.open(str(voice), "wb") as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(8000)
+            wav.writeframes(b"\x00\x10" * 16000)
+        row = MagicMock(
+            id=uuid.uuid4(), storage_path=str(voice), mime_type="audio/wav", media_type="voice"
+        )
+        result = MagicMock()
+        result.all.return_value = [row]
+        session = AsyncMock()
+        session.execute.side_effect = [result, MagicMock()]
+        factory = MagicMock()
+        factory.return_value.return_value.__aenter__.return_value = session
+        worker = MetadataWorker(1, 10, 1.0, session_factory=factory)
+
+        assert await worker.run_once() == 1
+
+        params = session.execute.await_args_list[1].args[1]
+        assert params[0]["metadata_status"] == "ready"
+        assert params[0]["duration_seconds"] == 2
+        assert params[0]["waveform"] == bytes([255]) * 100
+
+    def test_waveform_gives_duration_without_probe(self) -> None:
+        """Если заголовки не разобраны, длительность берётся из декодированного аудио."""
+        from src.services.media_metadata import metadata_values
+
+        media_id = uuid.uuid4()
+        values = metadata_values(media_id, None, (b"\x01" * 100, 4.6))
+
+        assert values == {
+            "id": media_id,
+            "metadata_status": "ready",
+            "waveform": b"\x01" * 100,
+            "duration_seconds": 5,
+        }
+
+    def test_voice_duration_limit(self) -> None:
+        """Голосовое длиннее 10 минут отмечается failed, обычное аудио — нет."""
+        from src.services.media_metadata import metadata_values
+        from src.services.media_probe import MediaProbe
+
+        media_id = uuid.uuid4()
+        long_probe = MediaProbe(duration=601.0)
+
+        assert metadata_values(media_id, long_probe, voice=True)["metadata_status"] == "failed"
+        assert metadata_values(media_id, long_probe)["metadata_status"] == "ready"
+        short = metadata_values(media_id, MediaProbe(duration=600.0), voice=True)
+        assert short["metadata_status"] == "ready"
+        empty = metadata_values(media_id, MediaProbe(duration=0.0), voice=True)
+        assert empty["metadata_status"] == "failed"
+
+
+class TestWaveforms:
+    """Тесты пиков громкости голосовых."""
+
+    def test_peaks_normalized_to_bytes(self) -> None:
+        """Каждый отрезок — максимум амплитуды, громкий пик равен 255."""
+        import numpy as np
+
+        from src.services.waveforms import compute_peaks
+
+        amplitudes = np.zeros(1000, dtype=np.int32)
+        amplitudes[5] = 100
+        amplitudes[995] = 50
+
+        peaks = compute_peaks(amplitudes)
+
+        assert len(peaks) == 100
+        assert peaks[0] == 255
+        assert peaks[99] == 128
+        assert sum(peaks[1:99]) == 0
+
+    def test_short_and_silent_audio(self) -> None:
+        """Сэмплов меньше, чем отрезков, и тишина не ломают расчёт."""
+        import numpy as np
+
+        from src.services.waveforms import compute_peaks
+
+        assert len(compute_peaks(np.array([3, 6], dtype=np.int32))) == 100
+        assert compute_peaks(np.zeros(500, dtype=np.int32)) == bytes(100)
+        assert compute_peaks(np.array([], dtype=np.int32)) == bytes(100)
+
+    def test_render_stereo_wav(self, tmp_path) -> None:
+        """WAV декодируется без ffmpeg; пик кадра — максимум по каналам."""
+        import struct
+        import wave
+
+        from src.services.waveforms import render_waveform
+
+        path = tmp_path / "stereo.wav"
+        frames = [(0, 0)] * 4000 + [(-32768, 1000)] * 4000
+        with wave.open(str(path), "wb") as wav:
+            wav.setnchannels(2)
+            wav.setsampwidth(2)
+            wav.setframerate(16000)
+            wav.writeframes(b"".join(struct.pack("<hh", *frame) for frame in frames))
+
+        peaks, duration = render_waveform(str(path), "audio/wav")
+
+        assert duration == 0.5
+        assert peaks == bytes(50) + bytes([255]) * 50
+
+    def test_broken_wav(self, tmp_path) -> None:
+        """Повреждённый WAV — WaveformError."""
+        import pytest
+
+        from src.services.waveforms import WaveformError, render_waveform
+
+        path = tmp_path / "broken.wav"
+        path.write_bytes(b"RIFF garbage")
+
+        with pytest.raises(WaveformError):
+            render_waveform(str(path), "audio/x-wav")
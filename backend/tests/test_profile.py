@@ -92,3 +92,40 @@ class TestProfileSchemas:
         data = ContactListResponse(contacts=[], total=0)
         assert data.contacts == []
         assert data.total == 0
+
+
+class TestProfileUpdate:
+    """Тесты обновления профиля."""
+
+    async def test_cache_invalidated_after_commit(self, monkeypatch):
+        """Кеш пользователя сбрасывается только после фиксации изменений."""
+        from datetime import datetime
+        from unittest.mock import AsyncMock
+
+        from src.api import profile
+        from src.models.user import User
+        from src.schemas.profile import ProfileUpdateRequest
+
+        user = User(
+            id=uuid.uuid4(),
+            email="user@example.com",
+            name="Старое имя",
+            is_active=True,
+            is_verified=False,
+            created_at=datetime(2024, 1, 1),
+        )
+        db = AsyncMock()
+        invalidated = []
+
+        def invalidate(user_id):
+            db.commit.assert_awaited_once()
+            invalidated.append(user_id)
+
+        monkeypatch.setattr(profile, "invalidate_user", invalidate)
+
+        response = await profile.update_my_profile(
+            ProfileUpdateRequest(name="Новое имя"), current_user=user, db=db
+        )
+
+        assert response.name == "Новое имя"
+        assert invalidated == [user.id]
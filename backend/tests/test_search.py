@@ -6,6 +6,7 @@ from datetime import datetime
 import pytest
 
 from src.schemas.search import (
+    SearchOrder,
     SearchRequest,
     SearchResponse,
     SearchResultItem,
@@ -104,3 +105,237 @@ class TestSearchSchemas:
             SearchRequest(query="test", limit=0)
         with pytest.raises(ValueError):
             SearchRequest(query="test", limit=101)
+
+    def test_search_order_default(self) -> None:
+        """По умолчанию результаты сортируются по дате."""
+        assert SearchRequest(query="тест").order == SearchOrder.DATE
+        assert SearchOrder.RELEVANCE.value == "relevance"
+
+
+class TestFullTextQuery:
+    """Тесты SQL полнотекстового поиска."""
+
+    @staticmethod
+    async def _compiled_search(
+        order: SearchOrder, search_type: SearchType = SearchType.ALL
+    ) -> str:
+        from unittest.mock import AsyncMock, MagicMock
+
+        from sqlalchemy.dialects.postgresql.asyncpg import dialect
+
+        from src.api.search import search_messages
+
+        db = AsyncMock()
+        db.scalar.return_value = 0
+        result = MagicMock()
+        result.all.return_value = []
+        db.execute.return_value = result
+
+        await search_messages(
+            q="привет мир",
+            chat_id=None,
+            search_type=search_type,
+            sender_id=None,
+            order=order,
+            limit=20,
+            offset=0,
+            current_user_id=uuid.uuid4(),
+            db=db,
+        )
+        return str(db.execute.await_args.args[0].compile(dialect=dialect()))
+
+    async def test_uses_search_vector(self) -> None:
+        """Совпадение через индексируемый tsvector, без LIKE."""
+        sql = await self._compiled_search(SearchOrder.DATE)
+
+        assert "messages.search_vector @@ websearch_to_tsquery" in sql
+        assert "LIKE" not in sql
+        assert "ts_headline" in sql
+
+    async def test_relevance_order(self) -> None:
+        """Сортировка по релевантности использует ts_rank_cd."""
+        sql = await self._compiled_search(SearchOrder.RELEVANCE)
+
+        assert "ts_rank_cd" in sql
+        assert "ORDER BY rank DESC, messages.created_at DESC" in sql
+
+    async def test_fuzzy_uses_trigram_operators(self) -> None:
+        """Нечёткий режим: ILIKE и <% по триграммному индексу."""
+        sql = await self._compiled_search(SearchOrder.RELEVANCE, SearchType.FUZZY)
+
+        assert "messages.content ILIKE" in sql
+        assert "<% messages.content" in sql
+        assert "word_similarity" in sql
+        assert "search_vector @@" not in sql
+        assert "ts_headline" not in sql
+
+    def test_fuzzy_highlight(self) -> None:
+        """Нечёткая подсветка: вхождения подстроки, без них — None."""
+        from src.services.search import fuzzy_highlight
+
+        assert (
+            fuzzy_highlight("См. Example.com/a и example.com/b", "example.com")
+            == "См. <mark>Example.com</mark>/a и <mark>example.com</mark>/b"
+        )
+        assert fuzzy_highlight("цена 100%", "0%") == "цена 10<mark>0%</mark>"
+        # найдено только по <% (опечатка) — подсвечивать нечего
+        assert fuzzy_highlight("Привет, как дела?", "превет") is None
+
+    def test_escape_like(self) -> None:
+        """Спецсимволы LIKE в запросе экранируются."""
+        from src.services.search import _escape_like
+
+        assert _escape_like("100%_a\\b") == "100\\%\\_a\\\\b"
+
+
+class TestMessageContextLoader:
+    """Тесты пакетной загрузки контекста результатов."""
+
+    @staticmethod
+    def _result(rows=None, scalars=None):
+        from unittest.mock import MagicMock
+
+        result = MagicMock()
+        result.tuples.return_value.all.return_value = rows or []
+        result.tuples.return_value.__iter__.return_value = iter(rows or [])
+        result.scalars.return_value.all.return_value = scalars or []
+        return result
+
+    async def test_page_loaded_in_constant_queries(self) -> None:
+        """Страница из многих сообщений — четыре запроса."""
+        from types import SimpleNamespace
+        from unittest.mock import AsyncMock
+
+        from src.services.message_context import MessageContextLoader
+
+        me, peer, sender = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+        group_id, direct_id, lonely_id, gone_id = (uuid.uuid4() for _ in range(4))
+        messages = [
+            SimpleNamespace(id=uuid.uuid4(), chat_id=chat_id, sender_id=sender_id)
+            for chat_id, sender_id in [
+                (group_id, sender),
+                (group_id, sender),
+                (direct_id, peer),
+                (lonely_id, me),
+                (gone_id, sender),
+            ]
+        ]
+
+        db = AsyncMock()
+        db.execute.side_effect = [
+            self._result([(group_id, "Команда"), (direct_id, None), (lonely_id, None)]),
+            self._result([(direct_id, "Пётр")]),
+            self._result([(sender, "Иван"), (peer, "Пётр")]),
+            self._result(scalars=[messages[1].id]),
+        ]
+
+        contexts = await MessageContextLoader(db).load(messages, me)
+
+        assert db.execute.await_count == 4
+        assert contexts[messages[0].id].chat_name == "Команда"
+        assert contexts[messages[0].id].has_media is False
+        assert contexts[messages[1].id].has_media is True
+        assert contexts[messages[2].id].chat_name == "Пётр"
+        assert contexts[messages[3].id].chat_name == "Чат"
+        assert contexts[messages[3].id].sender_name is None
+        assert messages[4].id not in contexts
+
+    async def test_empty_page_no_queries(self) -> None:
+        """Пустая страница не обращается к БД."""
+        from unittest.mock import AsyncMock
+
+        from src.services.message_context import MessageContextLoader
+
+        db = AsyncMock()
+
+        assert await MessageContextLoader(db).load([], uuid.uuid4()) == {}
+        db.execute.assert_not_awaited()
+
+
+class TestSearchCounter:
+    """Тесты подсчёта результатов поиска."""
+
+    @staticmethod
+    def _session_factory(total: int):
+        from contextlib import asynccontextmanager
+        from unittest.mock import AsyncMock
+
+        session = AsyncMock()
+        session.scalar.return_value = total
+
+        @asynccontextmanager
+        async def open_session():
+            yield session
+
+        return lambda: open_session, session
+
+    async def test_small_result_exact_and_cached(self) -> None:
+        """Совпадений меньше предела — число точное и кешируется."""
+        from unittest.mock import AsyncMock
+
+        from src.services.search import SearchCounter
+
+        counter = SearchCounter(cap=1000, ttl=60)
+        db = AsyncMock()
+        db.scalar.return_value = 42
+
+        assert await counter.estimate(db, "key", []) == (42, True)
+        assert await counter.estimate(db, "key", []) == (42, True)
+        assert db.scalar.await_count == 1
+
+    async def test_large_result_capped_then_exact(self) -> None:
+        """Больше предела — «1000+», точное число считается в фоне."""
+        import asyncio
+        from unittest.mock import AsyncMock
+
+        from src.services.search import SearchCounter
+
+        factory, session = self._session_factory(123456)
+        counter = SearchCounter(cap=1000, ttl=60, session_factory=factory)
+        db = AsyncMock()
+        db.scalar.return_value = 1001
+
+        assert await counter.estimate(db, "key", []) == (1000, False)
+        assert await counter.estimate(db, "key", []) == (1000, False)
+        await asyncio.gather(*counter._pending.values())
+
+        assert session.scalar.await_count == 1
+        assert await counter.estimate(db, "key", []) == (123456, True)
+        assert db.scalar.await_count == 2
+
+    async def test_background_counts_limited(self) -> None:
+        """Фоновых подсчётов не больше concurrency, лишние не запускаются."""
+        import asyncio
+        from unittest.mock import AsyncMock
+
+        from src.services.search import SearchCounter
+
+        factory, session = self._session_factory(5000)
+        counter = SearchCounter(cap=1000, ttl=60, concurrency=2, session_factory=factory)
+        db = AsyncMock()
+        db.scalar.return_value = 1001
+
+        for key in ("a", "b", "c"):
+            assert await counter.estimate(db, key, []) == (1000, False)
+        assert set(counter._pending) == {"a", "b"}
+        await asyncio.gather(*counter._pending.values())
+
+        assert session.scalar.await_count == 2
+        assert counter.cached("c") is None
+
+    async def test_capped_count_query(self) -> None:
+        """Быстрый подсчёт ограничен LIMIT cap + 1."""
+        from unittest.mock import AsyncMock
+
+        from sqlalchemy.dialects.postgresql.asyncpg import dialect
+
+        from src.services.search import SearchCounter
+
+        db = AsyncMock()
+        db.scalar.return_value = 0
+
+        await SearchCounter(cap=1000, ttl=60).estimate(db, "key", [])
+
+        statement = db.scalar.await_args.args[0].compile(dialect=dialect())
+        assert "LIMIT" in str(statement)
+        assert 1001 in statement.params.values()
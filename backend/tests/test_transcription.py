@@ -86,3 +86,341 @@ class TestTranscriptionSchemas:
         media_id = uuid.uuid4()
         data = CreateTranscriptionRequest(media_id=media_id)
         assert data.media_id == media_id
+
+
+class TestTranscriptionQueue:
+    """Тесты очереди транскрипции."""
+
+    @staticmethod
+    def _queue(backend=None, session=None, **overrides):
+        from unittest.mock import AsyncMock, MagicMock
+
+        from src.services.speech import FakeSpeechToText
+        from src.services.transcription_jobs import TranscriptionQueue
+
+        factory = MagicMock()
+        factory.return_value.return_value.__aenter__.return_value = session or AsyncMock()
+        options = {
+            "workers": 2,
+            "poll_interval": 1.0,
+            "timeout": 1.0,
+            "stale_after": 60.0,
+            "max_attempts": 3,
+            "retry_delay": 10.0,
+            "emit_job_event": AsyncMock(),
+        }
+        options.update(overrides)
+        return TranscriptionQueue(
+            backend or FakeSpeechToText(text="привет"), session_factory=factory, **options
+        )
+
+    @staticmethod
+    def _claimed(session, *jobs):
+        """Строки, которые при записи итогов всё ещё принадлежат этим задачам."""
+        from unittest.mock import MagicMock
+
+        locked = MagicMock()
+        locked.tuples.return_value.all.return_value = [(job.id, job.attempts) for job in jobs]
+        session.execute.side_effect = [locked, MagicMock()]
+
+    @staticmethod
+    def _job(attempts=1, duration=5, requested_by=None):
+        from src.services.transcription_jobs import TranscriptionJob
+
+        return TranscriptionJob(
+            uuid.uuid4(),
+            uuid.uuid4(),
+            requested_by,
+            attempts,
+            "/media/voice.ogg",
+            "audio/ogg",
+            duration,
+        )
+
+    async def test_claim_batch_with_skip_locked(self) -> None:
+        """Пакет забирается одним UPDATE с SKIP LOCKED вместе с путём к аудио."""
+        from unittest.mock import AsyncMock, MagicMock
+
+        from sqlalchemy.dialects.postgresql import asyncpg
+
+        job_id = uuid.uuid4()
+        result = MagicMock()
+        result.all.return_value = [
+            (job_id, uuid.uuid4(), None, 1, "/media/voice.ogg", "audio/ogg", 12)
+        ]
+        session = AsyncMock()
+        session.execute.return_value = result
+        queue = self._queue(session=session)
+
+        jobs = await queue.claim(2)
+
+        assert [job.id for job in jobs] == [job_id]
+        sql = str(session.execute.await_args.args[0].compile(dialect=asyncpg.dialect()))
+        assert sql.startswith("UPDATE transcriptions")
+        assert "FOR UPDATE SKIP LOCKED" in sql
+        assert "RETURNING" in sql
+        session.commit.assert_awaited_once()
+
+    async def test_completed(self) -> None:
+        """Успешное распознавание завершает задачу с текстом и языком."""
+        job = self._job()
+
+        outcome = await self._queue().run(job)
+
+        assert outcome["id"] == job.id
+        assert outcome["status"] == "completed"
+        assert outcome["text"] == "привет"
+        assert outcome["language"] == "ru"
+        assert outcome["completed_at"] is not None
+
+    async def test_timeout_is_retried_later(self) -> None:
+        """Таймаут возвращает задачу в очередь с задержкой."""
+        from src.services.speech import FakeSpeechToText
+
+        queue = self._queue(FakeSpeechToText(delay=1.0), timeout=0.01)
+
+        outcome = await queue.run(self._job(attempts=2))
+
+        assert outcome["status"] == "pending"
+        assert outcome["error_message"] == "Превышено время распознавания"
+        assert outcome["available_at"] is not None
+        assert outcome["completed_at"] is None
+
+    async def test_last_attempt_fails(self) -> None:
+        """Ошибка на последней попытке переводит задачу в failed."""
+        from unittest.mock import AsyncMock
+
+        from src.services.speech import SpeechError
+
+        backend = AsyncMock()
+        backend.transcribe.side_effect = SpeechError("Сервис распознавания ответил 503")
+
+        outcome = await self._queue(backend).run(self._job(attempts=3))
+
+        assert outcome["status"] == "failed"
+        assert outcome["error_message"] == "Сервис распознавания ответил 503"
+
+    async def test_exhausted_job_not_sent_to_backend(self) -> None:
+        """Брошенная задача без оставшихся попыток сразу завершается ошибкой."""
+        from unittest.mock import AsyncMock
+
+        backend = AsyncMock()
+
+        outcome = await self._queue(backend).run(self._job(attempts=4))
+
+        assert outcome["status"] == "failed"
+        backend.transcribe.assert_not_awaited()
+
+    async def test_results_flushed_in_one_statement(self) -> None:
+        """Накопленные итоги записываются одним bulk UPDATE."""
+        from unittest.mock import AsyncMock
+
+        from sqlalchemy.dialects.postgresql import asyncpg
+
+        session = AsyncMock()
+        queue = self._queue(session=session)
+        jobs = (self._job(), self._job())
+        for job in jobs:
+            await queue._execute(job)
+        self._claimed(session, *jobs)
+
+        assert await queue.flush() == 2
+
+        locked = session.execute.await_args_list[0].args[0]
+        assert "FOR UPDATE" in str(locked.compile(dialect=asyncpg.dialect()))
+        assert len(session.execute.await_args_list[1].args[1]) == 2
+        assert await queue.flush() == 0
+
+    async def test_outcomes_pushed_after_flush(self) -> None:
+        """После записи итогов запросившему уходит job_event с результатом."""
+        from unittest.mock import AsyncMock
+
+        emit = AsyncMock()
+        user_id = uuid.uuid4()
+        session = AsyncMock()
+        queue = self._queue(session=session, emit_job_event=emit)
+        job, anonymous = self._job(requested_by=user_id), self._job()
+        await queue._execute(job)
+        await queue._execute(anonymous)
+        emit.assert_not_awaited()
+        self._claimed(session, job, anonymous)
+
+        await queue.flush()
+
+        emit.assert_awaited_once()
+        assert emit.await_args.args == (user_id, "transcription", job.id, "completed", 100)
+        assert emit.await_args.kwargs["text"] == "привет"
+
+    async def test_reclaimed_outcome_not_written_or_pushed(self) -> None:
+        """Итог задачи, которую за это время забрали заново, не пишется и не сообщается."""
+        from dataclasses import replace
+        from unittest.mock import AsyncMock
+
+        emit = AsyncMock()
+        session = AsyncMock()
+        queue = self._queue(session=session, emit_job_event=emit)
+        current = self._job(requested_by=uuid.uuid4())
+        reclaimed = self._job(requested_by=uuid.uuid4())
+        await queue._execute(current)
+        await queue._execute(reclaimed)
+        # Брошенную задачу забрал другой воркер: номер попытки уже другой
+        self._claimed(session, current, replace(reclaimed, attempts=2))
+
+        assert await queue.flush() == 1
+
+        assert [row["id"] for row in session.execute.await_args_list[1].args[1]] == [current.id]
+        assert [call.args[2] for call in emit.await_args_list] == [current.id]
+
+    async def test_failed_flush_keeps_results(self) -> None:
+        """Если запись не удалась, итоги остаются до следующего прохода."""
+        from unittest.mock import AsyncMock
+
+        import pytest
+
+        session = AsyncMock()
+        session.execute.side_effect = ConnectionError
+        queue = self._queue(session=session)
+        await queue._execute(self._job())
+
+        with pytest.raises(ConnectionError):
+            await queue.flush()
+
+        assert len(queue._results) == 1
+
+    def test_backend_from_settings(self) -> None:
+        """Сервис распознавания выбирается настройкой STT_BACKEND."""
+        from src.config import Settings
+        from src.services.speech import (
+            FakeSpeechToText,
+            WhisperApiSpeechToText,
+            create_speech_backend,
+        )
+
+        assert isinstance(create_speech_backend(Settings(stt_backend="fake")), FakeSpeechToText)
+        backend = create_speech_backend(
+            Settings(stt_backend="whisper_api", stt_api_url="http://stt:8000/v1/")
+        )
+        assert isinstance(backend, WhisperApiSpeechToText)
+        assert backend.url == "http://stt:8000/v1/audio/transcriptions"
+
+    def test_backend_without_transcribe_not_instantiated(self) -> None:
+        """Сервис распознавания без transcribe() не создаётся."""
+        import pytest
+
+        from src.services.speech import SpeechToText
+
+        class Unfinished(SpeechToText):
+            pass
+
+        with pytest.raises(TypeError):
+            Unfinished()
+
+    async def test_long_voice_split_into_parallel_segments(self, monkeypatch) -> None:
+        """Длинное голосовое распознаётся сегментами параллельно и склеивается по порядку."""
+        import asyncio
+        from unittest.mock import AsyncMock
+
+        from src.services import transcription_jobs
+        from src.services.speech import SpeechResult, SpeechToText
+
+        class SegmentBackend(SpeechToText):
+            def __init__(self) -> None:
+                self.active = 0
+                self.peak = 0
+
+            async def transcribe(self, path: str, mime_type: str) -> SpeechResult:
+                self.active += 1
+                self.peak = max(self.peak, self.active)
+                index = int(path.rsplit("/", 1)[-1].split(".")[0])
+                # Последние сегменты готовы раньше первых
+                await asyncio.sleep(0.01 * (3 - index))
+                self.active -= 1
+                texts = ["раз два три", "три четыре пять", "пять шесть"]
+                return SpeechResult(texts[index], "ru")
+
+        monkeypatch.setattr(transcription_jobs, "can_split", lambda: True)
+        monkeypatch.setattr(transcription_jobs, "cut_segment", AsyncMock())
+        backend = SegmentBackend()
+        emit = AsyncMock()
+        user_id = uuid.uuid4()
+        queue = self._queue(backend, emit_job_event=emit)
+        job = self._job(duration=80, requested_by=user_id)
+
+        outcome = await queue.run(job)
+
+        assert outcome["status"] == "completed"
+        assert outcome["text"] == "раз два три четыре пять шесть"
+        assert backend.peak == 3
+        partials = emit.await_args_list
+        assert all(
+            call.args == (user_id, "transcription", job.id, "processing", progress)
+            for call, progress in zip(partials, [33, 66, 100], strict=True)
+        )
+        # Текст растёт только с начала: первый сегмент готов последним
+        assert [call.kwargs["text"] for call in partials] == ["", "", outcome["text"]]
+        assert partials[0].kwargs["media_id"] == str(job.media_id)
+
+    async def test_unknown_duration_probed_before_split(self, monkeypatch) -> None:
+        """Без длительности из метаданных длинная запись всё равно режется на сегменты."""
+        from unittest.mock import AsyncMock
+
+        from src.services import transcription_jobs
+        from src.services.speech import SpeechResult
+
+        backend = AsyncMock()
+        backend.transcribe.return_value = SpeechResult("слово", "ru")
+        probe = AsyncMock(return_value=75.0)
+        monkeypatch.setattr(transcription_jobs, "can_split", lambda: True)
+        monkeypatch.setattr(transcription_jobs, "probe_duration", probe)
+        monkeypatch.setattr(transcription_jobs, "cut_segment", AsyncMock())
+
+        outcome = await self._queue(backend).run(self._job(duration=None))
+
+        assert outcome["status"] == "completed"
+        probe.assert_awaited_once_with("/media/voice.ogg")
+        # 75 с сегментами по 30 с с перекрытием 2 с
+        assert backend.transcribe.await_count == 3
+        assert all(call.args[1] == "audio/wav" for call in backend.transcribe.await_args_list)
+
+    async def test_failed_segment_retries_job(self, monkeypatch) -> None:
+        """Ошибка одного сегмента возвращает задачу в очередь с текстом ошибки."""
+        from unittest.mock import AsyncMock
+
+        from src.services import transcription_jobs
+        from src.services.audio_segments import SegmentError
+
+        monkeypatch.setattr(transcription_jobs, "can_split", lambda: True)
+        monkeypatch.setattr(
+            transcription_jobs, "cut_segment", AsyncMock(side_effect=SegmentError("ffmpeg: boom"))
+        )
+
+        outcome = await self._queue().run(self._job(duration=80))
+
+        assert outcome["status"] == "pending"
+        assert outcome["error_message"] == "ffmpeg: boom"
+
+
+class TestAudioSegments:
+    """Тесты нарезки аудио и склейки текста сегментов."""
+
+    def test_bounds_overlap(self) -> None:
+        """Сегменты перекрываются и покрывают файл целиком."""
+        from src.services.audio_segments import segment_bounds
+
+        assert segment_bounds(20, 30, 2) == [(0.0, 20.0)]
+        assert segment_bounds(None, 30, 2) == [(0.0, 0.0)]
+        assert segment_bounds(60, 30, 2) == [(0, 30), (28, 30), (56, 4)]
+        bounds = segment_bounds(600, 30, 2)
+        assert len(bounds) == 22
+        assert bounds[-1][0] + bounds[-1][1] == 600
+
+    def test_merge_drops_overlap(self) -> None:
+        """Слова из перекрытия не дублируются, регистр и знаки не мешают."""
+        from src.services.audio_segments import merge_transcripts
+
+        assert merge_transcripts(["Привет, как дела", "Как дела? Отлично"]) == (
+            "Привет, как дела Отлично"
+        )
+        assert merge_transcripts(["один два", "три четыре"]) == "один два три четыре"
+        assert merge_transcripts(["", "текст"]) == "текст"
+        assert merge_transcripts([]) == ""
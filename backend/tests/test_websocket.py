@@ -1,8 +1,14 @@
 """Тесты WebSocket менеджера."""
 
+import asyncio
+import json
 import uuid
 
+import pytest
+
 from src.websocket.manager import ConnectionManager, UserConnection
+from src.websocket.presence import LocalPresenceStore, PresenceStore, PresenceTracker
+from src.websocket.pubsub import LocalPubSubBroker, LocalPubSubManager
 
 
 class TestUserConnection:
@@ -59,3 +65,283 @@ class TestConnectionManager:
 
         assert mgr.is_user_online(user_id) is True
         assert len(mgr._user_sids[user_id]) == 3
+
+
+class Worker:
+    """Узел кластера: ConnectionManager с общим pub/sub брокером.
+
+    Исходящие пакеты Engine.IO перехватываются вместо отправки в сеть,
+    наблюдатели присутствия берутся из словаря вместо таблицы контактов.
+    """
+
+    def __init__(
+        self,
+        broker: LocalPubSubBroker,
+        presence_store: LocalPresenceStore,
+        watchers: dict[uuid.UUID, list[uuid.UUID]],
+    ) -> None:
+        self.manager = ConnectionManager(
+            client_manager=LocalPubSubManager(broker),
+            presence_store=presence_store,
+        )
+        self.manager.presence.offline_grace = 0.01
+        self.sent: list[tuple[str, str, object]] = []
+        self._eio_counter = 0
+
+        async def load_watchers(user_id):
+            return watchers.get(user_id, [])
+
+        self.watchers = watchers
+        self.manager.load_presence_watchers = load_watchers
+
+        async def capture(eio_sid, eio_pkt):
+            event, payload = json.loads(eio_pkt.data[1:])
+            self.sent.append((eio_sid, event, payload))
+
+        self.manager.sio._send_eio_packet = capture
+
+    async def connect(self, user_id: uuid.UUID) -> tuple[str, str]:
+        """Имитировать подключение сокета пользователя."""
+        self._eio_counter += 1
+        eio_sid = f"eio-{id(self)}-{self._eio_counter}"
+        sid = await self.manager.sio.manager.connect(eio_sid, "/")
+        await self.manager.register_connection(sid, user_id)
+        return sid, eio_sid
+
+    def received(self, eio_sid: str) -> list[tuple[str, object]]:
+        """События, доставленные сокету."""
+        return [(event, payload) for sid, event, payload in self.sent if sid == eio_sid]
+
+
+async def _settle() -> None:
+    """Дать слушателям pub/sub обработать очередь."""
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+
+@pytest.fixture
+async def cluster():
+    """Два воркера, связанные in-process заменителем Redis."""
+    broker = LocalPubSubBroker()
+    store = LocalPresenceStore()
+    watchers: dict[uuid.UUID, list[uuid.UUID]] = {}
+    workers = [Worker(broker, store, watchers), Worker(broker, store, watchers)]
+    for worker in workers:
+        await worker.manager.start()
+    await _settle()
+    yield workers
+    for worker in workers:
+        await worker.manager.stop()
+        worker.manager.sio.manager.thread.cancel()
+    await _settle()
+
+
+class TestMultiWorkerFanOut:
+    """Рассылка событий между воркерами."""
+
+    async def test_emit_to_user_reaches_other_worker(self, cluster):
+        """emit_to_user доставляет событие сокету на другом воркере."""
+        worker_a, worker_b = cluster
+        user_id = uuid.uuid4()
+        _, eio_sid = await worker_b.connect(user_id)
+
+        await worker_a.manager.emit_to_user(user_id, "ping", {"n": 1})
+        await _settle()
+
+        assert worker_b.received(eio_sid) == [("ping", {"n": 1})]
+
+    async def test_emit_to_user_all_devices(self, cluster):
+        """Событие получают все соединения пользователя на всех узлах."""
+        worker_a, worker_b = cluster
+        user_id = uuid.uuid4()
+        _, eio_a = await worker_a.connect(user_id)
+        _, eio_b = await worker_b.connect(user_id)
+        _, eio_other = await worker_b.connect(uuid.uuid4())
+
+        await worker_a.manager.emit_to_user(user_id, "ping", {})
+        await _settle()
+
+        assert worker_a.received(eio_a) == [("ping", {})]
+        assert worker_b.received(eio_b) == [("ping", {})]
+        assert worker_b.received(eio_other) == []
+
+    async def test_job_event_reaches_owner(self, cluster):
+        """emit_job_event доставляет владельцу событие задачи в общем формате."""
+        worker_a, worker_b = cluster
+        user_id = uuid.uuid4()
+        job_id = uuid.uuid4()
+        _, eio_sid = await worker_b.connect(user_id)
+
+        await worker_a.manager.emit_job_event(
+            user_id, "export", job_id, "processing", 40, current_message=4
+        )
+        await _settle()
+
+        assert worker_b.received(eio_sid) == [
+            (
+                "job_event",
+                {
+                    "type": "export",
+                    "id": str(job_id),
+                    "status": "processing",
+                    "progress": 40,
+                    "current_message": 4,
+                },
+            )
+        ]
+
+    async def test_room_broadcast_across_workers(self, cluster):
+        """emit_new_message доходит до участников комнаты на всех узлах."""
+        worker_a, worker_b = cluster
+        chat_id = uuid.uuid4()
+        sid_a, eio_a = await worker_a.connect(uuid.uuid4())
+        sid_b, eio_b = await worker_b.connect(uuid.uuid4())
+        await worker_a.manager.sio.enter_room(sid_a, f"chat:{chat_id}")
+        await worker_b.manager.sio.enter_room(sid_b, f"chat:{chat_id}")
+
+        await worker_b.manager.emit_new_message(chat_id, {"content": "Привет"})
+        await _settle()
+
+        assert worker_a.received(eio_a) == [("new_message", {"content": "Привет"})]
+        assert worker_b.received(eio_b) == [("new_message", {"content": "Привет"})]
+
+    async def test_disconnect_stops_delivery(self, cluster):
+        """После отключения сокет не получает события."""
+        worker_a, worker_b = cluster
+        user_id = uuid.uuid4()
+        sid, eio_sid = await worker_b.connect(user_id)
+        await worker_b.manager.unregister_connection(sid)
+        await worker_b.manager.sio.manager.disconnect(sid, "/", ignore_queue=True)
+
+        await worker_a.manager.emit_to_user(user_id, "ping", {})
+        await _settle()
+
+        assert worker_b.received(eio_sid) == []
+
+
+class FakeClock:
+    """Управляемые часы для проверки TTL."""
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestPresenceStore:
+    """Тесты хранилища присутствия."""
+
+    async def test_counts_summed_across_nodes(self):
+        """Соединения пользователя суммируются по всем узлам."""
+        store = LocalPresenceStore()
+        user_id = uuid.uuid4()
+        offline_id = uuid.uuid4()
+
+        await store.set_connections("node-a", {user_id: 2}, ttl=60)
+        await store.set_connections("node-b", {user_id: 1}, ttl=60)
+
+        assert await store.connection_counts([user_id, offline_id]) == {
+            user_id: 3,
+            offline_id: 0,
+        }
+        assert await store.are_online([user_id, offline_id]) == {user_id}
+
+    async def test_entry_expires_without_heartbeat(self):
+        """Запись упавшего узла истекает по TTL."""
+        clock = FakeClock()
+        store = LocalPresenceStore(clock=clock)
+        user_id = uuid.uuid4()
+        await store.set_connections("node-a", {user_id: 1}, ttl=60)
+
+        clock.now += 59
+        assert await store.are_online([user_id]) == {user_id}
+
+        clock.now += 2
+        assert await store.are_online([user_id]) == set()
+
+    async def test_heartbeat_extends_ttl(self):
+        """Heartbeat продлевает записи всех локальных пользователей."""
+        clock = FakeClock()
+        store = LocalPresenceStore(clock=clock)
+        tracker = PresenceTracker(store, ttl=60, offline_grace=0)
+        user_id = uuid.uuid4()
+        await tracker.connected(user_id)
+
+        clock.now += 50
+        await tracker.heartbeat()
+        clock.now += 50
+
+        assert await tracker.are_online([user_id]) == {user_id}
+
+    def test_incomplete_store_not_instantiated(self):
+        """Хранилище без части методов не создаётся."""
+        class PartialStore(PresenceStore):
+            async def set_connections(self, node_id, counts, ttl):
+                pass
+
+        with pytest.raises(TypeError):
+            PartialStore()
+
+
+class TestPresenceEvents:
+    """События онлайн/офлайн для контактов."""
+
+    async def test_online_offline_delivered_to_contacts(self, cluster):
+        """Контакт на другом узле получает user_online и user_offline."""
+        worker_a, worker_b = cluster
+        user_id, friend_id = uuid.uuid4(), uuid.uuid4()
+        worker_a.watchers[user_id] = [friend_id]
+        _, eio_friend = await worker_b.connect(friend_id)
+
+        sid, _ = await worker_a.connect(user_id)
+        await _settle()
+        assert await worker_b.manager.are_online([user_id, friend_id]) == {
+            user_id,
+            friend_id,
+        }
+
+        await worker_a.manager.unregister_connection(sid)
+        await asyncio.sleep(0.05)
+        await _settle()
+
+        assert worker_b.received(eio_friend) == [
+            ("user_online", {"user_id": str(user_id)}),
+            ("user_offline", {"user_id": str(user_id)}),
+        ]
+        assert await worker_b.manager.are_online([user_id]) == set()
+
+    async def test_second_device_does_not_repeat_online(self, cluster):
+        """Второе устройство на другом узле не порождает user_online."""
+        worker_a, worker_b = cluster
+        user_id, friend_id = uuid.uuid4(), uuid.uuid4()
+        worker_a.watchers[user_id] = [friend_id]
+        _, eio_friend = await worker_b.connect(friend_id)
+
+        sid_a, _ = await worker_a.connect(user_id)
+        await worker_b.connect(user_id)
+        await worker_a.manager.unregister_connection(sid_a)
+        await asyncio.sleep(0.05)
+        await _settle()
+
+        assert worker_b.received(eio_friend) == [
+            ("user_online", {"user_id": str(user_id)}),
+        ]
+
+    async def test_reconnect_within_grace_is_silent(self, cluster):
+        """Переподключение в пределах задержки не рассылает событий."""
+        worker_a, worker_b = cluster
+        user_id, friend_id = uuid.uuid4(), uuid.uuid4()
+        worker_a.watchers[user_id] = [friend_id]
+        _, eio_friend = await worker_b.connect(friend_id)
+        sid, _ = await worker_a.connect(user_id)
+        await _settle()
+        worker_b.sent.clear()
+
+        worker_a.manager.presence.offline_grace = 10
+        await worker_a.manager.unregister_connection(sid)
+        await worker_a.connect(user_id)
+        await _settle()
+
+        assert worker_b.received(eio_friend) == []
+        assert worker_a.manager.presence._pending_offline == {}
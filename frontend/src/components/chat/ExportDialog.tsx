@@ -4,8 +4,14 @@
 
 import { useState } from 'react';
 import { exportService } from '../../services/export';
-import type { ExportFormat } from '../../types/export';
+import { wsService } from '../../services/websocket';
+import type { ExportFormat, ExportStatus } from '../../types/export';
 import { FORMAT_LABELS } from '../../types/export';
+import type { JobEvent } from '../../types/job';
+
+const POLL_INTERVAL_MS = 1000;
+// С открытым сокетом прогресс приходит событием job_event, опрос — страховка
+const FALLBACK_POLL_INTERVAL_MS = 15000;
 
 interface ExportDialogProps {
     chatId: string;
@@ -20,6 +26,51 @@ export function ExportDialog({ chatId, chatName, onClose }: ExportDialogProps) {
     const [error, setError] = useState<string | null>(null);
     const [success, setSuccess] = useState(false);
     const [jobId, setJobId] = useState<string | null>(null);
+    const [progress, setProgress] = useState(0);
+
+    const waitForExport = (id: string): Promise<boolean> =>
+        new Promise((resolve) => {
+            let timer: number | undefined;
+            let done = false;
+
+            const finish = (ok: boolean) => {
+                if (done) return;
+                done = true;
+                window.clearTimeout(timer);
+                wsService.off('job_event', handleEvent);
+                resolve(ok);
+            };
+
+            const apply = (status: ExportStatus, value: number | null) => {
+                if (value !== null) setProgress(value);
+                if (status === 'completed') finish(true);
+                if (status === 'failed') finish(false);
+            };
+
+            const handleEvent = (data: unknown) => {
+                const event = data as JobEvent;
+                if (event.type === 'export' && event.id === id) {
+                    apply(event.status, event.progress);
+                }
+            };
+
+            const poll = async () => {
+                try {
+                    const current = await exportService.getExportProgress(id);
+                    apply(current.status, current.progress);
+                } catch {
+                    finish(false);
+                }
+                if (!done) {
+                    const delay = wsService.isConnected ? FALLBACK_POLL_INTERVAL_MS : POLL_INTERVAL_MS;
+                    timer = window.setTimeout(poll, delay);
+                }
+            };
+
+            wsService.on('job_event', handleEvent);
+            // Первый запрос — на случай, если задача завершилась до подписки
+            void poll();
+        });
 
     const handleExport = async () => {
         try {
@@ -33,15 +84,19 @@ export function ExportDialog({ chatId, chatName, onClose }: ExportDialogProps) {
             });
 
             setJobId(job.id);
+            setProgress(0);
+
+            if (!(await waitForExport(job.id))) {
+                setError('Ошибка экспорта чата');
+                return;
+            }
             setSuccess(true);
 
-            setTimeout(async () => {
-                try {
-                    await exportService.downloadExport(job.id);
-                } catch (err) {
-                    console.error('Ошибка скачивания:', err);
-                }
-            }, 1000);
+            try {
+                await exportService.downloadExport(job.id);
+            } catch (err) {
+                console.error('Ошибка скачивания:', err);
+            }
         } catch (err) {
             setError('Ошибка экспорта чата');
         } finally {
@@ -173,7 +228,7 @@ export function ExportDialog({ chatId, chatName, onClose }: ExportDialogProps) {
                                 disabled={loading}
                                 className="flex-1 py-2 px-4 bg-blue-500 hover:bg-blue-600 disabled:bg-blue-300 text-white font-medium rounded-lg transition-colors"
                             >
-                                {loading ? 'Экспорт...' : 'Экспортировать'}
+                                {loading ? `Экспорт... ${progress}%` : 'Экспортировать'}
                             </button>
                         </>
                     )}
@@ -12,12 +12,28 @@ interface SearchPanelProps {
     onClose?: () => void;
 }
 
+const HIGHLIGHT_PATTERN = /<mark>(.*?)<\/mark>/g;
+
+/** Отрисовать фрагмент с совпадениями без HTML-инъекций */
+function renderHighlight(highlight: string) {
+    return highlight.split(HIGHLIGHT_PATTERN).map((part, index) =>
+        index % 2 === 1 ? (
+            <mark key={index} className="bg-yellow-100 text-inherit">
+                {part}
+            </mark>
+        ) : (
+            part
+        )
+    );
+}
+
 export function SearchPanel({ chatId, onResultClick, onClose }: SearchPanelProps) {
     const [query, setQuery] = useState('');
     const [results, setResults] = useState<SearchResultItem[]>([]);
     const [isLoading, setIsLoading] = useState(false);
     const [searchType, setSearchType] = useState<SearchType>('all');
     const [totalCount, setTotalCount] = useState(0);
+    const [totalExact, setTotalExact] = useState(true);
     const [hasMore, setHasMore] = useState(false);
 
     const handleSearch = useCallback(async (offset = 0) => {
@@ -38,6 +54,7 @@ export function SearchPanel({ chatId, onResultClick, onClose }: SearchPanelProps
                 setResults((prev) => [...prev, ...response.results]);
             }
             setTotalCount(response.total_count);
+            setTotalExact(response.total_exact);
             setHasMore(response.has_more);
         } catch (error) {
             console.error('Ошибка поиска:', error);
@@ -92,7 +109,7 @@ export function SearchPanel({ chatId, onResultClick, onClose }: SearchPanelProps
                 </div>
 
                 <div className="flex gap-2">
-                    {(['all', 'text', 'media', 'voice'] as SearchType[]).map((type) => (
+                    {(['all', 'text', 'media', 'voice', 'fuzzy'] as SearchType[]).map((type) => (
                         <button
                             key={type}
                             onClick={() => setSearchType(type)}
@@ -105,6 +122,7 @@ export function SearchPanel({ chatId, onResultClick, onClose }: SearchPanelProps
                             {type === 'text' && 'Текст'}
                             {type === 'media' && 'Медиа'}
                             {type === 'voice' && 'Голос'}
+                            {type === 'fuzzy' && 'Похожие'}
                         </button>
                     ))}
                 </div>
@@ -114,6 +132,7 @@ export function SearchPanel({ chatId, onResultClick, onClose }: SearchPanelProps
                 {totalCount > 0 && (
                     <div className="px-4 py-2 text-sm text-gray-500 border-b">
                         Найдено: {totalCount}
+                        {!totalExact && '+'}
                     </div>
                 )}
 
@@ -128,7 +147,7 @@ export function SearchPanel({ chatId, onResultClick, onClose }: SearchPanelProps
                             <span className="text-xs text-gray-500">{formatDate(result.created_at)}</span>
                         </div>
                         <div className="text-sm text-gray-600 mb-1">{result.sender_name}</div>
-                        <div className="text-sm text-gray-800">{result.highlight}</div>
+                        <div className="text-sm text-gray-800">{result.highlight ? renderHighlight(result.highlight) : result.content}</div>
                         {result.has_media && (
                             <span className="inline-block mt-1 px-2 py-0.5 text-xs bg-gray-100 text-gray-600 rounded">
                                 Медиа
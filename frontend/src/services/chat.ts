@@ -14,8 +14,12 @@ import type {
 } from '../types/chat';
 
 export const chatService = {
-    async getChats(limit = 50, offset = 0): Promise<ChatListResponse> {
-        return api.get<ChatListResponse>(`/chats?limit=${limit}&offset=${offset}`);
+    async getChats(limit = 50, cursor?: string): Promise<ChatListResponse> {
+        let url = `/chats?limit=${limit}`;
+        if (cursor) {
+            url += `&cursor=${encodeURIComponent(cursor)}`;
+        }
+        return api.get<ChatListResponse>(url);
     },
 
     async getChat(chatId: string): Promise<Chat> {
@@ -13,6 +13,7 @@ export const searchService = {
         if (params.chat_id) queryParams.set('chat_id', params.chat_id);
         if (params.search_type) queryParams.set('search_type', params.search_type);
         if (params.sender_id) queryParams.set('sender_id', params.sender_id);
+        if (params.order) queryParams.set('order', params.order);
         if (params.limit) queryParams.set('limit', params.limit.toString());
         if (params.offset) queryParams.set('offset', params.offset.toString());
 
@@ -6,16 +6,12 @@ import { api } from './api';
 import type { VoiceTranscription, VoiceUploadResponse } from '../types/voice';
 
 export const voiceService = {
-    async uploadVoiceMessage(
-        chatId: string,
-        audioBlob: Blob,
-        duration: number
-    ): Promise<VoiceUploadResponse> {
+    async uploadVoiceMessage(chatId: string, audioBlob: Blob): Promise<VoiceUploadResponse> {
         const formData = new FormData();
         formData.append('file', audioBlob, 'voice.webm');
 
         const response = await fetch(
-            `${import.meta.env.VITE_API_URL || ''}/api/voice/upload?chat_id=${chatId}&duration=${duration}`,
+            `${import.meta.env.VITE_API_URL || ''}/api/voice/upload?chat_id=${chatId}`,
             {
                 method: 'POST',
                 body: formData,
@@ -22,6 +22,7 @@ interface WebSocketEvents {
     call_accepted: MessageHandler;
     call_declined: MessageHandler;
     call_ended: MessageHandler;
+    job_event: MessageHandler;
 }
 
 class WebSocketService {
@@ -84,6 +85,7 @@ class WebSocketService {
             'call_accepted',
             'call_declined',
             'call_ended',
+            'job_event',
         ];
 
         events.forEach((event) => {
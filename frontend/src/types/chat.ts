@@ -12,6 +12,7 @@ export interface ChatMember {
     avatar_url: string | null;
     role: MemberRole;
     joined_at: string;
+    is_online: boolean;
 }
 
 export interface Message {
@@ -43,6 +44,8 @@ export interface Chat {
 export interface ChatListResponse {
     chats: Chat[];
     total: number;
+    next_cursor: string | null;
+    has_more: boolean;
 }
 
 export interface MessageListResponse {
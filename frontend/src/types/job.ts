@@ -0,0 +1,13 @@
+/**
+ * Типы событий фоновых задач (канал job_event)
+ */
+
+export type JobType = 'transcription' | 'export';
+
+export interface JobEvent {
+    type: JobType;
+    id: string;
+    status: 'pending' | 'processing' | 'completed' | 'failed';
+    progress: number | null;
+    [key: string]: unknown;
+}
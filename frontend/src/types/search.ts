@@ -2,7 +2,9 @@
  * Типы для поиска
  */
 
-export type SearchType = 'all' | 'text' | 'media' | 'voice';
+export type SearchType = 'all' | 'text' | 'media' | 'voice' | 'fuzzy';
+
+export type SearchOrder = 'relevance' | 'date';
 
 export interface SearchResultItem {
     message_id: string;
@@ -11,7 +13,8 @@ export interface SearchResultItem {
     sender_id: string;
     sender_name: string;
     content: string;
-    highlight: string;
+    /** Фрагменты текста, совпадения обёрнуты в <mark>...</mark>; null — без подсветки */
+    highlight: string | null;
     created_at: string;
     has_media: boolean;
 }
@@ -19,6 +22,8 @@ export interface SearchResultItem {
 export interface SearchResponse {
     query: string;
     total_count: number;
+    /** false — найдено не меньше total_count (например, 1000+) */
+    total_exact: boolean;
     results: SearchResultItem[];
     has_more: boolean;
 }
@@ -28,6 +33,7 @@ export interface SearchParams {
     chat_id?: string;
     search_type?: SearchType;
     sender_id?: string;
+    order?: SearchOrder;
     limit?: number;
     offset?: number;
 }
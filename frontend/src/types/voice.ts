@@ -23,7 +23,8 @@ export interface VoiceMessageResponse {
 export interface VoiceUploadResponse {
     message_id: string;
     chat_id: string;
-    duration: number;
+    media_id: string;
+    url: string;
     created_at: string;
 }
 